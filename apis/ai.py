@@ -325,17 +325,12 @@ async def workbench_overview(current_user: dict = Depends(get_current_user)):
     plan = get_user_plan_summary(user)
     session.commit()
 
-    from core.models.feed import Feed
-    mp_count = session.query(Feed).filter(Feed.owner_id == owner_id).count()
-    article_count = session.query(Article).filter(
-        Article.owner_id == owner_id,
-        Article.status != DATA_STATUS.DELETED,
-    ).count()
-    unread_count = session.query(Article).filter(
-        Article.owner_id == owner_id,
-        Article.status != DATA_STATUS.DELETED,
-        Article.is_read != 1,
-    ).count()
+    from core.feed_stats_service import get_owner_overview
+    # 文章数/未读数来自各公众号的反范式统计：只计用户现有公众号下的正常文章
+    feed_overview = get_owner_overview(session, owner_id)
+    mp_count = feed_overview["mp_count"]
+    article_count = feed_overview["article_count"]
+    unread_count = feed_overview["unread_count"]
 
     wx_authorized = has_wechat_auth(session, owner_id)
     all_drafts = list_local_drafts(owner_id, limit=99999)
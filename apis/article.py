@@ -11,6 +11,8 @@ from apis.base import format_search_kw
 from core.cache import clear_cache_pattern
 from core.log import get_logger
 from core.events import log_event, E
+from core.feed_stats_service import record_articles_removed, record_read_change
+from core.content_backlog_service import remove_from_backlog
 logger = get_logger(__name__)
 from tools.fix import fix_article
 router = APIRouter(prefix=f"/articles", tags=["文章管理"])
@@ -51,11 +53,14 @@ async def _try_fetch_article_content(article: Article, session) -> tuple[bool, s
             return False, "未抓取到正文内容，请检查公众号授权状态后重试"
 
         if content == "DELETED":
+            record_articles_removed(session, [article])
             article.status = DATA_STATUS.DELETED
+            remove_from_backlog(session, [article.id])
             session.commit()
             return False, "该文章已删除或不可访问"
 
         article.content = content
+        remove_from_backlog(session, [article.id])
         session.commit()
         return True, ""
     except Exception as e:
@@ -135,6 +140,7 @@ async def toggle_article_read_status(
             )
         
         # 更新阅读状态
+        record_read_change(session, article, is_read)
         article.is_read = 1 if is_read else 0
         session.commit()
         
@@ -172,14 +178,17 @@ async def clean_duplicate(
             Article.status != DATA_STATUS.DELETED
         ).order_by(Article.url.asc(), Article.publish_time.desc())
         seen_urls = set()
-        deleted_count = 0
+        duplicates = []
         for item in query:
             url = item.url or f"__EMPTY__{item.id}"
             if url in seen_urls:
-                item.status = DATA_STATUS.DELETED
-                deleted_count += 1
+                duplicates.append(item)
             else:
                 seen_urls.add(url)
+        record_articles_removed(session, duplicates)
+        for item in duplicates:
+            item.status = DATA_STATUS.DELETED
+        deleted_count = len(duplicates)
         session.commit()
         msg = "清理重复文章成功"
         return success_response({
@@ -235,16 +244,16 @@ async def get_articles(
         # 分页查询（按发布时间降序）
         articles = query.all()
                        
-        # 查询公众号名称
+        # 一次性查询本页涉及的公众号名称
         from core.models.feed import Feed
+        mp_ids = {article.mp_id for article in articles if article.mp_id}
         mp_names = {}
-        for article in articles:
-            if article.mp_id and article.mp_id not in mp_names:
-                feed = session.query(Feed).filter(
-                    Feed.id == article.mp_id,
-                    Feed.owner_id == owner_id
-                ).first()
-                mp_names[article.mp_id] = feed.mp_name if feed else "未知公众号"
+        if mp_ids:
+            mp_names = dict(
+                session.query(Feed.id, Feed.mp_name)
+                .filter(Feed.id.in_(mp_ids), Feed.owner_id == owner_id)
+                .all()
+            )
         
         # 合并公众号名称到文章列表
         article_list = []
@@ -331,10 +340,15 @@ async def delete_article(
                 )
             )
         # 逻辑删除文章（更新状态为deleted）
+        record_articles_removed(session, [article])
         article.status = DATA_STATUS.DELETED
         if cfg.get("article.true_delete", False):
             session.delete(article)
         session.commit()
+        if cfg.get("article.true_delete", False):
+            # 物理删除后允许重新采集该文章
+            from core.seen_index import get_seen_index
+            get_seen_index().forget(article.mp_id)
         log_event(logger, E.ARTICLE_DELETE, owner_id=_owner(current_user), article_id=article_id)
         return success_response(None, message="文章已标记为删除")
     except Exception as e:
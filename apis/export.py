@@ -11,10 +11,11 @@ logger = get_logger(__name__)
 from datetime import datetime
 from core.config import cfg
 from core.res import save_avatar_locally
+import asyncio
 import csv
-import io
 import os
-import uuid
+import tempfile
+from core.import_service import IMPORTERS, ImportFormatError, create_import_job, get_import_job, start_import_async
 router = APIRouter(prefix=f"/export", tags=["导入/导出"])
 
 
@@ -74,93 +75,65 @@ async def export_mps(
             )
         )
 
+async def _save_upload(file: UploadFile) -> str:
+    """上传文件分块写入临时文件，避免整份读入内存"""
+    fd, path = tempfile.mkstemp(prefix="import_", suffix=".csv")
+    with os.fdopen(fd, "wb") as out:
+        while True:
+            chunk = await file.read(1 << 20)
+            if not chunk:
+                break
+            out.write(chunk)
+    return path
+
+
+async def _run_import(kind: str, file: UploadFile, owner_id: str, background: bool):
+    """background=True 时登记后台任务并立即返回任务进度，否则在线程中导入并返回统计"""
+    path = await _save_upload(file)
+    handed_off = False
+    try:
+        if background:
+            job = create_import_job(owner_id, kind, path, filename=file.filename or "")
+            start_import_async(job["id"], path)
+            handed_off = True
+            return job
+        return await asyncio.to_thread(IMPORTERS[kind](owner_id).run_file, path)
+    finally:
+        if not handed_off:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
 @router.post("/mps/import", summary="导入公众号列表")
 async def import_mps(
     file: UploadFile = File(...),
+    background: bool = Query(False, description="后台导入，立即返回任务ID，通过 /export/import/{job_id} 查询进度"),
     current_user: dict = Depends(get_current_user)
 ):
-    session = DB.get_session()
     try:
-        from core.models.feed import Feed
-        owner_id = _owner(current_user)
-
-        # 读取上传的CSV文件
-        contents = (await file.read()).decode('utf-8-sig')
-        csv_reader = csv.DictReader(io.StringIO(contents))
-
-        # 验证必要字段
-        required_columns = ["公众号名称", "封面图", "简介"]
-        if not all(col in csv_reader.fieldnames for col in required_columns):
-            missing_cols = [col for col in required_columns if col not in csv_reader.fieldnames]
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=error_response(
-                    code=40001,
-                    message=f"CSV文件缺少必要列: {', '.join(missing_cols)}"
-                )
-            )
-
-        # 导入数据
-        imported = 0
-        updated = 0
-        skipped = 0
-
-        for row in csv_reader:
-            mp_id = row["id"]
-            mp_name = row["公众号名称"]
-            mp_cover = row["封面图"]
-            mp_intro = row.get("简介", "")
-            status_val = int(row.get("状态", 1)) if row.get("状态") else 1
-            faker_id = row.get("faker_id", "")
-            import base64
-            try:
-                decoded = base64.b64decode(faker_id).decode("utf-8")
-            except Exception:
-                decoded = faker_id or str(uuid.uuid4())
-            mp_id = f"MP_WXS_{owner_id}_{decoded}"
-
-            # 检查是否已存在
-            existing = session.query(Feed).filter(
-                Feed.faker_id == faker_id,
-                Feed.owner_id == owner_id
-            ).first()
-
-            if existing:
-                # 更新现有记录
-                existing.mp_cover = mp_cover
-                existing.mp_intro = mp_intro
-                existing.status = status_val
-                existing.faker_id = faker_id
-                updated += 1
-            else:
-                # 创建新记录
-                mp = Feed(
-                    id=mp_id,
-                    owner_id=owner_id,
-                    mp_name=mp_name,
-                    mp_cover=mp_cover,
-                    mp_intro=mp_intro,
-                    status=status_val,
-                    faker_id=faker_id,
-                    created_at=datetime.now()
-                )
-                session.add(mp)
-                imported += 1
-
-        session.commit()
-
+        result = await _run_import("feeds", file, _owner(current_user), background)
+        if background:
+            return success_response(result, message="导入任务已开始")
         return success_response({
             "message": "导入公众号列表成功",
             "stats": {
-                "total": imported + updated + skipped,
-                "imported": imported,
-                "updated": updated,
-                "skipped": skipped
+                "total": result["imported"] + result["updated"] + result["skipped"],
+                "imported": result["imported"],
+                "updated": result["updated"],
+                "skipped": result["skipped"]
             }
         })
-
+    except ImportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(
+                code=40001,
+                message=str(e)
+            )
+        )
     except Exception as e:
-        session.rollback()
         logger.error(f"导入公众号列表错误: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_201_CREATED,
@@ -170,6 +143,22 @@ async def import_mps(
             )
         )
 
+@router.get("/import/{job_id}", summary="查询导入任务进度")
+async def get_import_progress(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    job = get_import_job(job_id, _owner(current_user))
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(
+                code=40401,
+                message="导入任务不存在"
+            )
+        )
+    return success_response(job)
+
 @router.get("/mps/opml", summary="导出公众号列表为OPML格式")
 async def export_mps_opml(
     request: Request,
@@ -283,93 +272,32 @@ async def export_tags(
 @router.post("/tags/import", summary="导入标签列表")
 async def import_tags(
         file: UploadFile = File(...),
+        background: bool = Query(False, description="后台导入，立即返回任务ID，通过 /export/import/{job_id} 查询进度"),
         current_user: dict = Depends(get_current_user)
 ):
-    session = DB.get_session()
     try:
-        from core.models.tags import Tags
-        owner_id = _owner(current_user)
-
-        contents = (await file.read()).decode('utf-8-sig')
-        csv_reader = csv.DictReader(io.StringIO(contents))
-
-        required_columns = ["标签名称", "状态", "mps_id"]
-        if not all(col in csv_reader.fieldnames for col in required_columns):
-            missing_cols = [col for col in required_columns if col not in csv_reader.fieldnames]
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=error_response(
-                    code=40002,
-                    message=f"CSV文件缺少必要列: {', '.join(missing_cols)}"
-                )
-            )
-
-        imported = 0
-        updated = 0
-        skipped = 0
-
-        for row in csv_reader:
-            tag_id = row.get("id")
-            tag_name = row.get("标签名称")
-
-            if not tag_name or not tag_name.strip():
-                skipped += 1
-                continue # 如果标签名称为空，则跳过此行
-
-            existing_tag = None
-            if tag_id and tag_id.strip():
-                existing_tag = session.query(Tags).filter(
-                    Tags.id == tag_id.strip(),
-                    Tags.owner_id == owner_id
-                ).first()
-
-            cover = row.get("封面图", "")
-            intro = row.get("描述", "")
-            try:
-                status_val = int(row.get("状态", 1))
-            except (ValueError, TypeError):
-                status_val = 1
-            mps_id_str = row.get("mps_id") or "[]"
-
-            if existing_tag:
-                existing_tag.name = tag_name
-                existing_tag.cover = cover
-                existing_tag.intro = intro
-                existing_tag.status = status_val
-                existing_tag.mps_id = mps_id_str
-                existing_tag.updated_at = datetime.now()
-                updated += 1
-            else:
-                new_tag = Tags(
-                    id=str(uuid.uuid4()),
-                    owner_id=owner_id,
-                    name=tag_name,
-                    cover=cover,
-                    intro=intro,
-                    status=status_val,
-                    mps_id=mps_id_str,
-                    created_at=datetime.now(),
-                    updated_at=datetime.now()
-                )
-                session.add(new_tag)
-                imported += 1
-
-        session.commit()
-
+        result = await _run_import("tags", file, _owner(current_user), background)
+        if background:
+            return success_response(result, message="导入任务已开始")
         return success_response({
             "message": "导入标签列表成功",
             "stats": {
-                "total_rows": imported + updated + skipped,
-                "imported": imported,
-                "updated": updated,
-                "skipped": skipped
+                "total_rows": result["imported"] + result["updated"] + result["skipped"],
+                "imported": result["imported"],
+                "updated": result["updated"],
+                "skipped": result["skipped"]
             }
         })
 
-    except HTTPException as he:
-        raise he
+    except ImportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(
+                code=40002,
+                message=str(e)
+            )
+        )
     except Exception as e:
-        session.rollback()
         logger.error(f"导入标签列表错误: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -151,6 +151,27 @@ async def get_message_task_logs(
         )
     except Exception as e:
         return error_response(code=500, message=str(e))
+
+
+@router.get("/{task_id}/schedule", summary="获取消息任务调度信息")
+async def get_message_task_schedule(
+    task_id: str,
+    current_user: dict = Depends(get_current_user),
+):
+    """返回任务的下次执行时间与最近一次执行耗时/结果（由执行任务的领导者进程写入）"""
+    db = DB.get_session()
+    try:
+        task = db.query(MessageTask).filter(
+            MessageTask.id == task_id,
+            MessageTask.owner_id == _owner(current_user),
+        ).first()
+        if not task:
+            return error_response(code=404, message="Message task not found")
+        from core.task.store import SchedulerJobStore
+        schedule = SchedulerJobStore().get(str(task_id))
+        return success_response(data=schedule or {"job_id": str(task_id), "next_run_at": None, "last_run_at": None})
+    except Exception as e:
+        return error_response(code=500, message=str(e))
 @router.get("/message/test/{task_id}", summary="测试消息")
 async def test_message_task(
     task_id: str,
@@ -289,7 +310,9 @@ async def create_message_task(
             csdn_publish_topk=max(1, int(task_data.csdn_publish_topk or 3)),
             task_type=str(task_data.task_type or 'crawl').strip() or 'crawl',
             publish_platforms=_json.dumps(task_data.publish_platforms or [], ensure_ascii=False),
-            status=task_data.status if task_data.status is not None else 0
+            status=task_data.status if task_data.status is not None else 0,
+            created_at=datetime.now(),
+            updated_at=datetime.now()
         )
         db.add(db_task)
         db.commit()
@@ -354,17 +377,16 @@ async def update_message_task(
         db_task.csdn_publish_enabled = 1 if int(task_data.csdn_publish_enabled or 0) else 0
         db_task.csdn_publish_topk = max(1, int(task_data.csdn_publish_topk or 3))
         db_task.publish_platforms = _json.dumps(task_data.publish_platforms or [], ensure_ascii=False)
+        # 调度器按 (cron_exp, updated_at) 判断任务是否变化
+        db_task.updated_at = datetime.now()
         db.commit()
         db.refresh(db_task)
 
         # 核心逻辑：如果任务状态改变或配置改变，需要同步调度器
         try:
-            from jobs.mps import stop_job, start_job
-            # 先停止旧任务（无论是否存在）
-            stop_job(task_id)
-            # 如果是开启状态，则重新加入调度器
-            if int(db_task.status or 0) == 1:
-                start_job(task_id)
+            from jobs.mps import start_job
+            # 按数据库中的任务定义对齐：已停用则移除，定义变化则替换，未变化不动
+            start_job(task_id)
         except Exception as e:
             logger.warning(f"Failed to sync job {task_id} after update: {e}")
 
@@ -383,7 +383,7 @@ async def add_mp(
          #在这里实现第一次添加获取公众号文章
         fetch_scheduled = False
         if not existing_feed:
-            from core.queue import TaskQueue
+            from core.queue import TaskQueue, LANE_INTERACTIVE
             from core.wx import WxGather
             Max_page=int(cfg.get("max_page","2"))
             token, cookie, user_agent = _resolve_gather_auth(
@@ -392,16 +392,20 @@ async def add_mp(
                 allow_global_fallback=False,
             )
             if token and cookie:
-                TaskQueue.add_task(
+                TaskQueue.submit(
                     WxGather().Model().get_Articles,
-                    faker_id=feed.faker_id,
-                    Mps_id=feed.id,
-                    CallBack=UpdateArticle,
-                    MaxPage=Max_page,
-                    Mps_title=mp_name,
-                    token=token,
-                    cookie=cookie,
-                    user_agent=user_agent,
+                    kwargs=dict(
+                        faker_id=feed.faker_id,
+                        Mps_id=feed.id,
+                        CallBack=UpdateArticle,
+                        MaxPage=Max_page,
+                        Mps_title=mp_name,
+                        token=token,
+                        cookie=cookie,
+                        user_agent=user_agent,
+                    ),
+                    owner_id=owner_id,
+                    lane=LANE_INTERACTIVE,
                 )
                 fetch_scheduled = True
             
@@ -455,8 +459,12 @@ async def delete_mp(
             Article.mp_id == mp_id,
             Article.owner_id == owner_id
         ).delete(synchronize_session=False)
+        from core.models.feed_stats import FeedStats
+        session.query(FeedStats).filter(FeedStats.feed_id == mp_id).delete(synchronize_session=False)
         session.delete(mp)
         session.commit()
+        from core.seen_index import get_seen_index
+        get_seen_index().forget(mp_id)
         log_event(logger, E.FEED_UNSUBSCRIBE, owner_id=owner_id, mp_id=mp_id)
         return success_response({
             "message": "订阅号删除成功",
@@ -1,94 +1,166 @@
 from fastapi import APIRouter, Request, HTTPException
 import httpx
-from fastapi.responses import Response
-import os
-import hashlib
+from fastapi.responses import Response, StreamingResponse, FileResponse
+import asyncio
 import time
-import json
+from typing import Dict, Optional
+from urllib.parse import urlparse
 from core.config import cfg
-CACHE_DIR = cfg.get("cache.dir","data/cache")
-CACHE_TTL = 3600  # 缓存过期时间1小时
+from core.log import get_logger
+from core.res.proxy_cache import ResourceCache, CachedObject
+
+logger = get_logger(__name__)
+ALLOWED_HOSTS = ["mmbiz.qpic.cn", "mmbiz.qlogo.cn", "mmecoa.qpic.cn"]
+# 并发未命中时等待首个请求完成的最长时间（秒），超时后自行回源
+COALESCE_WAIT_SECONDS = 30
+
+_cache: Optional[ResourceCache] = None
+_client: Optional[httpx.AsyncClient] = None
+# 正在回源的 key -> Future(bool)，结果表示是否已写入缓存
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def get_cache() -> ResourceCache:
+    global _cache
+    if _cache is None:
+        _cache = ResourceCache()
+    return _cache
+
+
+def get_client() -> httpx.AsyncClient:
+    """进程内共享的回源连接池，应用关闭时由 close_client 释放"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=5.0, read=20.0, write=20.0, pool=10.0),
+            limits=httpx.Limits(
+                max_connections=int(cfg.get("cache.res.max_connections", 50) or 50),
+                max_keepalive_connections=int(cfg.get("cache.res.max_keepalive", 20) or 20),
+            ),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
 
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
 
 router = APIRouter(prefix="/res", tags=["资源反向代理"])
+
+
+def _browser_headers(etag: str, fetched_at: float, ttl: int) -> dict:
+    max_age = max(0, int(ttl - (time.time() - fetched_at)))
+    return {"Cache-Control": f"public, max-age={max_age}", "ETag": etag}
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _cached_response(request: Request, obj: CachedObject, ttl: int) -> Response:
+    headers = _browser_headers(obj.etag, obj.fetched_at, ttl)
+    if _not_modified(request, obj.etag):
+        return Response(status_code=304, headers=headers)
+    if obj.body is not None:
+        return Response(content=obj.body, headers=headers, media_type=obj.content_type or None)
+    return FileResponse(obj.path, headers=headers, media_type=obj.content_type or None)
+
+
+def _release(key: str, future: asyncio.Future, cached: bool) -> None:
+    if _inflight.get(key) is future:
+        _inflight.pop(key, None)
+    if not future.done():
+        future.set_result(cached)
+
+
+async def _fetch_streaming(target_url: str, key: str) -> Response:
+    """回源并边收边转发给浏览器，同时写入缓存；同一 key 的并发请求等待本次结果"""
+    cache = get_cache()
+    client = get_client()
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        upstream = await client.send(client.build_request("GET", target_url), stream=True)
+    except httpx.HTTPError as e:
+        _release(key, future, False)
+        logger.warning("资源回源失败 %s: %s", target_url[:120], e)
+        raise HTTPException(status_code=502, detail="资源获取失败")
+    if upstream.status_code != 200:
+        try:
+            content = await upstream.aread()
+        finally:
+            await upstream.aclose()
+            _release(key, future, False)
+        return Response(content=content, status_code=upstream.status_code,
+                        media_type=upstream.headers.get("Content-Type"))
+
+    content_type = upstream.headers.get("Content-Type", "")
+    length = upstream.headers.get("Content-Length")
+    cacheable = length is None or (length.isdigit() and int(length) <= cache.max_object_bytes)
+    writer = cache.open_writer(key) if cacheable else None
+    fetched_at = time.time()
+    etag = f'W/"{key[:16]}-{int(fetched_at)}"'
+
+    async def body():
+        cached = False
+        try:
+            async for chunk in upstream.aiter_bytes():
+                if writer is not None:
+                    writer.write(chunk)
+                yield chunk
+            if writer is not None:
+                cached = writer.commit(content_type, etag, fetched_at) is not None
+        finally:
+            if writer is not None:
+                writer.abort()
+            await upstream.aclose()
+            _release(key, future, cached)
+
+    headers = _browser_headers(etag, fetched_at, cache.ttl)
+    if length is not None:
+        headers["Content-Length"] = length
+    return StreamingResponse(body(), status_code=200, headers=headers, media_type=content_type or None)
+
+
+async def _passthrough(request: Request, target_url: str) -> Response:
+    resp = await get_client().request(method=request.method, url=target_url, content=await request.body())
+    return Response(content=resp.content, status_code=resp.status_code,
+                    media_type=resp.headers.get("Content-Type"))
+
+
 @router.api_route("/logo/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"], operation_id="reverse_proxy_logo")
 async def reverse_proxy(request: Request, path: str):
-    hosts=["mmbiz.qpic.cn","mmbiz.qlogo.cn","mmecoa.qpic.cn"]
     path=path.replace("https://", "http://")
-    from urllib.parse import urlparse
-    parsed_url = urlparse(path)
-    host = parsed_url.netloc
-    if  host not  in hosts:
+    host = urlparse(path).netloc
+    if  host not  in ALLOWED_HOSTS:
         return Response(
         content="只允许访问微信公众号图标，请使用正确的域名。",
         status_code=301,
         headers={"Location":path},
     )
-    
-    # 生成缓存文件名
-    cache_key = f"{request.method}_{path}".encode('utf-8')
-    cache_filename = os.path.join(CACHE_DIR, hashlib.sha256(cache_key).hexdigest())
-    
-    # 检查缓存是否存在且有效
-    if os.path.exists(cache_filename):
-        file_mtime = os.path.getmtime(cache_filename)
-        if time.time() - file_mtime < CACHE_TTL:
-            with open(cache_filename, 'rb') as f:
-                content = f.read()
-            
-            # 读取缓存的状态码和响应头
-            headers_filename = cache_filename + ".headers"
-            if os.path.exists(headers_filename):
-                with open(headers_filename, 'r', encoding='utf-8') as f:
-                    headers = json.load(f)
-            else:
-                headers = {}
-            
-            media_type = headers.get("Content-Type")
-            status_code = 200  # 默认状态码
-            
-            return Response(
-                content=content,
-                status_code=status_code,
-                headers=headers,
-                media_type=media_type
-            )
-    
-    target_url = path
-    
-    client = httpx.AsyncClient()
-    request_data = await request.body()
-    headers = dict(request.headers)
-    headers.pop("host", host)
-    headers.pop("referer", None)
-    print(headers)
-    resp = await client.request(
-        method=request.method,
-        url=target_url,
-        # headers=headers,
-        content=request_data
-    )
-    
-    content = resp.content
-    status_code = resp.status_code
-    headers = dict(resp.headers)
-    media_type = resp.headers.get("Content-Type")
-    try:
-        # 缓存响应
-        with open(cache_filename, 'wb') as f:
-            f.write(content)
-        
-        # 缓存响应头
-        headers_filename = cache_filename + ".headers"
-        with open(headers_filename, 'w', encoding='utf-8') as f:
-            json.dump(headers, f)
-    except Exception as e:
-        print(f"缓存响应失败: {str(e)}")    
-    return Response(
-        content=content,
-        status_code=status_code,
-        headers=headers,
-        media_type=media_type
-    )
\ No newline at end of file
+    if request.method != "GET":
+        return await _passthrough(request, path)
+
+    cache = get_cache()
+    key = cache.key_for(path)
+    while True:
+        obj = cache.get(key)
+        if obj is not None:
+            return _cached_response(request, obj, cache.ttl)
+        future = _inflight.get(key)
+        if future is None:
+            break
+        # 同一资源正在回源：等待其完成后从缓存读取；回源失败或不可缓存时重新检查/自行回源
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=COALESCE_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            break
+    return await _fetch_streaming(path, key)
@@ -186,6 +186,10 @@ async def get_mp_articles_source(
     template:str=None
     # current_user: dict = Depends(get_current_user)
 ):
+    if feed_id not in ["all",None]:
+        # 有人订阅的公众号优先补抓正文
+        from core.content_backlog_service import mark_feed_subscribed
+        mark_feed_subscribed(feed_id)
     rss=RSS(name=f'{tag_id}_{feed_id}_{limit}_{offset}',ext=ext)
     rss.set_content_type(content_type)
     rss_xml = rss.get_cache()
@@ -198,6 +202,7 @@ async def get_mp_articles_source(
     try:
         from core.models.article import Article
         from core.models.tags import Tags
+        from core.tag_feed_service import tag_feed_ids
         # 查询公众号信息
         feed = session.query(Feed)
         query=session.query(Feed, Article).join(Article, Feed.id == Article.mp_id)
@@ -214,8 +219,7 @@ async def get_mp_articles_source(
             if tag_id is not None:
                 tags=session.query(Tags).filter(Tags.id == tag_id).first()
                 if tags:
-                    mps_ids = [str(mp['id']) for mp in json.loads(tags.mps_id)] if tags.mps_id else []
-                    query=query.filter(Feed.id.in_(mps_ids))
+                    query=query.filter(Feed.id.in_(tag_feed_ids(tag_id)))
                     feed.mp_name = tags.name
                     feed.mp_intro = tags.intro
                     feed.mp_cover = f'{rss_domain}{tags.cover}'
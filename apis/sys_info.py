@@ -1,9 +1,8 @@
 import platform
 import time
 import sys
-import psutil
-from fastapi import APIRouter,Depends
-from typing import Dict, Any
+from fastapi import APIRouter,Depends,Query
+from typing import Dict, Any, Optional
 from core.auth import get_current_user
 from .base import success_response, error_response
 from core.log import get_logger
@@ -44,7 +43,7 @@ async def get_base_info() -> Dict[str, Any]:
         )    
     
 
-from core.resource import get_system_resources
+from core.resource import get_system_resources, get_resource_sampler
 @router.get("/resources", summary="获取系统资源使用情况")
 async def system_resources(
     current_user: dict = Depends(get_current_user)
@@ -56,16 +55,41 @@ async def system_resources(
         - cpu: CPU使用率(%)
         - memory: 内存使用情况
         - disk: 磁盘使用情况
+        - queue: 任务队列状态
+        - timestamp: 采样时间（由后台采样线程定期采集，接口只读取最近一次快照）
     """
     try:
         resources_info=get_system_resources()
-        resources_info["queue"]=TaskQueue.get_queue_info(),
         return success_response(data=resources_info)
     except Exception as e:
         return error_response(
             code=50002,
             message=f"获取系统资源失败: {str(e)}"
         )
+@router.get("/resources/history", summary="获取系统资源时间序列")
+async def system_resources_history(
+    since: Optional[float] = Query(None, description="起始时间戳（秒，不含），用于增量拉取"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="最多返回最近的点数"),
+    current_user: dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """获取后台采样的资源时间序列
+
+    Returns:
+        BaseResponse格式的数据，包括:
+        - interval: 采样间隔(秒)
+        - samples: 按时间升序的采样点（t/cpu/memory/disk/process_cpu/process_memory/queue_pending/queue_running）
+    """
+    try:
+        sampler=get_resource_sampler()
+        return success_response(data={
+            "interval": sampler.interval,
+            "samples": sampler.series(since=since, limit=limit),
+        })
+    except Exception as e:
+        return error_response(
+            code=50002,
+            message=f"获取系统资源失败: {str(e)}"
+        )
 from core.article_lax import get_article_info
 from .ver import API_VERSION
 from core.base import VERSION as CORE_VERSION,LATEST_VERSION
@@ -83,8 +107,7 @@ async def get_system_info(
         - system: 系统详细信息
     """
     try:
-      
-        wx_cfg.reload()
+        # wx_cfg.get 会按配置文件 mtime 自动重新加载，无需每次请求强制刷新
         # 获取系统信息
         system_info = {
             'os': {
@@ -8,6 +8,7 @@ from schemas.tags import Tags, TagsCreate
 from .base import success_response, error_response
 from core.auth import get_current_user, requires_permission
 from core.cache import clear_cache_pattern
+from core.tag_feed_service import remove_tag_feeds, sync_tag_feeds
 from core.log import get_logger
 logger = get_logger(__name__)
 
@@ -84,6 +85,8 @@ async def create_tag(tag: TagsCreate, db: Session = Depends(get_db),cur_user: di
             updated_at=datetime.now()
         )
         db.add(db_tag)
+        db.flush()
+        sync_tag_feeds(db, db_tag)
         db.commit()
         db.refresh(db_tag)
         
@@ -160,6 +163,7 @@ async def update_tag(tag_id: str, tag_data: TagsCreate, db: Session = Depends(ge
         tag.status = tag_data.status
         tag.mps_id = tag_data.mps_id
         tag.updated_at = datetime.now()
+        sync_tag_feeds(db, tag)
         
         db.commit()
         db.refresh(tag)
@@ -194,6 +198,7 @@ async def delete_tag(tag_id: str, db: Session = Depends(get_db),cur_user: dict =
         ).first()
         if not tag:
             return error_response(code=status.HTTP_201_CREATED, message="Tag not found")
+        remove_tag_feeds(db, [tag.id])
         db.delete(tag)
         db.commit()
         
@@ -372,6 +372,7 @@ async def update_user_info(
                 user.plan_expires_at = datetime.fromisoformat(str(plan_expires_at))
 
         user.updated_at = datetime.now()
+        user.bump_auth_version()
         session.commit()
         from core.auth import clear_user_cache
         clear_user_cache(target_username)
@@ -429,6 +430,7 @@ async def update_user_plan(
                 user.plan_expires_at = datetime.fromisoformat(str(plan_expires_at))
 
         user.updated_at = datetime.now()
+        user.bump_auth_version()
         session.commit()
         plan = get_user_plan_summary(user)
         session.commit()
@@ -459,6 +461,7 @@ async def reset_user_plan_usage(
     user.monthly_image_used = 0
     user.quota_reset_at = datetime.now()
     user.updated_at = datetime.now()
+    user.bump_auth_version()
     session.commit()
     plan = get_user_plan_summary(user)
     session.commit()
@@ -592,6 +595,7 @@ async def delete_user(
     username: str,
     current_user: dict = Depends(get_current_user),
 ):
+    """立即停用用户，关联数据由后台任务分批删除，进度见 GET /user/{username}/purge"""
     _require_admin(current_user)
     if str(current_user.get("username") or "").strip() == str(username or "").strip():
         raise HTTPException(
@@ -599,52 +603,20 @@ async def delete_user(
             detail=error_response(code=40011, message="不允许删除当前登录管理员账号"),
         )
 
+    from core.tenant_purge_service import request_purge, start_purge_async
     session = DB.get_session()
     try:
-        target = session.query(DBUser).filter(DBUser.username == username).first()
-        if not target:
+        job = request_purge(session, username, requested_by=current_user.get("username") or "")
+        if job is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=error_response(code=40401, message="用户不存在"),
             )
-
-        from core.models.feed import Feed
-        from core.models.article import Article
-        from core.models.wechat_auth import WechatAuth
-        from core.models.message_task import MessageTask
-        from core.models.message_task_log import MessageTask as MessageTaskLog
-        from core.models.tags import Tags
-        from core.models.analytics_event import AnalyticsEvent
-        from core.models.ai_profile import AIProfile
-        from core.models.ai_publish_task import AIPublishTask
-        from core.models.billing_order import BillingOrder
-
-        deleted = {
-            "articles": session.query(Article).filter(Article.owner_id == username).delete(synchronize_session=False),
-            "feeds": session.query(Feed).filter(Feed.owner_id == username).delete(synchronize_session=False),
-            "wechat_auths": session.query(WechatAuth).filter(WechatAuth.owner_id == username).delete(synchronize_session=False),
-            "message_tasks": session.query(MessageTask).filter(MessageTask.owner_id == username).delete(synchronize_session=False),
-            "message_task_logs": session.query(MessageTaskLog).filter(MessageTaskLog.owner_id == username).delete(synchronize_session=False),
-            "tags": session.query(Tags).filter(Tags.owner_id == username).delete(synchronize_session=False),
-            "analytics_events": session.query(AnalyticsEvent).filter(AnalyticsEvent.owner_id == username).delete(synchronize_session=False),
-            "analytics_events_by_username": session.query(AnalyticsEvent).filter(AnalyticsEvent.username == username).delete(synchronize_session=False),
-            "ai_profiles": session.query(AIProfile).filter(AIProfile.owner_id == username).delete(synchronize_session=False),
-            "ai_publish_tasks": session.query(AIPublishTask).filter(AIPublishTask.owner_id == username).delete(synchronize_session=False),
-            "billing_orders": session.query(BillingOrder).filter(BillingOrder.owner_id == username).delete(synchronize_session=False),
-        }
-        session.delete(target)
-        session.commit()
-
-        try:
-            from core.auth import clear_user_cache
-            clear_user_cache(username)
-        except Exception:
-            pass
-
+        start_purge_async(job["id"])
         return success_response({
             "username": username,
-            "deleted": deleted,
-        }, message="用户及关联数据已删除")
+            "job": job,
+        }, message="用户已停用，关联数据正在后台删除")
     except HTTPException:
         raise
     except Exception as e:
@@ -658,6 +630,22 @@ async def delete_user(
             session.close()
         except Exception:
             pass
+
+
+@router.get("/{username}/purge", summary="管理员查看用户数据清理进度")
+async def get_user_purge_status(
+    username: str,
+    current_user: dict = Depends(get_current_user),
+):
+    _require_admin(current_user)
+    from core.tenant_purge_service import get_purge_job
+    job = get_purge_job(username)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_response(code=40401, message="没有该用户的清理任务"),
+        )
+    return success_response(job)
    
 
 @router.put("/password", summary="修改密码")
@@ -719,6 +707,7 @@ async def change_password(
         # 更新密码
         user.password_hash = pwd_context.hash(new_password)
         user.updated_at = datetime.now()
+        user.bump_auth_version()
         session.commit()
         session.expire(user)
         # 清除用户缓存，确保新密码立即生效
@@ -17,9 +17,11 @@ from core.ai_service import (
     refine_draft,
     save_local_draft,
 )
+from core.cache import TTLCache
 from core.config import cfg
 from core.db import DB
 from core.log import get_logger
+from core.tracing import current_span_context, start_span
 from core.events import log_event, E
 from core.models.ai_compose_task import AIComposeTask
 
@@ -43,6 +45,8 @@ _WORKER_LOCK = threading.Lock()
 _WORKER_STARTED = False
 _WORKER_THREADS: List[threading.Thread] = []
 _DRAFT_WRITE_LOCK = threading.Lock()
+# 任务 ID → 入队时的 span：worker 线程处理时接上发起请求的 trace
+_TASK_TRACE_PARENTS = TTLCache(maxsize=4096, ttl=3600)
 
 
 class ComposeTaskError(Exception):
@@ -196,6 +200,9 @@ def enqueue_compose_task(
     session.add(task)
     session.commit()
     session.refresh(task)
+    parent = current_span_context()
+    if parent is not None:
+        _TASK_TRACE_PARENTS.set(task.id, parent)
     log_event(logger, E.AI_COMPOSE_ENQUEUE, task_id=task.id, owner_id=task.owner_id, article_id=task.article_id, mode=task.mode)
     return task
 
@@ -292,14 +299,15 @@ def _run_compose_pipeline(session, task: AIComposeTask) -> Dict[str, Any]:
     )
 
     text = call_openai_compatible(profile, system_prompt, user_prompt)
-    text = refine_draft(
-        profile=profile,
-        mode=mode,
-        draft=text,
-        title=article.title or "",
-        create_options=create_options,
-        instruction=instruction_text,
-    )
+    with start_span("compose.refine"):
+        text = refine_draft(
+            profile=profile,
+            mode=mode,
+            draft=text,
+            title=article.title or "",
+            create_options=create_options,
+            instruction=instruction_text,
+        )
     result = {
         "article_id": article.id,
         "mode": mode,
@@ -328,7 +336,7 @@ def _run_compose_pipeline(session, task: AIComposeTask) -> Dict[str, Any]:
         result["images"] = image_urls
         result["image_notice"] = image_notice
 
-    with _DRAFT_WRITE_LOCK:
+    with start_span("compose.save_draft"), _DRAFT_WRITE_LOCK:
         local_draft = save_local_draft(
             owner_id=owner_id,
             article_id=article.id,
@@ -366,7 +374,9 @@ def process_compose_task(session, task: AIComposeTask) -> Tuple[bool, str]:
 
     log_event(logger, E.AI_COMPOSE_START, task_id=task.id, owner_id=task.owner_id, mode=task.mode)
     try:
-        result = _run_compose_pipeline(session, task)
+        with start_span("compose.pipeline", parent=_TASK_TRACE_PARENTS.pop(task.id), kind="consumer",
+                        attributes={"task_id": task.id, "owner_id": task.owner_id, "mode": task.mode}):
+            result = _run_compose_pipeline(session, task)
         task.status = COMPOSE_TASK_STATUS_SUCCESS
         task.status_message = "任务完成"
         task.error_message = ""
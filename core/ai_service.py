@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import os
 import re
 import json
@@ -21,6 +21,8 @@ from core.events import log_event, E
 from core.models.ai_profile import AIProfile
 from core.models.ai_publish_task import AIPublishTask
 from core.models.ai_compose_result import AIComposeResult
+from core.wechat_token_service import get_wechat_token_service
+from core.tracing import traced
 
 logger = get_logger(__name__)
 
@@ -838,6 +840,7 @@ def merge_image_urls_into_markdown(content: str, image_urls: List[str]) -> str:
     return "\n\n".join([x for x in merged_blocks if str(x or "").strip()])
 
 
+@traced("ai.llm", kind="client")
 def call_openai_compatible(profile: AIProfile, system_prompt: str, user_prompt: str) -> str:
     runtime = _resolve_runtime_provider(profile)
     base_url = str(runtime.get("base_url") or "").strip()
@@ -1344,6 +1347,7 @@ def _generate_images_with_jimeng_api(prompts: List[str]) -> Tuple[List[str], str
     return image_urls, "；".join([n for n in notices if n])
 
 
+@traced("ai.images", kind="client")
 def generate_images_with_jimeng(prompts: List[str]) -> Tuple[List[str], str]:
     """
     即梦双通道：
@@ -2327,7 +2331,6 @@ PUBLISH_STATUS_PENDING = "pending"
 PUBLISH_STATUS_PROCESSING = "processing"
 PUBLISH_STATUS_SUCCESS = "success"
 PUBLISH_STATUS_FAILED = "failed"
-_WECHAT_OPENAPI_TOKEN_CACHE: Dict[str, Dict[str, Any]] = {}
 
 
 def _wechat_auth(owner_id: str = "", session=None) -> Tuple[str, str]:
@@ -2396,49 +2399,8 @@ def _try_upload_cover_media_id(token: str, cookie: str, cover_url: str) -> Tuple
 
 
 def _get_wechat_openapi_access_token(app_id: str, app_secret: str) -> Tuple[str, str]:
-    appid = str(app_id or "").strip()
-    secret = str(app_secret or "").strip()
-    if not appid or not secret:
-        return "", "缺少 appid/appsecret"
-    cache_key = f"{appid}:{hashlib.sha1(secret.encode('utf-8')).hexdigest()[:12]}"
-    now_ts = int(time.time())
-    cached = _WECHAT_OPENAPI_TOKEN_CACHE.get(cache_key) or {}
-    cached_token = str(cached.get("token") or "").strip()
-    expire_at = int(cached.get("expire_at") or 0)
-    if cached_token and expire_at > now_ts + 30:
-        return cached_token, ""
-
-    token_url = "https://api.weixin.qq.com/cgi-bin/token"
-    params = {
-        "grant_type": "client_credential",
-        "appid": appid,
-        "secret": secret,
-    }
-    
-    # 日志记录尝试获取 token（脱敏处理）
-    masked_secret = f"{secret[:4]}***{secret[-4:]}" if len(secret) > 8 else "***"
-    logger.info(f"正在尝试为 AppID: {appid} 获取 access_token, Secret: {masked_secret}")
-    
-    try:
-        resp = requests.get(token_url, params=params, timeout=(5, 25))
-    except Exception as e:
-        return "", f"获取 access_token 异常: {e}"
-    if int(resp.status_code or 0) >= 400:
-        return "", f"获取 access_token HTTP {resp.status_code}"
-    try:
-        payload = resp.json()
-    except Exception:
-        return "", "获取 access_token 返回非 JSON"
-    token = str(payload.get("access_token") or "").strip()
-    if not token:
-        err = str(payload.get("errmsg") or payload.get("errcode") or payload)[:260]
-        return "", f"获取 access_token 失败: {err}"
-    expires_in = int(payload.get("expires_in") or 7200)
-    _WECHAT_OPENAPI_TOKEN_CACHE[cache_key] = {
-        "token": token,
-        "expire_at": now_ts + max(60, expires_in - 120),
-    }
-    return token, ""
+    # 统一由 token 服务获取：进程内单飞 + 跨进程共享 + 提前刷新
+    return get_wechat_token_service().get_token(app_id, app_secret)
 
 
 def _download_image_bytes(image_url: str) -> Tuple[bytes, str, str]:
@@ -2522,12 +2484,12 @@ def _upload_article_image_openapi(access_token: str, image_url: str) -> Tuple[st
     if not image_bytes:
         return "", f"图片下载失败 {dl_err}"
     image_bytes = _compress_image_bytes(image_bytes, max_size=1 * 1024 * 1024)
-    endpoint = f"https://api.weixin.qq.com/cgi-bin/media/uploadimg?access_token={access_token}"
+    endpoint = "https://api.weixin.qq.com/cgi-bin/media/uploadimg"
     files = {
         "media": (f"body_{int(time.time() * 1000)}.jpg", image_bytes, mime or "image/jpeg"),
     }
     try:
-        resp = requests.post(endpoint, files=files, timeout=(5, 40))
+        resp = get_wechat_token_service().post(endpoint, access_token, files=files, timeout=(5, 40))
     except Exception as e:
         return "", f"正文图片上传异常: {e}"
     if int(resp.status_code or 0) >= 400:
@@ -2545,12 +2507,12 @@ def _upload_article_image_openapi(access_token: str, image_url: str) -> Tuple[st
 
 def _upload_cover_media_openapi(access_token: str, cover_url: str) -> Tuple[str, str]:
     def _post_cover(image_bytes: bytes, mime: str, filename: str) -> Tuple[str, str]:
-        endpoint = f"https://api.weixin.qq.com/cgi-bin/material/add_material?access_token={access_token}&type=image"
+        endpoint = "https://api.weixin.qq.com/cgi-bin/material/add_material"
         files = {
             "media": (filename, image_bytes, mime or "image/jpeg"),
         }
         try:
-            resp = requests.post(endpoint, files=files, timeout=(5, 40))
+            resp = get_wechat_token_service().post(endpoint, access_token, params={"type": "image"}, files=files, timeout=(5, 40))
         except Exception as e:
             return "", f"封面上传异常: {e}"
         if int(resp.status_code or 0) >= 400:
@@ -2601,12 +2563,12 @@ def _upload_cover_media_openapi_from_local_file(access_token: str, file_path: st
     elif lower.endswith(".webp"):
         mime = "image/webp"
     image_bytes = _compress_image_bytes(image_bytes, max_size=9 * 1024 * 1024)
-    endpoint = f"https://api.weixin.qq.com/cgi-bin/material/add_material?access_token={access_token}&type=image"
+    endpoint = "https://api.weixin.qq.com/cgi-bin/material/add_material"
     files = {
         "media": (f"cover_fallback_{int(time.time() * 1000)}.jpg", image_bytes, mime),
     }
     try:
-        resp = requests.post(endpoint, files=files, timeout=(5, 40))
+        resp = get_wechat_token_service().post(endpoint, access_token, params={"type": "image"}, files=files, timeout=(5, 40))
     except Exception as e:
         return "", f"默认封面上传异常: {e}"
     if int(resp.status_code or 0) >= 400:
@@ -2956,12 +2918,13 @@ def _publish_batch_to_wechat_draft_openapi(
     if not articles:
         return False, "没有有效内容可推送", {}
 
-    endpoint = f"https://api.weixin.qq.com/cgi-bin/draft/add?access_token={token}"
+    endpoint = "https://api.weixin.qq.com/cgi-bin/draft/add"
     try:
         # 显式序列化 JSON，确保中文不被转义为 \uXXXX（修复草稿箱乱码问题）
         payload_json = json.dumps({"articles": articles}, ensure_ascii=False)
-        resp = requests.post(
+        resp = get_wechat_token_service().post(
             endpoint,
+            token,
             data=payload_json.encode('utf-8'),
             headers={"Content-Type": "application/json; charset=utf-8"},
             timeout=(5, 40),
@@ -2990,6 +2953,7 @@ def _publish_batch_to_wechat_draft_openapi(
     return False, f"微信草稿箱投递失败: errcode={errcode}, errmsg={errmsg}", payload
 
 
+@traced("wechat.draft.publish")
 def publish_batch_to_wechat_draft(
     items: List[Dict],
     owner_id: str = "",
@@ -3289,13 +3253,104 @@ def enqueue_publish_task(
     session.add(task)
     session.commit()
     session.refresh(task)
+    _notify_publish_task(task)
+    bump_publish_generation()
     return task
 
 
+# 投递任务入队回调（投递调度器注册，新任务入队后立即唤醒，不必等下一轮扫描）
+_publish_task_listeners: List[Callable[[str, str, Optional[datetime]], None]] = []
+
+
+def add_publish_task_listener(listener: Callable[[str, str, Optional[datetime]], None]) -> None:
+    if listener not in _publish_task_listeners:
+        _publish_task_listeners.append(listener)
+
+
+def remove_publish_task_listener(listener) -> None:
+    if listener in _publish_task_listeners:
+        _publish_task_listeners.remove(listener)
+
+
+def _notify_publish_task(task: AIPublishTask) -> None:
+    for listener in list(_publish_task_listeners):
+        try:
+            listener(str(task.id), str(task.owner_id or ""), task.next_retry_at)
+        except Exception as e:
+            logger.warning("投递任务入队通知失败: %s", e)
+
+
+# 入队标记：scheduler_leases 中的一行，generation 在每次入队后递增，
+# 其他进程的投递调度器只读这一行判断是否需要增量加载，空闲时不扫描投递任务表
+PUBLISH_MARKER_NAME = "ai_publish_queue"
+
+
+def bump_publish_generation() -> None:
+    """通知其他进程有新的投递任务入队"""
+    from sqlalchemy import insert, update
+    from sqlalchemy.exc import IntegrityError
+    from core.db import DB
+    from core.models.scheduler_lease import SchedulerLease
+
+    table = SchedulerLease.__table__
+    now = datetime.now()
+    try:
+        with DB.get_engine().begin() as conn:
+            rows = conn.execute(
+                update(table).where(table.c.name == PUBLISH_MARKER_NAME).values(
+                    generation=table.c.generation + 1, updated_at=now,
+                )
+            ).rowcount
+            if not rows:
+                conn.execute(insert(table).values(
+                    name=PUBLISH_MARKER_NAME, holder="", generation=1, updated_at=now,
+                ))
+    except IntegrityError:
+        # 其他进程同时插入了标记行，重新递增一次
+        bump_publish_generation()
+    except Exception as e:
+        logger.warning("投递任务入队标记更新失败: %s", e)
+
+
+def read_publish_generation() -> Optional[int]:
+    """读取入队标记，读取失败返回 None"""
+    from sqlalchemy import select
+    from core.db import DB
+    from core.models.scheduler_lease import SchedulerLease
+
+    table = SchedulerLease.__table__
+    try:
+        with DB.get_engine().connect() as conn:
+            value = conn.execute(select(table.c.generation).where(table.c.name == PUBLISH_MARKER_NAME)).scalar()
+    except Exception as e:
+        logger.warning("投递任务入队标记读取失败: %s", e)
+        return None
+    return int(value or 0)
+
+
+def recover_stale_publish_tasks(session, lease_seconds: int, now: Optional[datetime] = None) -> int:
+    """把处理中且超过 lease_seconds 未更新的任务（处理进程崩溃遗留）放回 pending，返回恢复数"""
+    now = now or datetime.now()
+    affected = session.query(AIPublishTask).filter(
+        AIPublishTask.status == PUBLISH_STATUS_PROCESSING,
+        AIPublishTask.updated_at < now - timedelta(seconds=max(1, int(lease_seconds))),
+    ).update(
+        {
+            AIPublishTask.status: PUBLISH_STATUS_PENDING,
+            AIPublishTask.next_retry_at: now,
+            AIPublishTask.updated_at: now,
+        },
+        synchronize_session=False,
+    )
+    session.commit()
+    return int(affected or 0)
+
+
 def _mark_task_processing(session, task: AIPublishTask, now: datetime) -> bool:
     """
     尝试将任务从 pending 原子切换到 processing。
-    在并发 worker 场景下，只有一个执行器能成功切换状态。
+    在并发 worker 场景下，只有一个执行器能成功切换状态；
+    条件中同时校验 next_retry_at，其他进程已处理并改期的任务不会被提前认领。
     """
     if not hasattr(session, "query"):
         task.status = PUBLISH_STATUS_PROCESSING
@@ -3306,6 +3361,7 @@ def _mark_task_processing(session, task: AIPublishTask, now: datetime) -> bool:
         affected = session.query(AIPublishTask).filter(
             AIPublishTask.id == task.id,
             AIPublishTask.status == PUBLISH_STATUS_PENDING,
+            (AIPublishTask.next_retry_at.is_(None)) | (AIPublishTask.next_retry_at <= now),
         ).update(
             {
                 AIPublishTask.status: PUBLISH_STATUS_PROCESSING,
@@ -3379,7 +3435,8 @@ def process_pending_publish_tasks(session, owner_id: str = "", limit: int = 10)
     )
     if owner_id:
         query = query.filter(AIPublishTask.owner_id == owner_id)
-    tasks = query.order_by(AIPublishTask.created_at.asc()).limit(max(1, int(limit or 10))).all()
+    tasks = query.order_by(AIPublishTask.next_retry_at.asc(), AIPublishTask.created_at.asc()).limit(
+        max(1, int(limit or 10))).all()
 
     success_count = 0
     failed_count = 0
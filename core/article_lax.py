@@ -1,11 +1,10 @@
 import threading
-from core import lax, thread
-from core.models import Article,Feed,DATA_STATUS
+from sqlalchemy import case, func
+from core.models import Article,Feed,DATA_STATUS,ContentBacklog
 from core.db import DB
 from core.cache import data_cache
-import json
 class ArticleInfo():
-    #没有内容的文章数量
+    #没有内容的文章数量（补抓队列中的文章）
     no_content_count:int=0
     #有内容的文章数量
     has_content_count:int=0
@@ -16,45 +15,40 @@ class ArticleInfo():
     #公众号总数
     mp_all_count:int=0
 def laxArticle():
+    """统计文章数量：文章表只做一次聚合扫描，不读正文列（由资源采样线程低频调用，不在请求中执行）"""
     info=ArticleInfo()
     session=DB.get_session()
-    #获取没有内容的文章数量 - 只查询content字段
-    info.no_content_count=session.query(Article).filter(Article.content == None).count()
-    #所有文章数量 - 只查询id字段
-    info.all_count=session.query(Article.id).count()
+    try:
+        all_count, wrong_count = session.query(
+            func.count(Article.id),
+            func.sum(case((Article.status != DATA_STATUS.ACTIVE, 1), else_=0)),
+        ).one()
+        #没有内容的文章数量：读补抓队列，不再扫描正文列
+        no_content_count = session.query(func.count(ContentBacklog.article_id)).scalar()
+        #公众号总数
+        mp_all_count = session.query(func.count(Feed.id)).scalar()
+    finally:
+        session.close()
+    info.all_count=int(all_count or 0)
+    info.no_content_count=int(no_content_count or 0)
     #有内容的文章数量
     info.has_content_count=info.all_count-info.no_content_count
-
-    #获取删除的文章 - 只查询status字段
-    info.wrong_count=session.query(Article).filter(Article.status !=DATA_STATUS.ACTIVE ).count()
-
-    #公众号总数 - 只查询id字段
-    info.mp_all_count=session.query(Feed.id).distinct().count()
-    # session.close()
+    info.wrong_count=int(wrong_count or 0)
+    info.mp_all_count=int(mp_all_count or 0)
     return info.__dict__
-    pass
 ARTICLE_INFO={}
 lock = threading.Lock()
-def refresh_article_info():
-    def lax_article():
-        global ARTICLE_INFO
-        with lock:
-            ARTICLE_INFO=laxArticle()
-            # 存储到缓存中，缓存30分钟
-            data_cache.set("article_info", ARTICLE_INFO)
-            print(ARTICLE_INFO)
-    threading.Thread(target=lax_article).start()
+def refresh_article_info(max_age: int = 1800):
+    """刷新文章统计；其他进程在 max_age 秒内已统计过时直接复用缓存中的结果"""
+    global ARTICLE_INFO
+    with lock:
+        info = data_cache.get("article_info", ttl=max_age)
+        if info is None:
+            info = laxArticle()
+            data_cache.set("article_info", info)
+        ARTICLE_INFO = info
+    return info
 
 def get_article_info():
-    """从缓存获取文章信息，如果缓存不存在则返回全局变量"""
-    # 先尝试从缓存获取
-    cached_info = data_cache.get("article_info", ttl=1800)  # 30分钟TTL
-    ARTICLE_INFO=cached_info
-    if cached_info is not None:
-        return cached_info
-    else:
-        refresh_article_info()
-    
-    # 如果缓存不存在，返回全局变量
+    """返回最近一次的文章统计（由资源采样线程定期刷新，请求中不查库）"""
     return ARTICLE_INFO
-
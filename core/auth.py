@@ -12,7 +12,11 @@ from core.models import User
 from sqlalchemy import or_
 import core.db  as db
 from passlib.context import CryptContext
+from sqlalchemy import select
+from core.cache import TTLCache
+from core.login_limiter import LoginAttemptLimiter
 import json
+import time
 
 DB=db.Db(tag="用户连接")
 SECRET_KEY = cfg.get("secret","csol2025")  # 生产环境应使用更安全的密钥
@@ -45,54 +49,84 @@ class PasswordHasher:
 pwd_context = PasswordHasher()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{API_BASE}/auth/token",auto_error=False)
 
-# 用户缓存字典
-_user_cache = {}
-# 登录失败次数记录
-_login_attempts = {}
-MAX_LOGIN_ATTEMPTS = 5
+# 已验证的 Token -> claims（有上限、带过期时间，不超过 Token 本身的有效期）
+_token_cache = TTLCache(
+    maxsize=int(cfg.get("auth.cache.max_tokens", 10000) or 10000),
+    ttl=int(cfg.get("auth.cache.token_ttl", 300) or 300),
+)
+# 用户名 -> (auth_version, 用户记录)；每次使用前与数据库中的 auth_version 比对，跨进程失效
+_user_cache = TTLCache(
+    maxsize=int(cfg.get("auth.cache.max_users", 5000) or 5000),
+    ttl=int(cfg.get("auth.cache.user_ttl", 600) or 600),
+)
+# 登录失败次数记录在数据库中，多个 worker 共享；最后一次失败 LOGIN_LOCK_SECONDS 秒后自动解锁
+MAX_LOGIN_ATTEMPTS = int(cfg.get("auth.max_login_attempts", 5) or 5)
+LOGIN_LOCK_SECONDS = int(cfg.get("auth.login_lock_seconds", 900) or 900)
+_login_limiter = LoginAttemptLimiter(MAX_LOGIN_ATTEMPTS, LOGIN_LOCK_SECONDS)
 
 def get_login_attempts(username: str) -> int:
     """获取用户登录失败次数"""
-    return _login_attempts.get(username, 0)
+    return _login_limiter.attempts(username)
 
-def get_user(identifier: str) -> Optional[dict]:
-    """从数据库获取用户，带缓存功能"""
-    # 先检查缓存
-    if identifier in _user_cache:
-        return _user_cache[identifier]
-        
-    session = DB.get_session()
-    try:
-        user = session.query(DBUser).filter(
-            or_(DBUser.username == identifier, DBUser.phone == identifier)
-        ).first()
-        if user:
-            # 转换为字典并存入缓存
-            user_dict = user.__dict__.copy()
-            # 移除 SQLAlchemy 内部属性（如 _sa_instance_state）
-            user_dict.pop('_sa_instance_state', None)
-            user_dict=User(**user_dict)
-            _user_cache[identifier] = user_dict
-            _user_cache[user.username] = user_dict
-            if getattr(user, "phone", None):
-                _user_cache[user.phone] = user_dict
-            return user_dict
-        return None
+def _lookup_auth_version(identifier: str):
+    """按用户名或手机号只查询 (username, auth_version)，用于校验缓存是否仍然有效"""
+    table = DBUser.__table__
+    with DB.get_engine().connect() as conn:
+        row = conn.execute(
+            select(table.c.username, table.c.auth_version)
+            .where(or_(table.c.username == identifier, table.c.phone == identifier))
+            .limit(1)
+        ).first()
+    if row is None:
+        return None
+    return row[0], int(row[1] or 0)
+
+def _load_user(username: str) -> Optional[User]:
+    session = DB.get_session()
+    try:
+        user = session.query(DBUser).filter(DBUser.username == username).first()
+        if not user:
+            return None
+        # 转换为脱离会话的对象后存入缓存
+        user_dict = user.__dict__.copy()
+        # 移除 SQLAlchemy 内部属性（如 _sa_instance_state）
+        user_dict.pop('_sa_instance_state', None)
+        return User(**user_dict)
+    finally:
+        session.close()
+
+def get_user(identifier: str) -> Optional[dict]:
+    """从数据库获取用户，带缓存功能（缓存按 auth_version 校验，其他进程的修改同样可见）"""
+    try:
+        found = _lookup_auth_version(identifier)
+        if found is None:
+            _user_cache.pop(identifier)
+            return None
+        username, version = found
+        cached = _user_cache.get(username)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        user = _load_user(username)
+        if user is None:
+            _user_cache.pop(username)
+            return None
+        _user_cache.set(username, (int(user.auth_version or 0), user))
+        return user
     except Exception as e:
         from core.print import print_error
         print_error(f"获取用户错误: {str(e)}")
         return None
         
-def clear_user_cache(username: str):
-    """清除指定用户的缓存"""
-    if username in _user_cache:
-        del _user_cache[username]
+def clear_user_cache(username: str):
+    """清除本进程中指定用户的缓存（其他进程依赖 auth_version 失效）"""
+    _user_cache.pop(username)
 
 from apis.base import error_response
 def authenticate_user(username: str, password: str) -> Optional[DBUser]:
     """验证用户凭据"""
-    # 检查是否超过最大尝试次数
-    if _login_attempts.get(username, 0) >= MAX_LOGIN_ATTEMPTS:
+    # 校验密码前先占用一次尝试，超过最大尝试次数直接拒绝
+    allowed, failed_count = _login_limiter.acquire(username)
+    if not allowed:
         raise HTTPException(
             status_code=status.HTTP_202_ACCEPTED,
             detail=error_response(
@@ -104,9 +138,7 @@ def authenticate_user(username: str, password: str) -> Optional[DBUser]:
     user = get_user(username)
 
     if not user or not pwd_context.verify(password, user.password_hash):
-        # 增加失败次数
-        _login_attempts[username] = _login_attempts.get(username, 0) + 1
-        remaining_attempts = MAX_LOGIN_ATTEMPTS - _login_attempts[username]
+        remaining_attempts = MAX_LOGIN_ATTEMPTS - failed_count
         raise HTTPException(
             status_code=status.HTTP_202_ACCEPTED,
             detail=error_response(
@@ -115,9 +147,16 @@ def authenticate_user(username: str, password: str) -> Optional[DBUser]:
             )
         )
     
-    # 登录成功，清除失败记录
-    if username in _login_attempts:
-        del _login_attempts[username]
+    # 密码正确，清除失败记录
+    _login_limiter.reset(username)
+    if user.is_active is False:
+        raise HTTPException(
+            status_code=status.HTTP_202_ACCEPTED,
+            detail=error_response(
+                code=40102,
+                message="帐号已停用"
+            )
+        )
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -137,16 +176,22 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except jwt.PyJWTError:
-        raise credentials_exception
+    payload = _token_cache.get(token) if token else None
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.PyJWTError:
+            raise credentials_exception
+        if payload.get("sub") is None:
+            raise credentials_exception
+        # 缓存时间不超过 Token 剩余有效期
+        exp = payload.get("exp")
+        ttl = _token_cache.ttl if exp is None else min(_token_cache.ttl, float(exp) - time.time())
+        _token_cache.set(token, payload, ttl=ttl)
+    username: str = payload.get("sub")
     
     user = get_user(username)
-    if user is None:
+    if user is None or user.is_active is False:
         raise credentials_exception
         
     permissions = user.permissions
@@ -121,6 +121,7 @@ def apply_subscription(user: DBUser, tier: str, months: int) -> Tuple[datetime,
     ensure_user_plan_defaults(user, preferred_tier=normalized)
     user.plan_expires_at = end
     user.updated_at = now
+    user.bump_auth_version()
     return start, end
 
 
@@ -228,6 +229,7 @@ def sweep_expired_subscriptions(session, limit: int = 200) -> Dict:
         user.monthly_ai_used = min(int(user.monthly_ai_used or 0), int(user.monthly_ai_quota))
         user.monthly_image_used = min(int(user.monthly_image_used or 0), int(user.monthly_image_quota))
         user.updated_at = now
+        user.bump_auth_version()
         changed.append(user.username)
     if changed:
         session.commit()
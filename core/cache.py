@@ -3,7 +3,9 @@ import hashlib
 import time
 import json
 import pickle
-from typing import Any, Optional, Union
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Union
 from functools import wraps
 from core.config import cfg
 
@@ -158,4 +160,62 @@ def clear_cache_pattern(pattern: str) -> bool:
 
 def clear_all_cache() -> bool:
     """清除所有视图缓存"""
-    return view_cache.clear()
\ No newline at end of file
+    return view_cache.clear()
+
+class TTLCache:
+    """进程内有界缓存：每项带过期时间，超过 maxsize 时淘汰最久未使用的项"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if self._clock() >= expires_at:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else float(ttl)
+        if ttl <= 0:
+            self.pop(key)
+            return
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def incr(self, key, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """计数加 amount 并重置过期时间，返回新值"""
+        ttl = self.ttl if ttl is None else float(ttl)
+        with self._lock:
+            entry = self._data.get(key)
+            current = entry[1] if entry is not None and self._clock() < entry[0] else 0
+            value = int(current) + amount
+            self._store(key, value, ttl)
+        return value
+
+    def _store(self, key, value, ttl: float) -> None:
+        self._data[key] = (self._clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,14 +1,34 @@
 import yaml
 import sys
 import os
+import re
+import copy
+import time
 import argparse
 from string import Template
 from core.print import print_warning, print_error,print_info
 from .file import FileCrypto
+# 匹配 ${VAR:-default} 或 ${VAR} 格式
+_ENV_VAR_PATTERN = re.compile(r'\$\{([^}:]+)(?::-([^}]*))?\}')
+_MISSING = object()
+
+
+class ConfigSnapshot:
+    """Resolved (env-interpolated, typed) view of a config tree with a flat dotted-key index."""
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+
 class Config: 
     config_path=""
-    config={}
-    _config_cache = None  # 添加缓存变量
+    _raw={}
+    _snapshot=None      # 解析后的只读快照，配置变化时置空、下次 get 时重建
+    _mtime=None         # 最近一次加载时配置文件的 mtime
+    _checked_at=0.0
+    MTIME_CHECK_INTERVAL=1.0  # 检查配置文件 mtime 的最小间隔（秒）
     def __init__(self, config_path=None, encrypt=False):
         self.args = self.parse_args()
         self.config_path = config_path or self.args.config
@@ -21,6 +41,17 @@ class Config:
         self.get_config()
         # 初始化加密设置
         self._init_encryption()
+
+    @property
+    def config(self):
+        # 调用方拿到原始配置后可能原地修改（如 product_mode、配置管理接口），下次 get 时重建快照
+        self._snapshot = None
+        return self._raw
+
+    @config.setter
+    def config(self, value):
+        self._raw = value
+        self._snapshot = None
         
     def _init_encryption(self):
         """初始化加密设置"""
@@ -89,20 +120,26 @@ class Config:
             elif isinstance(data, list):
                 return [self.replace_env_vars(item) for item in data]
             elif isinstance(data, str):
+                if '${' not in data:
+                    return data
                 try:
-                    import re
-                    # 匹配 ${VAR:-default} 或 ${VAR} 格式
-                    pattern = re.compile(r'\$\{([^}:]+)(?::-([^}]*))?\}')
                     def replace_match(match):
                         var_name = match.group(1)
                         default_value = match.group(2)
                         return os.getenv(var_name, default_value) if default_value is not None else os.getenv(var_name, '')
-                    return pattern.sub(replace_match, data)
+                    return _ENV_VAR_PATTERN.sub(replace_match, data)
                 except:
                     return data
             return data
+    def _file_mtime(self):
+        try:
+            return os.path.getmtime(self.config_path)
+        except OSError:
+            return None
     def get_config(self):
         try:
+            self._mtime = self._file_mtime()
+            self._checked_at = time.monotonic()
             with open(self.config_path, 'r', encoding='utf-8') as f:
                 content = f.read()
                 
@@ -121,7 +158,6 @@ class Config:
                     config = {}
                 
                 self.config = config
-                self._config = self.replace_env_vars(config)
                
                 return self.config
         except Exception as e:
@@ -129,9 +165,18 @@ class Config:
             # sys.exit(1)
     def reload(self):
         self.config=self.get_config()
-    def set(self,key,default:any=None):
+    def refresh(self) -> bool:
+        """配置文件在外部被修改（mtime 变化）时重新加载，返回是否重新加载。"""
+        self._checked_at = time.monotonic()
+        mtime = self._file_mtime()
+        if mtime is None or mtime == self._mtime:
+            return False
+        self.reload()
+        return True
+    def set(self,key,default:any=None,save:bool=True):
         self.config[key] = default
-        self.save_config()
+        if save:
+            self.save_config()
     def __fix(self,v:str):
         if v in ("", "''", '""', None):
             return ""
@@ -148,24 +193,48 @@ class Config:
             return v
         except:
             return v
+    def _build_snapshot(self):
+        tree = self.replace_env_vars(self._raw)
+        index = {}
+        # 预先展开所有 a.b.c 路径并完成类型转换；含 '.' 或非字符串的键无法通过点号路径访问，跳过
+        def walk(node, prefix):
+            for k, v in node.items():
+                if not isinstance(k, str) or '.' in k:
+                    continue
+                path = prefix + k
+                index[path] = self.__fix(v)
+                if isinstance(v, dict):
+                    walk(v, path + '.')
+        if isinstance(tree, dict):
+            walk(tree, '')
+        return ConfigSnapshot(tree, index)
+    def snapshot(self) -> ConfigSnapshot:
+        """返回当前配置的解析快照；配置文件 mtime 变化时先重新加载。"""
+        if time.monotonic() - self._checked_at >= self.MTIME_CHECK_INTERVAL:
+            self.refresh()
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._build_snapshot()
+            self._snapshot = snapshot
+        return snapshot
     def get(self,key,default:any=None):
-        _config=self.replace_env_vars(self.config)
-        
+        snapshot = self.snapshot()
         # 支持嵌套key访问
-        keys = key.split('.') if isinstance(key, str) else [key]
-        value = _config
-        try:
-            for k in keys:
-                value = value[k]
-            val=self.__fix(value)
-            if val is None and default is not None  :
+        if isinstance(key, str):
+            val = snapshot.index.get(key, _MISSING)
+            if val is _MISSING:
+                return default
+        else:
+            try:
+                val = self.__fix(snapshot.tree[key])
+            except (KeyError, TypeError):
                 return default
-            else:
-                return val
-        except (KeyError, TypeError):
-            # print_warning("Key {} not found in configuration".format(key))
-            pass
-        return default 
+        if isinstance(val, (dict, list)):
+            # 快照是共享的，返回副本避免调用方修改
+            val = copy.deepcopy(val)
+        if val is None and default is not None  :
+            return default
+        return val
 
 cfg=Config()
 def set_config(key:str,value:str):
@@ -0,0 +1,320 @@
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional
+
+from sqlalchemy import delete, insert, or_, select, update
+
+from core.cache import TTLCache
+from core.config import cfg
+from core.log import get_logger
+from core.models.article import Article
+from core.models.base import DATA_STATUS
+from core.models.content_backlog import ContentBacklog
+
+logger = get_logger(__name__)
+
+# 除 seed_backlog 与 ContentBackfiller 外，本模块的维护函数均不提交事务，由调用方统一 commit。
+
+# 被 RSS 订阅（近期有人拉取）的公众号额外加的优先级，高于任何按发布时间给出的优先级
+SUBSCRIBED_BOOST = 100
+_RECENCY_LEVELS = ((86400, 30), (7 * 86400, 20), (30 * 86400, 10))
+
+# 近期被 RSS 拉取过的公众号；同一公众号在有效期内只提升一次积压优先级
+_subscribed_feeds = TTLCache(maxsize=10000, ttl=600)
+
+
+def backlog_priority(publish_time, subscribed: bool = False, now: Optional[float] = None) -> int:
+    """按发布时间给出优先级：一天内 30、一周内 20、一个月内 10，更早为 0；订阅中的公众号另加 SUBSCRIBED_BOOST"""
+    now = time.time() if now is None else now
+    age = now - int(publish_time or 0)
+    priority = 0
+    for max_age, level in _RECENCY_LEVELS:
+        if age <= max_age:
+            priority = level
+            break
+    return priority + (SUBSCRIBED_BOOST if subscribed else 0)
+
+
+def enqueue_article(session, article: Article) -> None:
+    """文章入库后（需已 flush）正文为空时登记到补抓队列"""
+    if str(article.content or "").strip():
+        return
+    now = datetime.now()
+    feed_id = str(article.mp_id or "")
+    session.add(ContentBacklog(
+        article_id=str(article.id),
+        feed_id=feed_id,
+        owner_id=str(article.owner_id or ""),
+        priority=backlog_priority(article.publish_time, subscribed=_subscribed_feeds.get(feed_id) is not None),
+        attempts=0,
+        next_attempt_at=now,
+        last_error="",
+        created_at=now,
+        updated_at=now,
+    ))
+
+
+def remove_from_backlog(session, article_ids: Iterable[str]) -> int:
+    """正文已补齐或文章已删除时移出补抓队列"""
+    ids = [str(i) for i in article_ids if i]
+    if not ids:
+        return 0
+    return session.execute(delete(ContentBacklog).where(ContentBacklog.article_id.in_(ids))).rowcount or 0
+
+
+def mark_feed_subscribed(feed_id: str, engine=None) -> bool:
+    """公众号的 RSS 被拉取时调用：该公众号积压中的文章提前抓取（每个公众号每 10 分钟最多更新一次）"""
+    feed_id = str(feed_id or "")
+    if not feed_id or _subscribed_feeds.get(feed_id) is not None:
+        return False
+    _subscribed_feeds.set(feed_id, True)
+    try:
+        table = ContentBacklog.__table__
+        with (engine or _engine()).begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.feed_id == feed_id)
+                .where(table.c.priority < SUBSCRIBED_BOOST)
+                .values(priority=table.c.priority + SUBSCRIBED_BOOST)
+            )
+    except Exception as e:
+        logger.warning("提升公众号 %s 补抓优先级失败: %s", feed_id, e)
+        return False
+    return True
+
+
+def seed_backlog(session, chunk_size: int = 1000) -> int:
+    """把现有正文为空的文章一次性登记进补抓队列（建表时调用，按主键分页只扫描一次文章表）"""
+    backlog = ContentBacklog.__table__
+    articles = Article.__table__
+    now = datetime.now()
+    existing = select(backlog.c.article_id).where(backlog.c.article_id == articles.c.id)
+    count = 0
+    last_id = None
+    while True:
+        query = select(
+            articles.c.id, articles.c.mp_id, articles.c.owner_id, articles.c.publish_time,
+        ).where(
+            or_(articles.c.content.is_(None), articles.c.content == ""),
+            articles.c.status == DATA_STATUS.ACTIVE,
+            ~existing.exists(),
+        ).order_by(articles.c.id).limit(chunk_size)
+        if last_id is not None:
+            query = query.where(articles.c.id > last_id)
+        rows = session.execute(query).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        session.execute(insert(backlog), [{
+            "article_id": str(row.id),
+            "feed_id": str(row.mp_id or ""),
+            "owner_id": str(row.owner_id or ""),
+            "priority": backlog_priority(row.publish_time),
+            "attempts": 0,
+            "next_attempt_at": now,
+            "last_error": "",
+            "created_at": now,
+            "updated_at": now,
+        } for row in rows])
+        session.commit()
+        count += len(rows)
+        if len(rows) < chunk_size:
+            break
+    return count
+
+
+def _engine():
+    from core.db import DB
+    return DB.get_engine()
+
+
+class ContentBackfiller:
+    """
+    按优先级分批补抓文章正文
+
+    - 每批按 (priority DESC, next_attempt_at) 取到期的积压，通过条件更新把 next_attempt_at
+      推到 lease_seconds 之后完成认领，多个进程同时补抓时不会重复处理；
+    - concurrency 个线程并行抓取，每个线程各自持有抓取器（fetcher_factory 创建）；
+    - 失败按 retry_base_seconds * 2^attempts 退避（上限 retry_max_seconds），
+      超过 max_attempts 次移出队列，不再反复占用每一批；
+    - 抓到正文后写回文章并移出队列；返回 DELETED 时标记文章删除；
+    - 同一线程相邻两次抓取之间停顿 pause_seconds。
+    """
+
+    def __init__(self, fetcher_factory: Optional[Callable[[], Callable[[str], str]]] = None,
+                 concurrency: Optional[int] = None, batch_size: Optional[int] = None,
+                 max_attempts: Optional[int] = None, retry_base_seconds: Optional[int] = None,
+                 retry_max_seconds: Optional[int] = None, lease_seconds: Optional[int] = None,
+                 pause_seconds: Optional[float] = None, engine=None, session_factory=None,
+                 clock: Callable[[], datetime] = datetime.now, sleep: Callable[[float], None] = time.sleep):
+        self.fetcher_factory = fetcher_factory or default_fetcher_factory
+        self.concurrency = max(1, int(concurrency or cfg.get("gather.content_concurrency", 1) or 1))
+        per_worker = int(cfg.get("content_backlog.batch_per_worker", 5) or 5)
+        self.batch_size = max(1, int(batch_size or self.concurrency * per_worker))
+        self.max_attempts = max(1, int(max_attempts or cfg.get("content_backlog.max_attempts", 8) or 8))
+        self.retry_base_seconds = max(1, int(retry_base_seconds or cfg.get("content_backlog.retry_base_seconds", 600) or 600))
+        self.retry_max_seconds = max(self.retry_base_seconds,
+                                     int(retry_max_seconds or cfg.get("content_backlog.retry_max_seconds", 86400) or 86400))
+        self.lease_seconds = max(60, int(lease_seconds or cfg.get("content_backlog.lease_seconds", 1800) or 1800))
+        self.pause_seconds = float(pause_seconds if pause_seconds is not None
+                                   else cfg.get("content_backlog.pause_seconds", 5) or 0)
+        self.engine = engine or _engine()
+        if session_factory is None:
+            from core.db import DB
+            session_factory = DB.get_session
+        self.session_factory = session_factory
+        self._clock = clock
+        self._sleep = sleep
+
+    def claim_batch(self) -> List[str]:
+        table = ContentBacklog.__table__
+        now = self._clock()
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(table.c.article_id, table.c.next_attempt_at)
+                .where(table.c.next_attempt_at <= now)
+                .order_by(table.c.priority.desc(), table.c.next_attempt_at)
+                .limit(self.batch_size)
+            ).all()
+        claimed = []
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        with self.engine.begin() as conn:
+            for article_id, next_attempt_at in rows:
+                result = conn.execute(
+                    update(table)
+                    .where(table.c.article_id == article_id)
+                    .where(table.c.next_attempt_at == next_attempt_at)
+                    .values(next_attempt_at=lease_until, updated_at=now)
+                )
+                if (result.rowcount or 0) == 1:
+                    claimed.append(str(article_id))
+        return claimed
+
+    def drain(self, max_batches: Optional[int] = None) -> dict:
+        """连续处理到期的批次，直到没有到期积压或达到 max_batches，返回各结果的计数"""
+        max_batches = max(1, int(max_batches or cfg.get("content_backlog.max_batches_per_run", 10) or 10))
+        totals = {"filled": 0, "deleted": 0, "failed": 0, "dropped": 0, "missing": 0}
+        for _ in range(max_batches):
+            ids = self.claim_batch()
+            if not ids:
+                break
+            for key, value in self.process(ids).items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def process(self, article_ids: List[str]) -> dict:
+        counts = {"filled": 0, "deleted": 0, "failed": 0, "dropped": 0, "missing": 0}
+        counts_lock = threading.Lock()
+        pending = queue.Queue()
+        for article_id in article_ids:
+            pending.put(article_id)
+
+        def worker():
+            fetch = None
+            try:
+                while True:
+                    try:
+                        article_id = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    if fetch is None:
+                        fetch = self.fetcher_factory()
+                    outcome = self._process_one(article_id, fetch)
+                    with counts_lock:
+                        counts[outcome] += 1
+                    # 同一线程相邻两次抓取之间停顿，降低触发风控的概率
+                    if outcome != "missing" and self.pause_seconds > 0 and not pending.empty():
+                        self._sleep(self.pause_seconds)
+            finally:
+                close = getattr(fetch, "close", None)
+                if callable(close):
+                    try:
+                        close()
+                    except Exception:
+                        pass
+
+        threads = [threading.Thread(target=worker, daemon=True, name=f"content-backfill-{i}")
+                   for i in range(min(self.concurrency, len(article_ids)))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return counts
+
+    def _process_one(self, article_id: str, fetch: Callable[[str], str]) -> str:
+        from core.events import log_event, E
+        from core.feed_stats_service import record_articles_removed
+
+        session = self.session_factory()
+        try:
+            article = session.query(Article).filter(Article.id == article_id).first()
+            if article is None or str(article.content or "").strip() or article.status == DATA_STATUS.DELETED:
+                remove_from_backlog(session, [article_id])
+                session.commit()
+                return "missing"
+            url = article.url or f"https://mp.weixin.qq.com/s/{article.id}"
+            title = str(article.title or "")[:60]
+            try:
+                content = fetch(url)
+                error = "" if content else "empty content"
+            except Exception as e:
+                content, error = "", str(e) or e.__class__.__name__
+            if content:
+                article.content = content
+                outcome = "filled"
+                if content == "DELETED":
+                    logger.error("获取文章 %s 内容已被发布者删除", title)
+                    record_articles_removed(session, [article])
+                    article.status = DATA_STATUS.DELETED
+                    outcome = "deleted"
+                remove_from_backlog(session, [article_id])
+                session.commit()
+                log_event(logger, E.ARTICLE_UPDATE, title=title)
+                return outcome
+            log_event(logger, E.ARTICLE_FETCH_FAIL, title=title)
+            return self._record_failure(session, article_id, error)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _record_failure(self, session, article_id: str, error: str) -> str:
+        item = session.query(ContentBacklog).filter(ContentBacklog.article_id == article_id).first()
+        if item is None:
+            return "failed"
+        attempts = int(item.attempts or 0) + 1
+        if attempts >= self.max_attempts:
+            session.delete(item)
+            session.commit()
+            logger.warning("文章 %s 连续 %s 次抓取正文失败，移出补抓队列: %s", article_id, attempts, error)
+            return "dropped"
+        now = self._clock()
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** (attempts - 1)))
+        item.attempts = attempts
+        item.next_attempt_at = now + timedelta(seconds=delay)
+        item.last_error = str(error or "")[:500]
+        item.updated_at = now
+        session.commit()
+        return "failed"
+
+
+def default_fetcher_factory() -> Callable[[str], str]:
+    """按 gather.content_mode 创建抓取函数；web 模式每个线程使用独立的浏览器实例"""
+    if str(cfg.get("gather.content_mode", "web")).strip().lower() == "web":
+        from driver.wxarticle import WXArticleFetcher
+        fetcher = WXArticleFetcher()
+
+        def fetch(url: str) -> str:
+            return (fetcher.get_article_content(url) or {}).get("content") or ""
+        fetch.close = fetcher.Close
+        return fetch
+
+    from core.wx.base import WxGather
+    model = WxGather().Model()
+
+    def fetch(url: str) -> str:
+        return model.content_extract(url) or ""
+    return fetch
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Engine,Text,event, inspect, text
+from sqlalchemy import create_engine, Engine,Text,event, inspect, text, select, insert, update
 from sqlalchemy.orm import sessionmaker, declarative_base,scoped_session
 from sqlalchemy import Column, Integer, String, DateTime
 from typing import Optional, List
@@ -6,16 +6,21 @@ from .models import Feed, Article
 from .config import cfg
 from core.models.base import Base  
 from core.print import print_warning,print_info,print_error,print_success
+from core.engine_registry import get_engine, bootstrap_once, dispose_engine
 # 声明基类
 # Base = declarative_base()
 
-class Db:
+# 在线结构补丁版本：新增或修改 _ensure_* 补丁时递增，数据库已记录该版本时启动跳过结构检查
+SCHEMA_VERSION = 8
+
+class Db:
     connection_str: str=None
     def __init__(self,tag:str="默认",User_In_Thread=True):
         self.Session= None
         self.engine = None
         self.User_In_Thread=User_In_Thread
         self.tag=tag
+        self._schema_errors = []
         print_success(f"[{tag}]连接初始化")
         self.init(cfg.get("db"))
     def get_engine(self) -> Engine:
@@ -27,36 +32,59 @@ class Db:
         return sessionmaker(bind=self.engine, autoflush=True, expire_on_commit=True, future=True)
     def init(self, con_str: str) -> None:
         """Initialize database connection and create tables"""
-        try:
+        try:
             self.connection_str=con_str
-            # 检查SQLite数据库文件是否存在
-            if con_str.startswith('sqlite:///'):
-                import os
-                db_path = con_str[10:]  # 去掉'sqlite:///'前缀
-                if not os.path.exists(db_path):
-                    try:
-                        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-                    except Exception as e:
-                        pass
-                    open(db_path, 'w').close()
-            self.engine = create_engine(con_str,
-                                     pool_size=2,          # 最小空闲连接数
-                                     max_overflow=20,      # 允许的最大溢出连接数
-                                     pool_timeout=30,      # 获取连接时的超时时间（秒）
-                                     echo=False,
-                                     pool_recycle=60,  # 连接池回收时间（秒）
-                                     isolation_level="AUTOCOMMIT",  # 设置隔离级别
-                                    #  isolation_level="READ COMMITTED",  # 设置隔离级别
-                                    #  query_cache_size=0,
-                                     connect_args={"check_same_thread": False} if con_str.startswith('sqlite:///') else {}
-                                     )
-            self.session_factory=self.get_session_factory()
-            self._ensure_user_profile_columns()
-            self._ensure_message_task_columns()
-            self._ensure_message_task_log_table()
-        except Exception as e:
-            print(f"Error creating database connection: {e}")
-            raise
+            # 同一连接串在进程内共享 Engine（见 core.engine_registry）
+            self.engine = get_engine(con_str)
+            self.session_factory=self.get_session_factory()
+            bootstrap_once(con_str, self._bootstrap_schema)
+        except Exception as e:
+            print(f"Error creating database connection: {e}")
+            raise
+
+    def _bootstrap_schema(self, engine: Engine) -> None:
+        """Run online schema patches once, skipped when the database already records SCHEMA_VERSION."""
+        from core.models.schema_meta import SchemaMeta
+        table = SchemaMeta.__table__
+        version = None
+        try:
+            table.create(bind=engine, checkfirst=True)
+            with engine.connect() as conn:
+                version = conn.execute(select(table.c.version).where(table.c.name == "schema")).scalar()
+        except Exception as e:
+            print_warning(f"[{self.tag}] read schema version failed: {e}")
+        if version is not None and int(version) >= SCHEMA_VERSION:
+            return
+        self._schema_errors = []
+        self._ensure_user_profile_columns()
+        self._ensure_message_task_columns()
+        self._ensure_message_task_log_table()
+        self._ensure_feed_columns()
+        self._ensure_feed_stats_table()
+        self._ensure_scheduler_tables()
+        self._ensure_tenant_purge_table()
+        self._ensure_content_backlog_table()
+        self._ensure_import_job_table()
+        self._ensure_tag_feeds_table()
+        self._ensure_article_feed_index()
+        self._ensure_wechat_token_table()
+        self._ensure_login_attempt_table()
+        if self._schema_errors:
+            # 有补丁失败时不记录版本，下次启动重试
+            return
+        try:
+            from datetime import datetime
+            with engine.begin() as conn:
+                if version is None:
+                    conn.execute(insert(table).values(name="schema", version=SCHEMA_VERSION, updated_at=datetime.now()))
+                else:
+                    conn.execute(update(table).where(table.c.name == "schema").values(version=SCHEMA_VERSION, updated_at=datetime.now()))
+        except Exception as e:
+            print_warning(f"[{self.tag}] save schema version failed: {e}")
+
+    def _schema_warning(self, message: str) -> None:
+        self._schema_errors.append(message)
+        print_warning(message)
 
     def _ensure_user_profile_columns(self) -> None:
         """Best-effort online schema patch for old users table."""
@@ -70,6 +98,7 @@ class Db:
             needed = {
                 "wechat_app_id": "VARCHAR(128) DEFAULT ''",
                 "wechat_app_secret": "VARCHAR(256) DEFAULT ''",
+                "auth_version": "INTEGER DEFAULT 0",
             }
             for name, ddl in needed.items():
                 if name in existing:
@@ -84,7 +113,7 @@ class Db:
                         continue
                     raise
         except Exception as e:
-            print_warning(f"[{self.tag}] ensure users schema failed: {e}")
+            self._schema_warning(f"[{self.tag}] ensure users schema failed: {e}")
 
     def _ensure_message_task_columns(self) -> None:
         """Best-effort online schema patch for message task automation fields."""
@@ -115,8 +144,163 @@ class Db:
                         continue
                     raise
         except Exception as e:
-            print_warning(f"[{self.tag}] ensure message_tasks schema failed: {e}")
+            self._schema_warning(f"[{self.tag}] ensure message_tasks schema failed: {e}")
 
+    def _ensure_feed_columns(self) -> None:
+        """Best-effort online schema patch for feed counters, backfilled on first add."""
+        if not self.engine:
+            return
+        try:
+            inspector = inspect(self.engine)
+            if not inspector.has_table("feeds"):
+                return
+            existing = {str(col.get("name") or "").strip() for col in inspector.get_columns("feeds")}
+            if "article_count" in existing:
+                return
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(text("ALTER TABLE feeds ADD COLUMN article_count INTEGER DEFAULT 0"))
+            except Exception as e:
+                msg = str(e).lower()
+                if "duplicate column" in msg or "already exists" in msg:
+                    return
+                raise
+            from core.feed_stats_service import recount_article_counts
+            session = self.session_factory()
+            try:
+                recount_article_counts(session)
+            finally:
+                session.close()
+        except Exception as e:
+            self._schema_warning(f"[{self.tag}] ensure feeds schema failed: {e}")
+
+    def _ensure_feed_stats_table(self) -> None:
+        """Best-effort create feed stats table, rebuilt from articles on first create."""
+        if not self.engine:
+            return
+        try:
+            inspector = inspect(self.engine)
+            if inspector.has_table("feed_stats") or not inspector.has_table("feeds"):
+                return
+            from core.models.feed_stats import FeedStats
+            FeedStats.__table__.create(bind=self.engine, checkfirst=True)
+            from core.feed_stats_service import repair_feed_stats
+            session = self.session_factory()
+            try:
+                repair_feed_stats(session)
+            finally:
+                session.close()
+        except Exception as e:
+            self._schema_warning(f"[{self.tag}] ensure feed_stats table failed: {e}")
+
+    def _ensure_scheduler_tables(self) -> None:
+        """Best-effort create scheduler job store and lease tables."""
+        if not self.engine:
+            return
+        try:
+            from core.models.scheduler_job import SchedulerJob
+            from core.models.scheduler_lease import SchedulerLease
+            SchedulerJob.__table__.create(bind=self.engine, checkfirst=True)
+            SchedulerLease.__table__.create(bind=self.engine, checkfirst=True)
+        except Exception as e:
+            self._schema_warning(f"[{self.tag}] ensure scheduler tables failed: {e}")
+
+    def _ensure_tenant_purge_table(self) -> None:
+        """Best-effort create tenant purge job table."""
+        if not self.engine:
+            return
+        try:
+            from core.models.tenant_purge_job import TenantPurgeJob
+            TenantPurgeJob.__table__.create(bind=self.engine, checkfirst=True)
+        except Exception as e:
+            self._schema_warning(f"[{self.tag}] ensure tenant_purge_jobs table failed: {e}")
+
+    def _ensure_content_backlog_table(self) -> None:
+        """Best-effort create content backlog table, seeded from articles without content on first create."""
+        if not self.engine:
+            return
+        try:
+            inspector = inspect(self.engine)
+            if inspector.has_table("content_backlog") or not inspector.has_table("articles"):
+                return
+            from core.models.content_backlog import ContentBacklog
+            ContentBacklog.__table__.create(bind=self.engine, checkfirst=True)
+            from core.content_backlog_service import seed_backlog
+            session = self.session_factory()
+            try:
+                seed_backlog(session)
+            finally:
+                session.close()
+        except Exception as e:
+            self._schema_warning(f"[{self.tag}] ensure content_backlog table failed: {e}")
+
+    def _ensure_import_job_table(self) -> None:
+        """Best-effort create bulk import job table."""
+        if not self.engine:
+            return
+        try:
+            from core.models.import_job import ImportJob
+            ImportJob.__table__.create(bind=self.engine, checkfirst=True)
+        except Exception as e:
+            self._schema_warning(f"[{self.tag}] ensure import_jobs table failed: {e}")
+
+    def _ensure_wechat_token_table(self) -> None:
+        """Best-effort create shared WeChat OpenAPI access_token table."""
+        if not self.engine:
+            return
+        try:
+            from core.models.wechat_token import WechatAccessToken
+            WechatAccessToken.__table__.create(bind=self.engine, checkfirst=True)
+        except Exception as e:
+            self._schema_warning(f"[{self.tag}] ensure wechat_access_tokens table failed: {e}")
+
+    def _ensure_login_attempt_table(self) -> None:
+        """Best-effort create shared login failure counter table."""
+        if not self.engine:
+            return
+        try:
+            from core.models.login_attempt import LoginAttempt
+            LoginAttempt.__table__.create(bind=self.engine, checkfirst=True)
+        except Exception as e:
+            self._schema_warning(f"[{self.tag}] ensure login_attempts table failed: {e}")
+
+    def _ensure_tag_feeds_table(self) -> None:
+        """Best-effort create tag/feed association table, migrated from tags.mps_id on first create."""
+        if not self.engine:
+            return
+        try:
+            inspector = inspect(self.engine)
+            if inspector.has_table("tag_feeds") or not inspector.has_table("tags"):
+                return
+            from core.models.tag_feed import TagFeed
+            TagFeed.__table__.create(bind=self.engine, checkfirst=True)
+            from core.tag_feed_service import rebuild_tag_feeds
+            session = self.session_factory()
+            try:
+                rebuild_tag_feeds(session)
+            finally:
+                session.close()
+        except Exception as e:
+            self._schema_warning(f"[{self.tag}] ensure tag_feeds table failed: {e}")
+
+    def _ensure_article_feed_index(self) -> None:
+        """Best-effort create the (mp_id, status, publish_time) index on articles."""
+        if not self.engine:
+            return
+        try:
+            inspector = inspect(self.engine)
+            if not inspector.has_table("articles"):
+                return
+            existing = {str(ix.get("name") or "") for ix in inspector.get_indexes("articles")}
+            if "ix_articles_feed_publish" in existing:
+                return
+            from core.models.article import Article
+            for index in Article.__table__.indexes:
+                if index.name == "ix_articles_feed_publish":
+                    index.create(bind=self.engine, checkfirst=True)
+        except Exception as e:
+            self._schema_warning(f"[{self.tag}] ensure articles index failed: {e}")
+
     def _ensure_message_task_log_table(self) -> None:
         """Best-effort create message task logs table."""
         if not self.engine:
@@ -125,7 +309,7 @@ class Db:
             from core.models.message_task_log import MessageTaskLog
             MessageTaskLog.__table__.create(bind=self.engine, checkfirst=True)
         except Exception as e:
-            print_warning(f"[{self.tag}] ensure message_tasks_logs table failed: {e}")
+            self._schema_warning(f"[{self.tag}] ensure message_tasks_logs table failed: {e}")
     def create_tables(self):
         """Create all tables defined in models"""
         from core.models.base import Base as B # 导入所有模型
@@ -155,6 +339,10 @@ class Db:
             session=DB.get_session()
             article = session.query(Article).filter(Article.id == art.id).first()
             if article is not None:
+                from core.feed_stats_service import record_articles_removed
+                from core.content_backlog_service import remove_from_backlog
+                record_articles_removed(session, [article])
+                remove_from_backlog(session, [article.id])
                 session.delete(article)
                 session.commit()
                 return True
@@ -195,8 +383,15 @@ class Db:
                 pass
             from core.models.base import DATA_STATUS
             art.status=DATA_STATUS.ACTIVE
-            session.add(art)
+            session.add(art)
             # self._session.merge(art)
+            # 先落库文章（重复时在此抛出），再累加公众号计数
+            session.flush()
+            from core.feed_stats_service import record_article_added
+            record_article_added(session, art)
+            # 正文为空时登记补抓队列，与文章在同一事务提交
+            from core.content_backlog_service import enqueue_article
+            enqueue_article(session, art)
             sta=session.commit()
             
         except Exception as e:
@@ -297,7 +492,8 @@ class Db:
         except Exception as e:
             from core.print import print_warning
             print_warning(f"[{self.tag}] Database connection lost: {e}. Reconnecting...")
-            self.init(self.connection_str)
+            # Engine 为进程内共享，只需丢弃失效的连接
+            dispose_engine(self.connection_str)
             _session()
             return self.Session()
         return session
@@ -318,5 +514,4 @@ class Db:
             session.remove()
 
 # 全局数据库实例
-DB = Db(User_In_Thread=True)
-DB.init(cfg.get("db"))
+DB = Db(User_In_Thread=True)
@@ -0,0 +1,83 @@
+import os
+import threading
+from typing import Callable, Dict, Set
+
+from sqlalchemy import create_engine, Engine
+
+from core.config import cfg
+
+# 进程内按连接串共享 Engine：所有 Db 实例共用同一个连接池，
+# 结构自检（_ensure_*）每个进程每个库只执行一次。
+
+_engines: Dict[str, Engine] = {}
+_bootstrapped: Set[str] = set()
+_lock = threading.Lock()
+_bootstrap_lock = threading.Lock()
+
+
+def _prepare_sqlite_file(con_str: str) -> None:
+    # 检查SQLite数据库文件是否存在
+    if not con_str.startswith('sqlite:///'):
+        return
+    db_path = con_str[10:]  # 去掉'sqlite:///'前缀
+    if os.path.exists(db_path):
+        return
+    try:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    except Exception:
+        pass
+    open(db_path, 'w').close()
+
+
+def _create_engine(con_str: str) -> Engine:
+    _prepare_sqlite_file(con_str)
+    return create_engine(con_str,
+                         pool_size=int(cfg.get("db_pool.size", 5) or 5),                # 最小空闲连接数
+                         max_overflow=int(cfg.get("db_pool.max_overflow", 20) or 20),   # 允许的最大溢出连接数
+                         pool_timeout=30,      # 获取连接时的超时时间（秒）
+                         echo=False,
+                         pool_recycle=60,  # 连接池回收时间（秒）
+                         isolation_level="AUTOCOMMIT",  # 设置隔离级别
+                         connect_args={"check_same_thread": False} if con_str.startswith('sqlite:///') else {}
+                         )
+
+
+def get_engine(con_str: str) -> Engine:
+    """返回连接串对应的共享 Engine，首次调用时创建。"""
+    engine = _engines.get(con_str)
+    if engine is not None:
+        return engine
+    with _lock:
+        engine = _engines.get(con_str)
+        if engine is None:
+            engine = _create_engine(con_str)
+            _engines[con_str] = engine
+        return engine
+
+
+def bootstrap_once(con_str: str, bootstrap: Callable[[Engine], None]) -> bool:
+    """
+    每个进程对同一连接串只执行一次 bootstrap，返回本次是否实际执行。
+
+    bootstrap 抛出异常时不标记完成，下次调用会重试。
+    """
+    if con_str in _bootstrapped:
+        return False
+    with _bootstrap_lock:
+        if con_str in _bootstrapped:
+            return False
+        bootstrap(get_engine(con_str))
+        _bootstrapped.add(con_str)
+        return True
+
+
+def dispose_engine(con_str: str) -> None:
+    """释放连接池中的连接（连接断开后重建），Engine 对象本身继续复用。"""
+    engine = _engines.get(con_str)
+    if engine is not None:
+        engine.dispose()
+
+
+def registered_engines() -> Dict[str, Engine]:
+    with _lock:
+        return dict(_engines)
@@ -44,7 +44,11 @@ class E:
     FEED_SYNC_START = "feed.sync.start"
     FEED_SYNC_COMPLETE = "feed.sync.complete"
     FEED_SYNC_FAIL = "feed.sync.fail"
+    FEED_SYNC_THROTTLE = "feed.sync.throttle"
+    FEED_SYNC_SHARED = "feed.sync.shared"
     FEED_REFRESH = "feed.refresh"
+    FEED_STATS_REPAIR_START = "feed.stats.repair.start"
+    FEED_STATS_REPAIR_COMPLETE = "feed.stats.repair.complete"
 
     # ── 文章 Article ───────────────────────────────────────────────────────────
     ARTICLE_FETCH_START = "article.fetch.start"
@@ -81,6 +85,11 @@ class E:
     AI_PUBLISH_COMPLETE = "ai.publish.complete"
     AI_PUBLISH_FAIL = "ai.publish.fail"
 
+    # ── 微信公众号 OpenAPI access_token ────────────────────────────────────────
+    WECHAT_TOKEN_REFRESH = "wechat.token.refresh"
+    WECHAT_TOKEN_REFRESH_FAIL = "wechat.token.refresh_fail"
+    WECHAT_TOKEN_INVALIDATE = "wechat.token.invalidate"
+
     # ── CSDN 授权 Auth ─────────────────────────────────────────────────────────
     CSDN_AUTH_QR_GENERATE = "csdn.auth.qr.generate"
     CSDN_AUTH_QR_SUCCESS = "csdn.auth.qr.success"
@@ -119,6 +128,9 @@ class E:
     WEBHOOK_SEND_START = "webhook.send.start"
     WEBHOOK_SEND_COMPLETE = "webhook.send.complete"
     WEBHOOK_SEND_FAIL = "webhook.send.fail"
+    WEBHOOK_SEND_RETRY = "webhook.send.retry"
+    WEBHOOK_SEND_DROP = "webhook.send.drop"
+    WEBHOOK_CIRCUIT_OPEN = "webhook.circuit.open"
 
     # ── 系统 System ────────────────────────────────────────────────────────────
     SYSTEM_STARTUP = "system.startup"
@@ -126,6 +138,11 @@ class E:
     SYSTEM_QUEUE_START = "system.queue.start"
     SYSTEM_JOB_ADD = "system.job.add"
     SYSTEM_JOB_REMOVE = "system.job.remove"
+    SCHEDULER_LEADER_ACQUIRE = "system.scheduler.leader_acquire"
+    SCHEDULER_LEADER_LOSE = "system.scheduler.leader_lose"
+    SCHEDULER_RECONCILE = "system.scheduler.reconcile"
+    RETENTION_PURGE_START = "system.retention.start"
+    RETENTION_PURGE_COMPLETE = "system.retention.complete"
     SYSTEM_CONFIG_LOAD = "system.config.load"
     SYSTEM_RELOAD = "system.reload"
 
@@ -0,0 +1,246 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import and_, case, func, or_
+
+from core.models.article import Article
+from core.models.base import DATA_STATUS
+from core.models.feed import Feed
+from core.models.feed_stats import FeedStats
+
+# 除 repair_feed_stats / recount_article_counts 外，本模块的维护函数均不提交事务，由调用方统一 commit。
+
+SYNC_STATUS_SUCCESS = 1
+SYNC_STATUS_FAILED = 2
+
+
+def adjust_article_count(session, mp_id: str, delta: int = 1) -> None:
+    """原子更新公众号的有效文章计数。"""
+    if not mp_id or not delta:
+        return
+    session.query(Feed).filter(Feed.id == mp_id).update(
+        {Feed.article_count: func.coalesce(Feed.article_count, 0) + int(delta)},
+        synchronize_session=False,
+    )
+
+
+def _update_stats(session, feed_id: str, values: dict) -> bool:
+    values = dict(values)
+    values[FeedStats.updated_at] = datetime.now()
+    rows = session.query(FeedStats).filter(FeedStats.feed_id == feed_id).update(
+        values,
+        synchronize_session=False,
+    )
+    return rows > 0
+
+
+def record_article_added(session, article: Article) -> None:
+    """文章入库后（需已 flush）累加计数、未读数并推进最新发布时间。"""
+    mp_id = str(article.mp_id or "")
+    if not mp_id:
+        return
+    adjust_article_count(session, mp_id, 1)
+    publish_time = int(article.publish_time or 0)
+    # 条件用 <=：无论方言按旧值（SQLite/PG）还是新值（MySQL）求值 SET 子句，两列都能保持一致
+    is_newer = func.coalesce(FeedStats.latest_publish_time, 0) <= publish_time
+    updated = _update_stats(session, mp_id, {
+        FeedStats.unread_count: func.coalesce(FeedStats.unread_count, 0) + (0 if article.is_read else 1),
+        FeedStats.latest_article_id: case((is_newer, str(article.id)), else_=FeedStats.latest_article_id),
+        FeedStats.latest_publish_time: case((is_newer, publish_time), else_=FeedStats.latest_publish_time),
+    })
+    if not updated:
+        repair_feed_stats(session, [mp_id], commit=False)
+
+
+def record_articles_removed(session, articles: Iterable[Article]) -> None:
+    """在文章被删除/标记删除之前调用，扣减计数并在必要时重新定位最新文章。"""
+    removed = [a for a in articles if a.mp_id and a.status == DATA_STATUS.ACTIVE]
+    if not removed:
+        return
+    by_feed = defaultdict(list)
+    for article in removed:
+        by_feed[str(article.mp_id)].append(article)
+    for mp_id, items in by_feed.items():
+        adjust_article_count(session, mp_id, -len(items))
+        unread = sum(1 for a in items if not a.is_read)
+        if unread:
+            _update_stats(session, mp_id, {
+                FeedStats.unread_count: func.coalesce(FeedStats.unread_count, 0) - unread,
+            })
+        removed_ids = [str(a.id) for a in items]
+        latest_id = session.query(FeedStats.latest_article_id).filter(FeedStats.feed_id == mp_id).scalar()
+        if latest_id and latest_id in removed_ids:
+            _refresh_latest(session, mp_id, exclude_ids=removed_ids)
+
+
+def record_read_change(session, article: Article, is_read: bool) -> None:
+    """在修改 is_read 之前调用，按状态变化调整未读数。"""
+    if not article.mp_id or article.status != DATA_STATUS.ACTIVE:
+        return
+    if bool(article.is_read) == bool(is_read):
+        return
+    _update_stats(session, str(article.mp_id), {
+        FeedStats.unread_count: func.coalesce(FeedStats.unread_count, 0) + (-1 if is_read else 1),
+    })
+
+
+def record_sync_result(session, feed_id: str, ok: bool, count: int = 0, duration_ms: int = 0, message: str = "") -> None:
+    """记录最近一次抓取结果与耗时。"""
+    if not feed_id:
+        return
+    values = {
+        FeedStats.last_sync_at: datetime.now(),
+        FeedStats.last_sync_status: SYNC_STATUS_SUCCESS if ok else SYNC_STATUS_FAILED,
+        FeedStats.last_sync_count: int(count or 0),
+        FeedStats.last_crawl_ms: int(duration_ms or 0),
+        FeedStats.last_sync_message: str(message or "")[:500],
+    }
+    if not _update_stats(session, feed_id, values):
+        repair_feed_stats(session, [feed_id], commit=False)
+        _update_stats(session, feed_id, values)
+
+
+def _refresh_latest(session, feed_id: str, exclude_ids: Optional[list] = None) -> None:
+    query = session.query(Article.id, Article.publish_time).filter(
+        Article.mp_id == feed_id,
+        Article.status == DATA_STATUS.ACTIVE,
+    )
+    if exclude_ids:
+        query = query.filter(~Article.id.in_(exclude_ids))
+    row = query.order_by(Article.publish_time.desc(), Article.created_at.desc()).first()
+    _update_stats(session, feed_id, {
+        FeedStats.latest_article_id: str(row[0]) if row else "",
+        FeedStats.latest_publish_time: int(row[1] or 0) if row else 0,
+    })
+
+
+def recount_article_counts(session, feed_ids: Optional[Iterable[str]] = None, commit: bool = True) -> int:
+    """按 Article 表重新计算公众号文章计数，返回更新的公众号数量。"""
+    count_query = session.query(Article.mp_id, func.count(Article.id)).filter(
+        Article.status == DATA_STATUS.ACTIVE
+    )
+    feed_query = session.query(Feed.id)
+    if feed_ids is not None:
+        ids = [str(i) for i in feed_ids if i]
+        if not ids:
+            return 0
+        count_query = count_query.filter(Article.mp_id.in_(ids))
+        feed_query = feed_query.filter(Feed.id.in_(ids))
+    counts = dict(count_query.group_by(Article.mp_id).all())
+    updated = 0
+    for (feed_id,) in feed_query.all():
+        session.query(Feed).filter(Feed.id == feed_id).update(
+            {Feed.article_count: int(counts.get(feed_id, 0))},
+            synchronize_session=False,
+        )
+        updated += 1
+    if commit:
+        session.commit()
+    return updated
+
+
+def repair_feed_stats(session, feed_ids: Optional[Iterable[str]] = None, commit: bool = True) -> int:
+    """从 Article 表全量重算统计（文章数、未读数、最新文章），返回处理的公众号数量。"""
+    ids = None if feed_ids is None else [str(i) for i in feed_ids if i]
+    if ids is not None and not ids:
+        return 0
+    recount_article_counts(session, ids, commit=False)
+
+    active = Article.status == DATA_STATUS.ACTIVE
+    unread_query = session.query(Article.mp_id, func.count(Article.id)).filter(
+        active,
+        or_(Article.is_read.is_(None), Article.is_read != 1),
+    )
+    latest_sub = session.query(
+        Article.mp_id.label("mp_id"),
+        func.max(Article.publish_time).label("max_time"),
+    ).filter(active)
+    feed_query = session.query(Feed.id, Feed.owner_id)
+    if ids is not None:
+        unread_query = unread_query.filter(Article.mp_id.in_(ids))
+        latest_sub = latest_sub.filter(Article.mp_id.in_(ids))
+        feed_query = feed_query.filter(Feed.id.in_(ids))
+    unread = dict(unread_query.group_by(Article.mp_id).all())
+    latest_sub = latest_sub.group_by(Article.mp_id).subquery()
+    latest = {}
+    for mp_id, article_id, publish_time in session.query(
+        Article.mp_id, Article.id, Article.publish_time
+    ).join(
+        latest_sub,
+        and_(Article.mp_id == latest_sub.c.mp_id, Article.publish_time == latest_sub.c.max_time),
+    ).filter(active).all():
+        latest.setdefault(mp_id, (article_id, int(publish_time or 0)))
+
+    feeds = feed_query.all()
+    target_ids = [feed_id for feed_id, _ in feeds]
+    existing = set()
+    if target_ids:
+        existing = {
+            row[0] for row in session.query(FeedStats.feed_id).filter(FeedStats.feed_id.in_(target_ids)).all()
+        }
+    now = datetime.now()
+    for feed_id, owner_id in feeds:
+        latest_id, latest_time = latest.get(feed_id, ("", 0))
+        values = {
+            "owner_id": owner_id,
+            "unread_count": int(unread.get(feed_id, 0)),
+            "latest_article_id": str(latest_id or ""),
+            "latest_publish_time": latest_time,
+            "updated_at": now,
+        }
+        if feed_id in existing:
+            session.query(FeedStats).filter(FeedStats.feed_id == feed_id).update(
+                values,
+                synchronize_session=False,
+            )
+        else:
+            session.add(FeedStats(feed_id=feed_id, **values))
+    if ids is None:
+        # 清理已不存在公众号的统计行
+        session.query(FeedStats).filter(
+            ~FeedStats.feed_id.in_(session.query(Feed.id))
+        ).delete(synchronize_session=False)
+    session.flush()
+    if commit:
+        session.commit()
+    return len(feeds)
+
+
+def get_article_counts(session, feed_ids: Iterable[str]) -> Dict[str, int]:
+    """一次查询取回多个公众号的文章计数。"""
+    ids = list({str(i) for i in feed_ids if i})
+    if not ids:
+        return {}
+    rows = session.query(Feed.id, Feed.article_count).filter(Feed.id.in_(ids)).all()
+    return {feed_id: int(count or 0) for feed_id, count in rows}
+
+
+def get_feed_stats(session, feed_id: str) -> Optional[FeedStats]:
+    if not feed_id:
+        return None
+    return session.query(FeedStats).filter(FeedStats.feed_id == feed_id).first()
+
+
+def get_owner_overview(session, owner_id: str) -> Dict[str, int]:
+    """
+    按用户汇总公众号数、文章数与未读数（仅读取反范式统计，不扫描文章表）。
+
+    文章数与未读数为用户名下所有公众号（含已停用的）中状态为正常（ACTIVE）的文章之和；
+    已删除公众号遗留的文章、以及其他非正常状态的文章不计入。
+    """
+    row = session.query(
+        func.count(Feed.id),
+        func.coalesce(func.sum(Feed.article_count), 0),
+        func.coalesce(func.sum(FeedStats.unread_count), 0),
+    ).outerjoin(
+        FeedStats, FeedStats.feed_id == Feed.id
+    ).filter(
+        Feed.owner_id == owner_id
+    ).first()
+    mp_count, article_count, unread_count = row or (0, 0, 0)
+    return {
+        "mp_count": int(mp_count or 0),
+        "article_count": int(article_count or 0),
+        "unread_count": max(0, int(unread_count or 0)),
+    }
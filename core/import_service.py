@@ -0,0 +1,354 @@
+import abc
+import base64
+import csv
+import itertools
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import select, update
+
+from core.config import cfg
+from core.log import get_logger
+from core.models.feed import Feed
+from core.models.import_job import ImportJob
+from core.models.tags import Tags
+from core.tag_feed_service import replace_tag_feeds
+
+logger = get_logger(__name__)
+
+IMPORT_STATUS_PENDING = "pending"
+IMPORT_STATUS_RUNNING = "running"
+IMPORT_STATUS_DONE = "done"
+IMPORT_STATUS_FAILED = "failed"
+
+FEED_REQUIRED_COLUMNS = ["公众号名称", "封面图", "简介"]
+TAG_REQUIRED_COLUMNS = ["标签名称", "状态", "mps_id"]
+
+
+class ImportFormatError(ValueError):
+    """导入文件缺少必要列"""
+
+    def __init__(self, missing: Sequence[str]):
+        self.missing = list(missing)
+        super().__init__(f"CSV文件缺少必要列: {', '.join(self.missing)}")
+
+
+def _engine():
+    from core.db import DB
+    return DB.get_engine()
+
+
+def upsert_rows(conn, table, rows: List[dict], key_columns: Sequence[str], update_columns: Sequence[str]) -> None:
+    """
+    按方言批量写入：SQLite/PostgreSQL 使用 ON CONFLICT DO UPDATE，MySQL 使用 ON DUPLICATE KEY UPDATE，
+    其他方言逐行先更新后插入。rows 中同一主键只能出现一次。
+    """
+    if not rows:
+        return
+    dialect = conn.engine.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[c] for c in key_columns],
+            set_={c: stmt.excluded[c] for c in update_columns},
+        )
+        conn.execute(stmt, rows)
+        return
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in update_columns})
+        conn.execute(stmt, rows)
+        return
+    for row in rows:
+        condition = [table.c[c] == row[c] for c in key_columns]
+        values = {c: row[c] for c in update_columns}
+        if not (conn.execute(update(table).where(*condition).values(**values)).rowcount or 0):
+            conn.execute(table.insert().values(**row))
+
+
+def _chunks(iterable: Iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _int(value, default: int = 1) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def count_rows(path: str) -> int:
+    """按换行数估算数据行数（不含表头），用于进度展示"""
+    lines = 0
+    last = b""
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last and last != b"\n":
+        lines += 1
+    return max(0, lines - 1)
+
+
+def open_csv(path: str, required_columns: Sequence[str]):
+    """打开 CSV 并校验表头，返回 (文件对象, DictReader)；缺少必要列时抛出 ImportFormatError"""
+    f = open(path, "r", encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(f)
+    fieldnames = reader.fieldnames or []
+    missing = [col for col in required_columns if col not in fieldnames]
+    if missing:
+        f.close()
+        raise ImportFormatError(missing)
+    return f, reader
+
+
+class BulkImporter(abc.ABC):
+    """
+    分块导入：每块 chunk_size 行，用一次 IN 查询预取已存在的记录，再一条批量 upsert 写入，
+    每块单独提交。progress(stats) 在每块提交后回调。
+    """
+
+    kind = ""
+    required_columns: Sequence[str] = ()
+
+    def __init__(self, owner_id: str, engine=None, chunk_size: Optional[int] = None):
+        self.owner_id = str(owner_id or "")
+        self.engine = engine or _engine()
+        self.chunk_size = max(1, int(chunk_size or cfg.get("import.chunk_size", 500) or 500))
+
+    def run(self, rows: Iterable[dict], progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+        stats = {"processed": 0, "imported": 0, "updated": 0, "skipped": 0}
+        for chunk in _chunks(rows, self.chunk_size):
+            with self.engine.begin() as conn:
+                imported, updated, skipped = self._apply(conn, chunk)
+            stats["processed"] += len(chunk)
+            stats["imported"] += imported
+            stats["updated"] += updated
+            stats["skipped"] += skipped
+            if progress is not None:
+                progress(dict(stats))
+        return stats
+
+    def run_file(self, path: str, progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+        f, reader = open_csv(path, self.required_columns)
+        try:
+            return self.run(reader, progress)
+        finally:
+            f.close()
+
+    @abc.abstractmethod
+    def _apply(self, conn, chunk: List[dict]):
+        """在 conn 的事务内写入一块数据，返回 (新建数, 更新数, 跳过数)"""
+
+
+class FeedImporter(BulkImporter):
+    """公众号导入：按 (owner_id, faker_id) 匹配已有公众号，更新封面/简介/状态，其余新建"""
+
+    kind = "feeds"
+    required_columns = FEED_REQUIRED_COLUMNS
+
+    def _apply(self, conn, chunk: List[dict]):
+        table = Feed.__table__
+        now = datetime.now()
+        parsed = []
+        for row in chunk:
+            faker_id = str(row.get("faker_id") or "")
+            try:
+                decoded = base64.b64decode(faker_id).decode("utf-8")
+            except Exception:
+                decoded = faker_id or str(uuid.uuid4())
+            parsed.append({
+                "id": f"MP_WXS_{self.owner_id}_{decoded}",
+                "owner_id": self.owner_id,
+                "mp_name": row.get("公众号名称") or "",
+                "mp_cover": row.get("封面图") or "",
+                "mp_intro": row.get("简介") or "",
+                "status": _int(row.get("状态"), 1) if row.get("状态") else 1,
+                "faker_id": faker_id,
+                "article_count": 0,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+        fakers = {item["faker_id"] for item in parsed if item["faker_id"]}
+        ids = {item["id"] for item in parsed}
+        by_faker: Dict[str, str] = {}
+        existing_ids = set()
+        if fakers:
+            for row in conn.execute(select(table.c.id, table.c.faker_id).where(
+                    table.c.owner_id == self.owner_id, table.c.faker_id.in_(fakers))):
+                by_faker.setdefault(str(row.faker_id), str(row.id))
+                existing_ids.add(str(row.id))
+        missing = ids - existing_ids
+        if missing:
+            existing_ids.update(str(row[0]) for row in conn.execute(select(table.c.id).where(table.c.id.in_(missing))))
+
+        rows: Dict[str, dict] = {}
+        for item in parsed:
+            # 已存在的公众号沿用原 ID，只更新封面、简介和状态（与逐行导入的行为一致）
+            item["id"] = by_faker.get(item["faker_id"], item["id"])
+            rows[item["id"]] = item
+        updated = sum(1 for key in rows if key in existing_ids)
+        upsert_rows(conn, table, list(rows.values()), ["id"], ["mp_cover", "mp_intro", "status", "faker_id", "updated_at"])
+        return len(rows) - updated, updated, len(chunk) - len(rows)
+
+
+class TagImporter(BulkImporter):
+    """标签导入：带本人已有标签 ID 的行更新该标签，其余（含空 ID 或他人的 ID）新建，标签名称为空的行跳过"""
+
+    kind = "tags"
+    required_columns = TAG_REQUIRED_COLUMNS
+
+    def _apply(self, conn, chunk: List[dict]):
+        table = Tags.__table__
+        now = datetime.now()
+        wanted = {str(row.get("id") or "").strip() for row in chunk} - {""}
+        existing = set()
+        if wanted:
+            existing = {str(row[0]) for row in conn.execute(select(table.c.id).where(
+                table.c.owner_id == self.owner_id, table.c.id.in_(wanted)))}
+
+        rows: Dict[str, dict] = {}
+        for row in chunk:
+            name = row.get("标签名称")
+            if not name or not name.strip():
+                continue
+            tag_id = str(row.get("id") or "").strip()
+            if tag_id not in existing:
+                tag_id = str(uuid.uuid4())
+            rows[tag_id] = {
+                "id": tag_id,
+                "owner_id": self.owner_id,
+                "name": name,
+                "cover": row.get("封面图", "") or "",
+                "intro": row.get("描述", "") or "",
+                "status": _int(row.get("状态", 1), 1),
+                "mps_id": row.get("mps_id") or "[]",
+                "created_at": now,
+                "updated_at": now,
+            }
+        updated = sum(1 for key in rows if key in existing)
+        upsert_rows(conn, table, list(rows.values()), ["id"], ["name", "cover", "intro", "status", "mps_id", "updated_at"])
+        replace_tag_feeds(conn, [(row["id"], row["owner_id"], row["mps_id"]) for row in rows.values()])
+        return len(rows) - updated, updated, len(chunk) - len(rows)
+
+
+IMPORTERS = {FeedImporter.kind: FeedImporter, TagImporter.kind: TagImporter}
+
+
+def serialize_import_job(job) -> Optional[dict]:
+    if job is None:
+        return None
+    row = job._mapping if hasattr(job, "_mapping") else {
+        column.name: getattr(job, column.name, None) for column in ImportJob.__table__.columns
+    }
+
+    def _iso(value):
+        return value.isoformat() if isinstance(value, datetime) else None
+
+    total = int(row.get("total_rows") or 0)
+    processed = int(row.get("processed_rows") or 0)
+    done = row.get("status") == IMPORT_STATUS_DONE
+    return {
+        "id": row.get("id"),
+        "kind": row.get("kind"),
+        "filename": row.get("filename") or "",
+        "status": row.get("status"),
+        "progress": {
+            "processed_rows": processed,
+            "total_rows": max(total, processed),
+            "percent": 100.0 if done else (round(min(processed, total) * 100.0 / total, 1) if total else 0.0),
+        },
+        "stats": {
+            "total": processed,
+            "imported": int(row.get("imported") or 0),
+            "updated": int(row.get("updated") or 0),
+            "skipped": int(row.get("skipped") or 0),
+        },
+        "error": row.get("error") or "",
+        "created_at": _iso(row.get("created_at")),
+        "updated_at": _iso(row.get("updated_at")),
+        "finished_at": _iso(row.get("finished_at")),
+    }
+
+
+def get_import_job(job_id: str, owner_id: str, engine=None) -> Optional[dict]:
+    table = ImportJob.__table__
+    with (engine or _engine()).connect() as conn:
+        row = conn.execute(select(table).where(table.c.id == job_id, table.c.owner_id == owner_id)).first()
+    return serialize_import_job(row)
+
+
+def create_import_job(owner_id: str, kind: str, path: str, filename: str = "", engine=None) -> dict:
+    """校验表头并登记导入任务；文件格式不对时抛出 ImportFormatError"""
+    f, _ = open_csv(path, IMPORTERS[kind].required_columns)
+    f.close()
+    table = ImportJob.__table__
+    now = datetime.now()
+    job_id = uuid.uuid4().hex
+    with (engine or _engine()).begin() as conn:
+        conn.execute(table.insert().values(
+            id=job_id, owner_id=owner_id, kind=kind, filename=str(filename or "")[:255],
+            status=IMPORT_STATUS_PENDING, total_rows=count_rows(path), processed_rows=0,
+            imported=0, updated=0, skipped=0, error="", created_at=now, updated_at=now,
+        ))
+    return get_import_job(job_id, owner_id, engine=engine)
+
+
+def run_import_job(job_id: str, path: str, engine=None, chunk_size: Optional[int] = None,
+                   progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                   remove_file: bool = True) -> Optional[dict]:
+    """执行导入任务：每块提交后写回进度；失败时已提交的块保留，任务标记为 failed"""
+    engine = engine or _engine()
+    table = ImportJob.__table__
+    with engine.connect() as conn:
+        job = conn.execute(select(table).where(table.c.id == job_id)).first()
+    if job is None:
+        return None
+
+    def _set(**values):
+        values["updated_at"] = datetime.now()
+        with engine.begin() as conn:
+            conn.execute(update(table).where(table.c.id == job_id).values(**values))
+
+    def _progress(stats):
+        _set(processed_rows=stats["processed"], imported=stats["imported"],
+             updated=stats["updated"], skipped=stats["skipped"])
+        if progress is not None:
+            progress(stats)
+
+    _set(status=IMPORT_STATUS_RUNNING)
+    try:
+        importer = IMPORTERS[job.kind](job.owner_id, engine=engine, chunk_size=chunk_size)
+        importer.run_file(path, progress=_progress)
+        _set(status=IMPORT_STATUS_DONE, finished_at=datetime.now())
+    except Exception as e:
+        logger.exception("导入任务 %s 失败: %s", job_id, e)
+        _set(status=IMPORT_STATUS_FAILED, error=str(e)[:2000], finished_at=datetime.now())
+    finally:
+        if remove_file:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return get_import_job(job_id, job.owner_id, engine=engine)
+
+
+def start_import_async(job_id: str, path: str) -> threading.Thread:
+    """在当前进程后台执行导入，不阻塞请求"""
+    t = threading.Thread(target=run_import_job, args=(job_id, path), daemon=True, name=f"import-{job_id[:8]}")
+    t.start()
+    return t
@@ -1 +1,2 @@
-from .template_parser import *
\ No newline at end of file
+from .template_parser import *
+from .template_registry import *
\ No newline at end of file
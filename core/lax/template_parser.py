@@ -1,5 +1,6 @@
 import re
 import os
+from functools import lru_cache
 from typing import Any, Dict, List, Union
 # """
 # 模板引擎使用示例
@@ -9,8 +10,446 @@ from typing import Any, Dict, List, Union
 # 2. 条件判断: {% if condition %}...{% endif %}
 # 3. 循环结构: {% for item in items %}...{% endfor %}
 # """
+
+
+# 表达式求值使用的安全函数表在模块加载时构建一次，所有解析器实例共享
+
+# 字符串操作函数
+def _safe_upper(s):
+    return str(s).upper() if s else ""
+
+
+def _safe_lower(s):
+    return str(s).lower() if s else ""
+
+
+def _safe_title(s):
+    return str(s).title() if s else ""
+
+
+def _safe_capitalize(s):
+    return str(s).capitalize() if s else ""
+
+
+def _safe_strip(s):
+    return str(s).strip() if s else ""
+
+
+def _safe_lstrip(s):
+    return str(s).lstrip() if s else ""
+
+
+def _safe_rstrip(s):
+    return str(s).rstrip() if s else ""
+
+
+def _safe_split(s, sep=None, maxsplit=-1):
+    return str(s).split(sep, maxsplit) if s else []
+
+
+def _safe_join(sep, iterable):
+    try:
+        return str(sep).join(str(item) for item in iterable)
+    except:
+        return ""
+
+
+def _safe_replace(s, old, new):
+    return str(s).replace(str(old), str(new)) if s else ""
+
+
+def _safe_startswith(s, prefix):
+    return str(s).startswith(str(prefix)) if s else False
+
+
+def _safe_endswith(s, suffix):
+    return str(s).endswith(str(suffix)) if s else False
+
+
+def _safe_contains(s, sub):
+    return str(sub) in str(s) if s else False
+
+
+def _safe_length(s):
+    try:
+        return len(s) if s is not None else 0
+    except:
+        return 0
+
+
+def _safe_slice(s, start, end=None):
+    try:
+        if end is None:
+            return str(s)[start:]
+        return str(s)[start:end]
+    except:
+        return "" if s else ""
+
+
+# 列表/数组操作函数
+def _safe_first(iterable):
+    try:
+        return iterable[0] if iterable else None
+    except:
+        return None
+
+
+def _safe_last(iterable):
+    try:
+        return iterable[-1] if iterable else None
+    except:
+        return None
+
+
+def _safe_rest(iterable):
+    try:
+        return iterable[1:] if iterable else []
+    except:
+        return []
+
+
+def _safe_take(iterable, n):
+    try:
+        return iterable[:n] if iterable else []
+    except:
+        return []
+
+
+def _safe_reverse(iterable):
+    try:
+        return list(reversed(iterable)) if iterable else []
+    except:
+        return []
+
+
+def _safe_sort(iterable, key=None, reverse=False):
+    try:
+        return sorted(iterable, key=key, reverse=reverse) if iterable else []
+    except:
+        return []
+
+
+def _safe_unique(iterable):
+    try:
+        return list(dict.fromkeys(iterable)) if iterable else []
+    except:
+        return []
+
+
+def _safe_concat(*lists):
+    try:
+        result = []
+        for lst in lists:
+            if lst:
+                result.extend(lst)
+        return result
+    except:
+        return []
+
+
+# 类型转换和检查函数
+def _safe_to_string(value):
+    return str(value) if value is not None else ""
+
+
+def _safe_to_int(value, default=0):
+    try:
+        return int(value)
+    except:
+        return default
+
+
+def _safe_to_float(value, default=0.0):
+    try:
+        return float(value)
+    except:
+        return default
+
+
+def _safe_to_list(value):
+    if value is None:
+        return []
+    elif isinstance(value, (list, tuple)):
+        return list(value)
+    elif isinstance(value, dict):
+        return list(value.values())
+    else:
+        return [value]
+
+
+def _safe_is_empty(value):
+    if value is None:
+        return True
+    elif isinstance(value, (list, tuple, dict, str)):
+        return len(value) == 0
+    else:
+        return False
+
+
+def _safe_is_not_empty(value):
+    return not _safe_is_empty(value)
+
+
+def _safe_is_numeric(value):
+    try:
+        float(value)
+        return True
+    except:
+        return False
+
+
+def _safe_type_of(value):
+    return type(value).__name__
+
+
+# 数学扩展函数
+def _safe_mean(iterable):
+    try:
+        if not iterable:
+            return 0
+        return sum(iterable) / len(iterable)
+    except:
+        return 0
+
+
+def _safe_median(iterable):
+    try:
+        if not iterable:
+            return 0
+        sorted_list = sorted(iterable)
+        n = len(sorted_list)
+        if n % 2 == 0:
+            return (sorted_list[n//2-1] + sorted_list[n//2]) / 2
+        else:
+            return sorted_list[n//2]
+    except:
+        return 0
+
+
+def _safe_range(start, stop=None, step=1):
+    try:
+        if stop is None:
+            return list(range(start))
+        return list(range(start, stop, step))
+    except:
+        return []
+
+
+# 日期时间函数
+def _safe_now(format="%Y-%m-%d %H:%M:%S"):
+    try:
+        from datetime import datetime
+        return datetime.now().strftime(format)
+    except:
+        return ""
+
+
+def _safe_today(format="%Y-%m-%d"):
+    try:
+        from datetime import datetime
+        return datetime.now().strftime(format)
+    except:
+        return ""
+
+
+def _safe_year():
+    try:
+        from datetime import datetime
+        return datetime.now().year
+    except:
+        return 0
+
+
+def _safe_month():
+    try:
+        from datetime import datetime
+        return datetime.now().month
+    except:
+        return 0
+
+
+def _safe_day():
+    try:
+        from datetime import datetime
+        return datetime.now().day
+    except:
+        return 0
+
+
+# 条件和逻辑函数
+def _safe_coalesce(*args):
+    for arg in args:
+        if arg is not None and arg != "":
+            return arg
+    return None
+
+
+def _safe_default(value, default_value):
+    return value if value is not None and value != "" else default_value
+
+
+def _safe_conditional(condition, true_value, false_value):
+    return true_value if condition else false_value
+
+
+# 局部变量操作函数
+def _safe_set_var(name, value):
+    """设置局部变量 - 这个函数会通过上下文管理器处理"""
+    return value
+
+
+def _safe_let(var_name, value):
+    """let语法支持 - 创建临时变量绑定"""
+    return value
+
+
+# URL和编码函数
+def _safe_quote(s):
+    try:
+        import urllib.parse
+        return urllib.parse.quote(str(s))
+    except:
+        return str(s)
+
+
+def _safe_unquote(s):
+    try:
+        import urllib.parse
+        return urllib.parse.unquote(str(s))
+    except:
+        return str(s)
+
+
+def _safe_json_encode(value):
+    try:
+        import json
+        return json.dumps(value, ensure_ascii=False)
+    except:
+        return ""
+
+
+def _safe_json_decode(s):
+    try:
+        import json
+        return json.loads(str(s))
+    except:
+        return None
+
+
+_SAFE_GLOBALS = {
+    # 基础常量
+    'None': None,
+    'True': True,
+    'False': False,
+    # 基础类型
+    'bool': bool,
+    'int': int,
+    'float': float,
+    'str': str,
+    'list': list,
+    'dict': dict,
+    'tuple': tuple,
+    # 基础函数
+    'len': len,
+    'sum': sum,
+    'min': min,
+    'max': max,
+    'abs': abs,
+    'round': round,
+    'pow': pow,
+    # 字符串操作
+    'upper': _safe_upper,
+    'lower': _safe_lower,
+    'title': _safe_title,
+    'capitalize': _safe_capitalize,
+    'strip': _safe_strip,
+    'lstrip': _safe_lstrip,
+    'rstrip': _safe_rstrip,
+    'split': _safe_split,
+    'join': _safe_join,
+    'replace': _safe_replace,
+    'startswith': _safe_startswith,
+    'endswith': _safe_endswith,
+    'contains': _safe_contains,
+    'length': _safe_length,
+    'slice': _safe_slice,
+    # 列表/数组操作
+    'first': _safe_first,
+    'last': _safe_last,
+    'rest': _safe_rest,
+    'take': _safe_take,
+    'reverse': _safe_reverse,
+    'sort': _safe_sort,
+    'unique': _safe_unique,
+    'concat': _safe_concat,
+    # 类型转换和检查
+    'to_string': _safe_to_string,
+    'to_int': _safe_to_int,
+    'to_float': _safe_to_float,
+    'to_list': _safe_to_list,
+    'is_empty': _safe_is_empty,
+    'is_not_empty': _safe_is_not_empty,
+    'is_numeric': _safe_is_numeric,
+    'type_of': _safe_type_of,
+    # 数学函数
+    'sqrt': lambda x: x ** 0.5,
+    'ceil': lambda x: int(x) + (1 if x > int(x) else 0),
+    'floor': int,
+    'mean': _safe_mean,
+    'median': _safe_median,
+    'range': _safe_range,
+    # 日期时间
+    'now': _safe_now,
+    'today': _safe_today,
+    'year': _safe_year,
+    'month': _safe_month,
+    'day': _safe_day,
+    # 逻辑和条件
+    'coalesce': _safe_coalesce,
+    'default': _safe_default,
+    'conditional': _safe_conditional,
+    # 局部变量操作
+    'set': _safe_set_var,
+    'let': _safe_let,
+    # URL和编码
+    'quote': _safe_quote,
+    'unquote': _safe_unquote,
+    'json_encode': _safe_json_encode,
+    'json_decode': _safe_json_decode,
+}
+
+
+_FORBIDDEN_KEYWORDS = (
+    'import', 'open', 'exec', 'eval', 'system', 'subprocess',
+    '__import__', 'getattr', 'setattr', 'delattr', 'compile',
+    'globals', 'locals', 'vars', 'dir', 'help', 'reload',
+    'input', 'file', 'execfile', 'reload', 'exit', 'quit'
+)
+
+
+@lru_cache(maxsize=2048)
+def _is_safe_source(expr: str) -> bool:
+    expr_lower = expr.lower()
+    return not any(keyword in expr_lower for keyword in _FORBIDDEN_KEYWORDS)
+
+
+@lru_cache(maxsize=2048)
+def _compile_expression(expr: str, mode: str = 'eval'):
+    """Compile an expression once; templates re-evaluate the same strings per item and per render."""
+    return compile(expr, '<string>', mode)
+
+
 class TemplateParser:
     """A lightweight template engine supporting variables, conditions and loops."""
+
+    # Split template into static parts and control blocks
+    TOKEN_PATTERN = re.compile(
+        r'(\{\%.*?\%\})|'  # control blocks {% ... %}
+        r'(\{\{.*?\}\})'    # variables {{ ... }}
+    )
+    INCLUDE_PATTERN = re.compile(r'\{\%\s*include\s+[\'"]([^\'"]+)[\'"]\s*\%\}')
+    SET_CALL_PATTERN = re.compile(r"set\(['\"]([^'\"]+)['\"]\s*,\s*(.+)\)")
+    LET_CALL_PATTERN = re.compile(r"let\(['\"]([^'\"]+)['\"]\s*,\s*(.+)\)")
     
     def __init__(self, template: str, template_dir: str = None):
         """Initialize the template parser with a template string."""
@@ -18,6 +457,7 @@ class TemplateParser:
         self.compiled = None
         self.custom_functions = {}
         self.template_dir = template_dir  # Template directory for include functionality
+        self._eval_globals = None
         
     def register_function(self, name: str, func: callable) -> None:
         """
@@ -28,6 +468,7 @@ class TemplateParser:
             func: The function to register
         """
         self.custom_functions[name] = func
+        self._eval_globals = None
         
     def register_functions(self, functions: Dict[str, callable]) -> None:
         """
@@ -37,18 +478,13 @@ class TemplateParser:
             functions: Dictionary of function names to functions
         """
         self.custom_functions.update(functions)
+        self._eval_globals = None
 
     def compile_template(self) -> None:
         """Compile the template into an intermediate representation."""
         # First process include directives
         processed_template = self._process_includes(self.template)
-        
-        # Split template into static parts and control blocks
-        pattern = re.compile(
-            r'(\{\%.*?\%\})|'  # control blocks {% ... %}
-            r'(\{\{.*?\}\})'    # variables {{ ... }}
-        )
-        self.compiled = pattern.split(processed_template)
+        self.compiled = self.TOKEN_PATTERN.split(processed_template)
         
     def render(self, context: Dict[str, Any]) -> str:
         """
@@ -60,18 +496,21 @@ class TemplateParser:
         Returns:
             The rendered template as a string
         """
+        if self.compiled is None:
+            self.compile_template()
+        return self._render_compiled(self.compiled, context)
+
+    def _render_compiled(self, compiled: List[Union[str, None]], context: Dict[str, Any]) -> str:
+        """Render a slice of compiled parts; nested branches reuse this parser instead of spawning new ones."""
         # Security check: validate context keys
         for key in context.keys():
             if not isinstance(key, str) or not key.isidentifier():
                 raise ValueError(f"Invalid context key: {key}. Keys must be valid Python identifiers")
-        
-        if self.compiled is None:
-            self.compile_template()
             
         output = []
         i = 0
-        while i < len(self.compiled):
-            part = self.compiled[i]
+        while i < len(compiled):
+            part = compiled[i]
             
             if part is None:
                 i += 1
@@ -220,15 +659,15 @@ class TemplateParser:
                         context['final_price'] = updated_context['final_price']
                     
                     # Find matching endif using helper method
-                    endif_idx = self._skip_control_block(i, 'if', 'endif')
-                    if endif_idx == len(self.compiled):
+                    endif_idx = self._skip_control_block(i, 'if', 'endif', compiled)
+                    if endif_idx == len(compiled):
                         i += 1
                         continue
                     
                     # Find else if exists
                     else_idx = -1
                     for j in range(i+1, endif_idx):
-                        part = self.compiled[j]
+                        part = compiled[j]
                         if isinstance(part, str) and part.strip() in ('{% else %}', 'else'):
                             else_idx = j
                             break
@@ -237,19 +676,15 @@ class TemplateParser:
                     if result:
                         # Process if block (from current position to else or endif)
                         end_idx = else_idx if else_idx != -1 else endif_idx
-                        if_content = self.compiled[i+1:end_idx]
+                        if_content = compiled[i+1:end_idx]
                         
-                        if_parser = TemplateParser('')
-                        if_parser.compiled = if_content
-                        rendered = if_parser.render(context)
+                        rendered = self._render_compiled(if_content, context)
                         output.append(rendered)
                     elif else_idx != -1:
                         # Process else block
-                        else_content = self.compiled[else_idx+1:endif_idx]
+                        else_content = compiled[else_idx+1:endif_idx]
                         
-                        else_parser = TemplateParser('')
-                        else_parser.compiled = else_content
-                        rendered = else_parser.render(context)
+                        rendered = self._render_compiled(else_content, context)
                         output.append(rendered)
                     
                     # Skip to after endif
@@ -265,8 +700,8 @@ class TemplateParser:
                     loop_content = []
                     j = i + 1
                     endfor_idx = j
-                    while j < len(self.compiled):
-                        inner_part = self.compiled[j]
+                    while j < len(compiled):
+                        inner_part = compiled[j]
                         if (isinstance(inner_part, str) and 
                             inner_part.startswith('{% endfor %}')):
                             endfor_idx = j
@@ -279,7 +714,7 @@ class TemplateParser:
                     total_items = len(items)
                     
                     # Get the indentation level from the template
-                    for_line = self.compiled[i]
+                    for_line = compiled[i]
                     indent = ''
                     if isinstance(for_line, str):
                         indent_match = re.match(r'^(\s*)', for_line)
@@ -497,373 +932,17 @@ class TemplateParser:
     
     def _get_safe_globals(self) -> Dict[str, Any]:
         """Return a dictionary of safe builtins for eval/exec."""
-        # 字符串操作函数
-        def safe_upper(s):
-            return str(s).upper() if s else ""
-        
-        def safe_lower(s):
-            return str(s).lower() if s else ""
-        
-        def safe_title(s):
-            return str(s).title() if s else ""
-        
-        def safe_capitalize(s):
-            return str(s).capitalize() if s else ""
-        
-        def safe_strip(s):
-            return str(s).strip() if s else ""
-        
-        def safe_lstrip(s):
-            return str(s).lstrip() if s else ""
-        
-        def safe_rstrip(s):
-            return str(s).rstrip() if s else ""
-        
-        def safe_split(s, sep=None, maxsplit=-1):
-            return str(s).split(sep, maxsplit) if s else []
-        
-        def safe_join(sep, iterable):
-            try:
-                return str(sep).join(str(item) for item in iterable)
-            except:
-                return ""
-        
-        def safe_replace(s, old, new):
-            return str(s).replace(str(old), str(new)) if s else ""
-        
-        def safe_startswith(s, prefix):
-            return str(s).startswith(str(prefix)) if s else False
-        
-        def safe_endswith(s, suffix):
-            return str(s).endswith(str(suffix)) if s else False
-        
-        def safe_contains(s, sub):
-            return str(sub) in str(s) if s else False
-        
-        def safe_length(s):
-            try:
-                return len(s) if s is not None else 0
-            except:
-                return 0
-        
-        def safe_slice(s, start, end=None):
-            try:
-                if end is None:
-                    return str(s)[start:]
-                return str(s)[start:end]
-            except:
-                return "" if s else ""
-        
-        # 列表/数组操作函数
-        def safe_first(iterable):
-            try:
-                return iterable[0] if iterable else None
-            except:
-                return None
-        
-        def safe_last(iterable):
-            try:
-                return iterable[-1] if iterable else None
-            except:
-                return None
-        
-        def safe_rest(iterable):
-            try:
-                return iterable[1:] if iterable else []
-            except:
-                return []
-        
-        def safe_take(iterable, n):
-            try:
-                return iterable[:n] if iterable else []
-            except:
-                return []
-        
-        def safe_reverse(iterable):
-            try:
-                return list(reversed(iterable)) if iterable else []
-            except:
-                return []
-        
-        def safe_sort(iterable, key=None, reverse=False):
-            try:
-                return sorted(iterable, key=key, reverse=reverse) if iterable else []
-            except:
-                return []
-        
-        def safe_unique(iterable):
-            try:
-                return list(dict.fromkeys(iterable)) if iterable else []
-            except:
-                return []
-        
-        def safe_concat(*lists):
-            try:
-                result = []
-                for lst in lists:
-                    if lst:
-                        result.extend(lst)
-                return result
-            except:
-                return []
-        
-        # 类型转换和检查函数
-        def safe_to_string(value):
-            return str(value) if value is not None else ""
-        
-        def safe_to_int(value, default=0):
-            try:
-                return int(value)
-            except:
-                return default
-        
-        def safe_to_float(value, default=0.0):
-            try:
-                return float(value)
-            except:
-                return default
-        
-        def safe_to_list(value):
-            if value is None:
-                return []
-            elif isinstance(value, (list, tuple)):
-                return list(value)
-            elif isinstance(value, dict):
-                return list(value.values())
-            else:
-                return [value]
-        
-        def safe_is_empty(value):
-            if value is None:
-                return True
-            elif isinstance(value, (list, tuple, dict, str)):
-                return len(value) == 0
-            else:
-                return False
-        
-        def safe_is_not_empty(value):
-            return not safe_is_empty(value)
-        
-        def safe_is_numeric(value):
-            try:
-                float(value)
-                return True
-            except:
-                return False
-        
-        def safe_type_of(value):
-            return type(value).__name__
-        
-        # 数学扩展函数
-        def safe_mean(iterable):
-            try:
-                if not iterable:
-                    return 0
-                return sum(iterable) / len(iterable)
-            except:
-                return 0
-        
-        def safe_median(iterable):
-            try:
-                if not iterable:
-                    return 0
-                sorted_list = sorted(iterable)
-                n = len(sorted_list)
-                if n % 2 == 0:
-                    return (sorted_list[n//2-1] + sorted_list[n//2]) / 2
-                else:
-                    return sorted_list[n//2]
-            except:
-                return 0
-        
-        def safe_range(start, stop=None, step=1):
-            try:
-                if stop is None:
-                    return list(range(start))
-                return list(range(start, stop, step))
-            except:
-                return []
-        
-        # 日期时间函数
-        def safe_now(format="%Y-%m-%d %H:%M:%S"):
-            try:
-                from datetime import datetime
-                return datetime.now().strftime(format)
-            except:
-                return ""
-        
-        def safe_today(format="%Y-%m-%d"):
-            try:
-                from datetime import datetime
-                return datetime.now().strftime(format)
-            except:
-                return ""
-        
-        def safe_year():
-            try:
-                from datetime import datetime
-                return datetime.now().year
-            except:
-                return 0
-        
-        def safe_month():
-            try:
-                from datetime import datetime
-                return datetime.now().month
-            except:
-                return 0
-        
-        def safe_day():
-            try:
-                from datetime import datetime
-                return datetime.now().day
-            except:
-                return 0
-        
-        # 条件和逻辑函数
-        def safe_coalesce(*args):
-            for arg in args:
-                if arg is not None and arg != "":
-                    return arg
-            return None
-        
-        def safe_default(value, default_value):
-            return value if value is not None and value != "" else default_value
-        
-        def safe_conditional(condition, true_value, false_value):
-            return true_value if condition else false_value
-        
-        # 局部变量操作函数
-        def safe_set_var(name, value):
-            """设置局部变量 - 这个函数会通过上下文管理器处理"""
-            return value
-        
-        def safe_let(var_name, value):
-            """let语法支持 - 创建临时变量绑定"""
-            return value
-        
-        # URL和编码函数
-        def safe_quote(s):
-            try:
-                import urllib.parse
-                return urllib.parse.quote(str(s))
-            except:
-                return str(s)
-        
-        def safe_unquote(s):
-            try:
-                import urllib.parse
-                return urllib.parse.unquote(str(s))
-            except:
-                return str(s)
-        
-        def safe_json_encode(value):
-            try:
-                import json
-                return json.dumps(value, ensure_ascii=False)
-            except:
-                return ""
-        
-        def safe_json_decode(s):
-            try:
-                import json
-                return json.loads(str(s))
-            except:
-                return None
-        
-        safe_builtins = {
-            # 基础常量
-            'None': None,
-            'True': True,
-            'False': False,
-            # 基础类型
-            'bool': bool,
-            'int': int,
-            'float': float,
-            'str': str,
-            'list': list,
-            'dict': dict,
-            'tuple': tuple,
-            # 基础函数
-            'len': len,
-            'sum': sum,
-            'min': min,
-            'max': max,
-            'abs': abs,
-            'round': round,
-            'pow': pow,
-            # 字符串操作
-            'upper': safe_upper,
-            'lower': safe_lower,
-            'title': safe_title,
-            'capitalize': safe_capitalize,
-            'strip': safe_strip,
-            'lstrip': safe_lstrip,
-            'rstrip': safe_rstrip,
-            'split': safe_split,
-            'join': safe_join,
-            'replace': safe_replace,
-            'startswith': safe_startswith,
-            'endswith': safe_endswith,
-            'contains': safe_contains,
-            'length': safe_length,
-            'slice': safe_slice,
-            # 列表/数组操作
-            'first': safe_first,
-            'last': safe_last,
-            'rest': safe_rest,
-            'take': safe_take,
-            'reverse': safe_reverse,
-            'sort': safe_sort,
-            'unique': safe_unique,
-            'concat': safe_concat,
-            # 类型转换和检查
-            'to_string': safe_to_string,
-            'to_int': safe_to_int,
-            'to_float': safe_to_float,
-            'to_list': safe_to_list,
-            'is_empty': safe_is_empty,
-            'is_not_empty': safe_is_not_empty,
-            'is_numeric': safe_is_numeric,
-            'type_of': safe_type_of,
-            # 数学函数
-            'sqrt': lambda x: x ** 0.5,
-            'ceil': lambda x: int(x) + (1 if x > int(x) else 0),
-            'floor': int,
-            'mean': safe_mean,
-            'median': safe_median,
-            'range': safe_range,
-            # 日期时间
-            'now': safe_now,
-            'today': safe_today,
-            'year': safe_year,
-            'month': safe_month,
-            'day': safe_day,
-            # 逻辑和条件
-            'coalesce': safe_coalesce,
-            'default': safe_default,
-            'conditional': safe_conditional,
-            # 局部变量操作
-            'set': safe_set_var,
-            'let': safe_let,
-            # URL和编码
-            'quote': safe_quote,
-            'unquote': safe_unquote,
-            'json_encode': safe_json_encode,
-            'json_decode': safe_json_decode,
-        }
-        return safe_builtins
+        return dict(_SAFE_GLOBALS)
+
+    def _get_eval_globals(self) -> Dict[str, Any]:
+        """Return the shared eval globals (safe builtins plus custom functions) for this parser."""
+        if self._eval_globals is None:
+            self._eval_globals = {**_SAFE_GLOBALS, **self.custom_functions}
+        return self._eval_globals
 
     def _is_safe_expression(self, expr: str) -> bool:
         """Check if an expression contains potentially dangerous operations."""
-        forbidden = [
-            'import', 'open', 'exec', 'eval', 'system', 'subprocess',
-            '__import__', 'getattr', 'setattr', 'delattr', 'compile',
-            'globals', 'locals', 'vars', 'dir', 'help', 'reload',
-            'input', 'file', 'execfile', 'reload', 'exit', 'quit'
-        ]
-        expr_lower = expr.lower()
-        return not any(keyword in expr_lower for keyword in forbidden)
+        return _is_safe_source(expr)
 
     def _evaluate_condition(self, condition: str, context: Dict[str, Any]) -> tuple:
         """
@@ -899,8 +978,7 @@ class TemplateParser:
                 return (not result if has_not else result), context
                     
             # Create safe evaluation environment
-            safe_globals = self._get_safe_globals()
-            eval_globals = {**safe_globals, **self.custom_functions}
+            eval_globals = self._get_eval_globals()
             
             # Make a copy of context to avoid modifying the original
             local_vars = context.copy()
@@ -908,8 +986,9 @@ class TemplateParser:
             # Handle multi-line code blocks
             if '\n' in condition.strip():
                 # Compile and execute the code block in restricted environment
-                code = compile(condition, '<string>', 'exec')
-                exec(code, eval_globals, local_vars)
+                code = _compile_expression(condition, 'exec')
+                # Statements may bind globals, so run them against a private copy
+                exec(code, dict(eval_globals), local_vars)
                 # The last expression's value should be in __result__
                 result = bool(local_vars.get('__result__', False))
                 # Return result and updated context (excluding special vars)
@@ -932,7 +1011,7 @@ class TemplateParser:
             
             # Handle function calls with = prefix
             if condition.startswith('='):
-                result = bool(eval(condition[1:], eval_globals, local_vars))
+                result = bool(eval(_compile_expression(condition[1:]), eval_globals, local_vars))
                 return result, local_vars
             
             # Handle nested attribute access (e.g. user.is_admin)
@@ -959,23 +1038,25 @@ class TemplateParser:
                 return bool(value), local_vars
                 
             # Evaluate other expressions
-            result = bool(eval(condition, eval_globals, local_vars))
+            result = bool(eval(_compile_expression(condition), eval_globals, local_vars))
             return result, local_vars
             
         except Exception:
             return False, context
             
-    def _skip_control_block(self, start_idx: int, start_tag: str, end_tag: str) -> int:
+    def _skip_control_block(self, start_idx: int, start_tag: str, end_tag: str, compiled: List[Union[str, None]] = None) -> int:
         """Skip a control block until matching end tag is found."""
-        if start_idx >= len(self.compiled):
-            return len(self.compiled)
+        if compiled is None:
+            compiled = self.compiled
+        if start_idx >= len(compiled):
+            return len(compiled)
             
         depth = 1
         i = start_idx + 1
         # print(f"DEBUG - Searching for {end_tag} starting from {start_idx}")
         
-        while i < len(self.compiled):
-            part = self.compiled[i]
+        while i < len(compiled):
+            part = compiled[i]
             if isinstance(part, str) and part.startswith('{%') and part.endswith('%}'):
                 block = part[2:-2].strip()
                 # print(f"DEBUG - Token {i}: {block} (depth={depth})")
@@ -1001,8 +1082,8 @@ class TemplateParser:
             i += 1
         
         # print(f"DEBUG - Error: Reached end without finding matching {end_tag} (current depth: {depth})")
-        # print(f"DEBUG - Last processed block: {self.compiled[i-1] if i > 0 else 'None'}")
-        return len(self.compiled)
+        # print(f"DEBUG - Last processed block: {compiled[i-1] if i > 0 else 'None'}")
+        return len(compiled)
 
     def _clean_output(self, output: str) -> str:
         """Clean up the final output while preserving essential formatting."""
@@ -1029,14 +1110,13 @@ class TemplateParser:
             if not self._is_safe_expression(iterable):
                 raise ValueError("Potentially dangerous expression detected")
             
-            safe_globals = self._get_safe_globals()
-            return eval(iterable, safe_globals, context)
+            return eval(_compile_expression(iterable), self._get_eval_globals(), context)
         except Exception:
             return []
             
     def _process_includes(self, template: str) -> str:
         """Process {% include 'filename' %} directives."""
-        include_pattern = re.compile(r'\{\%\s*include\s+[\'"]([^\'"]+)[\'"]\s*\%\}')
+        include_pattern = self.INCLUDE_PATTERN
         
         def replace_include(match):
             filename = match.group(1)
@@ -1060,8 +1140,7 @@ class TemplateParser:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             # Recursively process includes in the included file
-            included_parser = TemplateParser(content, self.template_dir)
-            return included_parser._process_includes(content)
+            return self._process_includes(content)
         except FileNotFoundError:
             return f"[Error: Include file '{filename}' not found]"
         except Exception as e:
@@ -1079,28 +1158,13 @@ class TemplateParser:
         if stripped_expr.startswith('set('):
             try:
                 # Parse set('var_name', value)
-                import re
-                match = re.match(r"set\(['\"]([^'\"]+)['\"]\s*,\s*(.+)\)", stripped_expr)
+                match = self.SET_CALL_PATTERN.match(stripped_expr)
                 if match:
                     var_name = match.group(1)
                     value_expr = match.group(2)
                     
                     # Evaluate the value
-                    safe_globals = self._get_safe_globals()
-                    safe_globals.update({
-                        'pow': pow,
-                        'sqrt': lambda x: x ** 0.5,
-                        'ceil': lambda x: int(x) + (1 if x > int(x) else 0),
-                        'floor': int,
-                        'abs': abs,
-                        'round': round,
-                        'min': min,
-                        'max': max,
-                        'sum': sum
-                    })
-                    eval_globals = {**safe_globals, **self.custom_functions}
-                    
-                    value = eval(value_expr, eval_globals, context)
+                    value = eval(_compile_expression(value_expr), self._get_eval_globals(), context)
                     
                     # Store in context for future use
                     context[var_name] = value
@@ -1113,28 +1177,13 @@ class TemplateParser:
         elif stripped_expr.startswith('let('):
             try:
                 # Parse let('var_name', value)
-                import re
-                match = re.match(r"let\(['\"]([^'\"]+)['\"]\s*,\s*(.+)\)", stripped_expr)
+                match = self.LET_CALL_PATTERN.match(stripped_expr)
                 if match:
                     var_name = match.group(1)
                     value_expr = match.group(2)
                     
                     # Evaluate the value
-                    safe_globals = self._get_safe_globals()
-                    safe_globals.update({
-                        'pow': pow,
-                        'sqrt': lambda x: x ** 0.5,
-                        'ceil': lambda x: int(x) + (1 if x > int(x) else 0),
-                        'floor': int,
-                        'abs': abs,
-                        'round': round,
-                        'min': min,
-                        'max': max,
-                        'sum': sum
-                    })
-                    eval_globals = {**safe_globals, **self.custom_functions}
-                    
-                    value = eval(value_expr, eval_globals, context)
+                    value = eval(_compile_expression(value_expr), self._get_eval_globals(), context)
                     
                     # Create a new context with the local variable
                     # In let expressions, the variable is available within the current evaluation scope
@@ -1144,32 +1193,13 @@ class TemplateParser:
             except Exception as e:
                 return f"[Let Error: {str(e)}]"
         
-        # Enhanced safe globals with math functions
-        safe_globals = self._get_safe_globals()
-        safe_globals.update({
-            'pow': pow,
-            'sqrt': lambda x: x ** 0.5,
-            'ceil': lambda x: int(x) + (1 if x > int(x) else 0),
-            'floor': int,
-            'abs': abs,
-            'round': round,
-            'min': min,
-            'max': max,
-            'sum': sum
-        })
-        
-        eval_globals = {**safe_globals, **self.custom_functions}
-        
         try:
-            return eval(expr, eval_globals, context)
+            return eval(_compile_expression(expr), self._get_eval_globals(), context)
         except Exception as e:
             return f"[Calculation Error: {str(e)}]"
 
     def _render_parts(self, parts: List[Union[str, None]], context: Dict[str, Any]) -> str:
         """Render a list of template parts with the given context."""
-        temp_parser = TemplateParser('', self.template_dir)
-        temp_parser.compiled = parts
-        
         # Create a copy of context for this rendering scope
         local_context = context.copy()
         
@@ -1231,8 +1261,7 @@ class TemplateParser:
             processed_parts.append(part)
             i += 1
         
-        temp_parser.compiled = processed_parts
-        return temp_parser.render(local_context)
+        return self._render_compiled(processed_parts, local_context)
 
 
 # Example usage
@@ -1622,4 +1651,4 @@ if __name__ == '__main__':
     # 清理创建的示例文件
     import shutil
     if os.path.exists('templates'):
-        shutil.rmtree('templates')
\ No newline at end of file
+        shutil.rmtree('templates')
\ No newline at end of file
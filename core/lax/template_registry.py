@@ -0,0 +1,129 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .template_parser import TemplateParser
+
+
+class CompiledTemplate:
+    """A template whose includes are resolved and whose token plan is split once."""
+
+    def __init__(self, name: str, path: str, template_dir: str, parts: Tuple[str, ...], dependencies: Dict[str, float]):
+        self.name = name
+        self.path = path
+        self.template_dir = template_dir
+        # Immutable token plan shared by every render
+        self.parts = parts
+        # Absolute file path -> mtime for the template and every file it includes
+        self.dependencies = dependencies
+
+    def is_stale(self) -> bool:
+        for path, mtime in self.dependencies.items():
+            try:
+                if os.path.getmtime(path) != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def render(self, context: Dict[str, Any]) -> str:
+        parser = TemplateParser('', template_dir=self.template_dir)
+        parser.compiled = self.parts
+        return parser.render(context)
+
+
+class TemplateRegistry:
+    """
+    Load and compile every template under a directory once, then render from memory.
+
+    With auto_reload enabled (debug mode) a template is recompiled whenever it or
+    any file it includes changes on disk.
+    """
+
+    MAX_INCLUDE_DEPTH = 16
+
+    def __init__(self, template_dir: str, auto_reload: bool = False, extensions: Tuple[str, ...] = ('.html',)):
+        self.template_dir = template_dir
+        self.auto_reload = auto_reload
+        self.extensions = extensions
+        self._templates: Dict[str, CompiledTemplate] = {}
+        self._lock = threading.Lock()
+
+    def load_all(self) -> int:
+        """Compile all templates under template_dir, returning how many were loaded."""
+        root = os.path.abspath(self.template_dir)
+        if not os.path.isdir(root):
+            return 0
+        compiled = {}
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if not filename.endswith(self.extensions):
+                    continue
+                path = os.path.join(dirpath, filename)
+                template = self._compile(path)
+                compiled[template.name] = template
+        with self._lock:
+            self._templates.update(compiled)
+        return len(compiled)
+
+    def get(self, name_or_path: str) -> CompiledTemplate:
+        """Return the compiled template for a name relative to template_dir or a file path."""
+        path = self._resolve_path(name_or_path)
+        name = self._name_for(path)
+        template = self._templates.get(name)
+        if template is None or (self.auto_reload and template.is_stale()):
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None or (self.auto_reload and template.is_stale()):
+                    template = self._compile(path)
+                    self._templates[name] = template
+        return template
+
+    def render(self, name_or_path: str, context: Dict[str, Any]) -> str:
+        return self.get(name_or_path).render(context)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+
+    def _resolve_path(self, name_or_path: str) -> str:
+        if os.path.isabs(name_or_path) or os.path.exists(name_or_path):
+            return os.path.abspath(name_or_path)
+        return os.path.abspath(os.path.join(self.template_dir, name_or_path))
+
+    def _name_for(self, path: str) -> str:
+        root = os.path.abspath(self.template_dir)
+        if path.startswith(root + os.sep):
+            return os.path.relpath(path, root).replace(os.sep, '/')
+        return path
+
+    def _compile(self, path: str) -> CompiledTemplate:
+        dependencies: Dict[str, float] = {}
+        source = self._read(path, dependencies)
+        resolved = self._resolve_includes(source, dependencies, depth=0)
+        parts = tuple(TemplateParser.TOKEN_PATTERN.split(resolved))
+        return CompiledTemplate(self._name_for(path), path, self.template_dir, parts, dependencies)
+
+    def _read(self, path: str, dependencies: Dict[str, float]) -> str:
+        # Record the mtime before reading so a concurrent edit is picked up next time
+        dependencies[path] = os.path.getmtime(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _resolve_includes(self, template: str, dependencies: Dict[str, float], depth: int) -> str:
+        def replace_include(match):
+            filename = match.group(1)
+            file_path = os.path.abspath(os.path.join(self.template_dir, filename) if self.template_dir else filename)
+            if depth >= self.MAX_INCLUDE_DEPTH:
+                return f"[Error: Include depth exceeded at '{filename}']"
+            try:
+                content = self._read(file_path, dependencies)
+            except FileNotFoundError:
+                # Track missing includes too, so creating the file triggers a reload
+                dependencies.setdefault(file_path, -1.0)
+                return f"[Error: Include file '{filename}' not found]"
+            except Exception as e:
+                return f"[Error: Failed to include '{filename}': {str(e)}]"
+            return self._resolve_includes(content, dependencies, depth + 1)
+
+        return TemplateParser.INCLUDE_PATTERN.sub(replace_include, template)
@@ -0,0 +1,81 @@
+"""
+登录失败限流
+
+失败次数记录在 login_attempts 表，所有 worker 共享：
+- 校验密码前先用条件更新占用一次尝试，并发请求合计不会超过 max_attempts；
+- 每次占用把 locked_until 顺延 lock_seconds，到期后计数从零开始；
+- 登录成功后删除记录。
+"""
+
+from datetime import datetime, timedelta
+from typing import Callable, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from core.models.login_attempt import LoginAttempt
+
+
+class LoginAttemptLimiter:
+    """按登录名限制连续失败次数；engine 为空时使用全局数据库连接"""
+
+    def __init__(self, max_attempts: int, lock_seconds: int, engine=None,
+                 clock: Callable[[], datetime] = datetime.now):
+        self.max_attempts = max(1, int(max_attempts))
+        self.lock_seconds = max(1, int(lock_seconds))
+        self._engine = engine
+        self._clock = clock
+
+    def _get_engine(self):
+        if self._engine is not None:
+            return self._engine
+        from core.db import DB
+        return DB.get_engine()
+
+    def acquire(self, username: str) -> Tuple[bool, int]:
+        """占用一次登录尝试，返回 (是否允许, 占用后的失败次数)；已锁定时不计数"""
+        table = LoginAttempt.__table__
+        now = self._clock()
+        until = now + timedelta(seconds=self.lock_seconds)
+        for _ in range(2):
+            try:
+                with self._get_engine().begin() as conn:
+                    # 计数已过期，从零开始
+                    conn.execute(
+                        update(table)
+                        .where(table.c.username == username, table.c.locked_until <= now)
+                        .values(failed_count=0, locked_until=None, updated_at=now)
+                    )
+                    claimed = conn.execute(
+                        update(table)
+                        .where(table.c.username == username, table.c.failed_count < self.max_attempts)
+                        .values(failed_count=table.c.failed_count + 1, locked_until=until, updated_at=now)
+                    ).rowcount
+                    count = conn.execute(select(table.c.failed_count).where(table.c.username == username)).scalar()
+                    if count is None:
+                        conn.execute(insert(table).values(
+                            username=username, failed_count=1, locked_until=until, updated_at=now,
+                        ))
+                        return True, 1
+                    return bool(claimed), int(count)
+            except IntegrityError:
+                # 其他 worker 同时插入了首行，重试走条件更新
+                continue
+        return False, self.max_attempts
+
+    def attempts(self, username: str) -> int:
+        """当前有效的失败次数"""
+        table = LoginAttempt.__table__
+        with self._get_engine().connect() as conn:
+            row = conn.execute(
+                select(table.c.failed_count, table.c.locked_until).where(table.c.username == username)
+            ).first()
+        if row is None or row.locked_until is None or row.locked_until <= self._clock():
+            return 0
+        return int(row.failed_count or 0)
+
+    def reset(self, username: str) -> None:
+        """清除失败记录"""
+        table = LoginAttempt.__table__
+        with self._get_engine().begin() as conn:
+            conn.execute(delete(table).where(table.c.username == username))
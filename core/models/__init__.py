@@ -19,5 +19,15 @@ from .analytics_event import AnalyticsEvent
 from .message_task_log import MessageTaskLog
 from .user_notice import UserNotice
 from .csdn_auth import CsdnAuth
+from .feed_stats import FeedStats
+from .scheduler_job import SchedulerJob
+from .scheduler_lease import SchedulerLease
+from .tenant_purge_job import TenantPurgeJob
+from .content_backlog import ContentBacklog
+from .import_job import ImportJob
+from .tag_feed import TagFeed
+from .wechat_token import WechatAccessToken
+from .login_attempt import LoginAttempt
+from .schema_meta import SchemaMeta
 # 导入基础模型
 from .base import *
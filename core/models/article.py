@@ -1,7 +1,12 @@
+from sqlalchemy import Index
 from  .base import Base,Column,String,Integer,DateTime,Text,DATA_STATUS
 class ArticleBase(Base):
     from_attributes = True
     __tablename__ = 'articles'
+    # 按公众号取有效文章并按发布时间排序（公众号/标签文章列表、标签计数）
+    __table_args__ = (
+        Index("ix_articles_feed_publish", "mp_id", "status", "publish_time"),
+    )
     id = Column(String(255), primary_key=True)
     owner_id = Column(String(50), index=True)
     mp_id = Column(String(255))
@@ -0,0 +1,25 @@
+from sqlalchemy import Index
+from .base import Base, Column, String, Integer, DateTime
+
+
+class ContentBacklog(Base):
+    """待抓取正文的文章队列：入库时正文为空则登记，抓取成功或文章删除后移除。
+
+    补抓任务按 (priority DESC, next_attempt_at) 取到期的批次，失败按指数退避推迟，
+    超过最大次数后移出队列，不再每次扫描文章表的正文列。
+    """
+    from_attributes = True
+    __tablename__ = "content_backlog"
+    __table_args__ = (
+        Index("ix_content_backlog_due", "priority", "next_attempt_at"),
+    )
+
+    article_id = Column(String(255), primary_key=True)
+    feed_id = Column(String(255), index=True)
+    owner_id = Column(String(50), index=True)
+    priority = Column(Integer, default=0)  # 越大越先抓：近期文章、被 RSS 订阅的公众号优先
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime)
+    last_error = Column(String(500), default="")
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
@@ -13,3 +13,5 @@ class Feed(Base):
     created_at = Column(DateTime) 
     updated_at = Column(DateTime)
     faker_id = Column(String(255))
+    # 有效文章数（入库/删除时增量维护，避免列表页逐个 COUNT）
+    article_count = Column(Integer, default=0)
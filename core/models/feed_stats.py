@@ -0,0 +1,22 @@
+from .base import Base, Column, Integer, String, DateTime
+
+
+class FeedStats(Base):
+    """公众号维度的反范式统计，随入库/已读/删除增量维护，可由修复任务全量重算。
+
+    有效文章数维护在 feeds.article_count 上（首页列表直接读取），此表承载其余聚合。
+    """
+    from_attributes = True
+    __tablename__ = "feed_stats"
+
+    feed_id = Column(String(255), primary_key=True)
+    owner_id = Column(String(50), index=True)
+    unread_count = Column(Integer, default=0)
+    latest_publish_time = Column(Integer, default=0)
+    latest_article_id = Column(String(255), default="")
+    last_sync_at = Column(DateTime)
+    last_sync_status = Column(Integer, default=0)
+    last_sync_message = Column(String(500), default="")
+    last_sync_count = Column(Integer, default=0)
+    last_crawl_ms = Column(Integer, default=0)
+    updated_at = Column(DateTime)
@@ -0,0 +1,22 @@
+from .base import Base, Column, String, Integer, DateTime, Text
+
+
+class ImportJob(Base):
+    """公众号/标签批量导入的后台任务：按块解析并写入，每块提交后更新进度，供前端轮询。"""
+    from_attributes = True
+    __tablename__ = "import_jobs"
+
+    id = Column(String(64), primary_key=True)
+    owner_id = Column(String(50), index=True)
+    kind = Column(String(20), default="")  # feeds/tags
+    filename = Column(String(255), default="")
+    status = Column(String(20), index=True, default="pending")  # pending/running/done/failed
+    total_rows = Column(Integer, default=0)  # 按行数估算，含引号内换行时可能偏大
+    processed_rows = Column(Integer, default=0)
+    imported = Column(Integer, default=0)
+    updated = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    finished_at = Column(DateTime)
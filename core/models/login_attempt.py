@@ -0,0 +1,16 @@
+from .base import Base, Column, String, DateTime, Integer
+
+
+class LoginAttempt(Base):
+    """登录失败计数，按登录名一行，供多个 worker 共享同一份锁定状态。
+
+    locked_until 为计数有效期：每次失败顺延到当前时间 + login_lock_seconds，过期后计数从零开始；
+    failed_count 达到上限时在此之前拒绝登录。
+    """
+    from_attributes = True
+    __tablename__ = "login_attempts"
+
+    username = Column(String(255), primary_key=True)
+    failed_count = Column(Integer, default=0, nullable=False)
+    locked_until = Column(DateTime)
+    updated_at = Column(DateTime)
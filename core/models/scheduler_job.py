@@ -0,0 +1,21 @@
+from .base import Base, Column, Integer, String, DateTime
+
+
+class SchedulerJob(Base):
+    """调度任务的持久化记录：任务定义与最近一次执行情况，供多进程共享查看。"""
+    from_attributes = True
+    __tablename__ = "scheduler_jobs"
+
+    job_id = Column(String(255), primary_key=True)
+    tag = Column(String(100), default="")
+    cron_exp = Column(String(100), default="")
+    jitter = Column(Integer, default=0)
+    next_run_at = Column(DateTime)
+    last_run_at = Column(DateTime)
+    last_duration_ms = Column(Integer, default=0)
+    last_status = Column(Integer, default=0)
+    last_error = Column(String(500), default="")
+    last_holder = Column(String(255), default="")
+    run_count = Column(Integer, default=0)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
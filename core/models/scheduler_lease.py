@@ -0,0 +1,16 @@
+from .base import Base, Column, Integer, String, DateTime
+
+
+class SchedulerLease(Base):
+    """调度器领导者租约：同一 name 同一时刻只有一个持有者负责触发定时任务。
+
+    generation 在非领导进程修改任务后递增，领导者据此重新对齐任务。
+    """
+    from_attributes = True
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(100), primary_key=True)
+    holder = Column(String(255), default="")
+    expires_at = Column(DateTime)
+    generation = Column(Integer, default=0)
+    updated_at = Column(DateTime)
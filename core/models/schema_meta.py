@@ -0,0 +1,11 @@
+from .base import Base, Column, Integer, String, DateTime
+
+
+class SchemaMeta(Base):
+    """记录已应用的在线结构补丁版本，版本一致时启动不再逐表检查结构。"""
+    from_attributes = True
+    __tablename__ = "schema_meta"
+
+    name = Column(String(100), primary_key=True)
+    version = Column(Integer, default=0)
+    updated_at = Column(DateTime)
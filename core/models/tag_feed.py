@@ -0,0 +1,15 @@
+from sqlalchemy import Index
+from .base import Base, Column, String
+
+
+class TagFeed(Base):
+    """标签与公众号的关联（由 tags.mps_id 同步维护），标签页、标签 RSS 与计数按此表关联查询。"""
+    from_attributes = True
+    __tablename__ = "tag_feeds"
+    __table_args__ = (
+        Index("ix_tag_feeds_feed", "feed_id", "tag_id"),
+    )
+
+    tag_id = Column(String(255), primary_key=True)
+    feed_id = Column(String(255), primary_key=True)
+    owner_id = Column(String(50), index=True)
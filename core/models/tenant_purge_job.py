@@ -0,0 +1,19 @@
+from .base import Base, Column, String, DateTime, Text
+
+
+class TenantPurgeJob(Base):
+    """删除用户时的后台清理任务：按表分批删除关联数据，进度随每批提交，进程重启后可续跑。"""
+    from_attributes = True
+    __tablename__ = "tenant_purge_jobs"
+
+    id = Column(String(64), primary_key=True)
+    username = Column(String(50), index=True, nullable=False)
+    requested_by = Column(String(50), default="")
+    status = Column(String(20), index=True, default="pending")  # pending/running/done/failed
+    step = Column(String(64), default="")  # 正在清理的数据类别
+    deleted_json = Column(Text)  # 各类别已删除行数
+    error = Column(Text)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)  # 运行中每批更新，长时间未更新视为中断
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
@@ -15,6 +15,7 @@ class User(Base):
     monthly_image_quota = Column(Integer, default=5)
     monthly_image_used = Column(Integer, default=0)
     quota_reset_at = Column(DateTime, nullable=True)
+    auth_version = Column(Integer, default=0)  # 密码、角色、套餐等变更时递增，各进程据此失效用户缓存
     nickname = Column(String(50), default='')  # 昵称
     avatar = Column(String(255), default='/static/default-avatar.png')  # 头像
     email = Column(String(50), default='')
@@ -37,3 +38,7 @@ class User(Base):
         """验证密码"""
         from core.auth import pwd_context
         return pwd_context.verify(password, self.password_hash)
+
+    def bump_auth_version(self) -> None:
+        """标记认证相关信息已变更（随本次提交写库），所有进程的用户缓存随之失效"""
+        self.auth_version = int(self.auth_version or 0) + 1
@@ -0,0 +1,18 @@
+from .base import Base, Column, String, DateTime, Text
+
+
+class WechatAccessToken(Base):
+    """微信公众号 OpenAPI access_token 的跨进程共享缓存，按 app_id 一行。
+
+    refreshing_until 为刷新租约：持有租约的进程负责调用 cgi-bin/token，其他进程等待或沿用未过期的旧 token。
+    """
+    from_attributes = True
+    __tablename__ = "wechat_access_tokens"
+
+    app_id = Column(String(64), primary_key=True)
+    secret_hash = Column(String(64), default="")
+    access_token = Column(Text)
+    expires_at = Column(DateTime)
+    refreshing_until = Column(DateTime)
+    refresh_holder = Column(String(255), default="")
+    updated_at = Column(DateTime)
@@ -1,38 +1,55 @@
-from .wechat import send_wechat_message
-from .dingtalk import send_dingtalk_message
-from .feishu import send_feishu_message
-from .custom import send_custom_message
+from .wechat import send_wechat_message, build_wechat_payload
+from .dingtalk import send_dingtalk_message, build_dingtalk_payload
+from .feishu import send_feishu_message, build_feishu_payload
+from .custom import send_custom_message, build_custom_payload
 
-def notice( webhook_url, title, text,notice_type: str=None):
+
+def detect_notice_type(webhook_url) -> str:
+    """根据 Webhook 地址判断通知类型：wechat / dingtalk / feishu / custom"""
+    webhook_url = str(webhook_url or "")
+    if 'qyapi.weixin.qq.com' in webhook_url:
+        return 'wechat'
+    if 'oapi.dingtalk.com' in webhook_url:
+        return 'dingtalk'
+    # 兼容企业本地化部署的飞书，如open.feishu.xxxx.com
+    if 'open.feishu.' in webhook_url:
+        return 'feishu'
+    return 'custom'
+
+
+def build_notice_payload(webhook_url, title, text) -> dict:
+    """按通知类型构造请求体"""
+    notice_type = detect_notice_type(webhook_url)
+    if notice_type == 'wechat':
+        return build_wechat_payload(title, text)
+    if notice_type == 'dingtalk':
+        return build_dingtalk_payload(title, text)
+    if notice_type == 'feishu':
+        return build_feishu_payload(title, text)
+    return build_custom_payload(title, text)
+
+
+def notice( webhook_url, title, text,notice_type: str=None, **context):
     """
-    公用通知方法，根据类型判断调用哪种通知
-    
+    公用通知方法，根据 Webhook 地址判断类型，交给发送队列异步投递
+
     参数:
-    - notice_type: 通知类型，'wechat' 或 'dingtalk'
     - webhook_url: 对应机器人的Webhook地址
     - title: 消息标题
     - text: 消息内容
+    - context: 投递记录上下文（task_id / owner_id / mps_id / article_count / coalesce）
+
+    返回:
+    - bool: 是否已进入发送队列（队列满或地址为空时为 False）
     """
-    if  len(str(webhook_url)) == 0:
+    if  len(str(webhook_url or "")) == 0:
         print('未提供webhook_url')
-        return
-    if 'qyapi.weixin.qq.com' in webhook_url:
-        notice_type = 'wechat'
-    elif 'oapi.dingtalk.com' in webhook_url:
-        notice_type = 'dingtalk'
-    # 兼容企业本地化部署的飞书，如open.feishu.xxxx.com
-    elif 'open.feishu.' in webhook_url:  
-        notice_type = 'feishu'
-    else:
-        notice_type = 'custom'
-    
-    if notice_type == 'wechat':
-        send_wechat_message(webhook_url, title, text)
-    elif notice_type == 'dingtalk':
-        send_dingtalk_message(webhook_url, title, text)
-    elif notice_type == 'feishu':
-        send_feishu_message(webhook_url, title, text)
-    elif notice_type == 'custom':
-        send_custom_message(webhook_url, title, text)
-    else:
-        print('不支持的通知类型')
\ No newline at end of file
+        return False
+    from .dispatcher import Delivery, get_dispatcher
+    return get_dispatcher().submit(Delivery(
+        url=str(webhook_url),
+        kind="notice",
+        title=title,
+        text=text,
+        **context,
+    ))
@@ -2,6 +2,13 @@ import requests
 import json
 
 
+def build_custom_payload(title, text):
+    return {
+        "title": title,
+        "content": text
+    }
+
+
 def send_custom_message(webhook_url, title, text):
     """
     发送微信消息
@@ -12,15 +19,13 @@ def send_custom_message(webhook_url, title, text):
     - text: 消息内容
     """
     headers = {'Content-Type': 'application/json'}
-    data = {
-        "title": title,
-        "content": text
-    }
+    data = build_custom_payload(title, text)
     try:
         response = requests.post(
             url=webhook_url,
             headers=headers,
-            data=json.dumps(data)
+            data=json.dumps(data),
+            timeout=10
         )
         print(response.text)
     except Exception as e:
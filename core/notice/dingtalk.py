@@ -1,5 +1,21 @@
 import requests
 import json
+
+
+def build_dingtalk_payload(title, text, is_at_all=False, at_mobiles=None):
+    return {
+        "msgtype": "markdown",
+        "markdown": {
+            "title": title,
+            "text": text
+        },
+        "at": {
+            "atMobiles": list(at_mobiles or []),
+            "isAtAll": is_at_all
+        }
+    }
+
+
 def send_dingtalk_message(webhook_url, title, text, is_at_all=False, at_mobiles=[]):
     """
     发送Markdown格式消息
@@ -12,22 +28,13 @@ def send_dingtalk_message(webhook_url, title, text, is_at_all=False, at_mobiles=
     - at_mobiles: 要@的手机号列表
     """
     headers = {'Content-Type': 'application/json'}
-    data = {
-        "msgtype": "markdown",
-        "markdown": {
-            "title": title,
-            "text": text
-        },
-        "at": {
-            "atMobiles": at_mobiles,
-            "isAtAll": is_at_all
-        }
-    }
+    data = build_dingtalk_payload(title, text, is_at_all, at_mobiles)
     try:
         response = requests.post(
             url=webhook_url,
             headers=headers,
-            data=json.dumps(data)
+            data=json.dumps(data),
+            timeout=10
         )
         print(response.text)
     except Exception as e:
@@ -0,0 +1,470 @@
+import heapq
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.config import cfg
+from core.events import log_event, E
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+@dataclass
+class Delivery:
+    """一次待投递的机器人通知或 Webhook 请求"""
+    url: str
+    kind: str = "notice"        # notice：按机器人类型构造请求体；webhook：原样 POST payload
+    title: str = ""
+    text: str = ""
+    payload: str = ""
+    task_id: str = ""
+    owner_id: str = ""
+    mps_id: str = ""
+    article_count: int = 0
+    coalesce: bool = False      # 是否允许与同一任务、同一地址的其他投递合并发送
+    attempts: int = 0
+    parts: int = 1              # 合并后包含的原始投递数
+
+    def coalesce_key(self) -> Tuple[str, str, str]:
+        return (self.kind, self.url, self.task_id)
+
+
+def short_url(url: str) -> str:
+    """去掉查询参数（常含 access_token）后用于日志与投递记录"""
+    try:
+        parts = urlsplit(str(url or ""))
+        return f"{parts.scheme}://{parts.netloc}{parts.path}"[:120]
+    except Exception:
+        return str(url or "")[:40]
+
+
+class CircuitBreaker:
+    """
+    单个地址的熔断器
+
+    连续失败达到阈值后熔断 reset_seconds，期间不再发起请求；
+    到期后进入半开状态，只放行一次试探请求，成功则恢复，失败则重新熔断。
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 60.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_seconds = max(0.0, float(reset_seconds))
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return STATE_CLOSED
+        if now - self._opened_at >= self.reset_seconds:
+            return STATE_HALF_OPEN
+        return STATE_OPEN
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        """距离进入半开状态的剩余秒数"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_seconds - time.monotonic())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> bool:
+        """记录一次失败，返回本次是否（重新）触发熔断"""
+        with self._lock:
+            self.failures += 1
+            was_trial = self._trial
+            self._trial = False
+            if was_trial or (self._opened_at is None and self.failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+
+def merge_deliveries(deliveries: List[Delivery]) -> List[Delivery]:
+    """
+    把同一任务发往同一地址的多条投递合并为一条
+
+    notice 按段落拼接正文；webhook 要求每条 payload 都是合法 JSON，合并为 JSON 数组，
+    否则保持逐条发送。
+    """
+    if len(deliveries) <= 1:
+        return list(deliveries)
+    first = deliveries[0]
+    if first.kind == "webhook":
+        try:
+            body = json.dumps([json.loads(d.payload) for d in deliveries], ensure_ascii=False)
+        except (TypeError, ValueError):
+            return list(deliveries)
+        text = ""
+    else:
+        body = ""
+        text = "\n\n".join(d.text for d in deliveries if d.text)
+    mps_ids = []
+    for d in deliveries:
+        for mps_id in str(d.mps_id or "").split(","):
+            if mps_id and mps_id not in mps_ids:
+                mps_ids.append(mps_id)
+    return [Delivery(
+        url=first.url,
+        kind=first.kind,
+        title=first.title,
+        text=text,
+        payload=body,
+        task_id=first.task_id,
+        owner_id=first.owner_id,
+        mps_id=",".join(mps_ids),
+        article_count=sum(int(d.article_count or 0) for d in deliveries),
+        coalesce=True,
+        parts=sum(d.parts for d in deliveries),
+    )]
+
+
+def record_delivery(delivery: Delivery, ok: bool, detail: str) -> None:
+    """把投递结果写入任务执行日志（message_tasks_logs），无任务上下文的系统通知只记事件日志"""
+    if not delivery.task_id:
+        return
+    from core.db import DB
+    from core.models.message_task_log import MessageTaskLog
+
+    kind = "消息通知" if delivery.kind == "notice" else "Webhook"
+    lines = [
+        f"{kind}投递{'成功' if ok else '失败'}",
+        f"地址: {short_url(delivery.url)}",
+        f"尝试次数: {delivery.attempts}",
+    ]
+    if delivery.parts > 1:
+        lines.append(f"合并投递: {delivery.parts} 条")
+    if detail:
+        lines.append(f"结果: {detail}")
+    now = datetime.now()
+    session = DB.get_session()
+    try:
+        session.add(MessageTaskLog(
+            id=str(uuid.uuid4()),
+            owner_id=delivery.owner_id,
+            task_id=delivery.task_id,
+            mps_id=delivery.mps_id,
+            update_count=max(0, int(delivery.article_count or 0)),
+            status=1 if ok else 2,
+            log="\n".join(lines)[:12000],
+            created_at=now,
+            updated_at=now,
+        ))
+        session.commit()
+    except Exception as e:
+        try:
+            session.rollback()
+        except Exception:
+            pass
+        logger.warning("写入投递记录失败: %s", e)
+    finally:
+        try:
+            session.close()
+        except Exception:
+            pass
+
+
+class NoticeDispatcher:
+    """
+    通知 / Webhook 异步投递器
+
+    - 调用方只负责入队（有界队列，满了直接丢弃并记录），抓取线程从不等待网络；
+    - 固定数量的发送线程共享一个 requests.Session，按 host 复用 keep-alive 连接；
+    - 可重试的失败（网络异常、429、5xx）按指数退避加随机抖动重试；
+    - 每个地址一个熔断器，持续失败的接收方不会拖慢其他地址；
+    - 开启合并窗口后，同一任务发往同一地址的文章通知会合并为一次请求。
+    """
+
+    def __init__(self, http: Optional[requests.Session] = None,
+                 recorder: Optional[Callable[[Delivery, bool, str], None]] = None):
+        self.enabled = bool(cfg.get("notice_dispatch.enabled", True))
+        self.workers = max(1, int(cfg.get("notice_dispatch.workers", 4) or 4))
+        self.queue_size = max(1, int(cfg.get("notice_dispatch.queue_size", 1000) or 1000))
+        self.connect_timeout = float(cfg.get("notice_dispatch.connect_timeout", 5) or 5)
+        self.read_timeout = float(cfg.get("notice_dispatch.read_timeout", 10) or 10)
+        self.max_attempts = max(1, int(cfg.get("notice_dispatch.max_attempts", 4) or 4))
+        self.backoff_base = float(cfg.get("notice_dispatch.backoff_base_seconds", 2) or 2)
+        self.backoff_max = float(cfg.get("notice_dispatch.backoff_max_seconds", 60) or 60)
+        self.breaker_threshold = int(cfg.get("notice_dispatch.breaker_failure_threshold", 5) or 5)
+        self.breaker_reset = float(cfg.get("notice_dispatch.breaker_reset_seconds", 60) or 60)
+        self.coalesce_window = float(cfg.get("notice_dispatch.coalesce_window_seconds", 0) or 0)
+        self.coalesce_max_items = max(1, int(cfg.get("notice_dispatch.coalesce_max_items", 20) or 20))
+        self.http = http or self._build_session()
+        self.recorder = recorder or record_delivery
+        self._queue: "queue.Queue[Delivery]" = queue.Queue(maxsize=self.queue_size)
+        self._timers: List[tuple] = []  # (到期时间, 序号, 动作, 参数) 小顶堆：重试与合并窗口
+        self._seq = itertools.count()
+        self._buckets: Dict[Tuple[str, str, str], List[Delivery]] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._cond = threading.Condition(threading.RLock())
+        self._outstanding = 0
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        # urllib3 按 host 维护连接池；每个 host 的连接数与发送线程数一致
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=self.workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                self._threads.append(threading.Thread(target=self._worker_loop, name=f"notice-dispatch-{i}", daemon=True))
+            self._threads.append(threading.Thread(target=self._timer_loop, name="notice-dispatch-timer", daemon=True))
+            for t in self._threads:
+                t.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stop.set()
+            with self._cond:
+                self._cond.notify_all()
+            self._threads = []
+
+    def submit(self, delivery: Delivery) -> bool:
+        """提交投递并立即返回，返回是否已被接收（队列满时丢弃并记录失败）"""
+        with self._cond:
+            self._outstanding += delivery.parts
+        if not self.enabled:
+            # 关闭异步投递时在调用线程内直接发送一次（旧行为），仍带超时
+            delivery.attempts += 1
+            ok, _, detail = self._send(delivery)
+            self._finish(delivery, ok, detail)
+            return ok
+        self.start()
+        if delivery.coalesce and self.coalesce_window > 0:
+            self._add_to_bucket(delivery)
+            return True
+        return self._enqueue(delivery)
+
+    def wait_idle(self, timeout: float = 10.0) -> bool:
+        """等待已提交的投递全部结束（成功或最终失败），主要用于测试与优雅退出"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._outstanding > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, 0.1))
+        return True
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(url)
+            if breaker is None:
+                breaker = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+                self._breakers[url] = breaker
+            return breaker
+
+    def backoff_delay(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(0, attempt - 1)))
+        # 半随机抖动：避免大量失败的投递在同一时刻重试
+        return random.uniform(delay / 2, delay)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queued": self._queue.qsize(),
+                "outstanding": self._outstanding,
+                "scheduled": len(self._timers),
+                "open_circuits": [short_url(url) for url, b in self._breakers.items() if b.state != STATE_CLOSED],
+            }
+
+    def _enqueue(self, delivery: Delivery) -> bool:
+        try:
+            self._queue.put_nowait(delivery)
+            return True
+        except queue.Full:
+            log_event(logger, E.WEBHOOK_SEND_DROP, level="warning", url=short_url(delivery.url), reason="queue full")
+            self._finish(delivery, False, "发送队列已满，已丢弃")
+            return False
+
+    def _schedule(self, delay: float, action: str, arg) -> None:
+        with self._cond:
+            heapq.heappush(self._timers, (time.monotonic() + max(0.0, delay), next(self._seq), action, arg))
+            self._cond.notify_all()
+
+    def _add_to_bucket(self, delivery: Delivery) -> None:
+        key = delivery.coalesce_key()
+        with self._cond:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = [delivery]
+                self._schedule(self.coalesce_window, "flush", key)
+                return
+            bucket.append(delivery)
+            full = len(bucket) >= self.coalesce_max_items
+        if full:
+            self._flush(key)
+
+    def _flush(self, key) -> None:
+        with self._cond:
+            bucket = self._buckets.pop(key, None)
+        if not bucket:
+            return
+        for delivery in merge_deliveries(bucket):
+            self._enqueue(delivery)
+
+    def _timer_loop(self) -> None:
+        while not self._stop.is_set():
+            with self._cond:
+                if not self._timers:
+                    self._cond.wait(1.0)
+                    continue
+                due, _, action, arg = self._timers[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(min(wait, 1.0))
+                    continue
+                heapq.heappop(self._timers)
+            if action == "flush":
+                self._flush(arg)
+            else:
+                self._enqueue(arg)
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                delivery = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                self._process(delivery)
+            except Exception as e:
+                logger.exception("通知投递异常")
+                self._finish(delivery, False, str(e)[:200])
+            finally:
+                self._queue.task_done()
+
+    def _process(self, delivery: Delivery) -> None:
+        breaker = self.breaker(delivery.url)
+        if not breaker.allow():
+            self._defer(delivery, breaker)
+            return
+        delivery.attempts += 1
+        ok, retryable, detail = self._send(delivery)
+        if ok:
+            breaker.record_success()
+            self._finish(delivery, True, detail)
+        elif retryable:
+            if breaker.record_failure():
+                log_event(logger, E.WEBHOOK_CIRCUIT_OPEN, level="warning", url=short_url(delivery.url),
+                          failures=breaker.failures, reset=f"{self.breaker_reset:.0f}s")
+            self._retry_or_fail(delivery, detail, breaker.retry_after())
+        else:
+            # 接收方有响应（4xx），说明地址可达，只是请求本身不被接受，重试无意义
+            breaker.record_success()
+            self._finish(delivery, False, detail)
+
+    def _defer(self, delivery: Delivery, breaker: CircuitBreaker) -> None:
+        """熔断中或半开试探未结束时暂缓投递：没有发出请求，不计入尝试次数，至少等一个熔断周期再排队"""
+        delay = max(breaker.retry_after(), breaker.reset_seconds)
+        log_event(logger, E.WEBHOOK_SEND_RETRY, level="warning", url=short_url(delivery.url),
+                  attempt=delivery.attempts, delay=f"{delay:.1f}s", reason="接收方熔断中，暂停投递")
+        self._schedule(delay, "retry", delivery)
+
+    def _retry_or_fail(self, delivery: Delivery, detail: str, min_delay: float = 0.0) -> None:
+        if delivery.attempts >= self.max_attempts:
+            self._finish(delivery, False, detail)
+            return
+        delay = max(self.backoff_delay(delivery.attempts), min_delay)
+        log_event(logger, E.WEBHOOK_SEND_RETRY, level="warning", url=short_url(delivery.url),
+                  attempt=delivery.attempts, delay=f"{delay:.1f}s", reason=detail[:200])
+        self._schedule(delay, "retry", delivery)
+
+    def _body(self, delivery: Delivery) -> bytes:
+        if delivery.kind == "webhook":
+            return str(delivery.payload or "").encode("utf-8")
+        from core.notice import build_notice_payload
+        return json.dumps(build_notice_payload(delivery.url, delivery.title, delivery.text)).encode("utf-8")
+
+    def _send(self, delivery: Delivery) -> Tuple[bool, bool, str]:
+        """发送一次，返回 (是否成功, 是否可重试, 结果描述)"""
+        try:
+            response = self.http.post(
+                delivery.url,
+                data=self._body(delivery),
+                headers={"Content-Type": "application/json; charset=utf-8"},
+                timeout=(self.connect_timeout, self.read_timeout),
+            )
+        except requests.RequestException as e:
+            return False, True, f"{type(e).__name__}: {str(e)[:200]}"
+        status = int(response.status_code)
+        detail = f"HTTP {status} {str(response.text or '')[:200]}".strip()
+        if status < 300:
+            return True, False, detail
+        return False, status == 429 or status >= 500, detail
+
+    def _finish(self, delivery: Delivery, ok: bool, detail: str) -> None:
+        if ok:
+            log_event(logger, E.WEBHOOK_SEND_COMPLETE, url=short_url(delivery.url), attempts=delivery.attempts,
+                      parts=delivery.parts)
+        else:
+            log_event(logger, E.WEBHOOK_SEND_FAIL, level="warning", url=short_url(delivery.url),
+                      attempts=delivery.attempts, reason=str(detail)[:200])
+        try:
+            self.recorder(delivery, ok, detail)
+        except Exception as e:
+            logger.warning("记录投递结果失败: %s", e)
+        finally:
+            with self._cond:
+                self._outstanding -= delivery.parts
+                self._cond.notify_all()
+
+
+_dispatcher: Optional[NoticeDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> NoticeDispatcher:
+    """返回进程内共享的投递器（首次调用时创建，发送线程在首次提交时启动）"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = NoticeDispatcher()
+    return _dispatcher
@@ -1,17 +1,8 @@
 import requests
 import json
 
-def send_feishu_message(webhook_url, title, text):
-    """
-    发送飞书 Markdown 格式消息
-    
-    参数:
-    - webhook_url: 飞书机器人 Webhook 地址
-    - title: 消息标题
-    - text: Markdown 格式内容
-    """
-    headers = {'Content-Type': 'application/json'}
-    data = {
+def build_feishu_payload(title, text):
+    return {
         "msg_type": "interactive",
         "card": {
             "config": {
@@ -36,11 +27,25 @@ def send_feishu_message(webhook_url, title, text):
             }
         }
     }
+
+
+def send_feishu_message(webhook_url, title, text):
+    """
+    发送飞书 Markdown 格式消息
+    
+    参数:
+    - webhook_url: 飞书机器人 Webhook 地址
+    - title: 消息标题
+    - text: Markdown 格式内容
+    """
+    headers = {'Content-Type': 'application/json'}
+    data = build_feishu_payload(title, text)
     try:
         response = requests.post(
             url=webhook_url,
             headers=headers,
-            data=json.dumps(data)
+            data=json.dumps(data),
+            timeout=10
         )
         print(response.text)
     except Exception as e:
@@ -2,6 +2,17 @@ import requests
 import json
 
 
+def build_wechat_payload(title, text):
+    # 截取 text 确保字符数不超过 4096 个
+    text = text[:2048]
+    return {
+        "msgtype": "markdown",
+        "markdown": {
+            "content": f"{text}"
+        }
+    }
+
+
 def send_wechat_message(webhook_url, title, text):
     """
     发送微信消息
@@ -11,20 +22,14 @@ def send_wechat_message(webhook_url, title, text):
     - title: 消息标题
     - text: 消息内容
     """
-    # 截取 text 确保字符数不超过 4096 个
-    text = text[:2048]
     headers = {'Content-Type': 'application/json'}
-    data = {
-        "msgtype": "markdown",
-        "markdown": {
-            "content": f"{text}"
-        }
-    }
+    data = build_wechat_payload(title, text)
     try:
         response = requests.post(
             url=webhook_url,
             headers=headers,
-            data=json.dumps(data)
+            data=json.dumps(data),
+            timeout=10
         )
         print(response.text)
     except Exception as e:
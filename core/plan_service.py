@@ -98,17 +98,26 @@ def ensure_user_plan_defaults(user, preferred_tier: str = DEFAULT_PLAN_TIER) ->
     return plan
 
 
+def _bump_auth_version(user) -> None:
+    # 配额信息随登录用户缓存下发，变更后需要让各进程的缓存失效
+    bump = getattr(user, "bump_auth_version", None)
+    if callable(bump):
+        bump()
+
+
 def maybe_reset_monthly_usage(user, now: datetime = None) -> bool:
     now = now or datetime.now()
     reset_at = getattr(user, "quota_reset_at", None)
     if not reset_at:
         user.quota_reset_at = now
+        _bump_auth_version(user)
         return True
     if reset_at.year == now.year and reset_at.month == now.month:
         return False
     user.monthly_ai_used = 0
     user.monthly_image_used = 0
     user.quota_reset_at = now
+    _bump_auth_version(user)
     return True
 
 
@@ -203,6 +212,7 @@ def consume_ai_usage(user, image_count: int = 0):
     user.monthly_ai_used = _int_value(getattr(user, "monthly_ai_used", 0), 0) + 1
     user.monthly_image_used = _int_value(getattr(user, "monthly_image_used", 0), 0) + max(0, int(image_count or 0))
     user.updated_at = datetime.now()
+    _bump_auth_version(user)
 
 
 def get_plan_catalog():
@@ -1,126 +1,307 @@
-import queue
 import threading
 import time
 import gc
-from typing import Callable, Any, Optional
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Any, Dict, Optional
+from core.config import cfg
 from core.log import get_logger
+from core.tracing import SpanContext, current_span_context, start_span
 
 logger = get_logger(__name__)
 
+# 优先级车道：按顺序服务，前面的车道有可执行任务时后面的车道等待
+LANE_INTERACTIVE = "interactive"   # 用户手动触发（立即运行、首次添加公众号）
+LANE_SCHEDULED = "scheduled"       # 定时任务
+LANE_BACKFILL = "backfill"         # 补抓、回填等可延后的任务
+LANES = (LANE_INTERACTIVE, LANE_SCHEDULED, LANE_BACKFILL)
+
+_current = threading.local()
+
+
+def current_task_owner() -> Optional[str]:
+    """当前线程正在执行的队列任务所属用户；不在队列任务中时返回 None"""
+    return getattr(_current, "owner_id", None)
+
+
+@dataclass
+class _QueuedTask:
+    task: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    owner_id: str
+    lane: str
+    enqueued_at: float
+    trace_parent: Optional[SpanContext] = None  # 入队时的 span，执行线程据此接上父子关系
+
+
+@dataclass
+class _Lane:
+    name: str
+    owners: "OrderedDict[str, deque]" = field(default_factory=OrderedDict)
+    deficits: Dict[str, float] = field(default_factory=dict)
+    pending: int = 0
+    dispatched: int = 0
+    waits: deque = field(default_factory=lambda: deque(maxlen=500))  # 最近出队任务的等待时长
+
+
 class TaskQueueManager:
-    """任务队列管理器，用于管理和执行排队任务"""
-    
-    def __init__(self,maxsize=0,tag:str=""):
+    """
+    任务队列管理器，用于管理和执行排队任务
+
+    - 每个车道内按用户（owner_id）拆分子队列，用差额轮询（DRR）在用户之间公平出队，
+      权重为 w 的用户每轮最多连续出队 w 个任务，任务多的用户不会饿死其他用户；
+    - 车道按 interactive > scheduled > backfill 的优先级服务，手动触发的任务不再排在整个积压之后；
+    - 同一用户同时执行的任务数不超过 per_owner_limit（0 表示不限制），达到上限的用户本轮跳过；
+    - get_queue_info 返回各车道积压、最久等待时间与最近出队的等待时长统计。
+    """
+
+    def __init__(self, maxsize=0, tag: str = "", workers: int = 1, per_owner_limit: Optional[int] = None,
+                 weights: Optional[Dict[str, int]] = None, clock: Callable[[], float] = time.monotonic):
         """初始化任务队列"""
-        self._queue = queue.Queue(maxsize=maxsize)
-        self._lock = threading.Lock()
-        self._is_running = False
+        self.maxsize = max(0, int(maxsize or 0))
         self.tag = tag or "默认"
-        
+        self.workers = max(1, int(workers or 1))
+        self.per_owner_limit = max(0, int(per_owner_limit if per_owner_limit is not None
+                                          else cfg.get("queue.per_owner_concurrency", 1) or 0))
+        self._weights: Dict[str, int] = {str(k): max(1, int(v)) for k, v in dict(weights or {}).items()}
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._lanes: Dict[str, _Lane] = {name: _Lane(name) for name in LANES}
+        self._running: Dict[str, int] = {}
+        self._is_running = False
+
     def add_task(self, task: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
-        """添加任务到队列
-        
+        """添加任务到队列（公共用户、定时车道）
+
         Args:
             task: 要执行的任务函数
             *args: 任务函数的参数
             **kwargs: 任务函数的关键字参数
         """
-        with self._lock:
-            self._queue.put((task, args, kwargs))
-        logger.info("[%s] 队列任务添加成功", self.tag)
+        self.submit(task, args, kwargs)
+
+    def submit(self, task: Callable[..., Any], args: tuple = (), kwargs: Optional[dict] = None,
+               owner_id: str = "", lane: str = LANE_SCHEDULED) -> None:
+        """按用户与车道添加任务；队列设置了 maxsize 且已满时阻塞等待"""
+        if lane not in self._lanes:
+            raise ValueError(f"unknown queue lane: {lane}")
+        item = _QueuedTask(task, tuple(args), dict(kwargs or {}), str(owner_id or ""), lane, self._clock(),
+                           current_span_context())
+        with self._cond:
+            while self.maxsize and self._pending() >= self.maxsize:
+                self._cond.wait()
+            target = self._lanes[lane]
+            target.owners.setdefault(item.owner_id, deque()).append(item)
+            target.pending += 1
+            self._cond.notify_all()
+        logger.info("[%s] 队列任务添加成功 owner=%s lane=%s", self.tag, item.owner_id or "-", lane)
+
+    def set_weight(self, owner_id: str, weight: int) -> None:
+        """设置用户的出队权重（默认 1）"""
+        with self._cond:
+            self._weights[str(owner_id or "")] = max(1, int(weight))
 
-    def run_task_background(self)->None:
-        threading.Thread(target=self.run_tasks, daemon=True).start()  
+    def run_task_background(self) -> None:
+        threading.Thread(target=self.run_tasks, daemon=True).start()
         logger.info("[%s] 队列任务开始后台运行", self.tag)
 
     def run_tasks(self, timeout: float = 1.0) -> None:
-        """执行队列中的所有任务，并持续运行以接收新任务
-        
+        """启动 workers 个执行线程并持续运行以接收新任务，直到 stop
+
         Args:
             timeout: 等待新任务的超时时间(秒)
         """
-        with self._lock:
+        with self._cond:
             if self._is_running:
                 return
             self._is_running = True
-            
+        threads = [threading.Thread(target=self._worker, args=(timeout,), daemon=True,
+                                    name=f"queue-{self.tag}-{i}") for i in range(self.workers)]
         try:
-            while self._is_running:
-                time.sleep(0.1)  # 避免过于频繁的任务获取 
-                try:
-                    # 阻塞获取任务，避免CPU空转
-                    task, args, kwargs = self._queue.get(timeout=timeout)
-                    
-                    try:
-                        # 记录任务开始时间
-                        start_time = time.time()
-                        task(*args, **kwargs)
-                        # 记录任务执行时间
-                        duration = time.time() - start_time
-                        logger.info("[%s] 任务执行完成，耗时: %.2f秒", self.tag, duration)
-                    except Exception as e:
-                        logger.error("[%s] 队列任务执行失败: %s", self.tag, e)
-                        # raise
-                    finally:
-                        # 确保任务完成标记和资源释放
-                        self._queue.task_done()
-                        # 强制垃圾回收
-                        gc.collect()
-                    
-                except queue.Empty:
-                    # 超时无任务，继续检查运行状态
-                    continue
-                    
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
         finally:
-            # 确保停止状态设置和资源清理
-            with self._lock:
+            with self._cond:
                 self._is_running = False
             # 清理可能残留的资源
             gc.collect()
-    
+
+    def _worker(self, timeout: float) -> None:
+        while True:
+            with self._cond:
+                item = None
+                while self._is_running:
+                    item = self._next_locked()
+                    if item is not None:
+                        break
+                    self._cond.wait(timeout)
+                if item is None:
+                    return
+                self._running[item.owner_id] = self._running.get(item.owner_id, 0) + 1
+                lane = self._lanes[item.lane]
+                lane.dispatched += 1
+                waited = self._clock() - item.enqueued_at
+                lane.waits.append(waited)
+                self._cond.notify_all()
+            _current.owner_id = item.owner_id
+            try:
+                # 记录任务开始时间
+                start_time = time.time()
+                with start_span("queue.task", parent=item.trace_parent, kind="consumer", attributes={
+                    "queue.name": self.tag,
+                    "queue.lane": item.lane,
+                    "queue.owner_id": item.owner_id,
+                    "queue.wait_ms": int(waited * 1000),
+                    "task": getattr(item.task, "__name__", ""),
+                }):
+                    item.task(*item.args, **item.kwargs)
+                # 记录任务执行时间
+                duration = time.time() - start_time
+                logger.info("[%s] 任务执行完成，耗时: %.2f秒", self.tag, duration)
+            except Exception as e:
+                logger.error("[%s] 队列任务执行失败: %s", self.tag, e)
+            finally:
+                _current.owner_id = None
+                with self._cond:
+                    left = self._running.get(item.owner_id, 1) - 1
+                    if left > 0:
+                        self._running[item.owner_id] = left
+                    else:
+                        self._running.pop(item.owner_id, None)
+                    self._cond.notify_all()
+                # 强制垃圾回收
+                gc.collect()
+
+    def _next_locked(self) -> Optional[_QueuedTask]:
+        for lane in self._lanes.values():
+            if lane.pending:
+                item = self._pick(lane)
+                if item is not None:
+                    return item
+        return None
+
+    def _pick(self, lane: _Lane) -> Optional[_QueuedTask]:
+        """差额轮询：轮到的用户补充 weight 的额度，每出队一个任务消耗 1，额度用完移到队尾"""
+        for _ in range(len(lane.owners)):
+            owner_id, tasks = next(iter(lane.owners.items()))
+            if self.per_owner_limit and self._running.get(owner_id, 0) >= self.per_owner_limit:
+                lane.deficits[owner_id] = 0
+                lane.owners.move_to_end(owner_id)
+                continue
+            deficit = lane.deficits.get(owner_id, 0)
+            if deficit < 1:
+                deficit += self._weights.get(owner_id, 1)
+            item = tasks.popleft()
+            lane.pending -= 1
+            deficit -= 1
+            if not tasks:
+                del lane.owners[owner_id]
+                lane.deficits.pop(owner_id, None)
+            elif deficit < 1:
+                lane.deficits[owner_id] = 0
+                lane.owners.move_to_end(owner_id)
+            else:
+                lane.deficits[owner_id] = deficit
+            return item
+        return None
+
+    def _pending(self) -> int:
+        return sum(lane.pending for lane in self._lanes.values())
+
     def stop(self) -> None:
         """停止任务执行"""
-        with self._lock:
+        with self._cond:
             self._is_running = False
-    
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待队列清空且没有执行中的任务，超时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending() or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
     def get_queue_info(self) -> dict:
         """
         获取队列的当前状态信息
-        
+
         返回:
             dict: 包含队列信息的字典，包括:
                 - is_running: 队列是否正在运行
                 - pending_tasks: 等待执行的任务数量
+                - running_tasks: 正在执行的任务数量
+                - lanes: 各车道的积压数、用户数、最久等待秒数及最近出队的平均/P95/最大等待秒数
+                - owners: 积压最多的用户（最多 10 个）
         """
-        with self._lock:
+        now = self._clock()
+        with self._cond:
+            lanes = {}
+            depth: Dict[str, int] = {}
+            for name, lane in self._lanes.items():
+                oldest = 0.0
+                for owner_id, tasks in lane.owners.items():
+                    depth[owner_id] = depth.get(owner_id, 0) + len(tasks)
+                    if tasks:
+                        oldest = max(oldest, now - tasks[0].enqueued_at)
+                waits = sorted(lane.waits)
+                lanes[name] = {
+                    "pending": lane.pending,
+                    "owners": len(lane.owners),
+                    "oldest_wait_seconds": round(oldest, 2),
+                    "dispatched": lane.dispatched,
+                    "avg_wait_seconds": round(sum(waits) / len(waits), 2) if waits else 0.0,
+                    "p95_wait_seconds": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else 0.0,
+                    "max_wait_seconds": round(waits[-1], 2) if waits else 0.0,
+                }
+            owners = sorted(depth.items(), key=lambda kv: kv[1], reverse=True)[:10]
             return {
                 'is_running': self._is_running,
-                'pending_tasks': self._queue.qsize()
+                'pending_tasks': self._pending(),
+                'running_tasks': sum(self._running.values()),
+                'workers': self.workers,
+                'per_owner_limit': self.per_owner_limit,
+                'lanes': lanes,
+                'owners': [
+                    {"owner_id": owner_id, "pending": count, "running": self._running.get(owner_id, 0)}
+                    for owner_id, count in owners
+                ],
             }
-            
-    def clear_queue(self) -> None:
-        """清空队列中的所有任务"""
-        with self._lock:
-            while not self._queue.empty():
-                try:
-                    self._queue.get_nowait()
-                    self._queue.task_done()
-                except queue.Empty:
-                    break
-            logger.info("[%s] 队列已清空", self.tag)
-            
+
+    def clear_queue(self, owner_id: Optional[str] = None, lane: Optional[str] = None) -> int:
+        """清空队列中的任务；指定 owner_id/lane 时只清空对应用户/车道，返回清除的任务数"""
+        removed = 0
+        with self._cond:
+            for name, target in self._lanes.items():
+                if lane is not None and name != lane:
+                    continue
+                owners = list(target.owners) if owner_id is None else [str(owner_id)]
+                for key in owners:
+                    tasks = target.owners.pop(key, None)
+                    target.deficits.pop(key, None)
+                    if tasks:
+                        removed += len(tasks)
+                        target.pending -= len(tasks)
+            self._cond.notify_all()
+        logger.info("[%s] 队列已清空 owner=%s lane=%s count=%s", self.tag,
+                    "*" if owner_id is None else owner_id or "-", lane or "*", removed)
+        return removed
+
     def delete_queue(self) -> None:
         """删除队列(停止并清空所有任务)"""
-        with self._lock:
-            self._is_running = False
-            while not self._queue.empty():
-                try:
-                    self._queue.get_nowait()
-                    self._queue.task_done()
-                except queue.Empty:
-                    break
-            logger.info("[%s] 队列已删除", self.tag)
-TaskQueue = TaskQueueManager(tag="默认队列")
+        self.stop()
+        self.clear_queue()
+        logger.info("[%s] 队列已删除", self.tag)
+
+
+TaskQueue = TaskQueueManager(tag="默认队列", workers=int(cfg.get("queue.workers", 2) or 2),
+                             weights=cfg.get("queue.owner_weights", None) if isinstance(cfg.get("queue.owner_weights", None), dict) else None)
 TaskQueue.run_task_background()
 if __name__ == "__main__":
     def task1():
@@ -132,4 +313,4 @@ if __name__ == "__main__":
     manager = TaskQueueManager()
     manager.add_task(task1)
     manager.add_task(task2, "测试任务")
-    manager.run_tasks()  # 按顺序执行任务1和任务2
\ No newline at end of file
+    manager.run_tasks()  # 按顺序执行任务1和任务2
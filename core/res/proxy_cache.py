@@ -0,0 +1,224 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from core.config import cfg
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CachedObject:
+    key: str
+    content_type: str
+    etag: str
+    fetched_at: float
+    size: int
+    path: str
+    body: Optional[bytes] = None   # 命中内存热层或小文件时直接带上内容
+
+
+class CacheWriter:
+    """边下载边写入临时文件，完成后 commit 原子替换并登记索引；超过单对象上限时自动放弃"""
+
+    def __init__(self, cache: "ResourceCache", key: str):
+        self.cache = cache
+        self.key = key
+        self.size = 0
+        self.path = cache.path_for(key)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._tmp = f"{self.path}.{uuid.uuid4().hex[:8]}.tmp"
+        self._file = open(self._tmp, "wb")
+        self._chunks = []
+        self.closed = False
+
+    def write(self, chunk: bytes) -> bool:
+        if self.closed:
+            return False
+        self.size += len(chunk)
+        if self.size > self.cache.max_object_bytes:
+            self.abort()
+            return False
+        self._file.write(chunk)
+        if self.size <= self.cache.memory_max_object_bytes:
+            self._chunks.append(chunk)
+        else:
+            self._chunks = []
+        return True
+
+    def commit(self, content_type: str, etag: str, fetched_at: float) -> Optional[CachedObject]:
+        if self.closed:
+            return None
+        self.closed = True
+        try:
+            self._file.close()
+            os.replace(self._tmp, self.path)
+        except OSError as e:
+            logger.warning("写入资源缓存失败 %s: %s", self.key, e)
+            self._remove_tmp()
+            return None
+        body = b"".join(self._chunks) if self.size <= self.cache.memory_max_object_bytes else None
+        obj = CachedObject(self.key, content_type, etag, fetched_at, self.size, self.path, body)
+        self.cache._register(obj)
+        return obj
+
+    def abort(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._remove_tmp()
+
+    def _remove_tmp(self) -> None:
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+
+class ResourceCache:
+    """
+    资源反向代理的磁盘缓存
+
+    - 文件按 key 的哈希前缀分两级目录存放（ab/cd/abcd...），避免单目录文件过多；
+    - 元数据（类型、ETag、大小、访问时间）集中保存在 index.db，不再为每个文件写旁路 .headers 文件；
+    - 总大小超过 max_bytes 时按最近访问时间淘汰（LRU）；
+    - 小文件额外保存在进程内的内存热层，命中时不读磁盘。
+    """
+
+    # 访问时间最多每隔这么久写一次索引，避免每次命中都写库
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None, ttl: Optional[int] = None,
+                 memory_bytes: Optional[int] = None, memory_max_object_bytes: Optional[int] = None,
+                 max_object_bytes: Optional[int] = None):
+        self.root = root or os.path.join(cfg.get("cache.dir", "data/cache"), "res")
+        self.max_bytes = int(max_bytes or cfg.get("cache.res.max_bytes", 512 * 1024 * 1024) or 0)
+        self.ttl = int(ttl or cfg.get("cache.ttl", 3600) or 3600)
+        self.memory_bytes = int(memory_bytes if memory_bytes is not None
+                                else cfg.get("cache.res.memory_bytes", 16 * 1024 * 1024) or 0)
+        self.memory_max_object_bytes = int(memory_max_object_bytes if memory_max_object_bytes is not None
+                                           else cfg.get("cache.res.memory_max_object_bytes", 256 * 1024) or 0)
+        self.max_object_bytes = int(max_object_bytes or cfg.get("cache.res.max_object_bytes", 10 * 1024 * 1024) or 0)
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.root, "index.db"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, size INTEGER NOT NULL, content_type TEXT, etag TEXT, "
+            "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+        self._memory: "OrderedDict[str, CachedObject]" = OrderedDict()
+        self._memory_size = 0
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(str(url).encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def get(self, key: str) -> Optional[CachedObject]:
+        now = time.time()
+        with self._lock:
+            obj = self._memory.get(key)
+            if obj is not None:
+                if now - obj.fetched_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    return obj
+                self._drop_memory(key)
+            row = self._db.execute(
+                "SELECT size, content_type, etag, fetched_at, accessed_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        size, content_type, etag, fetched_at, accessed_at = row
+        path = self.path_for(key)
+        if now - fetched_at >= self.ttl or not os.path.exists(path):
+            self.delete(key)
+            return None
+        obj = CachedObject(key, content_type or "", etag or "", fetched_at, int(size), path)
+        if obj.size <= self.memory_max_object_bytes:
+            try:
+                with open(path, "rb") as f:
+                    obj.body = f.read()
+            except OSError:
+                self.delete(key)
+                return None
+        with self._lock:
+            if now - accessed_at >= self.TOUCH_INTERVAL:
+                self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            if obj.body is not None:
+                self._remember(obj)
+        return obj
+
+    def open_writer(self, key: str) -> CacheWriter:
+        return CacheWriter(self, key)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._drop_memory(key)
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.remove(self.path_for(key))
+        except OSError:
+            pass
+
+    def total_size(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0])
+
+    def _register(self, obj: CachedObject) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, size, content_type, etag, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (obj.key, obj.size, obj.content_type, obj.etag, obj.fetched_at, now),
+            )
+            if obj.body is not None:
+                self._remember(obj)
+        self._evict()
+
+    def _evict(self) -> None:
+        if self.max_bytes <= 0:
+            return
+        total = self.total_size()
+        if total <= self.max_bytes:
+            return
+        # 一次淘汰到上限的 90%，避免每次写入都触发淘汰
+        target = int(self.max_bytes * 0.9)
+        with self._lock:
+            rows = self._db.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if total <= target:
+                break
+            self.delete(key)
+            total -= int(size)
+
+    def _remember(self, obj: CachedObject) -> None:
+        if obj.size > self.memory_max_object_bytes or self.memory_bytes <= 0:
+            return
+        self._drop_memory(obj.key)
+        self._memory[obj.key] = obj
+        self._memory_size += obj.size
+        while self._memory_size > self.memory_bytes and self._memory:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= old.size
+
+    def _drop_memory(self, key: str) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= old.size
@@ -1,7 +1,16 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
 import psutil
+
+from core.config import cfg
+from core.log import get_logger
 # Desc: 资源信息
 # Date: 2021-04-29 15:59
 # Author: Rachel
+logger = get_logger(__name__)
 # 缓存不会频繁变动的系统信息
 _STATIC_INFO = {
     'cpu': {
@@ -16,22 +25,63 @@ _STATIC_INFO = {
     }
 }
 
-def get_system_resources():
-    # 获取动态变化的资源信息
-    mem = psutil.virtual_memory()
-    cpu_percent = psutil.cpu_percent(interval=0.1)
-    disk = psutil.disk_usage('./')
-    # 获取当前 Python 进程的资源占用情况
-    current_process = psutil.Process()
-    process_cpu_percent = current_process.cpu_percent(interval=0.1)
-    process_mem_info = current_process.memory_info()
-    # 单位转换函数
-    def to_gb(bytes_value):
-            return round(bytes_value / (1024 ** 3), 2)
-        
-    resources_info = {
+
+# 单位转换函数
+def to_gb(bytes_value):
+    return round(bytes_value / (1024 ** 3), 2)
+
+
+def _default_queue_info() -> dict:
+    from core.queue import TaskQueue
+    return TaskQueue.get_queue_info()
+
+
+def _default_article_refresh(max_age: int) -> None:
+    from core.article_lax import refresh_article_info
+    refresh_article_info(max_age=max_age)
+
+
+class ResourceSampler:
+    """
+    后台资源采样器
+
+    - 后台线程每 interval 秒采样一次 CPU/内存/磁盘/进程/队列，最近 history 个点保存在环形缓冲中；
+    - CPU 占用使用 psutil 的非阻塞模式（interval=None，即与上次采样之间的平均值），不再在请求里等待；
+    - 文章统计（全表计数）按 article_interval 低频刷新；
+    - 接口只读取最近一次快照与时间序列，轮询不产生额外开销。
+    """
+
+    def __init__(self, interval: Optional[float] = None, history: Optional[int] = None,
+                 article_interval: Optional[int] = None,
+                 queue_info: Optional[Callable[[], dict]] = _default_queue_info,
+                 article_refresh: Optional[Callable[[int], None]] = _default_article_refresh,
+                 clock: Callable[[], float] = time.time):
+        self.interval = max(1.0, float(interval or cfg.get("sys_info.sample_interval", 5) or 5))
+        self.history = max(1, int(history or cfg.get("sys_info.history", 720) or 720))
+        self.article_interval = max(60, int(article_interval or cfg.get("sys_info.article_interval", 1800) or 1800))
+        self._queue_info = queue_info
+        self._article_refresh = article_refresh
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=self.history)
+        self._latest: Optional[dict] = None
+        self._articles_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = psutil.Process()
+        # 非阻塞模式下首次调用返回 0，先取一次基准
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+
+    def sample(self) -> dict:
+        """采样一次并写入环形缓冲，返回完整快照"""
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage('./')
+        process_mem_info = self._process.memory_info()
+        snapshot = {
+            'timestamp': round(self._clock(), 3),
             'cpu': {
-                'percent': cpu_percent,
+                'percent': psutil.cpu_percent(interval=None),
                 'cores': _STATIC_INFO['cpu']['cores'],
                 'threads': _STATIC_INFO['cpu']['threads']
             },
@@ -48,9 +98,97 @@ def get_system_resources():
                 'percent': disk.percent
             },
             'process': {
-                'cpu_percent': process_cpu_percent,
+                'cpu_percent': self._process.cpu_percent(interval=None),
                 'memory_used': to_gb(process_mem_info.rss),
-                'memory_percent': current_process.memory_percent()
-            }
+                'memory_percent': round(self._process.memory_percent(), 2)
+            },
+            'queue': {},
         }
-    return resources_info
\ No newline at end of file
+        if self._queue_info is not None:
+            try:
+                snapshot['queue'] = self._queue_info() or {}
+            except Exception as e:
+                logger.warning("采样队列状态失败: %s", e)
+        queue = snapshot['queue']
+        point = {
+            't': snapshot['timestamp'],
+            'cpu': snapshot['cpu']['percent'],
+            'memory': snapshot['memory']['percent'],
+            'disk': snapshot['disk']['percent'],
+            'process_cpu': snapshot['process']['cpu_percent'],
+            'process_memory': snapshot['process']['memory_used'],
+            'queue_pending': int(queue.get('pending_tasks', 0) or 0),
+            'queue_running': int(queue.get('running_tasks', 0) or 0),
+        }
+        with self._lock:
+            self._latest = snapshot
+            self._samples.append(point)
+        return snapshot
+
+    def latest(self) -> Optional[dict]:
+        with self._lock:
+            return self._latest
+
+    def series(self, since: Optional[float] = None, limit: Optional[int] = None) -> List[dict]:
+        """返回时间序列（按时间升序），since 为起始时间戳（不含），limit 只取最近的若干个点"""
+        with self._lock:
+            points = list(self._samples)
+        if since is not None:
+            points = [p for p in points if p['t'] > since]
+        if limit is not None and limit > 0:
+            points = points[-int(limit):]
+        return points
+
+    def refresh_articles(self, force: bool = False) -> None:
+        if self._article_refresh is None:
+            return
+        now = self._clock()
+        if not force and now - self._articles_at < self.article_interval:
+            return
+        self._articles_at = now
+        try:
+            self._article_refresh(self.article_interval)
+        except Exception as e:
+            logger.warning("刷新文章统计失败: %s", e)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="resource-sampler")
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning("资源采样失败: %s", e)
+            self.refresh_articles()
+            self._stop.wait(self.interval)
+
+
+_sampler: Optional[ResourceSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_resource_sampler() -> ResourceSampler:
+    """进程内共享的资源采样器，首次获取时启动后台采样线程"""
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                sampler = ResourceSampler()
+                sampler.start()
+                _sampler = sampler
+    return _sampler
+
+
+def get_system_resources():
+    """返回最近一次采样的资源快照；采样线程尚未产出数据时立即（非阻塞）采样一次"""
+    sampler = get_resource_sampler()
+    return sampler.latest() or sampler.sample()
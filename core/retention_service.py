@@ -0,0 +1,299 @@
+import gzip
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import MetaData, Table, delete, inspect, select, text
+from sqlalchemy.engine import Engine
+
+from core.config import cfg
+from core.events import log_event, E
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    """单张日志表的保留策略：time_column 早于 days 天的行按批归档/删除"""
+    table: str
+    time_column: str = "created_at"
+    days: int = 90
+    archive: bool = False
+    # 只清理这些状态的行（例如已结束的任务）；为空表示不按状态过滤
+    statuses: Tuple[str, ...] = ()
+    enabled: bool = True
+
+
+@dataclass
+class RetentionResult:
+    table: str
+    cutoff: Optional[datetime] = None
+    deleted: int = 0
+    archived: int = 0
+    dropped_partitions: List[str] = field(default_factory=list)
+    archive_files: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "table": self.table,
+            "cutoff": self.cutoff.isoformat() if self.cutoff else None,
+            "deleted": self.deleted,
+            "archived": self.archived,
+            "dropped_partitions": list(self.dropped_partitions),
+            "archive_files": list(self.archive_files),
+        }
+
+
+# 默认策略，可通过 retention.tables.<表名>.* 覆盖
+DEFAULT_POLICIES = (
+    RetentionPolicy("analytics_events", days=90, archive=True),
+    RetentionPolicy("message_tasks_logs", days=30),
+    RetentionPolicy("ai_publish_tasks", time_column="updated_at", days=90, statuses=("success", "failed")),
+    RetentionPolicy("ai_compose_tasks", time_column="updated_at", days=30, statuses=("success", "failed")),
+)
+
+
+def load_policies() -> List[RetentionPolicy]:
+    policies = []
+    for base in DEFAULT_POLICIES:
+        prefix = f"retention.tables.{base.table}"
+        statuses = cfg.get(f"{prefix}.statuses", None)
+        if isinstance(statuses, str):
+            statuses = [s.strip() for s in statuses.split(",") if s.strip()]
+        policies.append(RetentionPolicy(
+            table=base.table,
+            time_column=base.time_column,
+            days=int(cfg.get(f"{prefix}.days", base.days) or 0),
+            archive=bool(cfg.get(f"{prefix}.archive", base.archive)),
+            statuses=tuple(statuses) if statuses is not None else base.statuses,
+            enabled=bool(cfg.get(f"{prefix}.enabled", base.enabled)),
+        ))
+    return policies
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(value: datetime) -> datetime:
+    return datetime(value.year + 1, 1, 1) if value.month == 12 else datetime(value.year, value.month + 1, 1)
+
+
+def month_partition_name(table: str, month: datetime, dialect: str) -> str:
+    """按月分区命名约定：PostgreSQL 子表 {table}_pYYYYMM，MySQL 分区 pYYYYMM"""
+    suffix = f"p{month.year:04d}{month.month:02d}"
+    return f"{table}_{suffix}" if dialect == "postgresql" else suffix
+
+
+def parse_month_partition(name: str) -> Optional[datetime]:
+    tail = str(name or "").rsplit("p", 1)[-1]
+    if len(tail) != 6 or not tail.isdigit():
+        return None
+    year, month = int(tail[:4]), int(tail[4:])
+    if not 1 <= month <= 12:
+        return None
+    return datetime(year, month, 1)
+
+
+def expired_partitions(names: Sequence[str], cutoff: datetime) -> List[str]:
+    """整月都早于 cutoff 的分区，可以直接整体删除"""
+    expired = []
+    for name in names:
+        month = parse_month_partition(name)
+        if month is not None and next_month(month) <= cutoff:
+            expired.append(name)
+    return sorted(expired)
+
+
+class RetentionService:
+    """
+    日志类高频写入表的保留与归档
+
+    - 按批（batch_size）选出早于保留期的主键，需要归档时先把整行追加写入
+      {archive_dir}/{表名}/{YYYY-MM}.ndjson.gz，再按主键删除，每批之间短暂停顿，避免长事务锁表；
+    - PostgreSQL/MySQL 上表已按月分区（命名见 month_partition_name）时，提前建好后续月份分区，
+      并在清理后直接删除整月过期的分区；
+    - SQLite 删除后按页增量回收空间（auto_vacuum=INCREMENTAL 时执行 incremental_vacuum）。
+    """
+
+    def __init__(self, engine: Engine, policies: Optional[List[RetentionPolicy]] = None,
+                 batch_size: Optional[int] = None, archive_dir: Optional[str] = None,
+                 pause_seconds: Optional[float] = None, vacuum_pages: Optional[int] = None,
+                 now=datetime.now):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.policies = policies if policies is not None else load_policies()
+        self.batch_size = max(1, int(batch_size or cfg.get("retention.batch_size", 1000) or 1000))
+        self.archive_dir = archive_dir or str(cfg.get("retention.archive_dir", "data/archive") or "data/archive")
+        self.pause_seconds = float(pause_seconds if pause_seconds is not None
+                                   else cfg.get("retention.pause_seconds", 0.2) or 0)
+        self.vacuum_pages = int(vacuum_pages if vacuum_pages is not None
+                                else cfg.get("retention.sqlite_vacuum_pages", 2000) or 0)
+        self.months_ahead = max(1, int(cfg.get("retention.partition_months_ahead", 2) or 2))
+        self._now = now
+
+    def run(self) -> List[RetentionResult]:
+        results = []
+        for policy in self.policies:
+            if not policy.enabled or policy.days <= 0:
+                continue
+            try:
+                results.append(self.apply(policy))
+            except Exception as e:
+                logger.exception("日志表清理失败 %s: %s", policy.table, e)
+        if self.dialect == "sqlite" and any(r.deleted for r in results):
+            self._sqlite_vacuum()
+        return results
+
+    def apply(self, policy: RetentionPolicy) -> RetentionResult:
+        result = RetentionResult(policy.table, cutoff=self._now() - timedelta(days=policy.days))
+        table = self._reflect(policy.table)
+        if table is None:
+            return result
+        if policy.time_column not in table.c:
+            logger.warning("日志表 %s 缺少时间列 %s，跳过清理", policy.table, policy.time_column)
+            return result
+        log_event(logger, E.RETENTION_PURGE_START, table=policy.table, cutoff=result.cutoff.isoformat(),
+                  archive=policy.archive)
+        partitions = self._month_partitions(policy.table)
+        if partitions:
+            self._ensure_partitions(policy.table, partitions)
+        self._purge(table, policy, result)
+        if partitions and not policy.statuses:
+            for name in expired_partitions(partitions, result.cutoff):
+                self._drop_partition(policy.table, name)
+                result.dropped_partitions.append(name)
+        log_event(logger, E.RETENTION_PURGE_COMPLETE, table=policy.table, deleted=result.deleted,
+                  archived=result.archived, partitions=len(result.dropped_partitions))
+        return result
+
+    def _reflect(self, name: str) -> Optional[Table]:
+        if not inspect(self.engine).has_table(name):
+            return None
+        return Table(name, MetaData(), autoload_with=self.engine)
+
+    def _purge(self, table: Table, policy: RetentionPolicy, result: RetentionResult) -> None:
+        pk = list(table.primary_key.columns)[0]
+        time_col = table.c[policy.time_column]
+        condition = time_col < result.cutoff
+        if policy.statuses and "status" in table.c:
+            condition = condition & table.c.status.in_(policy.statuses)
+        columns = list(table.c) if policy.archive else [pk]
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    select(*columns).where(condition).order_by(time_col).limit(self.batch_size)
+                ).mappings().all()
+            if not rows:
+                break
+            if policy.archive:
+                for path in self._archive(policy, rows):
+                    if path not in result.archive_files:
+                        result.archive_files.append(path)
+                result.archived += len(rows)
+            ids = [row[pk.name] for row in rows]
+            with self.engine.begin() as conn:
+                result.deleted += conn.execute(delete(table).where(pk.in_(ids))).rowcount or 0
+            if len(rows) < self.batch_size:
+                break
+            if self.pause_seconds > 0:
+                time.sleep(self.pause_seconds)
+
+    def _archive(self, policy: RetentionPolicy, rows) -> List[str]:
+        """按行所在月份追加写入 gzip NDJSON（多次追加形成多段 gzip，gzip.open 可连续读取）"""
+        by_month: Dict[str, List[str]] = {}
+        for row in rows:
+            stamp = row.get(policy.time_column)
+            month = stamp.strftime("%Y-%m") if isinstance(stamp, datetime) else "unknown"
+            by_month.setdefault(month, []).append(json.dumps(dict(row), ensure_ascii=False, default=str))
+        folder = os.path.join(self.archive_dir, policy.table)
+        os.makedirs(folder, exist_ok=True)
+        paths = []
+        for month, lines in by_month.items():
+            path = os.path.join(folder, f"{month}.ndjson.gz")
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            paths.append(path)
+        return paths
+
+    def _month_partitions(self, table: str) -> List[str]:
+        """已按月分区的表返回分区名列表；未分区或不支持的数据库返回空列表"""
+        try:
+            with self.engine.connect() as conn:
+                if self.dialect == "postgresql":
+                    rows = conn.execute(text(
+                        "SELECT c.relname FROM pg_inherits i "
+                        "JOIN pg_class c ON c.oid = i.inhrelid "
+                        "JOIN pg_class p ON p.oid = i.inhparent "
+                        "WHERE p.relname = :table"
+                    ), {"table": table}).all()
+                elif self.dialect == "mysql":
+                    rows = conn.execute(text(
+                        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL"
+                    ), {"table": table}).all()
+                else:
+                    return []
+        except Exception as e:
+            logger.warning("读取分区信息失败 %s: %s", table, e)
+            return []
+        return [str(row[0]) for row in rows]
+
+    def _ensure_partitions(self, table: str, partitions: List[str]) -> None:
+        """提前创建当前及后续 months_ahead 个月的分区，避免跨月后写入失败"""
+        existing = set(partitions)
+        month = month_start(self._now())
+        for _ in range(self.months_ahead + 1):
+            name = month_partition_name(table, month, self.dialect)
+            upper = next_month(month)
+            if name not in existing:
+                if self.dialect == "postgresql":
+                    stmt = (f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')")
+                elif "pmax" in existing:
+                    stmt = (f"ALTER TABLE `{table}` REORGANIZE PARTITION pmax INTO ("
+                            f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{upper:%Y-%m-%d}')), "
+                            f"PARTITION pmax VALUES LESS THAN MAXVALUE)")
+                else:
+                    stmt = None
+                if stmt:
+                    try:
+                        with self.engine.begin() as conn:
+                            conn.execute(text(stmt))
+                        existing.add(name)
+                    except Exception as e:
+                        logger.warning("创建分区失败 %s.%s: %s", table, name, e)
+            month = upper
+
+    def _drop_partition(self, table: str, name: str) -> None:
+        if self.dialect == "postgresql":
+            stmt = f'DROP TABLE IF EXISTS "{name}"'
+        else:
+            stmt = f"ALTER TABLE `{table}` DROP PARTITION {name}"
+        with self.engine.begin() as conn:
+            conn.execute(text(stmt))
+
+    def _sqlite_vacuum(self) -> None:
+        """SQLite 滚动回收：每轮最多释放 vacuum_pages 页，不做阻塞整库的 VACUUM"""
+        if self.vacuum_pages <= 0:
+            return
+        try:
+            with self.engine.connect() as conn:
+                mode = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+                if int(mode or 0) != 2:
+                    logger.info("SQLite 未开启 auto_vacuum=INCREMENTAL，删除的页将被复用但不会归还磁盘")
+                    return
+                conn.execute(text(f"PRAGMA incremental_vacuum({self.vacuum_pages})"))
+        except Exception as e:
+            logger.warning("SQLite 增量回收失败: %s", e)
+
+
+def run_retention(engine: Optional[Engine] = None) -> List[RetentionResult]:
+    if engine is None:
+        from core.db import DB
+        engine = DB.get_engine()
+    return RetentionService(engine).run()
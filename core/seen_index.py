@@ -0,0 +1,157 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+
+from core.config import cfg
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def article_pk(mp_id: str, aid: str) -> str:
+    """与 Db.add_article 一致的文章主键：{mp_id}-{aid}，去掉 MP_WXS_ 前缀"""
+    return f"{str(mp_id)}-{aid}".replace("MP_WXS_", "")
+
+
+def _digest(article_id: str) -> int:
+    # 8 字节摘要代替字符串存储，每条记录只占一个小整数
+    return int.from_bytes(hashlib.blake2b(article_id.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class _FeedSeen:
+    __slots__ = ("keys", "complete")
+
+    def __init__(self):
+        self.keys: Dict[int, None] = {}   # 按插入顺序保存，超出上限时淘汰最早的
+        self.complete = False             # 内存中是否包含该公众号的全部文章（此时未命中即可判定为新文章）
+
+
+def _load_recent_ids(mp_id: str, limit: int) -> List[str]:
+    from core.db import DB
+    from core.models.article import Article
+
+    table = Article.__table__
+    with DB.get_engine().connect() as conn:
+        rows = conn.execute(
+            select(table.c.id)
+            .where(table.c.mp_id == mp_id)
+            .order_by(table.c.publish_time.desc())
+            .limit(limit)
+        ).all()
+    # 由旧到新插入，淘汰时先淘汰较早的文章
+    return [str(row[0]) for row in reversed(rows)]
+
+
+def _article_exists(article_id: str) -> bool:
+    from core.db import DB
+    from core.models.article import Article
+
+    table = Article.__table__
+    with DB.get_engine().connect() as conn:
+        return conn.execute(select(table.c.id).where(table.c.id == article_id).limit(1)).first() is not None
+
+
+class SeenArticleIndex:
+    """
+    按公众号划分的已采集文章索引
+
+    - 首次访问某公众号时从 articles 表预热最近的 max_per_feed 条主键，之后的判断都是 O(1)；
+    - 每个公众号最多保留 max_per_feed 条、最多保留 max_feeds 个公众号，内存有上限；
+    - 被淘汰或超出预热范围的文章在未命中时回查文章主键，不会把旧文章误判为新文章。
+    """
+
+    def __init__(self, max_per_feed: Optional[int] = None, max_feeds: Optional[int] = None,
+                 loader: Callable[[str, int], List[str]] = _load_recent_ids,
+                 exists: Callable[[str], bool] = _article_exists):
+        self.max_per_feed = max(1, int(max_per_feed or cfg.get("gather.seen_index.max_per_feed", 2000) or 2000))
+        self.max_feeds = max(1, int(max_feeds or cfg.get("gather.seen_index.max_feeds", 1000) or 1000))
+        self._loader = loader
+        self._exists = exists
+        self._feeds: "OrderedDict[str, _FeedSeen]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _feed(self, mp_id: str) -> _FeedSeen:
+        with self._lock:
+            seen = self._feeds.get(mp_id)
+            if seen is not None:
+                self._feeds.move_to_end(mp_id)
+                return seen
+        seen = _FeedSeen()
+        try:
+            ids = self._loader(mp_id, self.max_per_feed)
+            for article_id in ids:
+                seen.keys[_digest(article_id)] = None
+            seen.complete = len(ids) < self.max_per_feed
+        except Exception as e:
+            logger.warning("预热已采集文章索引失败 %s: %s", mp_id, e)
+        with self._lock:
+            current = self._feeds.get(mp_id)
+            if current is not None:
+                return current
+            self._feeds[mp_id] = seen
+            while len(self._feeds) > self.max_feeds:
+                self._feeds.popitem(last=False)
+            return seen
+
+    def warm(self, mp_id: str) -> None:
+        """预热公众号索引（首次采集前调用，避免第一条文章时再查库）"""
+        if mp_id:
+            self._feed(str(mp_id))
+
+    def contains(self, mp_id: str, aid) -> bool:
+        article_id = article_pk(mp_id, aid)
+        seen = self._feed(str(mp_id))
+        key = _digest(article_id)
+        with self._lock:
+            if key in seen.keys:
+                return True
+            if seen.complete:
+                return False
+        try:
+            found = self._exists(article_id)
+        except Exception as e:
+            logger.warning("查询文章是否存在失败 %s: %s", article_id, e)
+            return False
+        if found:
+            self._remember(seen, key)
+        return found
+
+    def add(self, mp_id: str, aid) -> None:
+        seen = self._feed(str(mp_id))
+        self._remember(seen, _digest(article_pk(mp_id, aid)))
+
+    def all_known(self, mp_id: str, aids: Iterable) -> bool:
+        """一页文章是否全部已采集（空页返回 False）"""
+        aids = list(aids)
+        return bool(aids) and all(self.contains(mp_id, aid) for aid in aids)
+
+    def forget(self, mp_id: str) -> None:
+        """公众号或其文章被物理删除后丢弃索引，下次访问重新预热"""
+        with self._lock:
+            self._feeds.pop(str(mp_id), None)
+
+    def _remember(self, seen: _FeedSeen, key: int) -> None:
+        with self._lock:
+            if key in seen.keys:
+                return
+            seen.keys[key] = None
+            if len(seen.keys) > self.max_per_feed:
+                seen.keys.pop(next(iter(seen.keys)))
+                seen.complete = False
+
+
+_index: Optional[SeenArticleIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_seen_index() -> SeenArticleIndex:
+    """返回进程内共享的已采集文章索引"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SeenArticleIndex()
+    return _index
@@ -0,0 +1,108 @@
+import json
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, func, insert, select
+
+from core.models.feed import Feed
+from core.models.tag_feed import TagFeed
+from core.models.tags import Tags
+
+# 除 rebuild_tag_feeds 外，本模块的维护函数均不提交事务，由调用方统一 commit。
+# 参数 conn 既可以是 Session 也可以是 Connection。
+
+
+def parse_mps_ids(raw) -> List[str]:
+    """解析 tags.mps_id（[{"id": ..., ...}] 形式的 JSON），返回去重后的公众号 ID 列表"""
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+    except (json.JSONDecodeError, TypeError):
+        return []
+    if not isinstance(data, list):
+        return []
+    ids = []
+    for item in data:
+        feed_id = str(item.get("id") or "").strip() if isinstance(item, dict) else ""
+        if feed_id and feed_id not in ids:
+            ids.append(feed_id)
+    return ids
+
+
+def replace_tag_feeds(conn, tags: Iterable[Tuple[str, str, object]]) -> None:
+    """按 (tag_id, owner_id, mps_id) 重建这些标签的公众号关联"""
+    tags = list(tags)
+    if not tags:
+        return
+    table = TagFeed.__table__
+    conn.execute(delete(table).where(table.c.tag_id.in_([str(tag_id) for tag_id, _, _ in tags])))
+    rows = [
+        {"tag_id": str(tag_id), "feed_id": feed_id, "owner_id": str(owner_id or "")}
+        for tag_id, owner_id, mps_id in tags
+        for feed_id in parse_mps_ids(mps_id)
+    ]
+    if rows:
+        conn.execute(insert(table), rows)
+
+
+def sync_tag_feeds(conn, tag) -> None:
+    """标签新建或修改 mps_id 后调用"""
+    replace_tag_feeds(conn, [(tag.id, tag.owner_id, tag.mps_id)])
+
+
+def remove_tag_feeds(conn, tag_ids: Iterable[str]) -> None:
+    ids = [str(i) for i in tag_ids if i]
+    if ids:
+        conn.execute(delete(TagFeed.__table__).where(TagFeed.__table__.c.tag_id.in_(ids)))
+
+
+def tag_feed_ids(tag_id: str):
+    """标签下公众号 ID 的子查询，用于 Feed.id.in_(...) / Article.mp_id.in_(...)"""
+    return select(TagFeed.feed_id).where(TagFeed.tag_id == str(tag_id))
+
+
+def tag_counts(conn, tag_ids: Iterable[str]) -> Dict[str, Dict[str, int]]:
+    """一次分组查询返回各标签的公众号数与文章数 {tag_id: {"mp_count", "article_count"}}
+
+    文章数取公众号上维护的 article_count 计数，不扫描文章表。
+    """
+    ids = [str(i) for i in tag_ids if i]
+    counts = {tag_id: {"mp_count": 0, "article_count": 0} for tag_id in ids}
+    if not ids:
+        return counts
+    query = (
+        select(TagFeed.tag_id, func.count(TagFeed.feed_id), func.coalesce(func.sum(Feed.article_count), 0))
+        .outerjoin(Feed, Feed.id == TagFeed.feed_id)
+        .where(TagFeed.tag_id.in_(ids))
+        .group_by(TagFeed.tag_id)
+    )
+    for tag_id, mp_count, article_count in conn.execute(query):
+        counts[str(tag_id)] = {"mp_count": int(mp_count or 0), "article_count": int(article_count or 0)}
+    return counts
+
+
+def tags_for_feed(conn, feed_id: str, owner_id: str = None) -> List[str]:
+    """包含该公众号的标签 ID"""
+    query = select(TagFeed.tag_id).where(TagFeed.feed_id == str(feed_id))
+    if owner_id:
+        query = query.where(TagFeed.owner_id == owner_id)
+    return [str(row[0]) for row in conn.execute(query)]
+
+
+def rebuild_tag_feeds(session, chunk_size: int = 500) -> int:
+    """按 tags.mps_id 全量重建关联表（建表时的在线迁移），按主键分页处理，返回处理的标签数"""
+    table = Tags.__table__
+    count = 0
+    last_id = None
+    while True:
+        query = select(table.c.id, table.c.owner_id, table.c.mps_id).order_by(table.c.id).limit(chunk_size)
+        if last_id is not None:
+            query = query.where(table.c.id > last_id)
+        rows = session.execute(query).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        replace_tag_feeds(session, [(row.id, row.owner_id, row.mps_id) for row in rows])
+        session.commit()
+        count += len(rows)
+        if len(rows) < chunk_size:
+            break
+    return count
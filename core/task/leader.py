@@ -0,0 +1,133 @@
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from core.log import logger
+from core.models.scheduler_lease import SchedulerLease
+
+
+def default_holder_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElector:
+    """
+    基于租约行（scheduler_leases）的领导者选举
+
+    持有者需在 ttl 内续约；租约过期后其他进程才能接管。
+    本地认定的有效期只取 ttl 的 2/3，续约失败时会先于数据库租约过期停止触发，
+    避免交接期间两个进程同时执行同一任务（要求各节点时钟同步）。
+    """
+
+    def __init__(self, name: str = "scheduler", ttl_seconds: int = 30, holder: Optional[str] = None, engine=None):
+        self.name = name
+        self.ttl_seconds = max(3, int(ttl_seconds))
+        self.holder = holder or default_holder_id()
+        self._engine = engine
+        self._valid_until = 0.0
+
+    def _get_engine(self):
+        if self._engine is not None:
+            return self._engine
+        from core.db import DB
+        return DB.get_engine()
+
+    def try_acquire(self) -> bool:
+        """获取或续约租约，返回当前是否为领导者。"""
+        started = time.monotonic()
+        now = datetime.now()
+        expires_at = now + timedelta(seconds=self.ttl_seconds)
+        table = SchedulerLease.__table__
+        try:
+            with self._get_engine().begin() as conn:
+                rows = conn.execute(
+                    update(table).where(
+                        table.c.name == self.name,
+                        or_(
+                            table.c.holder == self.holder,
+                            table.c.expires_at.is_(None),
+                            table.c.expires_at < now,
+                        ),
+                    ).values(holder=self.holder, expires_at=expires_at, updated_at=now)
+                ).rowcount
+                if not rows:
+                    exists = conn.execute(select(table.c.name).where(table.c.name == self.name)).first()
+                    if exists is None:
+                        conn.execute(insert(table).values(
+                            name=self.name,
+                            holder=self.holder,
+                            expires_at=expires_at,
+                            generation=0,
+                            updated_at=now,
+                        ))
+                        rows = 1
+        except IntegrityError:
+            rows = 0
+        except Exception as e:
+            logger.warning(f"Scheduler lease {self.name} renew failed: {str(e)}")
+            rows = 0
+        if rows:
+            self._valid_until = started + self.ttl_seconds * 2 / 3
+            return True
+        self._valid_until = 0.0
+        return False
+
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    def release(self) -> None:
+        """主动释放租约，便于其他进程立即接管。"""
+        was_leader = self.is_leader()
+        self._valid_until = 0.0
+        if not was_leader:
+            return
+        table = SchedulerLease.__table__
+        try:
+            with self._get_engine().begin() as conn:
+                conn.execute(
+                    update(table).where(
+                        table.c.name == self.name,
+                        table.c.holder == self.holder,
+                    ).values(expires_at=datetime.now(), updated_at=datetime.now())
+                )
+        except Exception as e:
+            logger.warning(f"Scheduler lease {self.name} release failed: {str(e)}")
+
+    def current_holder(self) -> str:
+        table = SchedulerLease.__table__
+        try:
+            with self._get_engine().connect() as conn:
+                row = conn.execute(
+                    select(table.c.holder, table.c.expires_at).where(table.c.name == self.name)
+                ).first()
+        except Exception:
+            return ""
+        if row is None or row[1] is None or row[1] < datetime.now():
+            return ""
+        return str(row[0] or "")
+
+    def read_generation(self) -> int:
+        table = SchedulerLease.__table__
+        with self._get_engine().connect() as conn:
+            value = conn.execute(select(table.c.generation).where(table.c.name == self.name)).scalar()
+        return int(value or 0)
+
+    def bump_generation(self) -> None:
+        """通知领导者任务定义已在其他进程中变更。"""
+        table = SchedulerLease.__table__
+        try:
+            with self._get_engine().begin() as conn:
+                conn.execute(
+                    update(table).where(table.c.name == self.name).values(
+                        generation=table.c.generation + 1,
+                        updated_at=datetime.now(),
+                    )
+                )
+        except Exception as e:
+            logger.warning(f"Scheduler lease {self.name} generation bump failed: {str(e)}")
@@ -0,0 +1,159 @@
+import threading
+from typing import Callable, List, Optional
+
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from core.config import cfg
+from core.events import log_event, E
+from core.log import logger
+from .leader import LeaderElector
+from .store import SchedulerJobStore
+
+
+class SchedulerService:
+    """
+    进程内唯一的调度服务
+
+    - 所有 TaskScheduler 实例共享同一个 BackgroundScheduler 与线程池；
+    - 开启 scheduler.leader_election 时，多个进程/实例通过数据库租约选出领导者，
+      只有领导者真正执行到点的任务，其余进程的触发直接跳过；
+    - 领导者在接管、或其他进程修改任务（generation 递增）后调用已注册的对齐回调，
+      按数据库中的任务定义重新登记任务。
+    """
+
+    def __init__(self, store: Optional[SchedulerJobStore] = None, elector: Optional[LeaderElector] = None):
+        self.leader_election = bool(cfg.get("scheduler.leader_election", True))
+        self.misfire_grace_time = int(cfg.get("scheduler.misfire_grace_time", 60) or 60)
+        self.coalesce = bool(cfg.get("scheduler.coalesce", True))
+        self.default_jitter = int(cfg.get("scheduler.jitter_seconds", 0) or 0)
+        max_workers = max(1, int(cfg.get("scheduler.max_workers", 20) or 20))
+        self.scheduler = BackgroundScheduler(
+            executors={"default": ThreadPoolExecutor(max_workers)},
+            job_defaults={
+                "coalesce": self.coalesce,
+                "misfire_grace_time": self.misfire_grace_time,
+                "max_instances": 1,
+            },
+        )
+        self.store = store or SchedulerJobStore()
+        self.elector = elector or LeaderElector(
+            name="scheduler",
+            ttl_seconds=int(cfg.get("scheduler.lease_ttl_seconds", 30) or 30),
+        )
+        self._reconcilers: List[Callable[[], None]] = []
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._was_leader = False
+        self._seen_generation: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        return self.scheduler.running
+
+    def start(self) -> None:
+        with self._lock:
+            if self.leader_election and self._heartbeat is None:
+                # 启动时同步抢一次租约，避免启动后的第一次触发因尚未选主而被跳过
+                self._tick(initial=True)
+                self._stop.clear()
+                self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="scheduler-lease", daemon=True)
+                self._heartbeat.start()
+            if not self.scheduler.running:
+                self.scheduler.start()
+            if self.should_fire():
+                self.sync_next_runs()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            self._stop.set()
+            self._heartbeat = None
+            if self.scheduler.running:
+                self.scheduler.shutdown(wait=wait)
+            if self.leader_election:
+                self.elector.release()
+            self._was_leader = False
+
+    def should_fire(self) -> bool:
+        """当前进程是否应执行到点的任务。"""
+        return not self.leader_election or self.elector.is_leader()
+
+    def add_reconciler(self, func: Callable[[], None]) -> None:
+        """注册领导者接管或任务变更后的对齐回调（重复注册只保留一次）。"""
+        with self._lock:
+            if func not in self._reconcilers:
+                self._reconcilers.append(func)
+
+    def notify_jobs_changed(self) -> None:
+        """非领导进程修改了任务定义时，通知领导者重新对齐。"""
+        if self.leader_election and not self.elector.is_leader():
+            self.elector.bump_generation()
+
+    def sync_next_runs(self) -> None:
+        next_runs = {
+            job.id: getattr(job, "next_run_time", None)
+            for job in self.scheduler.get_jobs()
+        }
+        if next_runs:
+            self.store.update_next_run(next_runs)
+
+    def status(self) -> dict:
+        return {
+            "leader_election": self.leader_election,
+            "leader": self.should_fire(),
+            "holder": self.elector.holder,
+            "current_leader": self.elector.current_holder() if self.leader_election else self.elector.holder,
+        }
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(1.0, self.elector.ttl_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                self._tick()
+            except Exception as e:
+                logger.error(f"Scheduler heartbeat failed: {str(e)}")
+
+    def _tick(self, initial: bool = False) -> None:
+        acquired = self.elector.try_acquire()
+        if acquired and not self._was_leader:
+            log_event(logger, E.SCHEDULER_LEADER_ACQUIRE, holder=self.elector.holder)
+        elif not acquired and self._was_leader:
+            log_event(logger, E.SCHEDULER_LEADER_LOSE, level="warning", holder=self.elector.holder)
+        gained = acquired and not self._was_leader
+        self._was_leader = acquired
+        if not acquired:
+            return
+        generation = self.elector.read_generation()
+        if initial:
+            # 进程刚启动，随后由调用方登记自己的任务，无需对齐
+            self._seen_generation = generation
+            return
+        if gained or generation != self._seen_generation:
+            self._seen_generation = generation
+            self._reconcile()
+            self.sync_next_runs()
+
+    def _reconcile(self) -> None:
+        with self._lock:
+            reconcilers = list(self._reconcilers)
+        log_event(logger, E.SCHEDULER_RECONCILE, holder=self.elector.holder, count=len(reconcilers))
+        for func in reconcilers:
+            try:
+                func()
+            except Exception as e:
+                logger.error(f"Scheduler reconcile failed: {str(e)}")
+
+
+_service: Optional[SchedulerService] = None
+_service_lock = threading.Lock()
+
+
+def get_scheduler_service() -> SchedulerService:
+    """返回进程内共享的调度服务（首次调用时创建）。"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = SchedulerService()
+    return _service
@@ -0,0 +1,146 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from core.log import logger
+from core.models.scheduler_job import SchedulerJob
+
+JOB_STATUS_SUCCESS = 1
+JOB_STATUS_FAILED = 2
+
+
+def to_local_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """APScheduler 返回带时区的时间，数据库统一按本地时间（无时区）存储。"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+class SchedulerJobStore:
+    """
+    调度任务持久化存储（scheduler_jobs 表）
+
+    保存任务定义以及下次执行时间、最近一次执行耗时/结果，所有进程可见。
+    写入均为尽力而为：数据库异常只记录日志，不影响任务调度本身。
+    """
+
+    def __init__(self, engine=None):
+        self._engine = engine
+
+    def _get_engine(self):
+        if self._engine is not None:
+            return self._engine
+        from core.db import DB
+        return DB.get_engine()
+
+    def _execute(self, stmt):
+        with self._get_engine().begin() as conn:
+            return conn.execute(stmt).rowcount
+
+    def save_definition(self, job_id: str, tag: str = "", cron_exp: str = "", jitter: int = 0) -> None:
+        """登记或更新任务定义，保留已有的执行统计。"""
+        now = datetime.now()
+        values = {
+            "tag": str(tag or "")[:100],
+            "cron_exp": str(cron_exp or "")[:100],
+            "jitter": int(jitter or 0),
+            "updated_at": now,
+        }
+        table = SchedulerJob.__table__
+        try:
+            rows = self._execute(update(table).where(table.c.job_id == job_id).values(**values))
+            if rows:
+                return
+            try:
+                self._execute(insert(table).values(job_id=job_id, run_count=0, created_at=now, **values))
+            except IntegrityError:
+                # 并发登记：其他进程已插入，改为更新
+                self._execute(update(table).where(table.c.job_id == job_id).values(**values))
+        except Exception as e:
+            logger.warning(f"Failed to save scheduler job {job_id}: {str(e)}")
+
+    def update_next_run(self, next_runs: Dict[str, Optional[datetime]]) -> None:
+        table = SchedulerJob.__table__
+        try:
+            for job_id, next_run in next_runs.items():
+                self._execute(
+                    update(table).where(table.c.job_id == job_id).values(next_run_at=to_local_naive(next_run))
+                )
+        except Exception as e:
+            logger.warning(f"Failed to update scheduler next run: {str(e)}")
+
+    def record_run(self,
+                   job_id: str,
+                   holder: str,
+                   started_at: datetime,
+                   duration_ms: int,
+                   ok: bool,
+                   error: str = "",
+                   next_run: Optional[datetime] = None) -> None:
+        """记录一次执行的开始时间、耗时与结果。"""
+        table = SchedulerJob.__table__
+        try:
+            self._execute(
+                update(table).where(table.c.job_id == job_id).values(
+                    last_run_at=started_at,
+                    last_duration_ms=int(duration_ms or 0),
+                    last_status=JOB_STATUS_SUCCESS if ok else JOB_STATUS_FAILED,
+                    last_error=str(error or "")[:500],
+                    last_holder=str(holder or "")[:255],
+                    run_count=func.coalesce(table.c.run_count, 0) + 1,
+                    next_run_at=to_local_naive(next_run),
+                    updated_at=datetime.now(),
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record scheduler run {job_id}: {str(e)}")
+
+    def remove(self, job_ids: Iterable[str]) -> None:
+        ids = [str(i) for i in job_ids if i]
+        if not ids:
+            return
+        table = SchedulerJob.__table__
+        try:
+            self._execute(delete(table).where(table.c.job_id.in_(ids)))
+        except Exception as e:
+            logger.warning(f"Failed to remove scheduler jobs: {str(e)}")
+
+    def get_many(self, job_ids: Iterable[str]) -> Dict[str, dict]:
+        """一次查询取回多个任务的调度信息。"""
+        ids = list({str(i) for i in job_ids if i})
+        if not ids:
+            return {}
+        table = SchedulerJob.__table__
+        try:
+            with self._get_engine().connect() as conn:
+                rows = conn.execute(select(table).where(table.c.job_id.in_(ids))).mappings().all()
+        except Exception as e:
+            logger.warning(f"Failed to load scheduler jobs: {str(e)}")
+            return {}
+        return {row["job_id"]: serialize_job_row(row) for row in rows}
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.get_many([job_id]).get(str(job_id))
+
+
+def serialize_job_row(row) -> dict:
+    def _iso(value):
+        return value.isoformat() if value else None
+
+    return {
+        "job_id": row["job_id"],
+        "tag": row["tag"] or "",
+        "cron_exp": row["cron_exp"] or "",
+        "jitter": int(row["jitter"] or 0),
+        "next_run_at": _iso(row["next_run_at"]),
+        "last_run_at": _iso(row["last_run_at"]),
+        "last_duration_ms": int(row["last_duration_ms"] or 0),
+        "last_status": int(row["last_status"] or 0),
+        "last_error": row["last_error"] or "",
+        "last_holder": row["last_holder"] or "",
+        "run_count": int(row["run_count"] or 0),
+    }
@@ -1,9 +1,11 @@
 import threading
 import random
-from apscheduler.schedulers.background import BackgroundScheduler
+import time
+from datetime import datetime
 from apscheduler.triggers.cron import CronTrigger
 from typing import Callable, Any, Optional
 from core.log import logger
+from .service import get_scheduler_service
 import uuid
 # 设置日志
 
@@ -42,13 +44,23 @@ class TaskScheduler:
         "30 * * * * *"  每分钟的第30秒执行 (6位)
         "0 0 0 * * *"   每天午夜执行 (6位)
         "0 0 9 * * MON" 每周一上午9点执行 (6位)
+
+    同一进程内的所有实例共享一个调度服务（见 core.task.service），每个实例只管理自己添加的任务。
+    distributed=True 时任务定义与执行统计写入 scheduler_jobs 表，且仅由当前领导者进程执行；
+    distributed=False 的任务只在本进程内调度（适用于已有其他互斥手段的任务）。
     """
     
-    def __init__(self):
+    def __init__(self, distributed: bool = True):
         """初始化调度器和线程锁"""
-        self._scheduler = BackgroundScheduler()
+        self._service = get_scheduler_service()
+        self._scheduler = self._service.scheduler
+        self._distributed = distributed
         self._lock = threading.Lock()
         self._jobs = {}
+        # job_id -> (最近一次开始时间, 耗时毫秒)
+        self._last_runs = {}
+        # job_id -> 调用方登记时给出的版本标识，用于增量对齐时判断任务是否变化
+        self._versions = {}
 
     def add_cron_job(self,
                      func: Callable,
@@ -56,7 +68,11 @@ class TaskScheduler:
                      args: Optional[tuple] = None,
                      kwargs: Optional[dict] = None,
                      job_id: Optional[str] = None,
-                     tag: str = ""
+                     tag: str = "",
+                     jitter: Optional[int] = None,
+                     misfire_grace_time: Optional[int] = None,
+                     coalesce: Optional[bool] = None,
+                     version: Any = None
                      ) -> str:
         """
         添加一个cron定时任务
@@ -65,7 +81,11 @@ class TaskScheduler:
         :param cron_expr: cron表达式，如"* * * * *"
         :param args: 函数的位置参数
         :param kwargs: 函数的关键字参数
-        :param job_id: 任务ID，如果不指定则自动生成
+        :param job_id: 任务ID，如果不指定则自动生成；已存在同ID任务时替换
+        :param jitter: 每次触发随机延后的最大秒数，用于打散同一时刻的大量任务，默认取 scheduler.jitter_seconds
+        :param misfire_grace_time: 错过触发时间后仍允许补执行的秒数，默认取 scheduler.misfire_grace_time
+        :param coalesce: 多次错过的触发是否合并为一次，默认取 scheduler.coalesce
+        :param version: 任务版本标识（如任务定义的更新时间），可由 get_job_versions 取回比对
         :return: 任务ID
         """
         with self._lock:
@@ -130,8 +150,11 @@ class TaskScheduler:
 
                 day_of_week = translate_day_of_week(day_of_week_original)
 
+                # 未指定 job_id 的匿名任务每次启动 ID 都不同，不写入 scheduler_jobs，避免重启后遗留无人清理的记录
+                persist = self._distributed and bool(job_id)
                 # 生成job_id
-                job_id = job_id or str(uuid.uuid4())
+                job_id = str(job_id or uuid.uuid4())
+                jitter = self._service.default_jitter if jitter is None else max(0, int(jitter))
 
                 trigger = CronTrigger(
                     second=second,
@@ -139,26 +162,63 @@ class TaskScheduler:
                     hour=hour,
                     day=day,
                     month=month,
-                    day_of_week=day_of_week
+                    day_of_week=day_of_week,
+                    jitter=jitter or None
                 )
                 
-                # 包装任务函数以捕获异常
+                service = self._service
+                distributed = self._distributed
+
+                # 包装任务函数以捕获异常，并记录执行耗时
                 def wrapped_func(*args, **kwargs):
+                    if distributed and not service.should_fire():
+                        logger.debug(f"Skip job {tag} {job_id}: not scheduler leader")
+                        return None
+                    started_at = datetime.now()
+                    started = time.perf_counter()
+                    error = ""
                     try:
                         # logger.info(f"Executing job {job_id or 'anonymous'}")
                         return func(*args, **kwargs)
                     except Exception as e:
+                        error = str(e)
                         logger.error(f"Job {tag} {job_id or 'anonymous'} failed: {str(e)}")
                         raise
+                    finally:
+                        duration_ms = int((time.perf_counter() - started) * 1000)
+                        self._last_runs[job_id] = (started_at, duration_ms)
+                        if distributed:
+                            current = service.scheduler.get_job(job_id)
+                            service.store.record_run(
+                                job_id,
+                                holder=service.elector.holder,
+                                started_at=started_at,
+                                duration_ms=duration_ms,
+                                ok=not error,
+                                error=error,
+                                next_run=getattr(current, "next_run_time", None) if current else None,
+                            )
                 
+                job_options = {}
+                if misfire_grace_time is not None:
+                    job_options["misfire_grace_time"] = int(misfire_grace_time)
+                if coalesce is not None:
+                    job_options["coalesce"] = bool(coalesce)
                 job = self._scheduler.add_job(
                     wrapped_func,
                     trigger=trigger,
                     args=args,
                     kwargs=kwargs,
-                    id=str(job_id)
+                    id=job_id,
+                    name=tag or job_id,
+                    replace_existing=True,
+                    **job_options
                 )
                 self._jobs[job.id] = job
+                self._versions[job.id] = version
+                if persist:
+                    service.store.save_definition(job.id, tag=tag, cron_exp=cron_expr, jitter=jitter)
+                    service.notify_jobs_changed()
                 logger.info(f"Successfully added job {tag} {job.id}")
                 return job.id
             except Exception as e:
@@ -186,6 +246,12 @@ class TaskScheduler:
             if job_id in self._jobs:
                 del self._jobs[job_id]
                 success = True
+            self._last_runs.pop(job_id, None)
+            self._versions.pop(job_id, None)
+
+            if success and self._distributed:
+                self._service.store.remove([job_id])
+                self._service.notify_jobs_changed()
                 
             return success
     
@@ -198,29 +264,33 @@ class TaskScheduler:
         with self._lock:
             job_count = len(self._jobs)
             if job_count > 0:
-                # 先终止所有正在运行的任务
-                for job in self._scheduler.get_jobs():
+                # 调度器为进程内共享，只移除本实例添加的任务
+                job_ids = list(self._jobs.keys())
+                for job_id in job_ids:
                     try:
-                        self._scheduler.remove_job(job.id)
+                        self._scheduler.remove_job(job_id)
                     except Exception as e:
-                        logger.warning(f"Failed to remove job {job.id}: {str(e)}")
+                        logger.warning(f"Failed to remove job {job_id}: {str(e)}")
                 
-                # 清除所有计划任务
-                self._scheduler.remove_all_jobs()
                 self._jobs.clear()
+                self._last_runs.clear()
+                self._versions.clear()
+                if self._distributed:
+                    self._service.store.remove(job_ids)
+                    self._service.notify_jobs_changed()
                 logger.info(f"Removed all {job_count} jobs")
             return job_count
     
     def start(self) -> None:
         """启动调度器"""
         with self._lock:
-            if self._scheduler.running:
+            if self._service.running:
                 logger.warning("Scheduler is already running")
                 return
                 
             try:
                 logger.info("Starting scheduler...")
-                self._scheduler.start()
+                self._service.start()
                 logger.info("Scheduler started successfully")
             except Exception as e:
                 logger.error(f"Failed to start scheduler: {str(e)}")
@@ -228,19 +298,31 @@ class TaskScheduler:
     
     def shutdown(self, wait: bool = True) -> None:
         """
-        关闭调度器
+        关闭调度器：移除本实例的任务，共享调度器上已无任务时一并停止
         
         :param wait: 是否等待所有任务完成
         """
+        self.clear_all_jobs()
         with self._lock:
-            if self._scheduler.running:
-                self._scheduler.shutdown(wait=wait)
-                self._jobs.clear()
+            if self._service.running and not self._scheduler.get_jobs():
+                self._service.shutdown(wait=wait)
     
+    def add_reconciler(self, func: Callable[[], None]) -> None:
+        """
+        注册任务对齐回调：当前进程成为领导者、或其他进程修改了任务后调用，
+        用于按数据库中的任务定义重新登记本实例的任务
+        """
+        self._service.add_reconciler(func)
+
     def get_job_ids(self) -> list[str]:
         """获取所有任务ID"""
         with self._lock:
             return list(self._jobs.keys())
+
+    def get_job_versions(self) -> dict:
+        """获取所有任务登记时的版本标识 {job_id: version}"""
+        with self._lock:
+            return {job_id: self._versions.get(job_id) for job_id in self._jobs}
     
     def __enter__(self):
         """支持上下文管理协议"""
@@ -258,14 +340,19 @@ class TaskScheduler:
         :return: 包含调度器状态的字典
         """
         with self._lock:
-            return {
+            status = {
                 'running': self._scheduler.running,
                 'job_count': len(self._jobs),
                 'next_run_times': [
-                    (job_id, job.next_run_time.isoformat() if job.next_run_time else None)
+                    (job_id, self._iso(getattr(job, 'next_run_time', None)))
                     for job_id, job in self._jobs.items()
-                ]
+                ],
+                'last_durations_ms': {
+                    job_id: duration_ms for job_id, (_, duration_ms) in self._last_runs.items()
+                },
             }
+        status.update(self._service.status())
+        return status
 
     def get_job_details(self, job_id: str) -> dict:
         """
@@ -274,19 +361,35 @@ class TaskScheduler:
         :param job_id: 任务ID
         :return: 包含任务详情的字典
         """
+        job_id = str(job_id)
         with self._lock:
             if job_id not in self._jobs:
                 raise ValueError(f"Job {job_id} not found")
             
             job = self._jobs[job_id]
-            return {
+            last_run = self._last_runs.get(job_id)
+            details = {
                 'id': job.id,
                 'name': job.name,
                 'trigger': str(job.trigger),
-                'next_run_time': job.next_run_time.isoformat() if job.next_run_time else None,
-                'last_run_time': job.last_run_time.isoformat() if job.last_run_time else None,
-                'last_run_result': job.last_run_result
+                'next_run_time': self._iso(getattr(job, 'next_run_time', None)),
+                'last_run_time': self._iso(last_run[0]) if last_run else None,
+                'last_duration_ms': last_run[1] if last_run else None,
             }
+        if self._distributed:
+            # 领导者可能在其他进程，执行统计以持久化记录为准
+            stored = self._service.store.get(job_id)
+            if stored:
+                details['last_run_time'] = stored['last_run_at'] or details['last_run_time']
+                details['last_duration_ms'] = stored['last_duration_ms'] if stored['last_run_at'] else details['last_duration_ms']
+                details['last_status'] = stored['last_status']
+                details['last_error'] = stored['last_error']
+                details['run_count'] = stored['run_count']
+        return details
+
+    @staticmethod
+    def _iso(value) -> Optional[str]:
+        return value.isoformat() if value else None
 
 if __name__ == "__main__":
     # 示例用法
@@ -298,4 +401,4 @@ if __name__ == "__main__":
         job_id = scheduler.add_cron_job(sample_task, "* * * * * *")
         print(f"已添加任务: {job_id}")
         input("按Enter键退出...\n")
-    pass
\ No newline at end of file
+    pass
\ No newline at end of file
@@ -0,0 +1,291 @@
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, or_, select, update
+
+from core.config import cfg
+from core.log import get_logger
+from core.models.tenant_purge_job import TenantPurgeJob
+
+logger = get_logger(__name__)
+
+PURGE_STATUS_PENDING = "pending"
+PURGE_STATUS_RUNNING = "running"
+PURGE_STATUS_DONE = "done"
+PURGE_STATUS_FAILED = "failed"
+PURGE_STATUS_ACTIVE = (PURGE_STATUS_PENDING, PURGE_STATUS_RUNNING)
+
+
+def _purge_steps() -> List[Tuple[str, object, str]]:
+    """(进度键, 表, 归属列)，按顺序清理；文章量最大，最先处理"""
+    from core.models.article import Article
+    from core.models.feed import Feed
+    from core.models.feed_stats import FeedStats
+    from core.models.wechat_auth import WechatAuth
+    from core.models.message_task import MessageTask
+    from core.models.message_task_log import MessageTaskLog
+    from core.models.tags import Tags
+    from core.models.analytics_event import AnalyticsEvent
+    from core.models.ai_profile import AIProfile
+    from core.models.ai_publish_task import AIPublishTask
+    from core.models.billing_order import BillingOrder
+    from core.models.content_backlog import ContentBacklog
+    from core.models.import_job import ImportJob
+    from core.models.tag_feed import TagFeed
+
+    return [
+        ("content_backlog", ContentBacklog.__table__, "owner_id"),
+        ("articles", Article.__table__, "owner_id"),
+        ("feed_stats", FeedStats.__table__, "owner_id"),
+        ("feeds", Feed.__table__, "owner_id"),
+        ("wechat_auths", WechatAuth.__table__, "owner_id"),
+        ("message_tasks", MessageTask.__table__, "owner_id"),
+        ("message_task_logs", MessageTaskLog.__table__, "owner_id"),
+        ("tag_feeds", TagFeed.__table__, "owner_id"),
+        ("tags", Tags.__table__, "owner_id"),
+        ("analytics_events", AnalyticsEvent.__table__, "owner_id"),
+        ("analytics_events_by_username", AnalyticsEvent.__table__, "username"),
+        ("ai_profiles", AIProfile.__table__, "owner_id"),
+        ("ai_publish_tasks", AIPublishTask.__table__, "owner_id"),
+        ("billing_orders", BillingOrder.__table__, "owner_id"),
+        ("import_jobs", ImportJob.__table__, "owner_id"),
+    ]
+
+
+def _engine():
+    from core.db import DB
+    return DB.get_engine()
+
+
+def _load_counts(raw) -> Dict[str, int]:
+    try:
+        data = json.loads(raw or "{}")
+        return {str(k): int(v) for k, v in data.items()} if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def serialize_purge_job(job) -> Optional[dict]:
+    if job is None:
+        return None
+    if hasattr(job, "_mapping"):
+        row = job._mapping
+    else:
+        row = {column.name: getattr(job, column.name, None) for column in TenantPurgeJob.__table__.columns}
+    deleted = _load_counts(row.get("deleted_json"))
+    steps = [key for key, _, _ in _purge_steps()]
+    step = row.get("step") or ""
+    done = row.get("status") == PURGE_STATUS_DONE
+    finished_steps = len(steps) if done else (steps.index(step) if step in steps else 0)
+
+    def _iso(value):
+        return value.isoformat() if isinstance(value, datetime) else None
+
+    return {
+        "id": row.get("id"),
+        "username": row.get("username"),
+        "status": row.get("status"),
+        "step": step,
+        "progress": {"finished_steps": finished_steps, "total_steps": len(steps)},
+        "deleted": deleted,
+        "deleted_total": sum(deleted.values()),
+        "error": row.get("error") or "",
+        "requested_by": row.get("requested_by") or "",
+        "created_at": _iso(row.get("created_at")),
+        "updated_at": _iso(row.get("updated_at")),
+        "started_at": _iso(row.get("started_at")),
+        "finished_at": _iso(row.get("finished_at")),
+    }
+
+
+def get_purge_job(username: str) -> Optional[dict]:
+    """返回该用户最近一次清理任务的进度"""
+    table = TenantPurgeJob.__table__
+    with _engine().connect() as conn:
+        row = conn.execute(
+            select(table).where(table.c.username == username).order_by(table.c.created_at.desc()).limit(1)
+        ).first()
+    return serialize_purge_job(row)
+
+
+def request_purge(session, username: str, requested_by: str = "") -> Optional[dict]:
+    """
+    立即停用用户并登记清理任务（已有未完成的任务时直接返回该任务，失败的任务重新排队）
+
+    用户不存在且没有清理记录时返回 None。
+    """
+    from core.models.user import User as DBUser
+
+    now = datetime.now()
+    user = session.query(DBUser).filter(DBUser.username == username).first()
+    job = session.query(TenantPurgeJob).filter(
+        TenantPurgeJob.username == username
+    ).order_by(TenantPurgeJob.created_at.desc()).first()
+    if user is None and (job is None or job.status == PURGE_STATUS_DONE):
+        return None
+    if user is not None:
+        user.is_active = False
+        user.bump_auth_version()
+        user.updated_at = now
+    if job is None or job.status == PURGE_STATUS_DONE:
+        job = TenantPurgeJob(
+            id=uuid.uuid4().hex,
+            username=username,
+            requested_by=requested_by or "",
+            status=PURGE_STATUS_PENDING,
+            step="",
+            deleted_json="{}",
+            created_at=now,
+            updated_at=now,
+        )
+        session.add(job)
+    elif job.status == PURGE_STATUS_FAILED:
+        job.status = PURGE_STATUS_PENDING
+        job.error = ""
+        job.updated_at = now
+    session.commit()
+    try:
+        from core.auth import clear_user_cache
+        clear_user_cache(username)
+    except Exception:
+        pass
+    return serialize_purge_job(job)
+
+
+class TenantPurger:
+    """
+    分批清理一个用户的关联数据
+
+    - 每批按主键选出 chunk_size 行再按主键删除，删除与进度写入在同一个短事务内提交；
+    - 批与批之间停顿 pause_seconds，给前台请求让出数据库；
+    - 通过条件更新认领任务：pending 或心跳超过 stale_seconds 的 running 任务才能被认领，
+      进程崩溃后由其他进程/重启后的后台任务续跑，已删除的数据不会重复计数。
+    """
+
+    def __init__(self, engine=None, chunk_size: Optional[int] = None, pause_seconds: Optional[float] = None,
+                 stale_seconds: Optional[int] = None, sleep=time.sleep):
+        self.engine = engine or _engine()
+        self.chunk_size = max(1, int(chunk_size or cfg.get("tenant_purge.chunk_size", 500) or 500))
+        self.pause_seconds = float(pause_seconds if pause_seconds is not None
+                                   else cfg.get("tenant_purge.pause_seconds", 0.1) or 0)
+        self.stale_seconds = max(30, int(stale_seconds or cfg.get("tenant_purge.stale_seconds", 300) or 300))
+        self._sleep = sleep
+
+    def claim(self, job_id: str) -> bool:
+        table = TenantPurgeJob.__table__
+        now = datetime.now()
+        stale_before = now - timedelta(seconds=self.stale_seconds)
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                update(table)
+                .where(table.c.id == job_id)
+                .where(or_(
+                    table.c.status == PURGE_STATUS_PENDING,
+                    (table.c.status == PURGE_STATUS_RUNNING) & (table.c.updated_at < stale_before),
+                ))
+                .values(status=PURGE_STATUS_RUNNING, updated_at=now, started_at=now, error="")
+            )
+        return (result.rowcount or 0) == 1
+
+    def runnable_job_ids(self) -> List[str]:
+        table = TenantPurgeJob.__table__
+        stale_before = datetime.now() - timedelta(seconds=self.stale_seconds)
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(table.c.id).where(or_(
+                    table.c.status == PURGE_STATUS_PENDING,
+                    (table.c.status == PURGE_STATUS_RUNNING) & (table.c.updated_at < stale_before),
+                )).order_by(table.c.created_at)
+            ).all()
+        return [str(row[0]) for row in rows]
+
+    def run(self, job_id: str) -> bool:
+        """认领并执行任务，未能认领（其他进程正在执行或已完成）时返回 False"""
+        if not self.claim(job_id):
+            return False
+        table = TenantPurgeJob.__table__
+        with self.engine.connect() as conn:
+            job = conn.execute(select(table).where(table.c.id == job_id)).first()
+        username = job.username
+        counts = _load_counts(job.deleted_json)
+        try:
+            for key, target, column in _purge_steps():
+                self._purge_step(job_id, username, key, target, column, counts)
+            self._finish(job_id, username, counts)
+        except Exception as e:
+            logger.exception("用户数据清理失败 %s: %s", username, e)
+            with self.engine.begin() as conn:
+                conn.execute(update(table).where(table.c.id == job_id).values(
+                    status=PURGE_STATUS_FAILED, error=str(e)[:2000], updated_at=datetime.now()))
+            return False
+        return True
+
+    def _purge_step(self, job_id: str, username: str, key: str, target, column: str,
+                    counts: Dict[str, int]) -> None:
+        jobs = TenantPurgeJob.__table__
+        pk = list(target.primary_key.columns)[0]
+        owner = target.c[column]
+        while True:
+            with self.engine.connect() as conn:
+                ids = [row[0] for row in conn.execute(
+                    select(pk).where(owner == username).limit(self.chunk_size)
+                ).all()]
+            if not ids:
+                with self.engine.begin() as conn:
+                    conn.execute(update(jobs).where(jobs.c.id == job_id).values(step=key, updated_at=datetime.now()))
+                return
+            with self.engine.begin() as conn:
+                deleted = conn.execute(delete(target).where(pk.in_(ids))).rowcount or 0
+                counts[key] = counts.get(key, 0) + deleted
+                conn.execute(update(jobs).where(jobs.c.id == job_id).values(
+                    step=key, deleted_json=json.dumps(counts), updated_at=datetime.now()))
+            if key == "feeds":
+                self._forget_feeds(ids)
+            if len(ids) < self.chunk_size:
+                return
+            if self.pause_seconds > 0:
+                self._sleep(self.pause_seconds)
+
+    @staticmethod
+    def _forget_feeds(feed_ids) -> None:
+        try:
+            from core.seen_index import get_seen_index
+            index = get_seen_index()
+            for feed_id in feed_ids:
+                index.forget(feed_id)
+        except Exception:
+            pass
+
+    def _finish(self, job_id: str, username: str, counts: Dict[str, int]) -> None:
+        from core.models.user import User as DBUser
+        users = DBUser.__table__
+        jobs = TenantPurgeJob.__table__
+        now = datetime.now()
+        with self.engine.begin() as conn:
+            counts["users"] = counts.get("users", 0) + (
+                conn.execute(delete(users).where(users.c.username == username)).rowcount or 0)
+            conn.execute(update(jobs).where(jobs.c.id == job_id).values(
+                status=PURGE_STATUS_DONE, step="", deleted_json=json.dumps(counts),
+                updated_at=now, finished_at=now))
+        try:
+            from core.auth import clear_user_cache
+            clear_user_cache(username)
+        except Exception:
+            pass
+        try:
+            # 用户的定时任务已删除，通知调度领导者重新对齐
+            from core.task.service import get_scheduler_service
+            get_scheduler_service().notify_jobs_changed()
+        except Exception:
+            pass
+
+
+def start_purge_async(job_id: str) -> threading.Thread:
+    """在当前进程后台执行清理，不阻塞请求线程"""
+    t = threading.Thread(target=TenantPurger().run, args=(job_id,), daemon=True, name=f"tenant-purge-{job_id[:8]}")
+    t.start()
+    return t
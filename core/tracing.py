@@ -0,0 +1,360 @@
+"""
+core/tracing.py — 轻量级分阶段 span 追踪
+
+特性：
+• start_span() 上下文管理器 / traced() 装饰器记录各阶段耗时，父子关系通过 ContextVar 自动传递
+• 跨线程（TaskQueue、创作 worker）时用 current_span_context() 取出父 span，新线程里 start_span(parent=...) 接上
+• 根 span 按 tracing.sample_rate 采样，子 span 沿用父 span 的采样结果；未采样的 span 只传播上下文、不导出
+• 采样的 span 按 OTLP/JSON（ExportTraceServiceRequest）格式逐行写入本地滚动文件，
+  可直接交给 OpenTelemetry Collector 的 otlpjsonfile receiver 读取
+• HTTP 请求头的 W3C traceparent 会被沿用，调用方的 trace 与服务端 span 串在一起
+
+使用方式：
+    from core.tracing import start_span, traced
+
+    with start_span("wx.list_page", attributes={"page": 1}) as span:
+        ...
+        span.set_attribute("items", 5)
+
+    @traced("ai.llm")
+    def call_llm(...): ...
+"""
+
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generator, List, Optional
+
+from core.config import cfg
+from core.log import get_trace_id
+
+_SPAN_KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+_STATUS_UNSET, _STATUS_OK, _STATUS_ERROR = 0, 1, 2
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    """跨线程/跨进程传递的 span 标识"""
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+
+def format_traceparent(context: Optional[SpanContext]) -> str:
+    """按 W3C traceparent 格式输出，context 为空时返回空串"""
+    if context is None:
+        return ""
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+
+def parse_traceparent(value: str) -> Optional[SpanContext]:
+    match = _TRACEPARENT_RE.match(str(value or "").strip().lower())
+    if not match or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return SpanContext(match.group(1), match.group(2), bool(int(match.group(3), 16) & 1))
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)[:1000]}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": str(k), "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+class Span:
+    """一个阶段的耗时记录；结束后由 Tracer 交给导出器"""
+
+    __slots__ = ("name", "context", "parent_span_id", "kind", "attributes", "events",
+                 "start_ns", "end_ns", "status_code", "status_message", "local_root")
+
+    def __init__(self, name: str, context: SpanContext, parent_span_id: str = "", kind: str = "internal",
+                 attributes: Optional[Dict[str, Any]] = None, local_root: bool = False):
+        self.name = name
+        self.context = context
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[Dict[str, Any]] = []
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status_code = _STATUS_UNSET
+        self.status_message = ""
+        self.local_root = local_root
+
+    @property
+    def recording(self) -> bool:
+        return self.context.sampled
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.context.sampled:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        if self.context.sampled:
+            self.attributes.update(attributes)
+
+    def set_status(self, ok: bool, message: str = "") -> None:
+        self.status_code = _STATUS_OK if ok else _STATUS_ERROR
+        self.status_message = str(message or "")[:500]
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.set_status(False, f"{type(exc).__name__}: {exc}")
+        if self.context.sampled:
+            self.events.append({
+                "timeUnixNano": str(time.time_ns()),
+                "name": "exception",
+                "attributes": _otlp_attributes({
+                    "exception.type": type(exc).__name__,
+                    "exception.message": str(exc)[:1000],
+                }),
+            })
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict[str, Any]:
+        data = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": _SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id:
+            data["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            data["status"]["message"] = self.status_message
+        if self.events:
+            data["events"] = self.events
+        return data
+
+
+class _NoopSpan:
+    """追踪关闭时使用，所有操作为空"""
+    context = None
+    recording = False
+    duration_ms = 0.0
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def set_status(self, ok: bool, message: str = "") -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class FileSpanExporter:
+    """把一批 span 写成一行 OTLP/JSON，文件按大小滚动"""
+
+    def __init__(self, path: str, max_bytes: int = 20 * 1024 * 1024, backup_count: int = 5,
+                 service_name: str = "content-studio"):
+        self.path = path
+        self.service_name = service_name
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max(1024, int(max_bytes)), backupCount=max(0, int(backup_count)), encoding="utf-8",
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        # 独立 logger，不向根日志器传播
+        self._logger = logging.Logger("core.tracing.export")
+        self._logger.propagate = False
+        self._logger.addHandler(self._handler)
+
+    def export(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({
+                    "service.name": self.service_name,
+                    "process.pid": os.getpid(),
+                })},
+                "scopeSpans": [{
+                    "scope": {"name": "core.tracing"},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }],
+        }
+        self._logger.info(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+
+    def close(self) -> None:
+        self._handler.close()
+
+
+class Tracer:
+    """
+    span 的创建、采样与批量导出
+
+    结束的采样 span 先放入缓冲，本线程内的根 span（无父 span 或父 span 来自其他线程）结束、
+    或缓冲达到 batch_size 时一起导出，一次任务的各阶段通常写在同一行。
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 0.1, exporter=None, batch_size: int = 256,
+                 rng: Optional[random.Random] = None):
+        self.enabled = bool(enabled)
+        self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        self.exporter = exporter
+        self.batch_size = max(1, int(batch_size))
+        self._rng = rng or random.Random()
+        self._pending: List[Span] = []
+        self._lock = threading.Lock()
+
+    def _new_id(self, bits: int) -> str:
+        return f"{self._rng.getrandbits(bits):0{bits // 4}x}"
+
+    def new_span(self, name: str, parent: Optional[SpanContext] = None, kind: str = "internal",
+                 attributes: Optional[Dict[str, Any]] = None) -> Span:
+        current = _current_span.get()
+        local_root = parent is not None or current is None
+        if parent is None and current is not None:
+            parent = current.context
+        if parent is None:
+            context = SpanContext(self._new_id(128), self._new_id(64), self._rng.random() < self.sample_rate)
+            parent_span_id = ""
+        else:
+            context = SpanContext(parent.trace_id, self._new_id(64), parent.sampled)
+            parent_span_id = parent.span_id
+        span = Span(name, context, parent_span_id, kind, attributes if context.sampled else None, local_root)
+        if local_root and context.sampled:
+            # 与日志中的 trace_id 关联，便于从日志行找到对应的 trace
+            span.attributes.setdefault("log.trace_id", get_trace_id())
+        return span
+
+    def end_span(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        if not span.context.sampled or self.exporter is None:
+            return
+        with self._lock:
+            self._pending.append(span)
+            if not span.local_root and len(self._pending) < self.batch_size:
+                return
+            batch, self._pending = self._pending, []
+        self._export(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, []
+        self._export(batch)
+
+    def _export(self, batch: List[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"span 导出失败: {e}")
+
+    @contextmanager
+    def start_span(self, name: str, parent: Optional[SpanContext] = None, kind: str = "internal",
+                   attributes: Optional[Dict[str, Any]] = None) -> Generator[Any, None, None]:
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        span = self.new_span(name, parent=parent, kind=kind, attributes=attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+
+def _tracer_from_config() -> Tracer:
+    enabled = str(cfg.get("tracing.enabled", False)).strip().lower() in ("1", "true", "yes", "on")
+    if not enabled:
+        return Tracer(enabled=False)
+    path = str(cfg.get("tracing.file", "data/traces/spans.jsonl") or "data/traces/spans.jsonl")
+    exporter = FileSpanExporter(
+        path,
+        max_bytes=int(cfg.get("tracing.max_bytes", 20 * 1024 * 1024) or 20 * 1024 * 1024),
+        backup_count=int(cfg.get("tracing.backup_count", 5) or 5),
+        service_name=str(cfg.get("tracing.service_name", "content-studio") or "content-studio"),
+    )
+    return Tracer(
+        enabled=True,
+        sample_rate=float(cfg.get("tracing.sample_rate", 0.1) or 0),
+        exporter=exporter,
+        batch_size=int(cfg.get("tracing.batch_size", 256) or 256),
+    )
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = _tracer_from_config()
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    """替换全局 Tracer（测试或运行时重新配置），返回原来的 Tracer"""
+    global _tracer
+    with _tracer_lock:
+        previous, _tracer = _tracer, tracer
+    return previous
+
+
+def start_span(name: str, parent: Optional[SpanContext] = None, kind: str = "internal",
+               attributes: Optional[Dict[str, Any]] = None):
+    """
+    开始一个 span；parent 为空时以当前上下文中的 span 为父 span。
+
+        with start_span("db.article_upsert", attributes={"mp_id": mp_id}) as span:
+            ...
+    """
+    return get_tracer().start_span(name, parent=parent, kind=kind, attributes=attributes)
+
+
+def current_span_context() -> Optional[SpanContext]:
+    """当前上下文中的 span 标识，交给其他线程作为 parent 使用"""
+    span = _current_span.get()
+    return span.context if span is not None else None
+
+
+def traced(name: str, kind: str = "internal") -> Callable:
+    """把整个函数调用记录为一个 span"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(name, kind=kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -6,14 +6,13 @@
 
 from pathlib import Path
 from typing import Dict, Optional
-import requests
 import json
-import time
 import re
 from bs4 import BeautifulSoup
 
 from core.image_service import ImageService
 from core.log import get_logger
+from core.wechat_token_service import get_wechat_token_service
 
 logger = get_logger(__name__)
 
@@ -38,40 +37,16 @@ class WeChatDraftService:
         self.app_id = app_id
         self.app_secret = app_secret
         self.owner_id = owner_id
-        self.token = None
-        self.token_expires_at = 0
+        self.token_service = get_wechat_token_service()
         self.image_service = ImageService(owner_id)
 
     def get_access_token(self) -> str:
-        """获取或刷新 Access Token"""
-        if self.token and time.time() < self.token_expires_at:
-            return self.token
-
-        appid = str(self.app_id or "").strip()
-        secret = str(self.app_secret or "").strip()
-        
-        # 日志记录尝试获取 token（脱敏处理）
-        masked_secret = f"{secret[:4]}***{secret[-4:]}" if len(secret) > 8 else "***"
-        logger.info(f"正在尝试为 AppID: {appid} 获取 access_token, Secret: {masked_secret}")
-
-        url = (
-            f"https://api.weixin.qq.com/cgi-bin/token"
-            f"?grant_type=client_credential"
-            f"&appid={appid}"
-            f"&secret={secret}"
-        )
-        resp = requests.get(url)
-        data = resp.json()
-
-        if 'access_token' in data:
-            self.token = data['access_token']
-            # 提前 5 分钟过期，防止临界点问题
-            self.token_expires_at = time.time() + data['expires_in'] - 300
-            logger.info(f"✅ 获取 Access Token 成功")
-            return self.token
-        else:
-            logger.error(f"获取 Token 失败: {data}")
-            raise Exception(f"获取 Token 失败: {data}")
+        """获取 Access Token（由共享 token 服务统一缓存与提前刷新）"""
+        token, err = self.token_service.get_token(self.app_id, self.app_secret)
+        if not token:
+            logger.error(f"获取 Token 失败: {err}")
+            raise Exception(f"获取 Token 失败: {err}")
+        return token
 
     def upload_cover_image(self, image_path: Path) -> str:
         """
@@ -84,10 +59,7 @@ class WeChatDraftService:
             media_id
         """
         token = self.get_access_token()
-        url = (
-            f"https://api.weixin.qq.com/cgi-bin/material/add_material"
-            f"?access_token={token}&type=image"
-        )
+        url = "https://api.weixin.qq.com/cgi-bin/material/add_material"
 
         # 压缩图片到 9MB 以内
         compressed_path = self.image_service.compress_local_file(
@@ -102,7 +74,7 @@ class WeChatDraftService:
             filename = compressed_path.name
             with open(compressed_path, 'rb') as f:
                 files = {'media': (filename, f, 'image/jpeg')}
-                resp = requests.post(url, files=files)
+                resp = self.token_service.post(url, token, params={"type": "image"}, files=files, timeout=(5, 40))
 
             result = resp.json()
 
@@ -126,10 +98,7 @@ class WeChatDraftService:
             微信 CDN URL，失败返回 None
         """
         token = self.get_access_token()
-        url = (
-            f"https://api.weixin.qq.com/cgi-bin/media/uploadimg"
-            f"?access_token={token}"
-        )
+        url = "https://api.weixin.qq.com/cgi-bin/media/uploadimg"
 
         # 下载并压缩（内存处理，不落盘）
         compressed_stream = self.image_service.download_and_compress(
@@ -145,7 +114,7 @@ class WeChatDraftService:
             import uuid
             filename = f"img_{uuid.uuid4().hex}.jpg"
             files = {'media': (filename, compressed_stream, 'image/jpeg')}
-            resp = requests.post(url, files=files)
+            resp = self.token_service.post(url, token, files=files, timeout=(5, 40))
             result = resp.json()
 
             if 'url' in result:
@@ -267,10 +236,7 @@ class WeChatDraftService:
         article_data['title'] = self._clean_title(raw_title, max_bytes=self.MAX_TITLE_BYTES)
 
         token = self.get_access_token()
-        url = (
-            f"https://api.weixin.qq.com/cgi-bin/draft/add"
-            f"?access_token={token}"
-        )
+        url = "https://api.weixin.qq.com/cgi-bin/draft/add"
 
         payload = {"articles": [article_data]}
 
@@ -279,7 +245,7 @@ class WeChatDraftService:
         headers = {'Content-Type': 'application/json; charset=utf-8'}
 
         try:
-            resp = requests.post(url, data=json_data, headers=headers)
+            resp = self.token_service.post(url, token, data=json_data, headers=headers, timeout=(5, 40))
             result = resp.json()
 
             if 'media_id' in result:
@@ -302,13 +268,13 @@ class WeChatDraftService:
             publish_id（微信异步任务ID）
         """
         token = self.get_access_token()
-        url = f"https://api.weixin.qq.com/cgi-bin/freepublish/submit?access_token={token}"
+        url = "https://api.weixin.qq.com/cgi-bin/freepublish/submit"
         payload = {"media_id": media_id}
         json_data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
         headers = {"Content-Type": "application/json; charset=utf-8"}
 
         try:
-            resp = requests.post(url, data=json_data, headers=headers)
+            resp = self.token_service.post(url, token, data=json_data, headers=headers, timeout=(5, 40))
             result = resp.json()
             errcode = result.get("errcode", 0)
             if errcode != 0:
@@ -0,0 +1,399 @@
+"""
+微信公众号 OpenAPI access_token 服务
+
+所有上传素材、提交草稿、群发的调用统一从这里取 token：
+- 按 app_id 缓存，进程内单飞（single-flight），并发调用只有一个线程请求 cgi-bin/token；
+- 通过 wechat_access_tokens 表跨进程共享，刷新租约保证同一时刻只有一个进程调用 cgi-bin/token；
+- 距过期不足 refresh_ahead_seconds 时提前刷新，刷新期间其他调用继续使用未过期的旧 token；
+- 接口返回 40001/42001 等 token 失效错误码时作废缓存，换新 token 重试一次。
+"""
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from core.cache import TTLCache
+from core.config import cfg
+from core.events import E, log_event
+from core.log import get_logger
+from core.models.wechat_token import WechatAccessToken
+from core.task.leader import default_holder_id
+from core.tracing import start_span
+
+logger = get_logger(__name__)
+
+TOKEN_URL = "https://api.weixin.qq.com/cgi-bin/token"
+# 40001 token 无效或已被刷新，40014 不合法的 token，42001 token 已过期
+INVALID_TOKEN_ERRCODES = frozenset({40001, 40014, 42001})
+
+# fetcher(app_id, app_secret) -> (access_token, expires_in, 错误信息)
+TokenFetcher = Callable[[str, str], Tuple[str, int, str]]
+
+
+def is_invalid_token_error(payload: Any) -> bool:
+    """接口返回是否为 access_token 失效类错误"""
+    if not isinstance(payload, dict):
+        return False
+    try:
+        return int(payload.get("errcode") or 0) in INVALID_TOKEN_ERRCODES
+    except (TypeError, ValueError):
+        return False
+
+
+def _secret_hash(secret: str) -> str:
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+
+def _response_json(resp) -> Any:
+    try:
+        return resp.json()
+    except Exception:
+        return None
+
+
+def _rewind_files(files) -> None:
+    """重试前把文件流指针移回开头，bytes 内容无需处理"""
+    values = files.values() if isinstance(files, dict) else (files or [])
+    for value in values:
+        stream = value[1] if isinstance(value, (tuple, list)) and len(value) > 1 else value
+        if hasattr(stream, "seek"):
+            try:
+                stream.seek(0)
+            except Exception:
+                pass
+
+
+@dataclass
+class _CachedToken:
+    token: str
+    expires_at: datetime
+    secret_hash: str
+
+
+class WechatTokenService:
+    """
+    access_token 获取顺序：进程内缓存 → 共享表 → 持有刷新租约后请求 cgi-bin/token。
+
+    未拿到租约且没有可用旧 token 的调用最多等待 wait_seconds 让持有者写回结果，
+    超时（持有者可能已崩溃）后自行获取。共享表不可用时退化为进程内缓存。
+    """
+
+    def __init__(self, engine=None, fetcher: Optional[TokenFetcher] = None,
+                 refresh_ahead_seconds: Optional[int] = None, lease_seconds: Optional[int] = None,
+                 wait_seconds: Optional[float] = None, poll_seconds: float = 0.2,
+                 holder: Optional[str] = None, http: Optional[requests.Session] = None,
+                 clock: Callable[[], datetime] = datetime.now, sleep: Callable[[float], None] = time.sleep):
+        if refresh_ahead_seconds is None:
+            refresh_ahead_seconds = cfg.get("wechat.token_refresh_ahead_seconds", 300)
+        self.refresh_ahead_seconds = max(0, int(refresh_ahead_seconds or 0))
+        self.lease_seconds = max(5, int(lease_seconds or cfg.get("wechat.token_lease_seconds", 30) or 30))
+        if wait_seconds is None:
+            wait_seconds = cfg.get("wechat.token_wait_seconds", 10)
+        self.wait_seconds = max(0.0, float(wait_seconds or 0))
+        self.poll_seconds = max(0.01, float(poll_seconds))
+        self.holder = holder or default_holder_id()
+        self.http = http or self._build_session()
+        self._engine = engine
+        self._fetcher = fetcher or self._fetch_from_wechat
+        self._clock = clock
+        self._sleep = sleep
+        self._memory: Dict[str, _CachedToken] = {}
+        self._secrets: Dict[str, str] = {}
+        # 已被替换的旧 token → app_id：持有旧 token 的调用方下次请求时直接换成新 token
+        self._retired = TTLCache(maxsize=1024, ttl=7200)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _get_engine(self):
+        if self._engine is not None:
+            return self._engine
+        from core.db import DB
+        return DB.get_engine()
+
+    def _lock_for(self, app_id: str) -> threading.Lock:
+        with self._guard:
+            lock = self._locks.get(app_id)
+            if lock is None:
+                lock = self._locks[app_id] = threading.Lock()
+            return lock
+
+    # ── 获取 ──
+    def get_token(self, app_id: str, app_secret: str) -> Tuple[str, str]:
+        """返回 (access_token, 错误信息)；获取失败时 token 为空串"""
+        appid = str(app_id or "").strip()
+        secret = str(app_secret or "").strip()
+        if not appid or not secret:
+            return "", "缺少 appid/appsecret"
+        secret_hash = _secret_hash(secret)
+        token = self._fresh(appid, secret_hash)
+        if token:
+            return token, ""
+        with self._lock_for(appid):
+            # 等锁期间其他线程可能已完成刷新
+            token = self._fresh(appid, secret_hash)
+            if token:
+                return token, ""
+            with self._guard:
+                self._secrets[appid] = secret
+            return self._refresh(appid, secret, secret_hash)
+
+    def _fresh(self, app_id: str, secret_hash: str) -> str:
+        cached = self._memory.get(app_id)
+        if cached is None or cached.secret_hash != secret_hash:
+            return ""
+        if cached.expires_at - timedelta(seconds=self.refresh_ahead_seconds) <= self._clock():
+            return ""
+        return cached.token
+
+    def _refresh(self, app_id: str, secret: str, secret_hash: str) -> Tuple[str, str]:
+        deadline = time.monotonic() + self.wait_seconds
+        ahead = timedelta(seconds=self.refresh_ahead_seconds)
+        while True:
+            now = self._clock()
+            usable = None
+            try:
+                row = self._load(app_id)
+                if row is not None and row.access_token and row.expires_at and row.secret_hash == secret_hash:
+                    if row.expires_at - ahead > now:
+                        self._remember(app_id, row.access_token, row.expires_at, secret_hash)
+                        return row.access_token, ""
+                    if row.expires_at > now:
+                        usable = row
+                claimed = self._claim(app_id, now)
+            except Exception as e:
+                logger.warning(f"access_token 共享缓存不可用，改为进程内获取: {e}")
+                return self._fetch(app_id, secret, secret_hash, shared=False)
+            if claimed:
+                return self._fetch(app_id, secret, secret_hash, fallback=usable)
+            if usable is not None:
+                # 其他进程正在提前刷新，旧 token 仍然有效
+                self._remember(app_id, usable.access_token, usable.expires_at, secret_hash)
+                return usable.access_token, ""
+            if time.monotonic() >= deadline:
+                logger.warning(f"等待 AppID {app_id} 的 access_token 刷新超时，改为自行获取")
+                return self._fetch(app_id, secret, secret_hash)
+            self._sleep(self.poll_seconds)
+
+    def _fetch(self, app_id: str, secret: str, secret_hash: str, fallback=None, shared: bool = True) -> Tuple[str, str]:
+        try:
+            token, expires_in, err = self._fetcher(app_id, secret)
+        except Exception as e:
+            token, expires_in, err = "", 0, f"获取 access_token 异常: {e}"
+        now = self._clock()
+        if not token:
+            log_event(logger, E.WECHAT_TOKEN_REFRESH_FAIL, app_id=app_id, reason=str(err)[:200])
+            if shared:
+                self._release(app_id)
+            if fallback is not None:
+                self._remember(app_id, fallback.access_token, fallback.expires_at, secret_hash)
+                return fallback.access_token, ""
+            return "", err or "获取 access_token 失败"
+        expires_in = max(60, int(expires_in or 7200))
+        expires_at = now + timedelta(seconds=expires_in)
+        if shared:
+            self._store(app_id, token, expires_at, secret_hash, now)
+        self._remember(app_id, token, expires_at, secret_hash)
+        log_event(logger, E.WECHAT_TOKEN_REFRESH, app_id=app_id, expires_in=expires_in)
+        return token, ""
+
+    def _fetch_from_wechat(self, app_id: str, secret: str) -> Tuple[str, int, str]:
+        # 日志记录尝试获取 token（脱敏处理）
+        masked_secret = f"{secret[:4]}***{secret[-4:]}" if len(secret) > 8 else "***"
+        logger.info(f"正在尝试为 AppID: {app_id} 获取 access_token, Secret: {masked_secret}")
+        params = {"grant_type": "client_credential", "appid": app_id, "secret": secret}
+        try:
+            resp = self.http.get(TOKEN_URL, params=params, timeout=(5, 25))
+        except Exception as e:
+            return "", 0, f"获取 access_token 异常: {e}"
+        if int(resp.status_code or 0) >= 400:
+            return "", 0, f"获取 access_token HTTP {resp.status_code}"
+        payload = _response_json(resp)
+        if not isinstance(payload, dict):
+            return "", 0, "获取 access_token 返回非 JSON"
+        token = str(payload.get("access_token") or "").strip()
+        if not token:
+            err = str(payload.get("errmsg") or payload.get("errcode") or payload)[:260]
+            return "", 0, f"获取 access_token 失败: {err}"
+        return token, int(payload.get("expires_in") or 7200), ""
+
+    def _remember(self, app_id: str, token: str, expires_at: datetime, secret_hash: str) -> None:
+        with self._guard:
+            previous = self._memory.get(app_id)
+            if previous is not None and previous.token != token:
+                self._retired.set(previous.token, app_id)
+            self._memory[app_id] = _CachedToken(token=token, expires_at=expires_at, secret_hash=secret_hash)
+
+    # ── 共享表 ──
+    def _load(self, app_id: str):
+        table = WechatAccessToken.__table__
+        with self._get_engine().connect() as conn:
+            return conn.execute(
+                select(table.c.access_token, table.c.expires_at, table.c.secret_hash).where(table.c.app_id == app_id)
+            ).first()
+
+    def _claim(self, app_id: str, now: datetime) -> bool:
+        """获取 app_id 的刷新租约；行不存在时插入，并发插入冲突视为未获取"""
+        table = WechatAccessToken.__table__
+        until = now + timedelta(seconds=self.lease_seconds)
+        try:
+            with self._get_engine().begin() as conn:
+                rows = conn.execute(
+                    update(table).where(
+                        table.c.app_id == app_id,
+                        or_(
+                            table.c.refresh_holder == self.holder,
+                            table.c.refreshing_until.is_(None),
+                            table.c.refreshing_until < now,
+                        ),
+                    ).values(refreshing_until=until, refresh_holder=self.holder, updated_at=now)
+                ).rowcount
+                if not rows:
+                    exists = conn.execute(select(table.c.app_id).where(table.c.app_id == app_id)).first()
+                    if exists is None:
+                        conn.execute(insert(table).values(
+                            app_id=app_id,
+                            secret_hash="",
+                            access_token="",
+                            refreshing_until=until,
+                            refresh_holder=self.holder,
+                            updated_at=now,
+                        ))
+                        rows = 1
+        except IntegrityError:
+            rows = 0
+        return bool(rows)
+
+    def _store(self, app_id: str, token: str, expires_at: datetime, secret_hash: str, now: datetime) -> None:
+        table = WechatAccessToken.__table__
+        values = dict(access_token=token, expires_at=expires_at, secret_hash=secret_hash,
+                      refreshing_until=None, refresh_holder="", updated_at=now)
+        try:
+            with self._get_engine().begin() as conn:
+                rows = conn.execute(update(table).where(table.c.app_id == app_id).values(**values)).rowcount
+                if not rows:
+                    conn.execute(insert(table).values(app_id=app_id, **values))
+        except Exception as e:
+            logger.warning(f"写入 AppID {app_id} 的共享 access_token 失败: {e}")
+
+    def _release(self, app_id: str) -> None:
+        table = WechatAccessToken.__table__
+        try:
+            with self._get_engine().begin() as conn:
+                conn.execute(update(table).where(
+                    table.c.app_id == app_id, table.c.refresh_holder == self.holder,
+                ).values(refreshing_until=None, refresh_holder=""))
+        except Exception as e:
+            logger.warning(f"释放 AppID {app_id} 的 access_token 刷新租约失败: {e}")
+
+    # ── 失效处理 ──
+    def _app_for(self, token: str) -> str:
+        with self._guard:
+            for app_id, cached in self._memory.items():
+                if cached.token == token:
+                    return app_id
+        return self._retired.get(token) or ""
+
+    def invalidate(self, app_id: str = "", token: str = "") -> None:
+        """
+        作废缓存的 access_token。
+
+        传入 token 时只在缓存的仍是该 token 时作废，避免把其他调用刚换到的新 token 作废。
+        """
+        appid = str(app_id or "").strip() or self._app_for(token)
+        if not appid:
+            return
+        with self._guard:
+            cached = self._memory.get(appid)
+            if cached is not None and (not token or cached.token == token):
+                del self._memory[appid]
+                self._retired.set(cached.token, appid)
+        table = WechatAccessToken.__table__
+        conditions = [table.c.app_id == appid]
+        if token:
+            conditions.append(table.c.access_token == token)
+        try:
+            with self._get_engine().begin() as conn:
+                conn.execute(update(table).where(*conditions).values(
+                    access_token="", expires_at=None, updated_at=self._clock(),
+                ))
+        except Exception as e:
+            logger.warning(f"作废 AppID {appid} 的共享 access_token 失败: {e}")
+        log_event(logger, E.WECHAT_TOKEN_INVALIDATE, app_id=appid)
+
+    def current(self, token: str) -> str:
+        """token 已被本进程替换时返回同一 app_id 的新 token，否则原样返回"""
+        appid = self._retired.get(token) if token else None
+        secret = self._secrets.get(appid) if appid else None
+        if not secret:
+            return token
+        fresh, _ = self.get_token(appid, secret)
+        return fresh or token
+
+    def renew(self, token: str) -> str:
+        """作废失效的 token 并换取同一 app_id 的新 token；来源未知时返回空串"""
+        appid = self._app_for(token)
+        secret = self._secrets.get(appid) if appid else None
+        if not secret:
+            return ""
+        self.invalidate(appid, token)
+        fresh, _ = self.get_token(appid, secret)
+        return fresh
+
+    # ── 带 token 的接口调用 ──
+    def request(self, method: str, url: str, access_token: str, **kwargs) -> requests.Response:
+        """
+        以 access_token 查询参数调用公众号接口（url 不含 access_token）。
+
+        返回 40001/42001 等错误码时作废该 token，换新 token 重试一次。
+        """
+        token = self.current(access_token)
+        resp = self._send(method, url, token, kwargs)
+        if is_invalid_token_error(_response_json(resp)):
+            fresh = self.renew(token)
+            if fresh and fresh != token:
+                _rewind_files(kwargs.get("files"))
+                resp = self._send(method, url, fresh, kwargs)
+        return resp
+
+    def post(self, url: str, access_token: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, access_token, **kwargs)
+
+    def _send(self, method: str, url: str, token: str, kwargs: Dict[str, Any]) -> requests.Response:
+        options = dict(kwargs)
+        options["params"] = {**(options.get("params") or {}), "access_token": token}
+        options.setdefault("timeout", (5, 40))
+        with start_span("wechat.openapi", kind="client",
+                        attributes={"http.request.method": method, "url.path": urlparse(url).path}) as span:
+            resp = self.http.request(method, url, **options)
+            span.set_attribute("http.response.status_code", resp.status_code)
+            return resp
+
+
+_service: Optional[WechatTokenService] = None
+_service_lock = threading.Lock()
+
+
+def get_wechat_token_service() -> WechatTokenService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = WechatTokenService()
+    return _service
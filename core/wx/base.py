@@ -11,6 +11,9 @@ from core.rss import RSS
 from driver.success import setStatus
 from driver.wxarticle import Web
 from core.wait import Wait
+from core.seen_index import get_seen_index
+from core.wx.governor import get_governor
+from core.tracing import start_span
 import random
 # 定义一些常见的 User-Agent
 USER_AGENTS = [
@@ -37,20 +40,43 @@ USER_AGENTS = [
 ]
 # 定义基类
 class WxGather:
-    articles=[]
-    aids=[]
     def all_count(self):
         if getattr(self, 'articles', None) is not None:
             return len(self.articles)
         return 0
-    def RecordAid(self,aid:str):
-        self.aids.append(aid)
-        pass
-    def HasGathered(self,aid:str):
-        if aid in self.aids:
-            return True
-        self.RecordAid(aid)
-        return False
+    def RecordAid(self,aid:str,mp_id:str=None):
+        get_seen_index().add(mp_id or self.mp_id,aid)
+    def HasGathered(self,aid:str,mp_id:str=None):
+        # 按公众号的已采集索引判断（进程内共享，首次访问时从文章表预热）
+        return get_seen_index().contains(mp_id or self.mp_id,aid)
+    def PageKnown(self,aids:list,mp_id:str=None):
+        """整页文章都已采集过时返回 True，调用方据此停止翻页"""
+        if not cfg.get("gather.stop_on_known_page",True):
+            return False
+        return get_seen_index().all_known(mp_id or self.mp_id,aids)
+    def GatherItem(self,item:dict,Mps_id:str,Mps_title:str="",CallBack=None,Gather_Content=False):
+        """处理列表中的一篇文章：已采集过的直接跳过，返回是否为新文章"""
+        if self.item_hook is not None:
+            # 上游共享采集：记录列表中的每一篇（含已采集的），供订阅同一公众号的其他用户复用；
+            # 已采集过的文章不会抓正文，没有 content 键，由 FanOut 按需补抓
+            self.item_hook(item)
+        if self.HasGathered(item["aid"],mp_id=Mps_id):
+            return False
+        if Gather_Content:
+            self.FetchContent(item,Mps_id)
+        else:
+            item["content"] = ""
+        item["id"] = item["aid"]
+        item["mp_id"] = Mps_id
+        if CallBack is not None:
+            self.FillBack(CallBack=CallBack,data=item,Ext_Data={"mp_title":Mps_title,"mp_id":Mps_id})
+        return True
+    def FetchContent(self,item:dict,Mps_id:str):
+        """抓取文章正文写入 item["content"]"""
+        self.Throttle(min=3,max=10,tips=f"{item['title']} 采集前")
+        with start_span("wx.content_fetch", attributes={"mp_id": Mps_id, "aid": item["aid"]}) as span:
+            item["content"] = self.content_extract(item['link'])
+            span.set_attribute("content_bytes", len(item["content"] or ""))
     def Model(self,type=None):
         type=type or cfg.get("gather.model","web")
         print(f"采集模式:{type}")
@@ -72,6 +98,10 @@ class WxGather:
         return wx
     def __init__(self,is_add:bool=False):
         self.articles=[]
+        self.mp_id=""
+        self.item_hook=None
+        # 最近一次 get_Articles 是否完整翻到 MaxPage 或列表末尾（未因已采集页、错误提前停止）
+        self.crawl_complete=False
         self.is_add=is_add
         self._cookies={}
         self._runtime_token = ""
@@ -96,8 +126,9 @@ class WxGather:
                 "User-Agent": self.user_agent
             }
     def get_token(self):
-        cfg.reload()
-        wx_cfg.reload()
+        # 仅在配置文件变化时重新加载
+        cfg.refresh()
+        wx_cfg.refresh()
         self.Gather_Content=cfg.get('gather.content',False)
         if self._runtime_token and self._runtime_cookie:
             self.cookies = self._runtime_cookie
@@ -142,6 +173,28 @@ class WxGather:
         wait=random.randint(min,max)
         print_warning(f"{tips}等待{wait}秒后继续...")
         time.sleep(wait)
+    def Governed(self):
+        """是否由按授权共享的令牌桶控制请求节奏（关闭时退回固定随机等待）"""
+        return bool(cfg.get("gather.governor.enabled",True))
+    @property
+    def governor(self):
+        return get_governor(self.token,self.cookies)
+    def Throttle(self,min=0,max=10,tips:str=""):
+        """请求公众号平台前调用：按授权的令牌桶等待，未启用时随机等待 min~max 秒"""
+        if not self.Governed():
+            self.Wait(min,max,tips=tips)
+            return
+        waited=self.governor.acquire()
+        if waited>=1:
+            print_info(f"{tips}限速等待{waited:.1f}秒")
+    def Observe(self,msg:dict):
+        """根据接口返回码调整该授权的请求速率（频控时降速并冷却）"""
+        if not self.Governed():
+            return
+        try:
+            self.governor.observe(msg['base_resp']['ret'])
+        except (KeyError, TypeError):
+            pass
 
     def FillBack(self,CallBack=None,data=None,Ext_Data=None):
         if CallBack is not None:
@@ -160,7 +213,11 @@ class WxGather:
                 }
                 if 'digest' in data:
                     art['description']=data['digest']
-                if CallBack(art):
+                with start_span("db.article_upsert", attributes={"mp_id": data['mp_id'], "aid": str(data['id'])}) as span:
+                    saved = CallBack(art)
+                    span.set_attribute("inserted", bool(saved))
+                if saved:
+                    self.RecordAid(data['id'],mp_id=data['mp_id'])
                     art["ext"]=Ext_Data
                     # art.pop("content")
                     self.articles.append(art)
@@ -203,6 +260,8 @@ class WxGather:
             return
         data={}
         try:
+            if self.Governed():
+                self.governor.acquire()
             response = requests.get(
             url,
             params=params,
@@ -211,6 +270,7 @@ class WxGather:
             response.raise_for_status()  # 检查状态码是否为200
             data = response.text  # 解析JSON数据
             msg = json.loads(data)  # 手动解析
+            self.Observe(msg)
             if msg['base_resp']['ret'] == 200013:
                 self.Error("frequencey control, stop at {}".format(str(kw)))
                 return
@@ -228,6 +288,9 @@ class WxGather:
     
     def Start(self,mp_id=None,token: str = "", cookie: str = "", user_agent: str = ""):
         self.articles=[]
+        self.crawl_complete=False
+        self.mp_id=mp_id or ""
+        get_seen_index().warm(self.mp_id)
         if token and cookie:
             self.set_runtime_auth(token=token, cookie=cookie, user_agent=user_agent)
         self.get_token()
@@ -241,13 +304,42 @@ class WxGather:
           update_time=int(time.time()),
         ))
 
+    def FanOut(self,items:list,Mps_id:str,Mps_title:str="",CallBack=None,Over_CallBack=None,Gather_Content=False):
+        """
+        把同一公众号已抓取的文章列表写入当前订阅（不再请求公众号平台的列表接口）
+
+        items 为共享采集时记录的列表项，已采集过的文章跳过，其余按正常采集流程回调入库。
+        首个订阅已采集过的文章在共享列表中没有正文，采集正文时在这里补抓，并写回共享列表供后续订阅复用。
+        """
+        if self.Gather_Content:
+            Gather_Content=True
+        self.articles=[]
+        self.mp_id=Mps_id or ""
+        self.start_time=time.time()
+        self.update_mps(Mps_id,Feed(
+          sync_time=int(time.time()),
+          update_time=int(time.time()),
+        ))
+        for item in items:
+            if self.HasGathered(item["aid"],mp_id=Mps_id):
+                continue
+            if Gather_Content and "content" not in item:
+                self.FetchContent(item,Mps_id)
+            data=dict(item)
+            data.setdefault("content","")
+            data["id"]=data["aid"]
+            data["mp_id"]=Mps_id
+            self.FillBack(CallBack=CallBack,data=data,Ext_Data={"mp_title":Mps_title,"mp_id":Mps_id})
+        self.Over(CallBack=Over_CallBack)
+        return len(self.articles)
     def Item_Over(self,item=None,CallBack=None):
         print(f"item end")
         _cookies=[{'name': c.name, 'value': c.value, 'domain': c.domain,'expiry':c.expires,'expires':c.expires} for c in self._cookies]
         _cookies.append({'name':'token','value':self.token})
         if CallBack is not None:
             CallBack(item)
-        self.Wait(tips=f"{item['mps_title']} 处理完成",min=3,max=10)
+        if not self.Governed():
+            self.Wait(tips=f"{item['mps_title']} 处理完成",min=3,max=10)
         pass
     def Error(self,error:str,code=None):
         self.Over()
@@ -255,8 +347,9 @@ class WxGather:
             from jobs.failauth import send_wx_code
             import threading
             setStatus(False)
-            from core.queue import TaskQueue
-            TaskQueue.clear_queue()
+            from core.queue import TaskQueue, current_task_owner
+            # 只清空当前授权所属用户的积压任务；不在队列任务中调用时清空全部
+            TaskQueue.clear_queue(owner_id=current_task_owner())
             threading.Thread(target=send_wx_code,args=(f"公众号平台登录失效,请重新登录",)).start()
             # send_wx_code(f"公众号平台登录失效,请重新登录")
             raise Exception(error)
@@ -314,7 +407,8 @@ class WxGather:
                 Wait(tips="当前环境异常，完成验证后即可继续访问")
                 html_content=""
         else:
-            html_content=Web.clean_article_content(html_content)
+            with start_span("wx.html_clean", attributes={"input_bytes": len(html_content or "")}):
+                html_content=Web.clean_article_content(html_content)
         return html_content
 
     # 更新公众号更新状态
@@ -0,0 +1,150 @@
+import hashlib
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from core.config import cfg
+from core.events import log_event, E
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+# 公众号平台频率控制返回码
+FREQ_CONTROL_CODES = (200013,)
+
+
+def credential_key(token: str, cookie: str) -> str:
+    """按 token/cookie 计算授权标识（不保存原文）"""
+    raw = f"{token or ''}\n{cookie or ''}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+class RequestGovernor:
+    """
+    单个授权的自适应令牌桶
+
+    - 每次请求前 acquire() 取一个令牌，令牌不足时等待，同一授权的所有抓取线程共享；
+    - 连续成功 success_streak 次后速率加 increase_per_minute（加性增）；
+    - 遇到频率控制时速率乘以 decrease_factor（乘性减），清空令牌并进入冷却，
+      连续触发时冷却时间指数增长，直到再次成功。
+    """
+
+    def __init__(self, key: str = "", rate_per_minute: Optional[float] = None,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.monotonic):
+        self.key = key
+        self.min_rate = float(cfg.get("gather.governor.min_rate_per_minute", 2) or 2) / 60
+        self.max_rate = float(cfg.get("gather.governor.max_rate_per_minute", 30) or 30) / 60
+        initial = rate_per_minute or cfg.get("gather.governor.initial_rate_per_minute", 12) or 12
+        self.rate = min(self.max_rate, max(self.min_rate, float(initial) / 60))
+        self.burst = max(1.0, float(cfg.get("gather.governor.burst", 2) or 2))
+        self.increase = float(cfg.get("gather.governor.increase_per_minute", 1) or 1) / 60
+        self.success_streak = max(1, int(cfg.get("gather.governor.success_streak", 5) or 5))
+        self.decrease_factor = min(0.9, max(0.1, float(cfg.get("gather.governor.decrease_factor", 0.5) or 0.5)))
+        self.cooldown_base = float(cfg.get("gather.governor.cooldown_base_seconds", 60) or 60)
+        self.cooldown_max = float(cfg.get("gather.governor.cooldown_max_seconds", 1800) or 1800)
+        self.jitter = min(1.0, max(0.0, float(cfg.get("gather.governor.jitter", 0.2) or 0)))
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated_at = clock()
+        self._cooldown_until = 0.0
+        self._successes = 0
+        self._strikes = 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def reserve(self) -> float:
+        """预定一个令牌，返回需要等待的秒数（不阻塞）"""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            wait = max(wait, self._cooldown_until - now)
+        if wait > 0 and self.jitter:
+            # 小幅随机抖动，避免多个线程同时醒来
+            wait += random.uniform(0, self.jitter / self.rate)
+        return wait
+
+    def acquire(self) -> float:
+        """阻塞直到可以发起下一次请求，返回实际等待秒数"""
+        wait = self.reserve()
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._strikes = 0
+            self._successes += 1
+            if self._successes >= self.success_streak:
+                self._successes = 0
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_rate_limited(self) -> float:
+        """记录一次频率控制，返回本次冷却秒数"""
+        with self._lock:
+            self._successes = 0
+            self._strikes += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            cooldown = min(self.cooldown_max, self.cooldown_base * (2 ** (self._strikes - 1)))
+            now = self._clock()
+            self._refill(now)
+            self._tokens = 0.0
+            self._cooldown_until = max(self._cooldown_until, now + cooldown)
+            strikes = self._strikes
+            rate = self.rate
+        log_event(logger, E.FEED_SYNC_THROTTLE, level="warning", credential=self.key,
+                  strikes=strikes, cooldown=f"{cooldown:.0f}s", rate=f"{rate * 60:.1f}/min")
+        return cooldown
+
+    def observe(self, ret_code) -> None:
+        """根据公众号平台返回码调整速率：频控降速冷却，正常返回视为成功"""
+        try:
+            code = int(ret_code)
+        except (TypeError, ValueError):
+            return
+        if code in FREQ_CONTROL_CODES:
+            self.on_rate_limited()
+        elif code == 0:
+            self.on_success()
+
+    def status(self) -> dict:
+        with self._lock:
+            now = self._clock()
+            return {
+                "credential": self.key,
+                "rate_per_minute": round(self.rate * 60, 2),
+                "tokens": round(min(self.burst, self._tokens + max(0.0, now - self._updated_at) * self.rate), 2),
+                "cooldown_seconds": round(max(0.0, self._cooldown_until - now), 1),
+                "strikes": self._strikes,
+            }
+
+
+_governors: Dict[str, RequestGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(token: str, cookie: str) -> RequestGovernor:
+    """返回该授权共享的令牌桶（同一 token/cookie 的所有抓取线程共用）"""
+    key = credential_key(token, cookie)
+    governor = _governors.get(key)
+    if governor is not None:
+        return governor
+    with _governors_lock:
+        governor = _governors.get(key)
+        if governor is None:
+            governor = RequestGovernor(key=key)
+            _governors[key] = governor
+        return governor
+
+
+def governors_status() -> list:
+    with _governors_lock:
+        governors = list(_governors.values())
+    return [g.status() for g in governors]
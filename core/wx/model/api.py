@@ -6,6 +6,7 @@ import yaml
 import re
 from bs4 import BeautifulSoup
 from core.wx.base import WxGather
+from core.tracing import start_span
 from core.print import print_error
 from core.log import logger
 # 继承 BaseGather 类
@@ -45,17 +46,20 @@ class MpsApi(WxGather):
         i = start_page
         while True:
             if i >= MaxPage:
+                self.crawl_complete=True
                 break
             begin = i * count
             params["begin"] = str(begin)
             print(f"第{i+1}页开始爬取\n")
-            # 随机暂停几秒，避免过快的请求导致过快的被查到
-            time.sleep(random.randint(0,interval))
+            # 按授权共享的令牌桶控制请求节奏（未启用时随机暂停 0~interval 秒）
+            super().Throttle(0,interval,tips=f"第{i+1}页")
             try:
                 headers = self.fix_header(url)
-                resp = session.get(url, headers=headers, params = params, verify=False)
-                
-                msg = resp.json()
+                with start_span("wx.list_page", kind="client", attributes={"mp_id": Mps_id, "page": i + 1}) as span:
+                    resp = session.get(url, headers=headers, params = params, verify=False)
+                    span.set_attribute("http.response.status_code", resp.status_code)
+                    msg = resp.json()
+                super().Observe(msg)
 
                 self._cookies=resp.cookies
                 # 流量控制了, 退出
@@ -69,26 +73,23 @@ class MpsApi(WxGather):
                 
                 # 如果返回的内容中为空则结束
                 if 'app_msg_list' not in msg:
+                    self.crawl_complete=True
                     super().Error("all ariticle parsed")
                     break
                 if msg['base_resp']['ret'] != 0:
                     super().Error("错误原因:{}:代码:{}".format(msg['base_resp']['err_msg'],msg['base_resp']['ret']),code=msg['base_resp']['err_msg'])
                     break    
                 if "app_msg_list" in msg:
+                    # 整页都是已采集文章时，后面的页只会更旧，无需继续翻页
+                    page_known = super().PageKnown([item["aid"] for item in msg["app_msg_list"]], mp_id=Mps_id)
                     for item in msg["app_msg_list"]:
-                        time.sleep(random.randint(1,3))
                         # info = '"{}","{}","{}","{}"'.format(str(item["aid"]), item['title'], item['link'], str(item['create_time']))
-                        if Gather_Content:
-                            if not super().HasGathered(item["aid"]):
-                                item["content"] = self.content_extract(item['link'])
-                                super().Wait(3,10,tips=f"{item['title']} 采集完成")
-                        else:
-                            item["content"] = ""
-                        item["id"] = item["aid"]
-                        item["mp_id"] = Mps_id
-                        if CallBack is not None:
-                            super().FillBack(CallBack=CallBack,data=item,Ext_Data={"mp_title":Mps_title,"mp_id":Mps_id})
+                        if super().GatherItem(item, Mps_id, Mps_title, CallBack=CallBack, Gather_Content=Gather_Content) and not super().Governed():
+                            time.sleep(random.randint(1,3))
                     print(f"第{i+1}页爬取成功\n")
+                    if page_known:
+                        print(f"第{i+1}页文章均已采集，停止翻页\n")
+                        break
                 # 翻页
                 i += 1
             except requests.exceptions.Timeout:
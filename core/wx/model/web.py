@@ -6,6 +6,7 @@ import yaml
 import re
 from bs4 import BeautifulSoup
 from core.wx.base import WxGather
+from core.tracing import start_span
 from core.print import print_error
 from core.log import logger
 # 继承 BaseGather 类
@@ -49,17 +50,20 @@ class MpsWeb(WxGather):
         i = start_page
         while True:
             if i >= MaxPage:
+                self.crawl_complete=True
                 break
             begin = i * count
             params["begin"] = str(begin)
             print(f"第{i+1}页开始爬取\n")
-            # 随机暂停几秒，避免过快的请求导致过快的被查到
-            time.sleep(random.randint(0,interval))
+            # 按授权共享的令牌桶控制请求节奏（未启用时随机暂停 0~interval 秒）
+            super().Throttle(0,interval,tips=f"第{i+1}页")
             try:
                 headers = self.fix_header(url)
-                resp = session.get(url, headers=headers, params = params, verify=False)
-                
-                msg = resp.json()
+                with start_span("wx.list_page", kind="client", attributes={"mp_id": Mps_id, "page": i + 1}) as span:
+                    resp = session.get(url, headers=headers, params = params, verify=False)
+                    span.set_attribute("http.response.status_code", resp.status_code)
+                    msg = resp.json()
+                super().Observe(msg)
                 self._cookies =resp.cookies
                 # 流量控制了, 退出
                 if msg['base_resp']['ret'] == 200013:
@@ -74,6 +78,7 @@ class MpsWeb(WxGather):
                     break    
                 # 如果返回的内容中为空则结束
                 if 'publish_page' not in msg:
+                    self.crawl_complete=True
                     super().Error("all ariticle parsed")
                     break
                 if msg['base_resp']['ret'] != 0:
@@ -81,24 +86,22 @@ class MpsWeb(WxGather):
                     break  
                 if "publish_page" in msg:
                     msg["publish_page"]=json.loads(msg['publish_page'])
+                    page_items=[]
                     for item in msg["publish_page"]['publish_list']:
                         if "publish_info" in item:
                             publish_info= json.loads(item['publish_info'])
                        
                             if "appmsgex" in publish_info:
-                                # info = '"{}","{}","{}","{}"'.format(str(item["aid"]), item['title'], item['link'], str(item['create_time']))
-                                for item in publish_info["appmsgex"]:
-                                    if Gather_Content:
-                                        if not super().HasGathered(item["aid"]):
-                                            item["content"] = self.content_extract(item['link'])
-                                            super().Wait(3,10,tips=f"{item['title']} 采集完成")
-                                    else:
-                                        item["content"] = ""
-                                    item["id"] = item["aid"]
-                                    item["mp_id"] = Mps_id
-                                    if CallBack is not None:
-                                        super().FillBack(CallBack=CallBack,data=item,Ext_Data={"mp_title":Mps_title,"mp_id":Mps_id})
+                                page_items.extend(publish_info["appmsgex"])
+                    # 整页都是已采集文章时，后面的页只会更旧，无需继续翻页
+                    page_known = super().PageKnown([item["aid"] for item in page_items], mp_id=Mps_id)
+                    for item in page_items:
+                        # info = '"{}","{}","{}","{}"'.format(str(item["aid"]), item['title'], item['link'], str(item['create_time']))
+                        super().GatherItem(item, Mps_id, Mps_title, CallBack=CallBack, Gather_Content=Gather_Content)
                     print(f"第{i+1}页爬取成功\n")
+                    if page_known:
+                        print(f"第{i+1}页文章均已采集，停止翻页\n")
+                        break
                 # 翻页
                 i += 1
             except requests.exceptions.Timeout:
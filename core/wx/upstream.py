@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.config import cfg
+from core.events import log_event, E
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class UpstreamCrawlCache:
+    """
+    按公众号（faker_id）共享的上游抓取结果
+
+    订阅同一公众号的多个用户各自拥有独立的 Feed（MP_WXS_{owner_id}_{biz}），
+    同一时间窗口内只由第一个任务请求公众号平台，其余任务直接复用抓到的列表与正文。
+    """
+
+    def __init__(self, window_seconds: Optional[float] = None, max_entries: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window_seconds = float(window_seconds if window_seconds is not None
+                                    else cfg.get("gather.upstream.window_seconds", 300) or 0)
+        self.max_entries = max(1, int(max_entries or cfg.get("gather.upstream.max_entries", 500) or 500))
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[dict]]]" = OrderedDict()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def lock(self, faker_id: str) -> threading.Lock:
+        """同一公众号的抓取串行执行，后到的任务等待并复用结果"""
+        with self._lock:
+            lock = self._locks.get(faker_id)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[faker_id] = lock
+            return lock
+
+    def get(self, faker_id: str, max_page: int) -> Optional[List[dict]]:
+        with self._lock:
+            entry = self._entries.get((faker_id, max_page))
+            if entry is None:
+                return None
+            fetched_at, items = entry
+            if self._clock() - fetched_at > self.window_seconds:
+                self._entries.pop((faker_id, max_page), None)
+                return None
+            return items
+
+    def put(self, faker_id: str, max_page: int, items: List[dict]) -> None:
+        if self.window_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[(faker_id, max_page)] = (self._clock(), list(items))
+            self._entries.move_to_end((faker_id, max_page))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_cache: Optional[UpstreamCrawlCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_upstream_cache() -> UpstreamCrawlCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = UpstreamCrawlCache()
+    return _cache
+
+
+def crawl_feed(wx, feed, CallBack=None, Over_CallBack=None, MaxPage: int = 1, interval=10,
+               token: str = "", cookie: str = "", user_agent: str = "") -> bool:
+    """
+    抓取一个订阅：窗口内已有同一公众号的抓取结果时直接写入该订阅，否则请求公众号平台并缓存结果
+
+    返回 True 表示复用了共享结果（未请求公众号平台）。
+    """
+    faker_id = str(getattr(feed, "faker_id", "") or "")
+    if not faker_id or not cfg.get("gather.upstream.enabled", True):
+        wx.get_Articles(faker_id, CallBack=CallBack, Mps_id=feed.id, Mps_title=feed.mp_name, MaxPage=MaxPage,
+                        Over_CallBack=Over_CallBack, interval=interval, token=token, cookie=cookie,
+                        user_agent=user_agent)
+        return False
+    cache = get_upstream_cache()
+    with cache.lock(faker_id):
+        items = cache.get(faker_id, MaxPage)
+        if items is not None:
+            count = wx.FanOut(items, Mps_id=feed.id, Mps_title=feed.mp_name, CallBack=CallBack,
+                              Over_CallBack=Over_CallBack)
+            log_event(logger, E.FEED_SYNC_SHARED, mp=feed.mp_name, mp_id=feed.id, items=len(items), count=count)
+            return True
+        items = []
+        wx.item_hook = items.append
+        try:
+            wx.get_Articles(faker_id, CallBack=CallBack, Mps_id=feed.id, Mps_title=feed.mp_name, MaxPage=MaxPage,
+                            Over_CallBack=Over_CallBack, interval=interval, token=token, cookie=cookie,
+                            user_agent=user_agent)
+        finally:
+            wx.item_hook = None
+        # 只缓存完整翻到 MaxPage 或列表末尾的结果；因已采集页提前停止、授权失效、频控等截断的列表
+        # 对其他订阅不完整，由其他订阅自行抓取
+        if items and getattr(wx, "crawl_complete", False):
+            cache.put(faker_id, MaxPage, items)
+        return False
@@ -25,7 +25,8 @@ def auth():
         pass
 if str(os.getenv('WE_RSS.AUTH',False))=="True":
     print_warning("启动授权定时任务")
-    auth_task=TaskScheduler()
+    # 授权任务已由文件锁保证单进程执行，只在本进程内调度
+    auth_task=TaskScheduler(distributed=False)
     auth_task.clear_all_jobs()
     print("是否开启调试模式:",str(os.getenv('DEBUG',False)))
     if str(os.getenv('DEBUG',False))=="True":
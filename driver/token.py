@@ -19,15 +19,15 @@ def set_token(data:any,ext_data:any=None):
     """
     if data.get("token", "") == "":
         return
-    wx_cfg.set("token", data.get("token", ""))
-    wx_cfg.set("cookie", data.get("cookies_str", ""))
-    wx_cfg.set("fingerprint", data.get("fingerprint", ""))
-    wx_cfg.set("expiry", data.get("expiry", {}))
+    # 批量写入后统一保存一次（save_config 会重新加载并重建快照）
+    wx_cfg.set("token", data.get("token", ""), save=False)
+    wx_cfg.set("cookie", data.get("cookies_str", ""), save=False)
+    wx_cfg.set("fingerprint", data.get("fingerprint", ""), save=False)
+    wx_cfg.set("expiry", data.get("expiry", {}), save=False)
     print_success(f"Token:{data.get('token')} \n到期时间:{data.get('expiry')['expiry_time']}\n")
     if ext_data is not None:
-        wx_cfg.set("ext_data", ext_data)
+        wx_cfg.set("ext_data", ext_data, save=False)
     wx_cfg.save_config()
-    wx_cfg.reload()
     from jobs.notice import sys_notice
     
 #     sys_notice(f"""授权成功
@@ -11,6 +11,7 @@ from bs4 import BeautifulSoup
 import os
 from datetime import datetime
 from core.config import cfg
+from core.tracing import traced
 
 class WXArticleFetcher:
     """微信公众号文章获取器
@@ -221,6 +222,7 @@ class WXArticleFetcher:
     async def async_get_article_content(self,url:str)->Dict:
         import asyncio
         return await asyncio.to_thread(self.get_article_content, url)
+    @traced("wx.article_content")
     def get_article_content(self, url: str) -> Dict:
         """获取单篇文章详细内容
         
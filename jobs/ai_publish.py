@@ -1,35 +1,317 @@
-import time
-from threading import Thread
+import heapq
+import itertools
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
 
 from core.config import cfg
 from core.db import DB
-from core.ai_service import process_pending_publish_tasks
+from core.ai_service import (
+    PUBLISH_STATUS_PENDING,
+    add_publish_task_listener,
+    process_publish_task,
+    read_publish_generation,
+    recover_stale_publish_tasks,
+    remove_publish_task_listener,
+)
+from core.models.ai_publish_task import AIPublishTask
 from core.log import get_logger
 from core.events import log_event, E
 
 logger = get_logger(__name__)
 
 
-def _worker_loop():
-    interval = max(10, int(cfg.get("ai.publish_queue_interval_seconds", 45) or 45))
-    while True:
-        session = None
+class PublishScheduler:
+    """
+    按 next_retry_at 调度草稿投递任务
+
+    - 进程内最小堆保存待投递任务（到期时间, 任务 ID, owner），启动时从数据库恢复；
+    - enqueue_publish_task 入队后通过回调立即唤醒，到期任务不再等待固定轮询间隔；
+    - 最多 concurrency 个投递并发执行，同一用户同时最多 per_owner 个；
+    - 认领沿用 pending → processing 的条件更新，多个进程同时调度时同一任务只会投递一次；
+    - 入队回调只在同一进程内生效；enqueue_publish_task 同时递增入队标记（scheduler_leases 中的一行），
+      其他进程定期只按主键读这一行，标记变化时才增量查询 updated_at 晚于上次查询的 pending 任务；
+      标记没有变化且本进程没有待投递任务时，读取间隔从 poll_seconds 逐次翻倍到 poll_max_seconds；
+    - 每 rehydrate_seconds 重新从数据库全量加载一次，
+      并把处理中超过 lease_seconds 未更新（进程崩溃遗留）的任务放回 pending；
+      没有到期任务时线程只等待唤醒、下一次增量查询或加载。
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, per_owner: Optional[int] = None,
+                 rehydrate_seconds: Optional[int] = None, rehydrate_limit: Optional[int] = None,
+                 lease_seconds: Optional[int] = None, poll_seconds: Optional[int] = None,
+                 poll_max_seconds: Optional[int] = None, session_factory=None,
+                 process: Callable = process_publish_task, clock: Callable[[], datetime] = datetime.now,
+                 read_generation: Callable[[], Optional[int]] = read_publish_generation):
+        self.concurrency = max(1, int(concurrency or cfg.get("ai.publish_concurrency", 4) or 4))
+        self.per_owner = max(1, int(per_owner or cfg.get("ai.publish_per_owner", 1) or 1))
+        self.rehydrate_seconds = max(10, int(rehydrate_seconds or cfg.get("ai.publish_rehydrate_seconds", 300) or 300))
+        self.rehydrate_limit = max(1, int(rehydrate_limit or cfg.get("ai.publish_rehydrate_limit", 5000) or 5000))
+        self.lease_seconds = max(60, int(lease_seconds or cfg.get("ai.publish_lease_seconds", 600) or 600))
+        self.poll_seconds = max(1, int(poll_seconds or cfg.get("ai.publish_poll_seconds", 5) or 5))
+        self.poll_max_seconds = max(self.poll_seconds,
+                                    int(poll_max_seconds or cfg.get("ai.publish_poll_max_seconds", 45) or 45))
+        self.session_factory = session_factory or DB.get_session
+        self._process = process
+        self._clock = clock
+        self._read_generation = read_generation
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        # 任务 ID → 堆中有效条目 (due, seq)；重复调度时旧条目在出堆时跳过
+        self._entries: Dict[str, Tuple[datetime, int]] = {}
+        self._running: Dict[str, str] = {}
+        self._owner_running: Dict[str, int] = defaultdict(int)
+        self._next_rehydrate: Optional[datetime] = None
+        self._next_poll: Optional[datetime] = None
+        self._poll_interval = self.poll_seconds
+        # 增量查询的起点：上次查询（或全量加载）的时间，以及当时读到的入队标记
+        self._poll_since: Optional[datetime] = None
+        self._seen_generation: Optional[int] = None
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ── 调度 ──
+    def schedule(self, task_id: str, owner_id: str, due: Optional[datetime] = None) -> None:
+        """登记任务在 due（为空表示立即）时投递；已登记的任务以最新的到期时间为准"""
+        task_id = str(task_id or "")
+        if not task_id:
+            return
+        due = due or self._clock()
+        with self._cond:
+            if task_id in self._running:
+                return
+            entry = self._entries.get(task_id)
+            if entry is not None and entry[0] == due:
+                return
+            seq = next(self._seq)
+            self._entries[task_id] = (due, seq)
+            heapq.heappush(self._heap, (due, seq, task_id, str(owner_id or "")))
+            self._cond.notify_all()
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._entries)
+
+    def rehydrate(self) -> int:
+        """从数据库恢复待投递任务，返回加载的任务数"""
+        started_at = self._clock()
+        generation = self._read_generation()
+        session = self.session_factory()
+        try:
+            recovered = recover_stale_publish_tasks(session, self.lease_seconds, now=self._clock())
+            if recovered:
+                logger.warning("恢复 %d 个处理超时的投递任务", recovered)
+            rows = session.query(
+                AIPublishTask.id, AIPublishTask.owner_id, AIPublishTask.next_retry_at,
+            ).filter(
+                AIPublishTask.status == PUBLISH_STATUS_PENDING,
+            ).order_by(AIPublishTask.next_retry_at.asc()).limit(self.rehydrate_limit).all()
+        finally:
+            session.close()
+        for task_id, owner_id, next_retry_at in rows:
+            self.schedule(task_id, owner_id, next_retry_at)
+        self._poll_since = started_at
+        self._seen_generation = generation
+        return len(rows)
+
+    def poll(self) -> int:
+        """入队标记变化时增量加载其他进程入队的待投递任务，返回加载的任务数；标记未变化时不查询任务表"""
+        if self._poll_since is None:
+            return self.rehydrate()
+        started_at = self._clock()
+        # 先读标记再查任务：查询期间新入队的任务会让下一次读到的标记不同
+        generation = self._read_generation()
+        if generation is not None and generation == self._seen_generation:
+            return 0
+        # 向前重叠一个轮询周期，覆盖提交晚于 updated_at 的事务；重复登记的任务由 schedule 去重
+        since = self._poll_since - timedelta(seconds=self.poll_seconds)
+        session = self.session_factory()
+        try:
+            rows = session.query(
+                AIPublishTask.id, AIPublishTask.owner_id, AIPublishTask.next_retry_at,
+            ).filter(
+                AIPublishTask.status == PUBLISH_STATUS_PENDING,
+                AIPublishTask.updated_at >= since,
+            ).order_by(AIPublishTask.next_retry_at.asc()).limit(self.rehydrate_limit).all()
+        finally:
+            session.close()
+        for task_id, owner_id, next_retry_at in rows:
+            self.schedule(task_id, owner_id, next_retry_at)
+        self._poll_since = started_at
+        self._seen_generation = generation
+        return len(rows)
+
+    def _next_poll_interval(self, loaded: int) -> int:
+        """本进程空闲（没有新任务、待投递或投递中的任务）时读取间隔逐次翻倍，有任务时恢复 poll_seconds"""
+        with self._cond:
+            busy = loaded or self._entries or self._running
+            if busy:
+                self._poll_interval = self.poll_seconds
+            else:
+                self._poll_interval = min(self._poll_interval * 2, self.poll_max_seconds)
+            return self._poll_interval
+
+    def dispatch_due(self) -> int:
+        """提交所有已到期且未超出并发限制的任务，返回提交数；到期时间最早的先提交"""
+        started = []
+        with self._cond:
+            now = self._clock()
+            deferred = []
+            while self._heap and self._heap[0][0] <= now and len(self._running) < self.concurrency:
+                item = heapq.heappop(self._heap)
+                due, seq, task_id, owner_id = item
+                if self._entries.get(task_id) != (due, seq):
+                    continue
+                if self._owner_running.get(owner_id, 0) >= self.per_owner:
+                    deferred.append(item)
+                    continue
+                del self._entries[task_id]
+                self._running[task_id] = owner_id
+                self._owner_running[owner_id] += 1
+                started.append((task_id, owner_id))
+            # 用户已达并发上限的任务放回堆中，等其他投递完成后再调度
+            for item in deferred:
+                heapq.heappush(self._heap, item)
+        for task_id, owner_id in started:
+            self._submit(task_id, owner_id)
+        return len(started)
+
+    def _submit(self, task_id: str, owner_id: str) -> None:
+        if self._executor is None:
+            self._run(task_id, owner_id)
+        else:
+            self._executor.submit(self._run, task_id, owner_id)
+
+    def _run(self, task_id: str, owner_id: str) -> None:
+        retry_at = None
+        session = self.session_factory()
         try:
-            session = DB.get_session()
-            log_event(logger, E.AI_PUBLISH_START, interval=interval)
-            process_pending_publish_tasks(session=session, owner_id="", limit=20)
+            task = session.query(AIPublishTask).filter(AIPublishTask.id == task_id).first()
+            if task is None or task.status != PUBLISH_STATUS_PENDING:
+                return
+            log_event(logger, E.AI_PUBLISH_START, task_id=task_id, owner_id=owner_id)
+            ok, message = self._process(session, task)
+            if ok:
+                log_event(logger, E.AI_PUBLISH_COMPLETE, task_id=task_id, owner_id=owner_id)
+            else:
+                log_event(logger, E.AI_PUBLISH_FAIL, task_id=task_id, owner_id=owner_id,
+                          status=task.status, reason=str(message)[:200])
+            # 失败待重试或未到重试时间（其他进程已改期）：按新的 next_retry_at 重新登记
+            if task.status == PUBLISH_STATUS_PENDING:
+                retry_at = task.next_retry_at or self._clock()
         except Exception:
-            logger.exception("草稿投递队列处理异常")
+            logger.exception("投递任务 %s 处理异常", task_id)
+            try:
+                session.rollback()
+            except Exception:
+                pass
         finally:
-            if session is not None and hasattr(session, "close"):
+            session.close()
+            with self._cond:
+                self._running.pop(task_id, None)
+                self._owner_running[owner_id] -= 1
+                if self._owner_running[owner_id] <= 0:
+                    del self._owner_running[owner_id]
+                self._cond.notify_all()
+        if retry_at is not None:
+            self.schedule(task_id, owner_id, retry_at)
+
+    def _wait_seconds(self) -> float:
+        """距离下一个需要处理的时刻（最早到期任务或下一次加载）的秒数"""
+        now = self._clock()
+        deadline = self._next_rehydrate
+        if self._next_poll is not None and (deadline is None or self._next_poll < deadline):
+            deadline = self._next_poll
+        if self._heap and len(self._running) < self.concurrency:
+            owners_full = {owner for owner, n in self._owner_running.items() if n >= self.per_owner}
+            if self._heap[0][3] not in owners_full:
+                candidates = [self._heap[0]]
+            else:
+                # 堆顶用户已满：在其余条目中找最早的可调度到期时间
+                candidates = [item for item in self._heap
+                              if item[3] not in owners_full and self._entries.get(item[2]) == (item[0], item[1])]
+            if candidates:
+                due = min(item[0] for item in candidates)
+                if deadline is None or due < deadline:
+                    deadline = due
+        if deadline is None:
+            return float(self.rehydrate_seconds)
+        return max(0.0, (deadline - now).total_seconds())
+
+    # ── 线程 ──
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop = False
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ai-publish")
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="ai-publish-scheduler")
+        add_publish_task_listener(self.schedule)
+        self._thread.start()
+
+    def stop(self) -> None:
+        remove_publish_task_listener(self.schedule)
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                if self._stop:
+                    return
+                now = self._clock()
+                rehydrate = self._next_rehydrate is None or now >= self._next_rehydrate
+                poll = self._next_poll is None or now >= self._next_poll
+            loaded = 0
+            if rehydrate:
                 try:
-                    session.close()
+                    loaded = self.rehydrate()
                 except Exception:
-                    pass
-        time.sleep(interval)
+                    logger.exception("投递队列加载失败")
+                with self._cond:
+                    self._next_rehydrate = self._clock() + timedelta(seconds=self.rehydrate_seconds)
+            elif poll:
+                try:
+                    loaded = self.poll()
+                except Exception:
+                    logger.exception("投递队列增量加载失败")
+            if rehydrate or poll:
+                interval = self._next_poll_interval(loaded)
+                with self._cond:
+                    self._next_poll = self._clock() + timedelta(seconds=interval)
+            try:
+                self.dispatch_due()
+            except Exception:
+                logger.exception("投递队列调度异常")
+            with self._cond:
+                if self._stop:
+                    return
+                timeout = self._wait_seconds()
+                if timeout > 0:
+                    self._cond.wait(timeout)
+
+
+_scheduler: Optional[PublishScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_publish_scheduler() -> PublishScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = PublishScheduler()
+    return _scheduler
 
 
 def start_publish_queue_worker():
-    t = Thread(target=_worker_loop, daemon=True)
-    t.start()
-    return t
+    scheduler = get_publish_scheduler()
+    scheduler.start()
+    return scheduler._thread
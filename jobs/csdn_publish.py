@@ -3,11 +3,16 @@ csdn_publish.py
 
 使用 Playwright storage_state（扫码登录后保存的浏览器状态）无头发布到 CSDN。
 storage_state 由 apis/csdn.py 扫码流程写入 DB，比 cookie 方式更稳定。
+
+CsdnPublishSession 在一个浏览器上下文里顺序发布多篇文章（每篇一个新页面），
+各步骤等待选择器 / 网络空闲 / 发布接口响应，不再使用固定 sleep；
+会话结束时读回刷新后的 storage_state，由调用方写回 DB。
 """
 import time
 import traceback
-from typing import Tuple
+from typing import Callable, Iterable, List, Optional, Tuple
 
+from core.config import cfg
 from core.log import get_logger
 from core.events import log_event, E
 
@@ -15,6 +20,150 @@ logger = get_logger(__name__)
 
 EDITOR_URL = "https://editor.csdn.net/md/?not_checkout=1&spm=1000.2115.3001.5352"
 DEFAULT_TAGS = ["人工智能", "大模型", "AI"]
+EDITOR_SELECTOR = 'pre.editor__inner.markdown-highlighting[contenteditable="true"]'
+MODAL_CONTAINERS = ['.modal__inner-2', '.modal__content', '.modal__button-bar', '.el-dialog__wrapper']
+# 编辑器发布文章调用的接口（bizapi.csdn.net/blog-console-api/.../saveArticle）
+PUBLISH_API_KEYWORD = "saveArticle"
+
+PublishResult = Tuple[bool, str, bool]
+
+
+def _is_login_url(url: str) -> bool:
+    return "login" in url or "passport" in url
+
+
+def _is_publish_response(response) -> bool:
+    try:
+        return PUBLISH_API_KEYWORD in response.url and response.request.method == "POST"
+    except Exception:
+        return False
+
+
+class CsdnPublishSession:
+    """
+    CSDN 发布会话：启动一次浏览器并恢复登录态，之后按顺序发布多篇文章。
+
+    用法::
+
+        with CsdnPublishSession(storage_state) as publisher:
+            results = publisher.publish_batch([(title, content), ...])
+        refreshed = publisher.refreshed_state  # 刷新后的登录态，调用方负责持久化
+
+    - 每篇文章使用新页面，结束后关闭，避免上一篇的编辑器状态残留；
+    - 检测到登录失效后标记 expired，本会话内剩余文章直接返回 needs_reauth；
+    - 进入 with 时浏览器启动失败不抛出，记录在 start_error，之后的 publish 直接返回失败；
+    - browser 参数用于注入已启动的浏览器（测试中为假页面），此时会话不负责关闭它。
+    """
+
+    def __init__(self, storage_state: dict, browser=None, headless: bool = True,
+                 editor_url: str = EDITOR_URL, timeout_ms: Optional[int] = None):
+        self.storage_state = storage_state
+        self.editor_url = editor_url
+        self.headless = headless
+        self.timeout_ms = int(timeout_ms or cfg.get("csdn.publish_timeout_ms", 15000) or 15000)
+        self.expired = False
+        self.published = 0
+        self.refreshed_state: Optional[dict] = None
+        self.start_error = ""
+        self._browser = browser
+        self._owns_browser = browser is None
+        self._playwright = None
+        self._context = None
+
+    def __enter__(self) -> "CsdnPublishSession":
+        try:
+            self.start()
+        except Exception as e:
+            self.start_error = f"浏览器启动失败: {e}"
+            log_event(logger, E.CSDN_PUSH_FAIL, reason=self.start_error[:200])
+            self.close()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def start(self) -> None:
+        if self._context is not None:
+            return
+        if self._browser is None:
+            from playwright.sync_api import sync_playwright
+            self._playwright = sync_playwright().start()
+            log_event(logger, E.CSDN_PUSH_BROWSER_LAUNCH, headless=self.headless)
+            self._browser = self._playwright.chromium.launch(headless=self.headless)
+        # 直接用 storage_state 恢复会话，无需手动注入 cookies
+        self._context = self._browser.new_context(storage_state=self.storage_state)
+
+    def close(self) -> None:
+        if self._context is not None:
+            if not self.expired and self.published > 0:
+                try:
+                    self.refreshed_state = self._context.storage_state()
+                except Exception as e:
+                    logger.warning("读取刷新后的 CSDN 登录态失败: %s", e)
+            try:
+                self._context.close()
+            except Exception:
+                pass
+            self._context = None
+        if self._owns_browser and self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    def publish(self, title: str, content: str, tags: list = None, fans_only: bool = True) -> PublishResult:
+        """发布一篇文章，返回 (success, message, needs_reauth)"""
+        if self.expired:
+            return False, "CSDN 登录态已失效，请重新扫码登录", True
+        if self.start_error:
+            return False, self.start_error, False
+        t0 = time.time()
+
+        def _elapsed() -> str:
+            return f"{time.time() - t0:.1f}s"
+
+        logger.info("=" * 60)
+        log_event(logger, E.CSDN_PUSH_START, title=str(title or "")[:60], content_len=len(content or ""))
+        page = None
+        try:
+            self.start()
+            page = self._context.new_page()
+            result = _publish_on_page(page, self.editor_url, title, content, tags, fans_only,
+                                      self.timeout_ms, _elapsed)
+        except Exception as e:
+            tb = traceback.format_exc()
+            msg = f"推送异常: {e}"
+            log_event(logger, E.CSDN_PUSH_FAIL, elapsed=_elapsed(), reason=str(e)[:200])
+            logger.error("[%s] %s\n%s", _elapsed(), msg, tb)
+            result = (False, msg, False)
+        finally:
+            if page is not None:
+                try:
+                    page.close()
+                except Exception:
+                    pass
+        if result[2]:
+            self.expired = True
+        elif result[0]:
+            self.published += 1
+        return result
+
+    def publish_batch(self, articles: Iterable[Tuple[str, str]], tags: list = None,
+                      fans_only: bool = True) -> List[PublishResult]:
+        """顺序发布 [(title, content), ...]；登录失效后停止，返回已尝试文章的结果"""
+        results = []
+        for title, content in articles:
+            results.append(self.publish(title, content, tags=tags, fans_only=fans_only))
+            if self.expired:
+                break
+        return results
 
 
 def push_to_csdn(
@@ -23,9 +172,9 @@ def push_to_csdn(
     content: str,
     tags: list = None,
     fans_only: bool = True,
-) -> Tuple[bool, str, bool]:
+) -> PublishResult:
     """
-    使用 Playwright storage_state 无头发布文章到 CSDN。
+    使用 Playwright storage_state 无头发布单篇文章到 CSDN（批量发布请使用 CsdnPublishSession）。
 
     Args:
         storage_state: context.storage_state() 返回的字典（含 cookies + localStorage）
@@ -40,176 +189,187 @@ def push_to_csdn(
         - message: 成功时含文章 URL；失败时含错误描述
         - needs_reauth: True 表示登录态已失效，需要重新扫码
     """
-    t0 = time.time()
-
-    def _elapsed() -> str:
-        return f"{time.time() - t0:.1f}s"
-
-    logger.info("=" * 60)
-    log_event(logger, E.CSDN_PUSH_START, title=title[:60], content_len=len(content))
-
-    # ── 1. 校验入参 ──
+    # ── 校验入参 ──
     if not storage_state or not isinstance(storage_state, dict):
         msg = "storage_state 为空或格式错误，请先扫码登录 CSDN"
         logger.error("%s", msg)
         return False, msg, True
 
-    # ── 2. 导入 Playwright ──
     try:
-        from playwright.sync_api import sync_playwright
+        import playwright.sync_api  # noqa: F401
     except ImportError:
         msg = "Playwright 未安装，请执行 pip install playwright && playwright install chromium"
         logger.error("依赖缺失: %s", msg)
         return False, msg, False
 
-    # ── 3. 启动浏览器，恢复 storage_state ──
-    try:
-        with sync_playwright() as p:
-            log_event(logger, E.CSDN_PUSH_BROWSER_LAUNCH, elapsed=_elapsed())
-            browser = p.chromium.launch(headless=True)
-            # 直接用 storage_state 恢复会话，无需手动注入 cookies
-            context = browser.new_context(storage_state=storage_state)
-            page = context.new_page()
-
-            # ── 3a. 打开编辑器页面 ──
-            logger.info("[%s] 正在打开编辑器: %s", _elapsed(), EDITOR_URL)
-            try:
-                page.goto(EDITOR_URL, timeout=60000)
-            except Exception as e:
-                _take_screenshot(page, "csdn_goto_fail", _elapsed())
-                browser.close()
-                msg = f"打开编辑页面失败: {e}"
-                logger.error("[%s] %s", _elapsed(), msg)
-                return False, msg, False
-
-            current_url = page.url
-            logger.info("[%s] 页面跳转后 URL: %s", _elapsed(), current_url)
-
-            # 判断是否被重定向到登录页 → 需要重新扫码
-            if "login" in current_url or "passport" in current_url:
-                _take_screenshot(page, "csdn_login_redirect", _elapsed())
-                browser.close()
-                msg = "CSDN 登录态已失效（被重定向到登录页），请重新扫码登录"
-                log_event(logger, E.CSDN_PUSH_NEED_REAUTH, elapsed=_elapsed(), url=current_url)
-                return False, msg, True
-
-            # ── 3b. 等待编辑器就绪 ──
-            editor_selector = 'pre.editor__inner.markdown-highlighting[contenteditable="true"]'
-            logger.info("[%s] 等待编辑器元素: %r", _elapsed(), editor_selector)
-            try:
-                page.wait_for_selector(editor_selector, timeout=20000)
-                log_event(logger, E.CSDN_PUSH_EDITOR_READY, elapsed=_elapsed())
-            except Exception:
-                current_url = page.url
-                _take_screenshot(page, "csdn_editor_timeout", _elapsed())
-                browser.close()
-                if "login" in current_url or "passport" in current_url:
-                    msg = "CSDN 登录态已失效（等待编辑器时被重定向），请重新扫码登录"
-                    return False, msg, True
-                msg = f"编辑器加载超时（20s），当前 URL: {current_url}"
-                logger.warning("[%s] %s", _elapsed(), msg)
-                return False, msg, False
-
-            # ── 3c. 填充标题 ──
-            logger.info("[%s] 开始填充标题: %r", _elapsed(), title[:60])
-            title_ok = _fill_title(page, str(title or "")[:100])
-            logger.info("[%s] 标题填充%s", _elapsed(), "成功" if title_ok else "失败（未找到标题输入框）")
-
-            # ── 3d. 填充正文 ──
-            logger.info("[%s] 开始填充正文（%d 字符）", _elapsed(), len(content))
-            fill_ok, fill_method = _fill_editor_with_markdown(page, str(content or ""))
-            if not fill_ok:
-                _take_screenshot(page, "csdn_fill_fail", _elapsed())
-                browser.close()
-                msg = "正文填充失败，未找到可用编辑器选择器"
-                logger.error("[%s] %s", _elapsed(), msg)
-                return False, msg, False
-            log_event(logger, E.CSDN_PUSH_CONTENT_FILL, elapsed=_elapsed(), method=fill_method)
-
-            # ── 3e. 验证编辑器内容 ──
-            actual_len = _verify_editor_content(page)
-            log_event(logger, E.CSDN_PUSH_CONTENT_VERIFY, elapsed=_elapsed(),
-                      expected=len(content), actual=actual_len)
-            if actual_len < max(10, len(content) // 10):
-                _take_screenshot(page, "csdn_content_mismatch", _elapsed())
-                browser.close()
-                msg = (
-                    f"正文写入验证失败：期望 {len(content)} 字符，"
-                    f"编辑器实际读回 {actual_len} 字符。"
-                    f"CSDN 编辑器可能已更新，请排查选择器兼容性。"
-                )
-                logger.error("[%s] %s", _elapsed(), msg)
-                return False, msg, False
-
-            time.sleep(2)
-
-            # ── 3f. 点击发布按钮 ──
-            use_tags = tags if tags else DEFAULT_TAGS
-            logger.info("[%s] 开始点击发布按钮，标签=%s，粉丝可见=%s", _elapsed(), use_tags, fans_only)
-            published, publish_detail = _click_publish_buttons(page, tags=use_tags, fans_only=fans_only)
-
-            if not published:
-                screenshot_path = _take_screenshot(page, "csdn_publish_fail", _elapsed())
-                browser.close()
-                msg = f"发布流程未完成: {publish_detail}"
-                if screenshot_path:
-                    msg += f"  截图: {screenshot_path}"
-                logger.error("[%s] %s", _elapsed(), msg)
-                return False, msg, False
-
-            log_event(logger, E.CSDN_PUSH_PUBLISH_CLICK, elapsed=_elapsed(), detail=publish_detail[:120])
-
-            # ── 3g. 等待页面跳转，判断是否成功 ──
-            publish_success = False
-            try:
-                # 等待 URL 变化，成功通常会跳转到 creation/success 或类似路径
-                # 某些情况下也可能直接跳转到文章详情页
-                page.wait_for_url(lambda url: "success" in url.lower() or "details" in url.lower(), timeout=15000)
-                publish_success = True
-                article_url = page.url
-                logger.info("[%s] 检测到发布成功跳转: %s", _elapsed(), article_url)
-            except Exception:
-                # 如果没跳转，检查页面是否有成功提示
-                try:
-                    # 检查是否有包含"发布成功"文字的元素
-                    if page.get_by_text("发布成功").first.is_visible():
-                        publish_success = True
-                        logger.info("[%s] 检测到页面'发布成功'文字", _elapsed())
-                except:
-                    pass
-            
-            if not publish_success:
-                logger.warning("[%s] 未检测到明确的发布成功跳转，当前 URL: %s", _elapsed(), page.url)
-            
-            article_url = page.url
-            
-            # 截图记录
-            screenshot_path = _take_screenshot(page, "csdn_after_publish", _elapsed())
-            if screenshot_path:
-                logger.info("[%s] 发布后截图已保存: %s", _elapsed(), screenshot_path)
-
-            browser.close()
-            elapsed = _elapsed()
-
-            # 简化成功判断：只要走到这里，说明发布按钮已点击，认为是成功
-            # 从 URL 提取文章 ID（如果有）
-            article_id = ""
-            if "creation/success/" in article_url:
-                article_id = article_url.rstrip("/").rsplit("/", 1)[-1]
-            display_url = article_url if not article_id else (
-                f"{article_url}  （文章ID: {article_id}，审核通过后可在 CSDN 主页查看）"
-            )
-            msg = f"CSDN 推送成功（{elapsed}）：{display_url}"
-            log_event(logger, E.CSDN_PUSH_COMPLETE, elapsed=elapsed, url=article_url)
-            logger.info("=" * 60)
-            return True, msg, False
+    with CsdnPublishSession(storage_state) as publisher:
+        return publisher.publish(title, content, tags=tags, fans_only=fans_only)
+
+
+def _publish_on_page(page, editor_url: str, title: str, content: str, tags: list, fans_only: bool,
+                     timeout_ms: int, _elapsed: Callable[[], str]) -> PublishResult:
+    """在一个新页面上完成一篇文章的填写与发布"""
+    title = str(title or "")
+    content = str(content or "")
 
+    # 监听发布接口响应：点击确认后到开始等待之间返回的响应也不会丢失
+    publish_responses = []
+    page.on("response", lambda response: publish_responses.append(response) if _is_publish_response(response) else None)
+
+    # ── 1. 打开编辑器页面 ──
+    logger.info("[%s] 正在打开编辑器: %s", _elapsed(), editor_url)
+    try:
+        page.goto(editor_url, timeout=60000, wait_until="domcontentloaded")
     except Exception as e:
-        tb = traceback.format_exc()
-        msg = f"推送异常: {e}"
-        log_event(logger, E.CSDN_PUSH_FAIL, elapsed=_elapsed(), reason=str(e)[:200])
-        logger.error("[%s] %s\n%s", _elapsed(), msg, tb)
+        _take_screenshot(page, "csdn_goto_fail", _elapsed())
+        msg = f"打开编辑页面失败: {e}"
+        logger.error("[%s] %s", _elapsed(), msg)
+        return False, msg, False
+
+    current_url = page.url
+    logger.info("[%s] 页面跳转后 URL: %s", _elapsed(), current_url)
+
+    # 判断是否被重定向到登录页 → 需要重新扫码
+    if _is_login_url(current_url):
+        _take_screenshot(page, "csdn_login_redirect", _elapsed())
+        msg = "CSDN 登录态已失效（被重定向到登录页），请重新扫码登录"
+        log_event(logger, E.CSDN_PUSH_NEED_REAUTH, elapsed=_elapsed(), url=current_url)
+        return False, msg, True
+
+    # ── 2. 等待编辑器就绪 ──
+    logger.info("[%s] 等待编辑器元素: %r", _elapsed(), EDITOR_SELECTOR)
+    try:
+        page.wait_for_selector(EDITOR_SELECTOR, timeout=20000)
+        log_event(logger, E.CSDN_PUSH_EDITOR_READY, elapsed=_elapsed())
+    except Exception:
+        current_url = page.url
+        _take_screenshot(page, "csdn_editor_timeout", _elapsed())
+        if _is_login_url(current_url):
+            msg = "CSDN 登录态已失效（等待编辑器时被重定向），请重新扫码登录"
+            return False, msg, True
+        msg = f"编辑器加载超时（20s），当前 URL: {current_url}"
+        logger.warning("[%s] %s", _elapsed(), msg)
+        return False, msg, False
+
+    # ── 3. 填充标题 ──
+    logger.info("[%s] 开始填充标题: %r", _elapsed(), title[:60])
+    title_ok = _fill_title(page, title[:100])
+    logger.info("[%s] 标题填充%s", _elapsed(), "成功" if title_ok else "失败（未找到标题输入框）")
+
+    # ── 4. 填充正文 ──
+    logger.info("[%s] 开始填充正文（%d 字符）", _elapsed(), len(content))
+    fill_ok, fill_method = _fill_editor_with_markdown(page, content)
+    if not fill_ok:
+        _take_screenshot(page, "csdn_fill_fail", _elapsed())
+        msg = "正文填充失败，未找到可用编辑器选择器"
+        logger.error("[%s] %s", _elapsed(), msg)
+        return False, msg, False
+    log_event(logger, E.CSDN_PUSH_CONTENT_FILL, elapsed=_elapsed(), method=fill_method)
+
+    # ── 5. 验证编辑器内容 ──
+    actual_len = _verify_editor_content(page)
+    log_event(logger, E.CSDN_PUSH_CONTENT_VERIFY, elapsed=_elapsed(),
+              expected=len(content), actual=actual_len)
+    if actual_len < max(10, len(content) // 10):
+        _take_screenshot(page, "csdn_content_mismatch", _elapsed())
+        msg = (
+            f"正文写入验证失败：期望 {len(content)} 字符，"
+            f"编辑器实际读回 {actual_len} 字符。"
+            f"CSDN 编辑器可能已更新，请排查选择器兼容性。"
+        )
+        logger.error("[%s] %s", _elapsed(), msg)
+        return False, msg, False
+
+    # 等待编辑器自动保存草稿等请求结束（网络空闲），代替固定等待
+    _wait_network_idle(page, timeout_ms)
+
+    # ── 6. 点击发布按钮 ──
+    use_tags = tags if tags else DEFAULT_TAGS
+    logger.info("[%s] 开始点击发布按钮，标签=%s，粉丝可见=%s", _elapsed(), use_tags, fans_only)
+    published, publish_detail = _click_publish_buttons(page, tags=use_tags, fans_only=fans_only)
+
+    if not published:
+        screenshot_path = _take_screenshot(page, "csdn_publish_fail", _elapsed())
+        msg = f"发布流程未完成: {publish_detail}"
+        if screenshot_path:
+            msg += f"  截图: {screenshot_path}"
+        logger.error("[%s] %s", _elapsed(), msg)
+        return False, msg, False
+
+    log_event(logger, E.CSDN_PUSH_PUBLISH_CLICK, elapsed=_elapsed(), detail=publish_detail[:120])
+
+    # ── 7. 以发布接口响应判断结果，页面跳转/成功提示作为兜底 ──
+    ok, article_url, api_msg = _wait_publish_result(page, publish_responses, timeout_ms)
+    if ok is False:
+        _take_screenshot(page, "csdn_publish_rejected", _elapsed())
+        msg = f"CSDN 拒绝发布: {api_msg}"
+        logger.error("[%s] %s", _elapsed(), msg)
         return False, msg, False
+    if ok is None:
+        logger.warning("[%s] 未检测到明确的发布成功信号，当前 URL: %s", _elapsed(), page.url)
+        _take_screenshot(page, "csdn_after_publish", _elapsed())
+    article_url = article_url or page.url
+    elapsed = _elapsed()
+
+    # 只要发布按钮已点击且接口未明确拒绝，即认为成功；从 URL 提取文章 ID（如果有）
+    article_id = ""
+    if "creation/success/" in article_url:
+        article_id = article_url.rstrip("/").rsplit("/", 1)[-1]
+    display_url = article_url if not article_id else (
+        f"{article_url}  （文章ID: {article_id}，审核通过后可在 CSDN 主页查看）"
+    )
+    msg = f"CSDN 推送成功（{elapsed}）：{display_url}"
+    log_event(logger, E.CSDN_PUSH_COMPLETE, elapsed=elapsed, url=article_url)
+    logger.info("=" * 60)
+    return True, msg, False
+
+
+def _wait_network_idle(page, timeout_ms: int) -> bool:
+    try:
+        page.wait_for_load_state("networkidle", timeout=timeout_ms)
+        return True
+    except Exception as e:
+        logger.debug("等待网络空闲超时: %s", e)
+        return False
+
+
+def _wait_publish_result(page, publish_responses: list, timeout_ms: int) -> Tuple[Optional[bool], str, str]:
+    """
+    等待发布结果，返回 (ok, article_url, message)。
+
+    ok 为 True/False 表示接口或页面给出了明确结果，None 表示没有等到任何信号。
+    """
+    response = publish_responses[0] if publish_responses else None
+    if response is None:
+        try:
+            response = page.wait_for_event("response", predicate=_is_publish_response, timeout=timeout_ms)
+        except Exception as e:
+            logger.debug("未等到发布接口响应: %s", e)
+    if response is not None:
+        try:
+            body = response.json() or {}
+        except Exception:
+            body = {}
+        data = body.get("data") if isinstance(body.get("data"), dict) else {}
+        code = body.get("code")
+        if response.ok and (code is None or int(code) == 200):
+            url = str(data.get("url") or "")
+            if not url and data.get("id"):
+                url = f"https://mp.csdn.net/mp_blog/creation/success/{data.get('id')}"
+            return True, url, ""
+        return False, "", str(body.get("msg") or body.get("message") or f"HTTP {response.status}")
+
+    # 兜底：等待 URL 跳转到成功页 / 文章详情页，或出现“发布成功”提示
+    try:
+        page.wait_for_url(lambda url: "success" in url.lower() or "details" in url.lower(), timeout=timeout_ms)
+        return True, page.url, ""
+    except Exception:
+        pass
+    try:
+        page.get_by_text("发布成功").first.wait_for(state="visible", timeout=2000)
+        return True, page.url, ""
+    except Exception:
+        return None, "", ""
 
 
 def _fill_title(page, title: str) -> bool:
@@ -325,14 +485,20 @@ def _click_publish_buttons(page, tags=None, fans_only=True) -> tuple:
     if not clicked_publish:
         return False, f"未找到发布按钮，尝试了: {publish_selectors}"
 
-    time.sleep(1.5)  # 等待弹窗动画
+    # 等待发布弹窗出现（代替固定的动画等待）
+    try:
+        page.wait_for_selector(", ".join(MODAL_CONTAINERS), state="visible", timeout=10000)
+    except Exception as e:
+        logger.debug("等待发布弹窗超时: %s", e)
 
     # ── 2. 处理发布弹窗 ──
-    modal_containers = ['.modal__inner-2', '.modal__content', '.modal__button-bar', '.el-dialog__wrapper']
     clicked_confirm = False
 
-    for container in modal_containers:
+    for container in MODAL_CONTAINERS:
         try:
+            # 跳过页面上不存在的容器，避免在其中逐个等待超时
+            if page.locator(container).count() == 0:
+                continue
             # 2.1 添加标签
             if tags and isinstance(tags, (list, tuple)) and len(tags) > 0:
                 logger.info("尝试在弹窗中添加 %d 个标签: %s", len(tags), tags)
@@ -385,7 +551,7 @@ def _click_publish_buttons(page, tags=None, fans_only=True) -> tuple:
                     page.wait_for_selector(container, state='detached', timeout=10000)
                     logger.info("容器 %r 已关闭", container)
                 except Exception:
-                    time.sleep(1)
+                    logger.debug("容器 %r 未在 10s 内关闭", container)
                 clicked_confirm = True
                 detail = f"主按钮={used_selector!r}，确认弹窗={container!r}"
                 return True, detail
@@ -429,7 +595,6 @@ def _robust_click_by_text(page, button_text: str, desc: str, timeout: int = 1000
             except Exception as e2:
                 last_err = e2
                 logger.warning("has-text fallback 失败: %s", e2)
-        time.sleep(0.5)
 
     # 最终 JS 兜底
     try:
@@ -506,14 +671,13 @@ def _ensure_tags_in_modal(page, container_selector: str, tag_text: str = '人工
                         iloc.click()
                         page.keyboard.type(tag_text)
                         page.keyboard.press('Enter')
-                        time.sleep(0.5)
-                        new_count = page.locator(f'{container_selector} .mark_selection_box .el-tag').count()
-                        if new_count > 0:
-                            logger.info("在弹窗中已添加标签: %s", tag_text)
-                            # 关闭下拉菜单
-                            _close_tag_dropdown(page, container_selector)
-                            time.sleep(0.2)
-                            return True
+                        # 等待标签出现在已选区域
+                        page.locator(f'{container_selector} .mark_selection_box .el-tag').first.wait_for(
+                            state='attached', timeout=2000)
+                        logger.info("在弹窗中已添加标签: %s", tag_text)
+                        # 关闭下拉菜单
+                        _close_tag_dropdown(page, container_selector)
+                        return True
                     except Exception:
                         continue
             except Exception:
@@ -618,7 +782,6 @@ def _set_fans_visible_in_modal(page, container_selector: str) -> bool:
                 locator.scroll_into_view_if_needed()
                 locator.click(timeout=5000)
                 logger.info("已点击'粉丝可见'选项 (selector=%s)", selector)
-                time.sleep(0.5)
                 return True
 
             except Exception as e:
@@ -0,0 +1,41 @@
+import time
+from threading import Thread
+
+from core.config import cfg
+from core.db import DB
+from core.feed_stats_service import repair_feed_stats
+from core.log import get_logger
+from core.events import log_event, E
+
+logger = get_logger(__name__)
+
+
+def _worker_loop():
+    interval = max(600, int(cfg.get("feed_stats.repair_interval_seconds", 86400) or 86400))
+    while True:
+        time.sleep(interval)
+        session = None
+        try:
+            session = DB.get_session()
+            log_event(logger, E.FEED_STATS_REPAIR_START, interval=interval)
+            total = repair_feed_stats(session)
+            log_event(logger, E.FEED_STATS_REPAIR_COMPLETE, total=total)
+        except Exception:
+            logger.exception("公众号统计修复异常")
+            if session is not None:
+                try:
+                    session.rollback()
+                except Exception:
+                    pass
+        finally:
+            if session is not None and hasattr(session, "close"):
+                try:
+                    session.close()
+                except Exception:
+                    pass
+
+
+def start_feed_stats_repair_worker():
+    t = Thread(target=_worker_loop, daemon=True)
+    t.start()
+    return t
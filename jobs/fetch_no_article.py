@@ -1,63 +1,24 @@
-from core.models.article import Article,DATA_STATUS
-import core.db as db
-from core.wait import Wait
-from core.wx.base import WxGather
-from time import sleep
 from core.log import get_logger
 from core.events import log_event, E
-import random
-from driver.wxarticle import Web
+from core.content_backlog_service import ContentBackfiller
 
 logger = get_logger(__name__)
 
-DB=db.Db(tag="内容修正")
 def fetch_articles_without_content():
     """
-    查询content为空的文章，调用微信内容提取方法获取内容并更新数据库
+    按优先级从补抓队列取出正文为空的文章，并行抓取内容并更新数据库
+    （并行度取 gather.content_concurrency，每批 content_backlog.batch_per_worker * 并行度 篇）
     """
-    session = DB.get_session()
-    ga=WxGather().Model()
     try:
-        # 查询content为空的文章
-        from sqlalchemy import or_
-        articles = session.query(Article).filter(or_(Article.content.is_(None), Article.content == "")).limit(10).all()
-
-        if not articles:
+        backfiller = ContentBackfiller()
+        log_event(logger, E.ARTICLE_FETCH_START, count=backfiller.batch_size, concurrency=backfiller.concurrency)
+        result = backfiller.drain()
+        if not any(result.values()):
             logger.warning("暂无需要获取内容的文章")
             return
-
-        log_event(logger, E.ARTICLE_FETCH_START, count=len(articles))
-        for article in articles:
-            # 构建URL
-            if article.url:
-                url = article.url
-            else:
-                url = f"https://mp.weixin.qq.com/s/{article.id}"
-
-            logger.info("正在处理文章: %s, URL: %s", article.title, url)
-
-            # 获取内容
-            if cfg.get("gather.content_mode","web"):
-                content=Web.get_article_content(url).get("content")
-            else:
-                content = ga.content_extract(url)
-            if content:
-                # 更新内容
-                article.content = content
-                if  content=="DELETED":
-                    logger.error("获取文章 %s 内容已被发布者删除", article.title)
-                    article.status = DATA_STATUS.DELETED
-                session.commit()
-                log_event(logger, E.ARTICLE_UPDATE, title=str(article.title or "")[:60])
-                logger.info("成功更新文章 %s 的内容", article.title)
-            else:
-                log_event(logger, E.ARTICLE_FETCH_FAIL, title=str(article.title or "")[:60])
-                logger.error("获取文章 %s 内容失败", article.title)
-            Wait(min=5,max=10,tips=f"修正 {article.title}... 完成")
+        logger.info("补抓文章正文完成: %s", result)
     except Exception as e:
         logger.error("处理过程中发生错误: %s", e)
-    finally:
-        Web.Close()
 from core.task import TaskScheduler
 from core.queue import TaskQueueManager
 scheduler=TaskScheduler()
@@ -94,7 +55,8 @@ def start_sync_content():
     scheduler.clear_all_jobs()
     def do_sync():
         task_queue.add_task(fetch_articles_without_content)
-    job_id=scheduler.add_cron_job(do_sync,cron_expr=cron_exp)
+    # 固定任务 ID：重启后覆盖同一条 scheduler_jobs 记录
+    job_id=scheduler.add_cron_job(do_sync,cron_expr=cron_exp,job_id="content_auto_sync",tag="文章内容自动同步")
     log_event(logger, E.SYSTEM_JOB_ADD, job_id=str(job_id), cron=cron_exp)
     logger.info("已添自动同步文章内容任务: %s", job_id)
     scheduler.start()
@@ -9,7 +9,9 @@ from core.models.message_task_log import MessageTaskLog
 from .article import UpdateArticle, Update_Over
 import core.db as db
 from core.wx import WxGather
+from core.wx.upstream import crawl_feed
 from core.log import get_logger, trace_ctx
+from core.tracing import start_span, traced
 from core.events import log_event, E
 from core.task import TaskScheduler
 from core.config import cfg, DEBUG
@@ -48,11 +50,10 @@ def fetch_all_article():
                 token, cookie, user_agent = _resolve_auth(getattr(item, "owner_id", ""))
                 if not token or not cookie:
                     continue
-                wx.get_Articles(
-                    item.faker_id,
+                crawl_feed(
+                    wx,
+                    item,
                     CallBack=UpdateArticle,
-                    Mps_id=item.id,
-                    Mps_title=item.mp_name,
                     MaxPage=1,
                     token=token,
                     cookie=cookie,
@@ -77,7 +78,16 @@ interval = int(cfg.get("interval", 60))  # 每隔多少秒执行一次
 
 def _latest_article_for_feed(session, owner_id: str, feed_id: str) -> Optional[Article]:
     from core.models.base import DATA_STATUS
+    from core.feed_stats_service import get_feed_stats
 
+    owner = str(owner_id or "").strip()
+    stats = get_feed_stats(session, str(feed_id or "").strip())
+    if stats and stats.latest_article_id and str(stats.owner_id or "") == owner:
+        article = session.query(Article).filter(Article.id == stats.latest_article_id).first()
+        if article and article.status != DATA_STATUS.DELETED:
+            return article
+
+    # 统计缺失或已过期时回退为扫描
     return session.query(Article).filter(
         Article.owner_id == str(owner_id or "").strip(),
         Article.mp_id == str(feed_id or "").strip(),
@@ -121,6 +131,7 @@ def _topk_articles_for_feeds(session, owner_id: str, feed_ids: list[str], k: int
     ).limit(k).all()
 
 
+@traced("job.auto_compose")
 def _run_auto_compose_sync(task: MessageTask, mps: list[Feed]) -> str:
     enabled = int(getattr(task, "auto_compose_sync_enabled", 0) or 0)
     if enabled != 1:
@@ -371,8 +382,8 @@ def _run_auto_compose_sync(task: MessageTask, mps: list[Feed]) -> str:
             media_id = str((raw or {}).get("media_id") or "")
             if wechat_mode == "draft_and_publish" and media_id and wechat_app_id and wechat_app_secret:
                 try:
-                    from core.wechat_draft_service import WechatDraftService
-                    svc = WechatDraftService(wechat_app_id, wechat_app_secret)
+                    from core.wechat_draft_service import WeChatDraftService
+                    svc = WeChatDraftService(wechat_app_id, wechat_app_secret, owner_id)
                     publish_id = svc.freepublish_submit(media_id)
                     log_event(logger, E.AI_PUBLISH_COMPLETE, task_id=str(task.id or ""), mp=mp_name,
                               action="freepublish", publish_id=publish_id[:24] if publish_id else "")
@@ -429,8 +440,9 @@ def _run_auto_compose_sync(task: MessageTask, mps: list[Feed]) -> str:
             pass
 
 
+@traced("job.csdn_publish")
 def _run_csdn_publish_sync(task: MessageTask, mps: list[Feed]) -> str:
-    """CSDN 自动推送逻辑（跨 MP 全局 topk）。"""
+    """CSDN 自动推送逻辑（跨 MP 全局 topk，单个发布会话内批量推送）。"""
     enabled = int(getattr(task, "csdn_publish_enabled", 0) or 0)
     if enabled != 1:
         return ""
@@ -445,7 +457,7 @@ def _run_csdn_publish_sync(task: MessageTask, mps: list[Feed]) -> str:
     session = db.DB.get_session()
     try:
         from core.notice_service import create_notice
-        from core.csdn_auth_service import get_storage_state, mark_csdn_auth_expired
+        from core.csdn_auth_service import get_csdn_auth, get_storage_state, mark_csdn_auth_expired, upsert_csdn_auth
         import json as _json
 
         # ── 1. 获取 storage_state ──
@@ -456,6 +468,7 @@ def _run_csdn_publish_sync(task: MessageTask, mps: list[Feed]) -> str:
             return msg
 
         topk = max(1, int(getattr(task, "csdn_publish_topk", 3) or 3))
+        batch_size = max(1, int(cfg.get("csdn.publish_batch", 1) or 1))
         feed_ids = [str(getattr(m, "id", "") or "").strip() for m in mps]
         feed_map = {str(getattr(m, "id", "") or "").strip(): m for m in mps}
 
@@ -473,8 +486,8 @@ def _run_csdn_publish_sync(task: MessageTask, mps: list[Feed]) -> str:
 
         logger.info("任务(%s) 已推送 ID 数: %d", task.id, len(csdn_published_ids))
 
-        # ── 2. 找第一篇未推送且内容非空的文章 ──
-        article = None
+        # ── 2. 按顺序找未推送且内容非空的文章（每次最多 batch_size 篇）──
+        articles = []
         for idx, candidate in enumerate(candidates):
             cid = str(candidate.id or "").strip()
             ctitle = str(candidate.title or "")[:40]
@@ -491,10 +504,11 @@ def _run_csdn_publish_sync(task: MessageTask, mps: list[Feed]) -> str:
             if already:
                 continue
             if clen > 0:
-                article = candidate
-                break
+                articles.append(candidate)
+                if len(articles) >= batch_size:
+                    break
 
-        if not article:
+        if not articles:
             has_unpublished = any(str(c.id or "").strip() not in csdn_published_ids for c in candidates)
             if has_unpublished:
                 msg = f"全局 top-{topk} 未推送文章内容尚未同步，等待下次执行"
@@ -503,247 +517,162 @@ def _run_csdn_publish_sync(task: MessageTask, mps: list[Feed]) -> str:
             logger.info("任务(%s) %s", task.id, msg)
             return msg
 
-        mp = feed_map.get(str(article.mp_id or "").strip())
-        mp_name = getattr(mp, "mp_name", "未知") if mp else "未知"
-        
-        article_id_str = str(article.id or "").strip()
-        title = str(article.title or "").strip()
-        source_content = str(article.content or article.description or "").strip()
-
-        logger.info(
-            "任务(%s)[%s] 选定文章 id=%s title=%r source_len=%d",
-            task.id, mp_name, article_id_str, title[:50], len(source_content),
-        )
-
-        # ── 3. AI 创作（配图 2 张，基于即梦生成）──
+        # ── 3. 逐篇 AI 创作（配图 2 张）并保存草稿 ──
         from core.models.user import User as DBUser
-        from core.ai_service import (
-            build_prompt,
-            build_image_prompts,
-            call_openai_compatible,
-            extract_first_image_url_from_text,
-            generate_images_with_jimeng,
-            get_or_create_profile,
-            merge_image_urls_into_markdown,
-            refine_draft,
-            save_local_draft,
-            mark_local_draft_delivery,
-        )
+        from core.ai_service import get_or_create_profile, mark_local_draft_delivery
         from core.plan_service import consume_ai_usage, validate_ai_action
 
         user = session.query(DBUser).filter(DBUser.username == owner_id).first()
         if not user:
             msg = "用户不存在，无法 AI 创作"
-            logger.error("任务(%s)[%s] %s", task.id, mp_name, msg)
+            logger.error("任务(%s) %s", task.id, msg)
             return msg
 
-        can_run, reason, _ = validate_ai_action(user, mode="create", image_count=2)
-        if not can_run:
-            msg = f"CSDN AI 创作被拦截: {reason}"
-            logger.warning("任务(%s)[%s] %s", task.id, mp_name, msg)
-            return msg
+        # 先启动发布会话再创作：浏览器启动失败时不消耗 AI 创作与配图额度
+        from jobs.csdn_publish import CsdnPublishSession
+        results = []
+        with CsdnPublishSession(storage_state) as publisher:
+            if publisher.start_error:
+                msg = f"CSDN 推送失败：{publisher.start_error}"
+                log_event(logger, E.CSDN_PUSH_FAIL, task_id=str(task.id or ""), mp="global",
+                          reason=publisher.start_error[:200])
+                return msg
+
+            instruction = str(getattr(task, "auto_compose_instruction", "") or "").strip()
+            profile = get_or_create_profile(session, owner_id)
+            drafts = []
+            blocked_msg = ""
+            for article in articles:
+                can_run, reason, _ = validate_ai_action(user, mode="create", image_count=2)
+                if not can_run:
+                    blocked_msg = f"CSDN AI 创作被拦截: {reason}"
+                    logger.warning("任务(%s) %s", task.id, blocked_msg)
+                    break
+                mp = feed_map.get(str(article.mp_id or "").strip())
+                draft = _compose_csdn_draft(task, owner_id, profile, instruction, article,
+                                            getattr(mp, "mp_name", "未知") if mp else "未知")
+                consume_ai_usage(user, image_count=len(draft["image_urls"]))
+                drafts.append(draft)
+            if not drafts:
+                return blocked_msg
+
+            # ── 4. 同一个发布会话内顺序推送（只登录一次）──
+            for draft in drafts:
+                log_event(logger, E.CSDN_PUSH_START, task_id=str(task.id or ""), mp=draft["mp_name"],
+                          title=draft["title"][:50], content_len=len(draft["content"]),
+                          has_images=len(draft["image_urls"]) > 0)
+                result = publisher.publish(draft["title"], draft["content"],
+                                           tags=["人工智能", "大模型", "AI"], fans_only=True)
+                results.append((draft, result))
+                if publisher.expired:
+                    break
 
-        instruction = str(getattr(task, "auto_compose_instruction", "") or "").strip()
-        profile = get_or_create_profile(session, owner_id)
-        create_options = {
-            "platform": "csdn",
-            "style": "专业深度",
-            "length": "medium",
-            "image_count": 2,       # 生成 2 张配图
-            "audience": "",
-            "tone": "",
-            "generate_images": True,
-        }
-        log_event(logger, E.AI_COMPOSE_START, task_id=str(task.id or ""), mp=mp_name,
-                  article=str(article.title or "")[:50], platform="csdn")
-        system_prompt, user_prompt = build_prompt(
-            mode="create",
-            title=title,
-            content=source_content,
-            instruction=instruction,
-            create_options=create_options,
-        )
-        draft_text = call_openai_compatible(profile, system_prompt, user_prompt)
-        draft_text = refine_draft(
-            profile=profile,
-            mode="create",
-            draft=draft_text,
-            title=title,
-            create_options=create_options,
-            instruction=instruction,
-        )
-        logger.info(
-            "任务(%s)[%s] CSDN AI 创作完成，创作后内容长度: %d 字符",
-            task.id, mp_name, len(draft_text),
-        )
+        from core.models.message_task import MessageTask as MessageTaskModel
 
-        # ── 4. 生成配图（基于即梦）并嵌入到内容中 ──
-        image_urls: list = []
-        image_notice = ""
-        try:
-            prompts = build_image_prompts(
-                title=article.title or "",
+        messages = []
+        reauth_msg = ""
+        for draft, (success, push_msg, needs_reauth) in results:
+            mp_name = draft["mp_name"]
+            title = draft["title"]
+            draft_id = str(draft["local_draft"].get("id") or "")
+            # 登录态失效的文章未真正推送，不记录，下次重新扫码后重试
+            if needs_reauth:
+                reauth_msg = push_msg
+                continue
+
+            # ── 5. 标记草稿投递状态 ──
+            mark_local_draft_delivery(
+                owner_id=owner_id,
+                draft_id=draft_id,
                 platform="csdn",
-                style="专业深度",
-                image_count=2,
-                content=draft_text,
+                status="success" if success else "failed",
+                message=push_msg,
+                source="message_task_csdn",
+                task_id=str(task.id or ""),
+                extra={
+                    "article_id": draft["article_id"],
+                    "has_images": len(draft["image_urls"]) > 0,
+                    "image_count": len(draft["image_urls"]),
+                },
             )
-            if prompts:
-                image_urls, image_notice = generate_images_with_jimeng(prompts)
-                if image_urls:
-                    # 将图片 URL 合并到 Markdown 中
-                    draft_text = merge_image_urls_into_markdown(draft_text, image_urls)
-                    logger.info(
-                        "任务(%s)[%s] 即梦生图成功，生成 %d 张配图",
-                        task.id, mp_name, len(image_urls),
-                    )
-                else:
-                    logger.warning("任务(%s)[%s] 即梦生图失败: %s", task.id, mp_name, image_notice)
-        except Exception as e:
-            logger.warning("任务(%s)[%s] 生图异常: %s", task.id, mp_name, e)
-
-        # ── 5. 上传图片到七牛云图床（CSDN 无法直接加载即梦图片）──
-        qiniu_mapping = {}
-        if image_urls:
-            try:
-                from core.qiniu_service import process_images_for_csdn
-                draft_text, qiniu_mapping = process_images_for_csdn(draft_text, image_urls)
-                uploaded_count = sum(1 for k, v in qiniu_mapping.items() if k != v)
-                logger.info(
-                    "任务(%s)[%s] 七牛云上传完成，成功 %d/%d",
-                    task.id, mp_name, uploaded_count, len(image_urls)
-                )
-            except Exception as e:
-                logger.warning("任务(%s)[%s] 七牛云上传失败，使用原URL: %s", task.id, mp_name, e)
-
-        # ── 6. 保存到本地草稿箱 ──
-        cover_url = extract_first_image_url_from_text(draft_text) if image_urls else ""
-        local_draft = save_local_draft(
-            owner_id=owner_id,
-            article_id=str(article.id or ""),
-            title=str(article.title or "AI 创作草稿").strip(),
-            content=draft_text,
-            platform="csdn",
-            mode="create",
-            metadata={
-                "digest": "",
-                "author": "",
-                "cover_url": cover_url,
-                "instruction": instruction,
-                "options": create_options,
-                "image_urls": image_urls,
-                "image_notice": image_notice,
-                "qiniu_mapping": qiniu_mapping,
-                "source": "message_task_csdn",
-                "message_task_id": str(task.id or ""),
-                "feed_id": str(article.mp_id or ""),
-            },
-        )
-        logger.info(
-            "任务(%s)[%s] CSDN 草稿已保存，draft_id=%s",
-            task.id, mp_name, str(local_draft.get("id") or "")[:8],
-        )
-
-        # ── 7. 推送创作后的内容到 CSDN ──
-        # 保留完整的 Markdown 内容（含图片链接），由 CSDN 编辑器处理
-        consume_ai_usage(user, image_count=len(image_urls))
-        log_event(logger, E.CSDN_PUSH_START, task_id=str(task.id or ""), mp=mp_name,
-                  title=title[:50], content_len=len(draft_text), has_images=len(image_urls) > 0)
-        from jobs.csdn_publish import push_to_csdn
-        success, push_msg, needs_reauth = push_to_csdn(
-            storage_state, title, draft_text,
-            tags=["人工智能", "大模型", "AI"],
-            fans_only=True,
-        )
-
-        # 登录态失效 → 标记过期 + 站内信提醒用户重新扫码
-        if needs_reauth:
-            mark_csdn_auth_expired(session, owner_id)
-            log_event(logger, E.CSDN_PUSH_NEED_REAUTH, task_id=str(task.id or ""), mp=mp_name)
-            try:
-                create_notice(
-                    session=session,
-                    owner_id=owner_id,
-                    title="CSDN 登录态已失效，需要重新扫码",
-                    content="自动推送时检测到 CSDN 登录状态已失效。请前往「CSDN 登录」页面重新扫码登录，之后推送将自动恢复。",
-                    notice_type="system",
-                )
-            except Exception:
-                pass
-            session.commit()
-            return f"CSDN 登录态失效，请重新扫码：{push_msg}"
-
-        from core.models.message_task import MessageTask as MessageTaskModel
-
-        # ── 8. 标记草稿投递状态 ──
-        mark_local_draft_delivery(
-            owner_id=owner_id,
-            draft_id=str(local_draft.get("id") or ""),
-            platform="csdn",
-            status="success" if success else "failed",
-            message=push_msg,
-            source="message_task_csdn",
-            task_id=str(task.id or ""),
-            extra={
-                "article_id": article_id_str,
-                "has_images": len(image_urls) > 0,
-                "image_count": len(image_urls),
-            },
-        )
 
-        # ── 9. 记录推送结果（无论成功与否都记录文章ID，避免无限重试）──
-        # 注意：只有认证失败(needs_reauth)时不记录，其他情况都记录以便跳过
-        should_record = success or not needs_reauth
-        
-        if should_record and article_id_str:
-            new_ids = list(csdn_published_ids)
-            if article_id_str not in new_ids:
-                new_ids.append(article_id_str)
+            # ── 6. 记录推送结果（无论成功与否都记录文章ID，避免无限重试）──
+            article_id_str = draft["article_id"]
+            if article_id_str and article_id_str not in csdn_published_ids:
+                csdn_published_ids.append(article_id_str)
                 session.query(MessageTaskModel).filter(
                     MessageTaskModel.id == str(task.id or ""),
                     MessageTaskModel.owner_id == owner_id,
                 ).update(
-                    {MessageTaskModel.csdn_published_ids: _json.dumps(new_ids, ensure_ascii=False)},
+                    {MessageTaskModel.csdn_published_ids: _json.dumps(csdn_published_ids, ensure_ascii=False)},
                     synchronize_session=False,
                 )
                 logger.info("任务(%s)[%s] 已记录文章到 csdn_published_ids: %s", task.id, mp_name, article_id_str)
 
-        if success:
-            msg = f"CSDN 推送成功：《{title[:40]}》  {push_msg}"
-            log_event(logger, E.CSDN_PUSH_COMPLETE, task_id=str(task.id or ""), mp=mp_name,
-                      title=title[:50], detail=push_msg[:120], draft_id=str(local_draft.get("id") or "")[:8])
-            try:
-                create_notice(
-                    session=session,
-                    owner_id=owner_id,
-                    title=f"CSDN 推送成功：{title[:50]}",
-                    content=f"{push_msg}\n草稿ID: {str(local_draft.get('id') or '')[:8]}",
-                    notice_type="task",
-                    ref_id=str(local_draft.get("id") or ""),
-                )
-            except Exception:
-                pass
-        else:
-            msg = f"CSDN 推送失败：{push_msg}"
-            log_event(logger, E.CSDN_PUSH_FAIL, task_id=str(task.id or ""), mp=mp_name,
-                      title=title[:50], reason=push_msg[:200], draft_id=str(local_draft.get("id") or "")[:8])
-            logger.warning("任务(%s)[%s] %s", task.id, mp_name, msg)
-            # 只有非认证失败时才发通知（认证失败已在前面处理）
-            if not needs_reauth:
+            if success:
+                msg = f"CSDN 推送成功：《{title[:40]}》  {push_msg}"
+                log_event(logger, E.CSDN_PUSH_COMPLETE, task_id=str(task.id or ""), mp=mp_name,
+                          title=title[:50], detail=push_msg[:120], draft_id=draft_id[:8])
+                try:
+                    create_notice(
+                        session=session,
+                        owner_id=owner_id,
+                        title=f"CSDN 推送成功：{title[:50]}",
+                        content=f"{push_msg}\n草稿ID: {draft_id[:8]}",
+                        notice_type="task",
+                        ref_id=draft_id,
+                    )
+                except Exception:
+                    pass
+            else:
+                msg = f"CSDN 推送失败：{push_msg}"
+                log_event(logger, E.CSDN_PUSH_FAIL, task_id=str(task.id or ""), mp=mp_name,
+                          title=title[:50], reason=push_msg[:200], draft_id=draft_id[:8])
+                logger.warning("任务(%s)[%s] %s", task.id, mp_name, msg)
                 try:
                     create_notice(
                         session=session,
                         owner_id=owner_id,
                         title=f"CSDN 推送失败：{title[:40]}",
-                        content=f"{msg}\n草稿ID: {str(local_draft.get('id') or '')[:8]}\n提示：文章已记录，不会立即重试",
+                        content=f"{msg}\n草稿ID: {draft_id[:8]}\n提示：文章已记录，不会立即重试",
                         notice_type="task",
-                        ref_id=str(local_draft.get("id") or ""),
+                        ref_id=draft_id,
                     )
                 except Exception:
                     pass
+            messages.append(msg)
+
+        # 登录态失效 → 标记过期 + 站内信提醒用户重新扫码
+        if reauth_msg:
+            session.commit()
+            mark_csdn_auth_expired(session, owner_id)
+            log_event(logger, E.CSDN_PUSH_NEED_REAUTH, task_id=str(task.id or ""))
+            try:
+                create_notice(
+                    session=session,
+                    owner_id=owner_id,
+                    title="CSDN 登录态已失效，需要重新扫码",
+                    content="自动推送时检测到 CSDN 登录状态已失效。请前往「CSDN 登录」页面重新扫码登录，之后推送将自动恢复。",
+                    notice_type="system",
+                )
+            except Exception:
+                pass
+            session.commit()
+            messages.append(f"CSDN 登录态失效，请重新扫码：{reauth_msg}")
+            return "；".join(messages)
 
         session.commit()
-        return msg
+        # 登录态在发布过程中会被刷新（cookie 续期），写回 DB 延长有效期
+        if publisher.refreshed_state:
+            try:
+                auth = get_csdn_auth(session, owner_id)
+                upsert_csdn_auth(session, owner_id, publisher.refreshed_state,
+                                 csdn_username=getattr(auth, "csdn_username", "") or "")
+            except Exception as e:
+                logger.warning("任务(%s) 保存刷新后的 CSDN 登录态失败: %s", task.id, e)
+        if blocked_msg:
+            messages.append(blocked_msg)
+        return "；".join(messages)
     except Exception as e:
         try:
             session.rollback()
@@ -759,6 +688,137 @@ def _run_csdn_publish_sync(task: MessageTask, mps: list[Feed]) -> str:
             pass
 
 
+def _compose_csdn_draft(task: MessageTask, owner_id: str, profile, instruction: str, article, mp_name: str) -> dict:
+    """AI 创作一篇 CSDN 文章（含即梦配图、七牛云转存），保存到本地草稿箱并返回推送所需信息。"""
+    from core.ai_service import (
+        build_prompt,
+        build_image_prompts,
+        call_openai_compatible,
+        extract_first_image_url_from_text,
+        generate_images_with_jimeng,
+        merge_image_urls_into_markdown,
+        refine_draft,
+        save_local_draft,
+    )
+
+    article_id_str = str(article.id or "").strip()
+    title = str(article.title or "").strip()
+    source_content = str(article.content or article.description or "").strip()
+
+    logger.info(
+        "任务(%s)[%s] 选定文章 id=%s title=%r source_len=%d",
+        task.id, mp_name, article_id_str, title[:50], len(source_content),
+    )
+
+    create_options = {
+        "platform": "csdn",
+        "style": "专业深度",
+        "length": "medium",
+        "image_count": 2,       # 生成 2 张配图
+        "audience": "",
+        "tone": "",
+        "generate_images": True,
+    }
+    log_event(logger, E.AI_COMPOSE_START, task_id=str(task.id or ""), mp=mp_name,
+              article=str(article.title or "")[:50], platform="csdn")
+    system_prompt, user_prompt = build_prompt(
+        mode="create",
+        title=title,
+        content=source_content,
+        instruction=instruction,
+        create_options=create_options,
+    )
+    draft_text = call_openai_compatible(profile, system_prompt, user_prompt)
+    draft_text = refine_draft(
+        profile=profile,
+        mode="create",
+        draft=draft_text,
+        title=title,
+        create_options=create_options,
+        instruction=instruction,
+    )
+    logger.info(
+        "任务(%s)[%s] CSDN AI 创作完成，创作后内容长度: %d 字符",
+        task.id, mp_name, len(draft_text),
+    )
+
+    # ── 生成配图（基于即梦）并嵌入到内容中 ──
+    image_urls: list = []
+    image_notice = ""
+    try:
+        prompts = build_image_prompts(
+            title=article.title or "",
+            platform="csdn",
+            style="专业深度",
+            image_count=2,
+            content=draft_text,
+        )
+        if prompts:
+            image_urls, image_notice = generate_images_with_jimeng(prompts)
+            if image_urls:
+                # 将图片 URL 合并到 Markdown 中
+                draft_text = merge_image_urls_into_markdown(draft_text, image_urls)
+                logger.info(
+                    "任务(%s)[%s] 即梦生图成功，生成 %d 张配图",
+                    task.id, mp_name, len(image_urls),
+                )
+            else:
+                logger.warning("任务(%s)[%s] 即梦生图失败: %s", task.id, mp_name, image_notice)
+    except Exception as e:
+        logger.warning("任务(%s)[%s] 生图异常: %s", task.id, mp_name, e)
+
+    # ── 上传图片到七牛云图床（CSDN 无法直接加载即梦图片）──
+    qiniu_mapping = {}
+    if image_urls:
+        try:
+            from core.qiniu_service import process_images_for_csdn
+            draft_text, qiniu_mapping = process_images_for_csdn(draft_text, image_urls)
+            uploaded_count = sum(1 for k, v in qiniu_mapping.items() if k != v)
+            logger.info(
+                "任务(%s)[%s] 七牛云上传完成，成功 %d/%d",
+                task.id, mp_name, uploaded_count, len(image_urls)
+            )
+        except Exception as e:
+            logger.warning("任务(%s)[%s] 七牛云上传失败，使用原URL: %s", task.id, mp_name, e)
+
+    # ── 保存到本地草稿箱 ──
+    cover_url = extract_first_image_url_from_text(draft_text) if image_urls else ""
+    local_draft = save_local_draft(
+        owner_id=owner_id,
+        article_id=str(article.id or ""),
+        title=str(article.title or "AI 创作草稿").strip(),
+        content=draft_text,
+        platform="csdn",
+        mode="create",
+        metadata={
+            "digest": "",
+            "author": "",
+            "cover_url": cover_url,
+            "instruction": instruction,
+            "options": create_options,
+            "image_urls": image_urls,
+            "image_notice": image_notice,
+            "qiniu_mapping": qiniu_mapping,
+            "source": "message_task_csdn",
+            "message_task_id": str(task.id or ""),
+            "feed_id": str(article.mp_id or ""),
+        },
+    )
+    logger.info(
+        "任务(%s)[%s] CSDN 草稿已保存，draft_id=%s",
+        task.id, mp_name, str(local_draft.get("id") or "")[:8],
+    )
+    # 保留完整的 Markdown 内容（含图片链接），由 CSDN 编辑器处理
+    return {
+        "article_id": article_id_str,
+        "title": title,
+        "content": draft_text,
+        "mp_name": mp_name,
+        "image_urls": image_urls,
+        "local_draft": local_draft,
+    }
+
+
 def _write_task_execution_log(
     task: MessageTask,
     mp: Union[Feed, list[Feed]],
@@ -819,13 +879,38 @@ def _write_task_execution_log(
             pass
 
 
+def _record_feed_sync(mp, ok: bool, count: int, duration_ms: int, message: str = "") -> None:
+    feed_id = str(getattr(mp, "id", "") or "").strip()
+    if not feed_id:
+        return
+    from core.feed_stats_service import record_sync_result
+
+    session = db.DB.get_session()
+    try:
+        record_sync_result(session, feed_id, ok=ok, count=count, duration_ms=duration_ms, message=message)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.warning("记录公众号同步统计失败 %s: %s", feed_id, e)
+    finally:
+        try:
+            session.close()
+        except Exception:
+            pass
+
+
 def do_job(mp=None, task: MessageTask = None, all_feeds: list[Feed] = None):
     """
     执行任务。
     如果是发布/创作类逻辑，需要考虑跨公众号的全局 top-k，所以会用到 all_feeds。
     """
-    with trace_ctx(f"job-{str(getattr(task, 'id', '') or '')[:8]}") as tid:
+    with trace_ctx(f"job-{str(getattr(task, 'id', '') or '')[:8]}") as tid, start_span("job.run") as job_span:
         mp_name = str(getattr(mp, "mp_name", "") or "") if mp else "全局推送"
+        job_span.set_attributes({
+            "task_id": str(getattr(task, "id", "") or ""),
+            "task_type": str(getattr(task, "task_type", "") or "crawl"),
+            "mp": mp_name,
+        })
         log_event(logger, E.TASK_EXECUTE_START, task_id=str(getattr(task, "id", "")),
                   mp=mp_name, type=str(getattr(task, "task_type", "crawl") or "crawl"))
         
@@ -914,19 +999,23 @@ def do_job(mp=None, task: MessageTask = None, all_feeds: list[Feed] = None):
                 logger.error("任务(%s)[%s] %s", str(getattr(task, 'id', '')), mp_name, msg)
                 return
             log_event(logger, E.FEED_SYNC_START, task_id=str(getattr(task, "id", "")), mp=mp_name)
-            wx.get_Articles(
-                mp.faker_id,
-                CallBack=UpdateArticle,
-                Mps_id=mp.id,
-                Mps_title=mp.mp_name,
-                MaxPage=1,
-                Over_CallBack=Update_Over,
-                interval=interval,
-                token=token,
-                cookie=cookie,
-                user_agent=user_agent,
-            )
+            # 同一公众号在共享窗口内已被其他订阅抓取过时直接复用结果
+            with start_span("job.crawl", attributes={"mp_id": str(getattr(mp, "id", "") or "")}) as crawl_span:
+                shared = crawl_feed(
+                    wx,
+                    mp,
+                    CallBack=UpdateArticle,
+                    MaxPage=1,
+                    Over_CallBack=Update_Over,
+                    interval=interval,
+                    token=token,
+                    cookie=cookie,
+                    user_agent=user_agent,
+                )
+                crawl_span.set_attributes({"shared": bool(shared), "count": wx.all_count()})
             count = wx.all_count()
+            if shared:
+                logs.append("复用同一公众号的共享抓取结果")
             logs.append(f"文章抓取完成，更新 {count} 条")
         except Exception as e:
             status_code = 2
@@ -936,12 +1025,20 @@ def do_job(mp=None, task: MessageTask = None, all_feeds: list[Feed] = None):
             count = wx.all_count()
             all_count += count
             log_event(logger, E.ARTICLE_FETCH_COMPLETE, mp=mp_name, count=count)
+            _record_feed_sync(
+                mp,
+                ok=status_code == 1,
+                count=count,
+                duration_ms=int((datetime.now() - started_at).total_seconds() * 1000),
+                message=logs[-1] if logs else "",
+            )
             from jobs.webhook import MessageWebHook
             tms = MessageWebHook(task=task, feed=mp, articles=wx.articles)
             try:
                 log_event(logger, E.WEBHOOK_SEND_START, task_id=str(getattr(task, "id", "")),
                           url=str(getattr(task, "web_hook_url", "") or "")[:80])
-                web_hook(tms)
+                with start_span("job.webhook"):
+                    web_hook(tms)
                 logs.append("消息通知处理完成")
                 log_event(logger, E.WEBHOOK_SEND_COMPLETE, task_id=str(getattr(task, "id", "")))
             except Exception as e:
@@ -1008,6 +1105,8 @@ def do_job(mp=None, task: MessageTask = None, all_feeds: list[Feed] = None):
                             pass
             except Exception:
                 pass
+            job_span.set_attribute("count", count)
+            job_span.set_status(status_code == 1)
             if status_code == 1:
                 log_event(logger, E.TASK_EXECUTE_COMPLETE, task_id=str(getattr(task, "id", "")),
                           mp=mp_name, type="crawl", count=count, duration=f"{duration:.2f}s")
@@ -1016,24 +1115,26 @@ def do_job(mp=None, task: MessageTask = None, all_feeds: list[Feed] = None):
                           mp=mp_name, count=count)
 
 
-from core.queue import TaskQueue
+from core.queue import TaskQueue, LANE_INTERACTIVE, LANE_SCHEDULED
 
 
-def add_job(feeds: list[Feed] = None, task: MessageTask = None, isTest=False):
+def add_job(feeds: list[Feed] = None, task: MessageTask = None, isTest=False, lane: str = LANE_SCHEDULED):
+    # 按任务所属用户分子队列公平出队；测试/手动运行走交互车道，不再清空其他用户的积压
+    owner_id = str(getattr(task, "owner_id", "") or "")
     if isTest:
-        TaskQueue.clear_queue()
+        lane = LANE_INTERACTIVE
     
     task_type = str(getattr(task, 'task_type', '') or 'crawl').strip() or 'crawl'
     
     if task_type == 'publish':
         # 发布任务：作为一个整体加入队列
-        TaskQueue.add_task(do_job, None, task, feeds)
+        TaskQueue.submit(do_job, (None, task, feeds), owner_id=owner_id, lane=lane)
         if not isTest:
             log_event(logger, E.SYSTEM_JOB_ADD, mp="GlobalPublish", task_id=str(getattr(task, "id", "")))
     else:
         # 采集任务：按公众号拆分
         for feed in feeds:
-            TaskQueue.add_task(do_job, feed, task, feeds)
+            TaskQueue.submit(do_job, (feed, task, feeds), owner_id=owner_id, lane=lane)
             if isTest:
                 logger.info("测试任务，%s，加入队列成功", feed.mp_name)
                 return
@@ -1061,43 +1162,17 @@ def get_feeds(task: MessageTask = None):
 scheduler = TaskScheduler()
 
 
-def _owner_all_task_ids(owner_id: str) -> list[str]:
-    owner = str(owner_id or "").strip()
-    if not owner:
-        return []
-    session = db.DB.get_session()
-    try:
-        from core.models.message_task import MessageTask as MessageTaskModel
-        rows = session.query(MessageTaskModel.id).filter(
-            MessageTaskModel.owner_id == owner
-        ).all()
-        return [str(getattr(item, "id", "") or "") for item in rows if str(getattr(item, "id", "") or "").strip()]
-    except Exception:
-        return []
-    finally:
-        try:
-            session.close()
-        except Exception:
-            pass
-
-
 def reload_job(owner_id: str = ""):
-    owner = str(owner_id or "").strip()
-    if not owner:
-        logger.info("重载全部任务")
-        scheduler.clear_all_jobs()
-        TaskQueue.clear_queue()
-        start_job()
-        return
+    """
+    按数据库中的任务定义增量对齐定时任务（不传 owner_id 时对齐全部用户）。
 
-    logger.info("重载用户任务: %s", owner)
-    for task_id in _owner_all_task_ids(owner):
-        try:
-            stop_job(task_id)
-            log_event(logger, E.TASK_SCHEDULE_REMOVE, task_id=task_id, owner_id=owner)
-        except Exception:
-            pass
-    start_job(owner_id=owner)
+    只增删、替换有变化的任务，不清空调度器和执行队列，已排队的采集不受影响。
+    """
+    owner = str(owner_id or "").strip()
+    logger.info("重载任务: %s", owner or "全部")
+    result = reconcile_jobs(owner_id=owner)
+    scheduler.start()
+    return result
 
 
 def stop_job(task_id: str):
@@ -1119,28 +1194,122 @@ def run(job_id: str = None, isTest=False, owner_id: str = None):
     for task in tasks:
         # 添加测试任务
         logger.warning("%s 添加到队列运行", task.name)
-        add_job(get_feeds(task), task, isTest=isTest)
+        add_job(get_feeds(task), task, isTest=isTest, lane=LANE_INTERACTIVE)
         pass
     return tasks
 
 
 def start_job(job_id: str = None, owner_id: str = ""):
+    """登记定时任务：指定 job_id 时只对齐该任务，否则对齐 owner_id（为空表示全部）的任务"""
+    try:
+        reconcile_jobs(owner_id=owner_id, task_id=job_id)
+    except Exception as e:
+        logger.error("登记定时任务失败: %s", e)
+        return
+    scheduler.start()
+    logger.info("启动任务")
+
+
+def fire_task(task_id: str):
+    """
+    定时触发入口：触发时才读取任务与公众号列表，
+    修改任务的公众号、模板等配置后无需重新登记即可在下次触发时生效。
+    """
     from .taskmsg import get_message_task
-    tasks = get_message_task(job_id, owner_id=owner_id)
+    tasks = get_message_task(task_id)
     if not tasks:
-        logger.info("没有任务")
+        logger.info("任务[%s]不存在或已停用，跳过本次触发", task_id)
         return
-    tag = "定时采集"
-    for task in tasks:
-        cron_exp = task.cron_exp
-        if not cron_exp:
-            logger.error("任务[%s]没有设置cron表达式", task.id)
+    task = tasks[0]
+    add_job(get_feeds(task), task)
+
+
+def _task_version(owner_id, cron_exp, updated_at) -> tuple:
+    stamp = updated_at.isoformat() if isinstance(updated_at, datetime) else str(updated_at or "")
+    return (str(owner_id or ""), str(cron_exp or "").strip(), stamp)
+
+
+def _task_jitter_seconds() -> int:
+    # 大量用户任务使用相同 cron（如 */5）时随机错开触发，避免同一秒集中抓取
+    try:
+        return max(0, int(cfg.get("scheduler.task_jitter_seconds", 0) or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def reconcile_jobs(owner_id: str = "", task_id: str = None) -> dict:
+    """
+    按数据库中的消息任务 (id, cron_exp, updated_at) 与已登记的定时任务做差异对齐：
+    新增缺少的、替换定义变化的、移除已删除或停用的，未变化的任务保持不动。
+
+    只查询这几列，不加载任务全文和公众号列表（在触发时由 fire_task 读取），
+    几千个任务时重载也只需一次轻量查询。owner_id/task_id 用于限定对齐范围。
+    领导者接管或其他进程修改任务后也由调度服务调用，不清空执行队列。
+    """
+    owner = str(owner_id or "").strip()
+    tid = str(task_id or "").strip()
+    # 直接查询：查询失败时应抛出异常中止对齐，而不是当作没有任务把已登记的任务全部移除
+    session = db.DB.get_session()
+    try:
+        query = session.query(
+            MessageTask.id, MessageTask.owner_id, MessageTask.cron_exp, MessageTask.updated_at
+        ).filter(MessageTask.status == 1)
+        if owner:
+            query = query.filter(MessageTask.owner_id == owner)
+        if tid:
+            query = query.filter(MessageTask.id == tid)
+        rows = query.all()
+    finally:
+        session.close()
+
+    expected = {}
+    for row in rows:
+        if not str(row.cron_exp or "").strip():
+            logger.error("任务[%s]没有设置cron表达式", row.id)
             continue
+        expected[str(row.id)] = _task_version(row.owner_id, row.cron_exp, row.updated_at)
+
+    def in_scope(job_id: str, version) -> bool:
+        if tid:
+            return job_id == tid
+        if owner:
+            return isinstance(version, tuple) and version[0] == owner
+        return True
+
+    registered = scheduler.get_job_versions()
+    counts = {"added": 0, "replaced": 0, "removed": 0, "unchanged": 0, "failed": 0}
+    for job_id, version in registered.items():
+        if in_scope(job_id, version) and job_id not in expected:
+            stop_job(job_id)
+            counts["removed"] += 1
+            log_event(logger, E.TASK_SCHEDULE_REMOVE, task_id=job_id, owner_id=owner)
+    for job_id, version in expected.items():
+        current = registered.get(job_id)
+        if job_id in registered and current == version:
+            counts["unchanged"] += 1
+            continue
+        try:
+            scheduler.add_cron_job(
+                fire_task,
+                cron_expr=version[1],
+                args=[job_id],
+                job_id=job_id,
+                tag="定时采集",
+                jitter=_task_jitter_seconds(),
+                version=version,
+            )
+        except Exception as e:
+            # 单个任务的 cron 表达式有误不影响其他任务登记
+            counts["failed"] += 1
+            logger.error("任务[%s]登记失败: %s", job_id, e)
+            continue
+        counts["replaced" if job_id in registered else "added"] += 1
+        log_event(logger, E.TASK_SCHEDULE_ADD, task_id=job_id, job_id=job_id)
+    log_event(logger, E.SCHEDULER_RECONCILE, owner_id=owner or "*", **counts)
+    return counts
 
-        job_id = scheduler.add_cron_job(add_job, cron_expr=cron_exp, args=[get_feeds(task), task], job_id=str(task.id), tag="定时采集")
-        log_event(logger, E.TASK_SCHEDULE_ADD, task_id=str(task.id), job_id=str(job_id))
-    scheduler.start()
-    logger.info("启动任务")
+
+scheduler.add_reconciler(reconcile_jobs)
 
 
 def start_all_task():
@@ -1148,9 +1317,15 @@ def start_all_task():
     from jobs.fetch_no_article import start_sync_content
     from jobs.ai_publish import start_publish_queue_worker
     from jobs.billing import start_subscription_sweep_worker
+    from jobs.feed_stats import start_feed_stats_repair_worker
+    from jobs.retention import start_retention_worker
+    from jobs.tenant_purge import start_tenant_purge_worker
     start_sync_content()
     start_publish_queue_worker()
     start_subscription_sweep_worker()
+    start_feed_stats_repair_worker()
+    start_retention_worker()
+    start_tenant_purge_worker()
     start_job()
 
 
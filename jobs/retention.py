@@ -0,0 +1,34 @@
+import time
+from threading import Thread
+
+from core.config import cfg
+from core.db import DB
+from core.retention_service import RetentionService
+from core.task.service import get_scheduler_service
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def _worker_loop():
+    interval = max(600, int(cfg.get("retention.interval_seconds", 21600) or 21600))
+    while True:
+        time.sleep(interval)
+        # 多进程部署时只由调度领导者执行，避免重复归档
+        if not get_scheduler_service().should_fire():
+            continue
+        try:
+            results = RetentionService(DB.get_engine()).run()
+            deleted = sum(r.deleted for r in results)
+            if deleted:
+                logger.info("日志表清理完成: %s", [r.as_dict() for r in results if r.deleted])
+        except Exception:
+            logger.exception("日志表清理异常")
+
+
+def start_retention_worker():
+    if not cfg.get("retention.enabled", True):
+        return None
+    t = Thread(target=_worker_loop, daemon=True)
+    t.start()
+    return t
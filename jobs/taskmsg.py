@@ -3,7 +3,6 @@ from core.db import Db
 from core.config import cfg
 from core.models import MessageTask
 DB = Db()
-DB.init(cfg.get("db"))
 def get_message_task(job_id:Union[str, list]=None, owner_id: str = None) -> list[MessageTask]:
 
     """
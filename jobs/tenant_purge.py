@@ -0,0 +1,27 @@
+import time
+from threading import Thread
+
+from core.config import cfg
+from core.tenant_purge_service import TenantPurger
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def _worker_loop():
+    # 接管排队中或执行进程已退出（心跳超时）的清理任务；认领是原子的，多进程同时运行也只有一个执行
+    interval = max(30, int(cfg.get("tenant_purge.resume_interval_seconds", 120) or 120))
+    while True:
+        try:
+            purger = TenantPurger()
+            for job_id in purger.runnable_job_ids():
+                purger.run(job_id)
+        except Exception:
+            logger.exception("用户数据清理任务续跑异常")
+        time.sleep(interval)
+
+
+def start_tenant_purge_worker():
+    t = Thread(target=_worker_loop, daemon=True)
+    t.start()
+    return t
@@ -2,6 +2,7 @@ from core.models.message_task import MessageTask
 from core.models.feed import Feed
 from core.models.article import Article
 from core.notice import notice
+from core.notice.dispatcher import Delivery, get_dispatcher
 from dataclasses import dataclass
 from core.lax import TemplateParser
 from datetime import datetime
@@ -21,6 +22,18 @@ class MessageWebHook:
     articles: list[Article]
     pass
 
+def _delivery_context(hook: MessageWebHook) -> dict:
+    """投递记录（message_tasks_logs）需要的任务上下文"""
+    task_id = str(getattr(hook.task, "id", "") or "")
+    owner_id = str(getattr(hook.task, "owner_id", "") or getattr(hook.feed, "owner_id", "") or "")
+    return {
+        "task_id": task_id,
+        "owner_id": owner_id,
+        "mps_id": str(getattr(hook.feed, "id", "") or ""),
+        "article_count": len(hook.articles or []),
+        "coalesce": bool(cfg.get("notice_dispatch.coalesce_articles", True)),
+    }
+
 def send_message(hook: MessageWebHook) -> str:
     """
     发送格式化消息
@@ -52,7 +65,8 @@ def send_message(hook: MessageWebHook) -> str:
     logger.debug("发送消息: %s", message)
     log_event(logger, E.WEBHOOK_SEND_START, url=str(getattr(hook.task, "web_hook_url", "") or "")[:80],
               type="message")
-    notice(hook.task.web_hook_url, hook.task.name, message)
+    # 交给投递队列异步发送，抓取线程不等待接收方
+    notice(hook.task.web_hook_url, hook.task.name, message, **_delivery_context(hook))
     return message
 
 def call_webhook(hook: MessageWebHook) -> str:
@@ -147,22 +161,18 @@ def call_webhook(hook: MessageWebHook) -> str:
     if not hook.task.web_hook_url:
         logger.error("web_hook_url为空")
         return
-    # 发送webhook请求
-    import requests
+    # 交给投递队列异步发送（超时、重试、熔断由投递器处理），结果写入任务执行日志
     url = str(hook.task.web_hook_url or "")
     log_event(logger, E.WEBHOOK_SEND_START, url=url[:80], type="webhook")
-    try:
-        response = requests.post(
-            hook.task.web_hook_url,
-            data=payload,
-            headers={"Content-Type": "application/json"}
-        )
-        response.raise_for_status()
-        log_event(logger, E.WEBHOOK_SEND_COMPLETE, url=url[:80])
-        return "Webhook调用成功"
-    except Exception as e:
-        log_event(logger, E.WEBHOOK_SEND_FAIL, url=url[:80], reason=str(e)[:200])
-        raise ValueError(f"Webhook调用失败: {str(e)}")
+    accepted = get_dispatcher().submit(Delivery(
+        url=url,
+        kind="webhook",
+        payload=payload,
+        **_delivery_context(hook),
+    ))
+    if not accepted:
+        raise ValueError("Webhook调用失败: 未能投递，详见任务执行日志")
+    return "Webhook已加入发送队列"
 
 def web_hook(hook:MessageWebHook):
     """
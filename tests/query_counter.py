@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """记录一段代码内在指定 engine 上执行的 SQL 语句。"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: List[str] = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+class QueryCountMixin:
+    """unittest 混入：断言代码块内执行的 SQL 条数不超过上限，用于防止 N+1 回归。"""
+
+    @contextmanager
+    def assertMaxQueries(self, engine, limit: int):
+        counter = QueryCounter(engine)
+        with counter:
+            yield counter
+        if counter.count > limit:
+            detail = "\n".join(f"  {i + 1}. {sql}" for i, sql in enumerate(counter.statements))
+            self.fail(f"expected at most {limit} queries, got {counter.count}:\n{detail}")
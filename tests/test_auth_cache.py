@@ -0,0 +1,143 @@
+import asyncio
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+from fastapi import HTTPException
+from sqlalchemy import update
+
+import core.auth as auth
+from core.cache import TTLCache
+from core.db import DB
+from core.models.user import User
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLCacheTestCase(unittest.TestCase):
+    def test_entries_expire_and_size_is_bounded(self):
+        clock = FakeClock()
+        cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        # b 最久未使用，被淘汰
+        self.assertIsNone(cache.get("b"))
+        clock.now += 11
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 1)
+
+    def test_incr_restarts_window(self):
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+        self.assertEqual(cache.incr("u"), 1)
+        clock.now += 50
+        self.assertEqual(cache.incr("u"), 2)
+        clock.now += 50
+        self.assertEqual(cache.get("u"), 2)
+        clock.now += 11
+        self.assertEqual(cache.incr("u"), 1)
+
+
+class AuthCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        DB.create_tables()
+        self.session = DB.get_session()
+        self.username = f"u_{uuid.uuid4().hex[:10]}"
+        now = datetime.now()
+        self.session.add(User(
+            id=str(uuid.uuid4()),
+            username=self.username,
+            phone=f"17{uuid.uuid4().int % 1000000000:09d}",
+            password_hash=auth.pwd_context.hash("demo123456"),
+            role="user",
+            permissions="[]",
+            plan_tier="free",
+            created_at=now,
+            updated_at=now,
+            is_active=True,
+        ))
+        self.session.commit()
+        auth._token_cache.clear()
+        auth.clear_user_cache(self.username)
+
+    def tearDown(self):
+        try:
+            self.session.query(User).filter(User.username == self.username).delete()
+            self.session.commit()
+        except Exception:
+            pass
+        self.session.close()
+        auth._login_limiter.reset(self.username)
+
+    def _update_elsewhere(self, **values):
+        # 模拟另一个进程直接改库
+        table = User.__table__
+        with DB.get_engine().begin() as conn:
+            conn.execute(update(table).where(table.c.username == self.username).values(**values))
+
+    def _current_user(self, token):
+        return asyncio.run(auth.get_current_user(token))
+
+    def test_user_record_is_reused_until_auth_version_changes(self):
+        first = auth.get_user(self.username)
+        self.assertIs(auth.get_user(self.username), first)
+
+        # 未递增 auth_version 的修改不会刷新缓存
+        self._update_elsewhere(role="editor")
+        self.assertEqual(auth.get_user(self.username).role, "user")
+
+        self._update_elsewhere(role="admin", auth_version=User.__table__.c.auth_version + 1)
+        self.assertEqual(auth.get_user(self.username).role, "admin")
+
+    def test_bump_auth_version_through_orm(self):
+        auth.get_user(self.username)
+        user = self.session.query(User).filter(User.username == self.username).first()
+        user.plan_tier = "pro"
+        user.bump_auth_version()
+        self.session.commit()
+        self.assertEqual(auth.get_user(self.username).plan_tier, "pro")
+
+    def test_token_claims_are_cached_and_deleted_user_rejected(self):
+        token = auth.create_access_token({"sub": self.username}, timedelta(minutes=5))
+        with mock.patch.object(auth.jwt, "decode", wraps=auth.jwt.decode) as decode:
+            self.assertEqual(self._current_user(token)["username"], self.username)
+            self.assertEqual(self._current_user(token)["role"], "user")
+            self.assertEqual(decode.call_count, 1)
+
+        self.session.query(User).filter(User.username == self.username).delete()
+        self.session.commit()
+        with self.assertRaises(HTTPException) as ctx:
+            self._current_user(token)
+        self.assertEqual(ctx.exception.status_code, 401)
+
+    def test_invalid_token_is_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(HTTPException):
+                self._current_user("not-a-token")
+        self.assertIsNone(auth._token_cache.get("not-a-token"))
+
+    def test_login_attempts_lock_and_reset(self):
+        for _ in range(auth.MAX_LOGIN_ATTEMPTS):
+            with self.assertRaises(HTTPException):
+                auth.authenticate_user(self.username, "wrong-password")
+        self.assertEqual(auth.get_login_attempts(self.username), auth.MAX_LOGIN_ATTEMPTS)
+        with self.assertRaises(HTTPException) as ctx:
+            auth.authenticate_user(self.username, "demo123456")
+        self.assertIn("锁定", ctx.exception.detail["message"])
+
+        auth._login_limiter.reset(self.username)
+        self.assertEqual(auth.authenticate_user(self.username, "demo123456").username, self.username)
+        self.assertEqual(auth.get_login_attempts(self.username), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
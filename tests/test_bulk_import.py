@@ -0,0 +1,129 @@
+import base64
+import csv
+import os
+import tempfile
+import time
+import unittest
+import uuid
+from datetime import datetime
+from unittest import mock
+
+from core.db import DB
+import core.import_service as import_service
+from core.models.feed import Feed
+from core.models.import_job import ImportJob
+from core.models.tags import Tags
+from core.import_service import (
+    FeedImporter,
+    ImportFormatError,
+    TagImporter,
+    create_import_job,
+    run_import_job,
+)
+
+
+class BulkImportTestCase(unittest.TestCase):
+    def setUp(self):
+        DB.create_tables()
+        self.owner = f"u_{uuid.uuid4().hex[:10]}"
+        self.paths = []
+
+    def tearDown(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+        session = DB.get_session()
+        try:
+            for model in (Feed, Tags, ImportJob):
+                session.query(model).filter(model.owner_id == self.owner).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def _csv(self, header, rows):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+        self.paths.append(path)
+        return path
+
+    def _feed_csv(self, count, cover="c"):
+        header = ["id", "公众号名称", "封面图", "简介", "状态", "创建时间", "faker_id"]
+        rows = [["", f"mp{i}", cover, "intro", 1, "", base64.b64encode(f"{self.owner}-{i}".encode()).decode()]
+                for i in range(count)]
+        return self._csv(header, rows)
+
+    def _feeds(self):
+        session = DB.get_session()
+        try:
+            return session.query(Feed).filter(Feed.owner_id == self.owner).all()
+        finally:
+            session.close()
+
+    def test_feed_import_prefetches_once_per_chunk_and_upserts(self):
+        importer = FeedImporter(self.owner, chunk_size=100)
+        with mock.patch("core.import_service.upsert_rows", wraps=import_service.upsert_rows) as upsert:
+            stats = importer.run_file(self._feed_csv(250))
+        self.assertEqual(upsert.call_count, 3)
+        self.assertEqual((stats["imported"], stats["updated"], stats["processed"]), (250, 0, 250))
+
+        stats = FeedImporter(self.owner, chunk_size=100).run_file(self._feed_csv(260, cover="new"))
+        self.assertEqual((stats["imported"], stats["updated"]), (10, 250))
+        feeds = self._feeds()
+        self.assertEqual(len(feeds), 260)
+        self.assertTrue(all(feed.mp_cover == "new" for feed in feeds))
+        self.assertTrue(all(feed.id.startswith(f"MP_WXS_{self.owner}_") for feed in feeds))
+
+    def test_import_is_fast_for_large_files(self):
+        started = time.perf_counter()
+        stats = FeedImporter(self.owner).run_file(self._feed_csv(5000))
+        self.assertEqual(stats["imported"], 5000)
+        self.assertLess(time.perf_counter() - started, 10)
+
+    def test_tag_import_updates_own_tags_and_skips_blank_names(self):
+        session = DB.get_session()
+        try:
+            tag_id = str(uuid.uuid4())
+            session.add(Tags(id=tag_id, owner_id=self.owner, name="old", mps_id="[]", status=1,
+                             created_at=datetime.now(), updated_at=datetime.now()))
+            session.commit()
+        finally:
+            session.close()
+        header = ["id", "标签名称", "封面图", "描述", "状态", "创建时间", "mps_id"]
+        path = self._csv(header, [
+            [tag_id, "renamed", "", "", 1, "", "[]"],
+            ["", "fresh", "", "", "x", "", "[]"],
+            ["", " ", "", "", 1, "", "[]"],
+        ])
+        stats = TagImporter(self.owner).run_file(path)
+        self.assertEqual((stats["imported"], stats["updated"], stats["skipped"]), (1, 1, 1))
+        session = DB.get_session()
+        try:
+            names = sorted(t.name for t in session.query(Tags).filter(Tags.owner_id == self.owner))
+        finally:
+            session.close()
+        self.assertEqual(names, ["fresh", "renamed"])
+
+    def test_background_job_reports_progress(self):
+        path = self._feed_csv(30)
+        job = create_import_job(self.owner, "feeds", path, filename="mps.csv")
+        self.assertEqual((job["status"], job["progress"]["total_rows"]), ("pending", 30))
+        seen = []
+        done = run_import_job(job["id"], path, chunk_size=10, progress=lambda stats: seen.append(stats["processed"]))
+        self.assertEqual(seen, [10, 20, 30])
+        self.assertEqual(done["status"], "done")
+        self.assertEqual(done["progress"]["percent"], 100.0)
+        self.assertEqual(done["stats"]["imported"], 30)
+        self.assertFalse(os.path.exists(path))
+
+    def test_missing_columns_are_rejected(self):
+        path = self._csv(["id", "公众号名称"], [["1", "x"]])
+        with self.assertRaises(ImportFormatError) as ctx:
+            create_import_job(self.owner, "feeds", path)
+        self.assertEqual(ctx.exception.missing, ["封面图", "简介"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from core.config import Config
+
+
+SAMPLE = """
+debug: 'true'
+port: '8001'
+ratio: '0.5'
+empty: ''
+none_value:
+name: ${SNAPSHOT_TEST_NAME:-fallback}
+rss:
+  full_context: false
+  items: [a, b]
+"""
+
+
+class ConfigSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "config.yaml")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(SAMPLE)
+        self.cfg = Config(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_values_keep_interpolation_and_typing(self):
+        self.assertIs(self.cfg.get("debug"), True)
+        self.assertEqual(self.cfg.get("port"), 8001)
+        self.assertEqual(self.cfg.get("ratio"), 0.5)
+        self.assertEqual(self.cfg.get("empty", "x"), "")
+        self.assertEqual(self.cfg.get("none_value", "x"), "")
+        self.assertEqual(self.cfg.get("name"), "fallback")
+        self.assertIs(self.cfg.get("rss.full_context", True), False)
+        self.assertEqual(self.cfg.get("rss.missing", 3), 3)
+        self.assertEqual(self.cfg.get("rss.items.0", "d"), "d")
+        self.assertEqual(self.cfg.get("debug.x", "d"), "d")
+
+    def test_lookups_do_not_rebuild_snapshot(self):
+        self.cfg.get("debug")
+        with mock.patch.object(self.cfg, "replace_env_vars", wraps=self.cfg.replace_env_vars) as resolve:
+            for _ in range(100):
+                self.cfg.get("rss.full_context")
+        self.assertEqual(resolve.call_count, 0)
+
+    def test_returned_containers_are_copies(self):
+        self.cfg.get("rss")["full_context"] = True
+        self.cfg.get("rss.items").append("c")
+        self.assertIs(self.cfg.get("rss.full_context"), False)
+        self.assertEqual(self.cfg.get("rss.items"), ["a", "b"])
+
+    def test_in_place_changes_and_set_are_visible(self):
+        self.cfg.get("debug")
+        self.cfg.config["rss"]["full_context"] = True
+        self.assertIs(self.cfg.get("rss.full_context"), True)
+        self.cfg.set("port", 9000, save=False)
+        self.assertEqual(self.cfg.get("port"), 9000)
+
+    def test_external_file_change_is_picked_up(self):
+        self.assertEqual(self.cfg.get("port"), 8001)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("port: 9100\n")
+        stamp = time.time() + 5
+        os.utime(self.path, (stamp, stamp))
+        self.cfg._checked_at = 0.0
+        self.assertEqual(self.cfg.get("port"), 9100)
+        self.assertFalse(self.cfg.refresh())
+
+
+if __name__ == "__main__":
+    unittest.main()
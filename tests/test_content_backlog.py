@@ -0,0 +1,158 @@
+import threading
+import time
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from core.db import DB
+from core.models.article import Article
+from core.models.base import DATA_STATUS
+from core.models.content_backlog import ContentBacklog
+from core.content_backlog_service import (
+    SUBSCRIBED_BOOST,
+    ContentBackfiller,
+    backlog_priority,
+    mark_feed_subscribed,
+)
+
+T0 = datetime(2000, 1, 1)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class ContentBacklogTestCase(unittest.TestCase):
+    def setUp(self):
+        DB.create_tables()
+        self.feed_id = f"MP_WXS_{uuid.uuid4().hex[:10]}"
+        self.clock = Clock(T0)
+
+    def tearDown(self):
+        session = DB.get_session()
+        try:
+            session.query(ContentBacklog).filter(ContentBacklog.feed_id == self.feed_id).delete(synchronize_session=False)
+            session.query(Article).filter(Article.mp_id == self.feed_id).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def _article(self, priority=0, content=None, due=T0 - timedelta(seconds=1)):
+        article_id = f"a_{uuid.uuid4().hex[:12]}"
+        session = DB.get_session()
+        try:
+            session.add(Article(
+                id=article_id, mp_id=self.feed_id, owner_id="", title=article_id,
+                url=f"https://mp.weixin.qq.com/s/{article_id}", content=content,
+                status=DATA_STATUS.ACTIVE, publish_time=int(time.time()),
+                created_at=datetime.now(), updated_at=datetime.now(),
+            ))
+            session.add(ContentBacklog(
+                article_id=article_id, feed_id=self.feed_id, owner_id="", priority=priority,
+                attempts=0, next_attempt_at=due, last_error="", created_at=T0, updated_at=T0,
+            ))
+            session.commit()
+        finally:
+            session.close()
+        return article_id
+
+    def _backlog(self, article_id):
+        session = DB.get_session()
+        try:
+            return session.query(ContentBacklog).filter(ContentBacklog.article_id == article_id).first()
+        finally:
+            session.close()
+
+    def _content(self, article_id):
+        session = DB.get_session()
+        try:
+            return session.query(Article.content).filter(Article.id == article_id).scalar()
+        finally:
+            session.close()
+
+    def _backfiller(self, fetch, **kwargs):
+        kwargs.setdefault("concurrency", 1)
+        kwargs.setdefault("pause_seconds", 0)
+        return ContentBackfiller(fetcher_factory=lambda: fetch, clock=self.clock, **kwargs)
+
+    def test_add_article_registers_missing_content_only(self):
+        raw_id = uuid.uuid4().hex[:10]
+        DB.add_article({"id": raw_id, "mp_id": self.feed_id, "title": "t", "url": "", "publish_time": int(time.time())})
+        DB.add_article({"id": raw_id + "x", "mp_id": self.feed_id, "title": "t", "url": "", "content": "<p>x</p>",
+                        "publish_time": int(time.time())})
+        session = DB.get_session()
+        try:
+            rows = session.query(ContentBacklog).filter(ContentBacklog.feed_id == self.feed_id).all()
+        finally:
+            session.close()
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0].article_id.endswith(raw_id))
+        self.assertEqual(rows[0].priority, 30)
+
+    def test_batches_follow_priority_and_are_leased(self):
+        low = self._article(priority=0)
+        high = self._article(priority=50)
+        backfiller = self._backfiller(lambda url: "", batch_size=1)
+        self.assertEqual(backfiller.claim_batch(), [high])
+        self.assertEqual(backfiller.claim_batch(), [low])
+        self.assertEqual(backfiller.claim_batch(), [])
+
+    def test_drain_fills_content_and_backs_off_failures(self):
+        good = self._article(priority=10)
+        bad = self._article(priority=5)
+        result = self._backfiller(lambda url: "" if bad in url else "<p>body</p>", max_attempts=3,
+                                  retry_base_seconds=60).drain(max_batches=1)
+        self.assertEqual((result["filled"], result["failed"]), (1, 1))
+        self.assertEqual(self._content(good), "<p>body</p>")
+        self.assertIsNone(self._backlog(good))
+        item = self._backlog(bad)
+        self.assertEqual(item.attempts, 1)
+        self.assertEqual(item.next_attempt_at, T0 + timedelta(seconds=60))
+
+        backfiller = self._backfiller(lambda url: "", max_attempts=3, retry_base_seconds=60)
+        self.clock.now = T0 + timedelta(seconds=61)
+        backfiller.drain(max_batches=1)
+        self.assertEqual(self._backlog(bad).next_attempt_at, self.clock.now + timedelta(seconds=120))
+        self.clock.now += timedelta(seconds=121)
+        self.assertEqual(backfiller.drain(max_batches=1)["dropped"], 1)
+        self.assertIsNone(self._backlog(bad))
+
+    def test_workers_scale_with_concurrency(self):
+        for _ in range(6):
+            self._article()
+        threads = set()
+        lock = threading.Lock()
+
+        def factory():
+            def fetch(url):
+                with lock:
+                    threads.add(threading.current_thread().name)
+                time.sleep(0.01)
+                return "<p>ok</p>"
+            return fetch
+
+        backfiller = ContentBackfiller(fetcher_factory=factory, concurrency=3, pause_seconds=0, clock=self.clock)
+        self.assertEqual(backfiller.batch_size, 15)
+        self.assertEqual(backfiller.drain(max_batches=1)["filled"], 6)
+        self.assertEqual(len(threads), 3)
+
+    def test_subscribed_feed_is_boosted_once(self):
+        article_id = self._article(priority=20)
+        self.assertTrue(mark_feed_subscribed(self.feed_id))
+        self.assertFalse(mark_feed_subscribed(self.feed_id))
+        self.assertEqual(self._backlog(article_id).priority, 20 + SUBSCRIBED_BOOST)
+
+    def test_priority_prefers_recent_articles(self):
+        now = 1_700_000_000
+        self.assertEqual(backlog_priority(now - 3600, now=now), 30)
+        self.assertEqual(backlog_priority(now - 3 * 86400, now=now), 20)
+        self.assertEqual(backlog_priority(now - 90 * 86400, now=now), 0)
+        self.assertEqual(backlog_priority(now - 90 * 86400, subscribed=True, now=now), SUBSCRIBED_BOOST)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,286 @@
+import unittest
+from unittest import mock
+
+import jobs.csdn_publish as csdn_publish
+from jobs.csdn_publish import EDITOR_URL, CsdnPublishSession
+
+
+class FakeTimeout(Exception):
+    pass
+
+
+class FakeResponse:
+    def __init__(self, body, status=200):
+        self.url = "https://bizapi.csdn.net/blog-console-api/v3/mdeditor/saveArticle"
+        self.status = status
+        self.ok = 200 <= status < 300
+        self.request = mock.Mock(method="POST")
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class FakeKeyboard:
+    def __init__(self, page):
+        self.page = page
+        self.typed = ""
+
+    def type(self, text):
+        self.typed += text
+
+    def press(self, key):
+        if key == "Enter" and self.typed:
+            self.page.tags.append(self.typed)
+            self.typed = ""
+
+
+class FakeLocator:
+    def __init__(self, page, selector):
+        self.page = page
+        self.selector = selector
+
+    @property
+    def first(self):
+        return self
+
+    def count(self):
+        return self.page.match(self.selector)
+
+    def wait_for(self, state="visible", timeout=None):
+        if self.count() == 0:
+            raise FakeTimeout(f"locator {self.selector!r} not found")
+
+    def click(self, timeout=None):
+        self.wait_for()
+        self.page.click(self.selector)
+
+    def hover(self):
+        self.wait_for()
+
+    def scroll_into_view_if_needed(self):
+        pass
+
+    def is_visible(self):
+        return self.count() > 0
+
+    def is_checked(self):
+        return self.page.fans_only
+
+    def bounding_box(self):
+        return {"x": 0, "y": 0, "width": 100, "height": 40}
+
+
+class FakeEditorPage:
+    """
+    CSDN Markdown 编辑器的最小模拟：标题输入框 + CodeMirror 编辑器 + 发布弹窗，
+    点击确认发布后通过 response 事件返回 saveArticle 接口结果。
+    """
+
+    def __init__(self, context, redirect_to_login=False, publish_body=None):
+        self.context = context
+        self.redirect_to_login = redirect_to_login
+        self.publish_body = publish_body or {"code": 200, "data": {"id": "1001", "url": "https://blog.csdn.net/u/article/details/1001"}}
+        self.url = "about:blank"
+        self.title = ""
+        self.content = ""
+        self.modal_open = False
+        self.tags = []
+        self.fans_only = False
+        self.closed = False
+        self.listeners = []
+        self.keyboard = FakeKeyboard(self)
+        self.mouse = mock.Mock()
+        self.load_states = []
+
+    # ── 导航与等待 ──
+    def goto(self, url, **kwargs):
+        self.url = "https://passport.csdn.net/login" if self.redirect_to_login else url
+
+    def wait_for_selector(self, selector, state="visible", timeout=None):
+        if state == "detached":
+            if self.modal_open:
+                raise FakeTimeout(selector)
+            return None
+        if self.match(selector) == 0:
+            raise FakeTimeout(selector)
+
+    def wait_for_load_state(self, state="load", timeout=None):
+        self.load_states.append(state)
+
+    def wait_for_url(self, predicate, timeout=None):
+        if not predicate(self.url):
+            raise FakeTimeout("url")
+
+    def wait_for_event(self, event, predicate=None, timeout=None):
+        raise FakeTimeout(event)
+
+    def on(self, event, handler):
+        if event == "response":
+            self.listeners.append(handler)
+
+    # ── 元素 ──
+    def match(self, selector):
+        if self.redirect_to_login:
+            return 0
+        if "modal" in selector or "el-dialog" in selector:
+            if not self.modal_open or ".modal__inner-2" not in selector:
+                return 0
+            if ".el-tag" in selector:
+                return len(self.tags)
+            return 1
+        if "btn-publish" in selector:
+            return 1
+        if "editor__inner" in selector:
+            return 1
+        return 0
+
+    def locator(self, selector):
+        return FakeLocator(self, selector)
+
+    def get_by_role(self, role, name=None):
+        return FakeLocator(self, f'button:has-text("{name}")')
+
+    def get_by_text(self, text):
+        return FakeLocator(self, f"text={text}")
+
+    def query_selector(self, selector):
+        if 'placeholder*="标题"' in selector:
+            element = mock.Mock()
+            element.fill.side_effect = lambda value: setattr(self, "title", value)
+            return element
+        return None
+
+    def click(self, selector):
+        if not self.modal_open and "btn-publish" in selector:
+            self.modal_open = True
+        elif self.modal_open and 'for="needfans"' in selector:
+            self.fans_only = not self.fans_only
+        elif self.modal_open and ("btn-b-red" in selector or "btn-publish" in selector):
+            self.modal_open = False
+            self.url = "https://mp.csdn.net/mp_blog/creation/success/1001"
+            response = FakeResponse(self.publish_body)
+            for handler in self.listeners:
+                handler(response)
+
+    def evaluate(self, script, arg=None):
+        if "CodeMirror.setValue" in script:
+            self.content = arg
+            return True
+        if "getValue().length" in script:
+            return len(self.content)
+        return False
+
+    def eval_on_selector(self, selector, script, arg=None):
+        self.content = arg
+
+    def screenshot(self, **kwargs):
+        return b""
+
+    def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self, browser, storage_state):
+        self.browser = browser
+        self.state = dict(storage_state)
+        self.pages = []
+        self.closed = False
+
+    def new_page(self):
+        page = FakeEditorPage(self, **self.browser.page_options)
+        self.pages.append(page)
+        return page
+
+    def storage_state(self):
+        return {**self.state, "refreshed": len(self.pages)}
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self, **page_options):
+        self.page_options = page_options
+        self.contexts = []
+
+    def new_context(self, storage_state=None):
+        context = FakeContext(self, storage_state or {})
+        self.contexts.append(context)
+        return context
+
+
+class CsdnPublishSessionTestCase(unittest.TestCase):
+    def setUp(self):
+        # 发布流程不应再依赖固定 sleep
+        patcher = mock.patch.object(csdn_publish.time, "sleep", side_effect=AssertionError("fixed sleep"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(csdn_publish, "_take_screenshot", return_value="")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batch_reuses_one_context_and_persists_state(self):
+        browser = FakeBrowser()
+        articles = [(f"标题{i}", "# 正文\n" + "内容" * 50) for i in range(3)]
+        with CsdnPublishSession({"cookies": []}, browser=browser, timeout_ms=100) as publisher:
+            results = publisher.publish_batch(articles, tags=["AI"])
+
+        self.assertEqual(len(browser.contexts), 1)
+        context = browser.contexts[0]
+        self.assertTrue(context.closed)
+        self.assertEqual(len(context.pages), 3)
+        self.assertTrue(all(page.closed for page in context.pages))
+        self.assertTrue(all(success and not reauth for success, _, reauth in results))
+        self.assertIn("https://blog.csdn.net/u/article/details/1001", results[0][1])
+
+        page = context.pages[1]
+        self.assertEqual(page.url, "https://mp.csdn.net/mp_blog/creation/success/1001")
+        self.assertEqual(page.title, "标题1")
+        self.assertEqual(page.tags, ["AI"])
+        self.assertTrue(page.fans_only)
+        self.assertIn("networkidle", page.load_states)
+        self.assertEqual(publisher.published, 3)
+        self.assertEqual(publisher.refreshed_state, {"cookies": [], "refreshed": 3})
+
+    def test_login_redirect_stops_batch(self):
+        browser = FakeBrowser(redirect_to_login=True)
+        with CsdnPublishSession({"cookies": []}, browser=browser, timeout_ms=100) as publisher:
+            results = publisher.publish_batch([("a", "x" * 50), ("b", "y" * 50)])
+            again = publisher.publish("c", "z" * 50)
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][0], False)
+        self.assertTrue(results[0][2])
+        self.assertTrue(again[2])
+        self.assertEqual(len(browser.contexts[0].pages), 1)
+        self.assertIsNone(publisher.refreshed_state)
+        self.assertEqual(browser.contexts[0].pages[0].url.split("/")[2], "passport.csdn.net")
+
+    def test_rejected_publish_response_fails(self):
+        browser = FakeBrowser(publish_body={"code": 400, "msg": "标题重复"})
+        with CsdnPublishSession({}, browser=browser, editor_url=EDITOR_URL, timeout_ms=100) as publisher:
+            success, message, needs_reauth = publisher.publish("t", "x" * 50)
+
+        self.assertFalse(success)
+        self.assertFalse(needs_reauth)
+        self.assertIn("标题重复", message)
+        self.assertEqual(publisher.published, 0)
+        self.assertIsNone(publisher.refreshed_state)
+
+    def test_launch_failure_is_reported_per_article(self):
+        browser = FakeBrowser()
+        browser.new_context = mock.Mock(side_effect=RuntimeError("no chromium"))
+        with CsdnPublishSession({}, browser=browser, timeout_ms=100) as publisher:
+            self.assertIn("no chromium", publisher.start_error)
+            results = publisher.publish_batch([("a", "x" * 50), ("b", "y" * 50)])
+
+        # 启动失败不是登录失效：调用方照常记录文章，不会在下一轮重复创作
+        self.assertEqual([(ok, reauth) for ok, _, reauth in results], [(False, False), (False, False)])
+        self.assertEqual(browser.new_context.call_count, 1)
+        self.assertIsNone(publisher.refreshed_state)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy import select
+
+import core.db as db
+from core.engine_registry import bootstrap_once, get_engine
+from core.models.schema_meta import SchemaMeta
+
+
+class EngineRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.url = f"sqlite:///{os.path.join(self.tmp_dir, 'registry.db')}"
+
+    def tearDown(self):
+        get_engine(self.url).dispose()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _schema_version(self):
+        with get_engine(self.url).connect() as conn:
+            return conn.execute(
+                select(SchemaMeta.__table__.c.version).where(SchemaMeta.__table__.c.name == "schema")
+            ).scalar()
+
+    def test_db_instances_share_one_engine(self):
+        first = db.Db(tag="registry-a")
+        second = db.Db(tag="registry-b")
+        self.assertIs(first.engine, second.engine)
+        self.assertIs(first.engine, db.DB.engine)
+
+    def test_same_url_returns_same_engine_and_creates_sqlite_file(self):
+        self.assertIs(get_engine(self.url), get_engine(self.url))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, "registry.db")))
+
+    def test_bootstrap_runs_once_per_process(self):
+        calls = []
+        self.assertTrue(bootstrap_once(self.url, calls.append))
+        self.assertFalse(bootstrap_once(self.url, calls.append))
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_bootstrap_is_retried(self):
+        def broken(engine):
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            bootstrap_once(self.url, broken)
+        calls = []
+        self.assertTrue(bootstrap_once(self.url, calls.append))
+
+    def test_schema_version_marker_skips_patches(self):
+        database = db.Db(tag="registry-schema")
+        engine = get_engine(self.url)
+        with mock.patch.object(db.Db, "_ensure_feed_columns") as ensure:
+            database._bootstrap_schema(engine)
+            self.assertEqual(ensure.call_count, 1)
+            self.assertEqual(self._schema_version(), db.SCHEMA_VERSION)
+            database._bootstrap_schema(engine)
+            self.assertEqual(ensure.call_count, 1)
+
+    def test_failed_patch_does_not_record_version(self):
+        database = db.Db(tag="registry-schema")
+        engine = get_engine(self.url)
+
+        def failing_patch(self):
+            self._schema_warning("ensure feeds schema failed: boom")
+
+        with mock.patch.object(db.Db, "_ensure_feed_columns", failing_patch):
+            database._bootstrap_schema(engine)
+        self.assertIsNone(self._schema_version())
+
+
+if __name__ == "__main__":
+    unittest.main()
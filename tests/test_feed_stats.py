@@ -0,0 +1,124 @@
+import unittest
+import uuid
+from datetime import datetime
+
+from core.db import DB
+from core.feed_stats_service import (
+    get_feed_stats,
+    get_owner_overview,
+    record_read_change,
+    record_sync_result,
+    repair_feed_stats,
+    SYNC_STATUS_FAILED,
+)
+from core.models.article import Article
+from core.models.feed import Feed
+from core.models.feed_stats import FeedStats
+from apis.article import delete_article, toggle_article_read_status
+from jobs.mps import _latest_article_for_feed
+
+
+class FeedStatsTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        DB.create_tables()
+        self.owner = f"fs_{uuid.uuid4().hex[:8]}"
+        self.feed_id = f"MP_WXS_{self.owner}"
+        session = DB.get_session()
+        now = datetime.now()
+        session.add(Feed(
+            id=self.feed_id,
+            owner_id=self.owner,
+            mp_name="stats",
+            status=1,
+            created_at=now,
+            updated_at=now,
+            faker_id=self.feed_id,
+        ))
+        session.commit()
+        for i in range(3):
+            DB.add_article({
+                "id": f"{self.owner}{i}",
+                "mp_id": self.feed_id,
+                "title": f"title-{i}",
+                "url": f"https://example.com/{self.owner}/{i}",
+                "publish_time": 1700000000 + i,
+            })
+        self.article_ids = [f"{self.owner}-{self.owner}{i}" for i in range(3)]
+
+    def tearDown(self):
+        session = DB.get_session()
+        try:
+            session.query(Article).filter(Article.mp_id == self.feed_id).delete(synchronize_session=False)
+            session.query(FeedStats).filter(FeedStats.feed_id == self.feed_id).delete(synchronize_session=False)
+            session.query(Feed).filter(Feed.id == self.feed_id).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def _stats(self):
+        session = DB.get_session()
+        session.expire_all()
+        return get_feed_stats(session, self.feed_id)
+
+    def test_ingestion_should_maintain_stats(self):
+        stats = self._stats()
+        self.assertEqual(stats.owner_id, self.owner)
+        self.assertEqual(stats.unread_count, 3)
+        self.assertEqual(stats.latest_article_id, self.article_ids[2])
+        self.assertEqual(stats.latest_publish_time, 1700000002)
+        self.assertEqual(
+            get_owner_overview(DB.get_session(), self.owner),
+            {"mp_count": 1, "article_count": 3, "unread_count": 3},
+        )
+
+    async def test_read_and_delete_should_update_stats(self):
+        user = {"username": self.owner}
+        await toggle_article_read_status(self.article_ids[0], is_read=True, current_user=user)
+        await toggle_article_read_status(self.article_ids[0], is_read=True, current_user=user)
+        self.assertEqual(self._stats().unread_count, 2)
+
+        await delete_article(self.article_ids[2], current_user=user)
+        stats = self._stats()
+        self.assertEqual(stats.unread_count, 1)
+        self.assertEqual(stats.latest_article_id, self.article_ids[1])
+        latest = _latest_article_for_feed(DB.get_session(), self.owner, self.feed_id)
+        self.assertEqual(latest.id, self.article_ids[1])
+
+    def test_overview_counts_disabled_feeds(self):
+        session = DB.get_session()
+        try:
+            session.query(Feed).filter(Feed.id == self.feed_id).update({Feed.status: 0})
+            session.commit()
+            self.assertEqual(
+                get_owner_overview(session, self.owner),
+                {"mp_count": 1, "article_count": 3, "unread_count": 3},
+            )
+        finally:
+            session.close()
+
+    def test_sync_result_and_repair(self):
+        session = DB.get_session()
+        record_sync_result(session, self.feed_id, ok=False, count=0, duration_ms=1234, message="授权无效")
+        session.query(FeedStats).filter(FeedStats.feed_id == self.feed_id).update({FeedStats.unread_count: 42})
+        session.commit()
+
+        repair_feed_stats(session, [self.feed_id])
+        stats = self._stats()
+        self.assertEqual(stats.unread_count, 3)
+        self.assertEqual(stats.last_sync_status, SYNC_STATUS_FAILED)
+        self.assertEqual(stats.last_crawl_ms, 1234)
+
+    def test_missing_row_should_be_rebuilt_on_read_change(self):
+        session = DB.get_session()
+        session.query(FeedStats).filter(FeedStats.feed_id == self.feed_id).delete()
+        session.commit()
+        article = session.query(Article).filter(Article.id == self.article_ids[0]).first()
+        record_read_change(session, article, True)
+        session.commit()
+        self.assertIsNone(self._stats())
+        repair_feed_stats(session, [self.feed_id])
+        self.assertEqual(self._stats().unread_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
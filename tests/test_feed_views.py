@@ -0,0 +1,134 @@
+import json
+import unittest
+import uuid
+from datetime import datetime
+
+from core.db import DB
+from core.feed_stats_service import recount_article_counts
+from core.models.article import Article
+from core.models.base import DATA_STATUS
+from core.models.feed import Feed
+from core.models.feed_stats import FeedStats
+from core.models.tag_feed import TagFeed
+from core.models.tags import Tags
+from core.tag_feed_service import sync_tag_feeds
+from apis.article import get_articles, delete_article
+from views.base import get_mps_view, get_tags_view
+from tests.query_counter import QueryCountMixin
+
+
+class FeedViewQueryTestCase(QueryCountMixin, unittest.IsolatedAsyncioTestCase):
+    FEEDS = 6
+    ARTICLES_PER_FEED = 3
+
+    def setUp(self):
+        DB.create_tables()
+        self.owner = f"fv_{uuid.uuid4().hex[:8]}"
+        self.feed_ids = [f"MP_WXS_{self.owner}_{i}" for i in range(self.FEEDS)]
+        session = DB.get_session()
+        now = datetime.now()
+        for feed_id in self.feed_ids:
+            session.add(Feed(
+                id=feed_id,
+                owner_id=self.owner,
+                mp_name=f"name-{feed_id}",
+                mp_cover="",
+                mp_intro="",
+                status=1,
+                sync_time=0,
+                update_time=0,
+                created_at=now,
+                updated_at=now,
+                faker_id=feed_id,
+            ))
+        tag = Tags(
+            id=f"tag_{self.owner}",
+            owner_id=self.owner,
+            name="tag",
+            cover="",
+            intro="",
+            status=1,
+            mps_id=json.dumps([{"id": feed_id} for feed_id in self.feed_ids]),
+            created_at=now,
+            updated_at=now,
+        )
+        session.add(tag)
+        session.flush()
+        sync_tag_feeds(session, tag)
+        session.commit()
+        for feed_id in self.feed_ids:
+            for i in range(self.ARTICLES_PER_FEED):
+                DB.add_article({
+                    "id": f"{uuid.uuid4().hex[:10]}",
+                    "mp_id": feed_id,
+                    "title": f"title-{i}",
+                    "url": f"https://example.com/{feed_id}/{i}",
+                    "publish_time": 1700000000 + i,
+                })
+
+    def tearDown(self):
+        session = DB.get_session()
+        try:
+            session.query(Article).filter(Article.mp_id.in_(self.feed_ids)).delete(synchronize_session=False)
+            session.query(FeedStats).filter(FeedStats.owner_id == self.owner).delete(synchronize_session=False)
+            session.query(Feed).filter(Feed.owner_id == self.owner).delete(synchronize_session=False)
+            session.query(TagFeed).filter(TagFeed.owner_id == self.owner).delete(synchronize_session=False)
+            session.query(Tags).filter(Tags.owner_id == self.owner).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def _feed_counts(self):
+        session = DB.get_session()
+        rows = session.query(Feed.id, Feed.article_count).filter(Feed.owner_id == self.owner).all()
+        return {feed_id: count for feed_id, count in rows}
+
+    def test_add_article_should_maintain_feed_counter(self):
+        counts = self._feed_counts()
+        self.assertEqual(set(counts.values()), {self.ARTICLES_PER_FEED})
+
+    async def test_delete_article_should_decrement_counter(self):
+        session = DB.get_session()
+        article = session.query(Article).filter(Article.mp_id == self.feed_ids[0]).first()
+        await delete_article(article.id, current_user={"username": self.owner})
+        await delete_article(article.id, current_user={"username": self.owner})
+        self.assertEqual(self._feed_counts()[self.feed_ids[0]], self.ARTICLES_PER_FEED - 1)
+
+    def test_recount_should_repair_drifted_counter(self):
+        session = DB.get_session()
+        session.query(Feed).filter(Feed.id == self.feed_ids[0]).update({Feed.article_count: 99})
+        session.commit()
+        recount_article_counts(session, self.feed_ids)
+        self.assertEqual(self._feed_counts()[self.feed_ids[0]], self.ARTICLES_PER_FEED)
+
+    def test_mps_view_query_count_is_constant(self):
+        with self.assertMaxQueries(DB.get_engine(), 3):
+            data = get_mps_view(1, 50)
+        ours = {f["id"]: f["article_count"] for f in data["feeds"] if f["id"] in self.feed_ids}
+        self.assertEqual(set(ours.values()), {self.ARTICLES_PER_FEED})
+
+    def test_tags_view_query_count_is_constant(self):
+        with self.assertMaxQueries(DB.get_engine(), 4):
+            data = get_tags_view(1, 50)
+        tag = next(t for t in data["tags"] if t["id"] == f"tag_{self.owner}")
+        self.assertEqual(tag["article_count"], self.FEEDS * self.ARTICLES_PER_FEED)
+        self.assertEqual(tag["mp_count"], self.FEEDS)
+
+    async def test_article_list_should_fetch_feed_names_once(self):
+        with self.assertMaxQueries(DB.get_engine(), 4):
+            result = await get_articles(
+                offset=0,
+                limit=20,
+                status=None,
+                search=None,
+                mp_id=None,
+                has_content=False,
+                current_user={"username": self.owner},
+            )
+        items = result["data"]["list"]
+        self.assertEqual(len(items), self.FEEDS * self.ARTICLES_PER_FEED)
+        self.assertTrue(all(item["mp_name"].startswith("name-") for item in items))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import threading
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from core.db import DB
+from core.login_limiter import LoginAttemptLimiter
+from core.models.login_attempt import LoginAttempt
+
+T0 = datetime(2000, 1, 1, 12, 0, 0)
+
+
+class FakeClock:
+    def __init__(self, now=T0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class LoginAttemptLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        DB.create_tables()
+        self.username = f"login_{uuid.uuid4().hex[:8]}"
+        self.clock = FakeClock()
+        # 两个独立实例模拟两个 worker 进程
+        self.first = LoginAttemptLimiter(3, 900, clock=self.clock)
+        self.second = LoginAttemptLimiter(3, 900, clock=self.clock)
+
+    def tearDown(self):
+        session = DB.get_session()
+        try:
+            session.query(LoginAttempt).filter(LoginAttempt.username == self.username).delete()
+            session.commit()
+        finally:
+            session.close()
+
+    def test_failures_are_shared_between_workers(self):
+        self.assertEqual(self.first.acquire(self.username), (True, 1))
+        self.assertEqual(self.second.acquire(self.username), (True, 2))
+        self.assertEqual(self.first.acquire(self.username), (True, 3))
+        self.assertEqual(self.second.acquire(self.username), (False, 3))
+        self.assertEqual(self.first.attempts(self.username), 3)
+
+        self.second.reset(self.username)
+        self.assertEqual(self.first.attempts(self.username), 0)
+        self.assertEqual(self.first.acquire(self.username), (True, 1))
+
+    def test_lock_expires_after_last_failure(self):
+        for limiter in (self.first, self.second, self.first):
+            limiter.acquire(self.username)
+        self.clock.now = T0 + timedelta(seconds=899)
+        self.assertFalse(self.second.acquire(self.username)[0])
+
+        self.clock.now = T0 + timedelta(seconds=900)
+        self.assertEqual(self.second.attempts(self.username), 0)
+        self.assertEqual(self.first.acquire(self.username), (True, 1))
+
+    def test_concurrent_attempts_never_exceed_limit(self):
+        results = []
+        lock = threading.Lock()
+
+        def attempt(limiter):
+            allowed, _ = limiter.acquire(self.username)
+            with lock:
+                results.append(allowed)
+
+        threads = [threading.Thread(target=attempt, args=(limiter,))
+                   for limiter in (self.first, self.second) * 5]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results.count(True), 3)
+        self.assertEqual(self.second.attempts(self.username), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import json
+import threading
+import unittest
+import uuid
+
+import requests
+
+from core.db import DB
+from core.models.message_task_log import MessageTaskLog
+from core.notice.dispatcher import (
+    STATE_OPEN,
+    Delivery,
+    NoticeDispatcher,
+    merge_deliveries,
+    record_delivery,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text="ok"):
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeHttp:
+    """按顺序返回预设结果（FakeResponse 或异常），记录每次请求"""
+
+    def __init__(self, results=None, gate=None):
+        self.results = list(results or [])
+        self.calls = []
+        self.gate = gate
+        self._lock = threading.Lock()
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        if self.gate is not None:
+            self.gate.wait(5)
+        with self._lock:
+            self.calls.append({"url": url, "data": data, "timeout": timeout})
+            result = self.results.pop(0) if self.results else FakeResponse()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class NoticeDispatcherTestCase(unittest.TestCase):
+    def _dispatcher(self, http, **overrides):
+        outcomes = []
+        dispatcher = NoticeDispatcher(http=http, recorder=lambda d, ok, detail: outcomes.append((d, ok, detail)))
+        dispatcher.enabled = True
+        dispatcher.workers = 1
+        dispatcher.max_attempts = 3
+        dispatcher.backoff_base = 0.01
+        dispatcher.backoff_max = 0.02
+        dispatcher.breaker_threshold = 100
+        dispatcher.coalesce_window = 0
+        for key, value in overrides.items():
+            setattr(dispatcher, key, value)
+        self.addCleanup(dispatcher.stop)
+        return dispatcher, outcomes
+
+    def test_transient_failure_is_retried_with_timeout(self):
+        http = FakeHttp([requests.ConnectionError("down"), FakeResponse(503), FakeResponse(200)])
+        dispatcher, outcomes = self._dispatcher(http)
+        self.assertTrue(dispatcher.submit(Delivery(url="http://hook.test/a", kind="webhook", payload="{}")))
+        self.assertTrue(dispatcher.wait_idle(5))
+        self.assertEqual(len(http.calls), 3)
+        self.assertEqual(http.calls[0]["timeout"], (dispatcher.connect_timeout, dispatcher.read_timeout))
+        delivery, ok, _ = outcomes[0]
+        self.assertTrue(ok)
+        self.assertEqual(delivery.attempts, 3)
+
+    def test_client_error_is_not_retried(self):
+        http = FakeHttp([FakeResponse(400, "bad")])
+        dispatcher, outcomes = self._dispatcher(http)
+        dispatcher.submit(Delivery(url="http://hook.test/b", kind="webhook", payload="{}"))
+        self.assertTrue(dispatcher.wait_idle(5))
+        self.assertEqual(len(http.calls), 1)
+        self.assertFalse(outcomes[0][1])
+        self.assertIn("HTTP 400", outcomes[0][2])
+
+    def test_open_circuit_defers_without_consuming_attempts(self):
+        http = FakeHttp([FakeResponse(500)] * 2)
+        dispatcher, outcomes = self._dispatcher(http, breaker_threshold=2, breaker_reset=0.3, max_attempts=2)
+        dispatcher.submit(Delivery(url="http://hook.test/c", kind="webhook", payload="{}"))
+        self.assertTrue(dispatcher.wait_idle(5))
+        self.assertEqual(dispatcher.breaker("http://hook.test/c").state, STATE_OPEN)
+
+        # 熔断期间不发请求也不消耗重试次数；半开试探成功后全部送达
+        dispatcher.max_attempts = 1
+        held = [Delivery(url="http://hook.test/c", kind="webhook", payload="{}") for _ in range(3)]
+        for delivery in held:
+            dispatcher.submit(delivery)
+        self.assertFalse(dispatcher.wait_idle(0.1))
+        self.assertEqual(len(http.calls), 2)
+        self.assertEqual([d.attempts for d in held], [0, 0, 0])
+        self.assertTrue(dispatcher.wait_idle(5))
+        self.assertEqual(len(http.calls), 5)
+        self.assertEqual([(ok, d.attempts) for d, ok, _ in outcomes[1:]], [(True, 1)] * 3)
+
+    def test_submit_never_blocks_when_queue_is_full(self):
+        gate = threading.Event()
+        http = FakeHttp(gate=gate)
+        dispatcher, outcomes = self._dispatcher(http)
+        dispatcher._queue.maxsize = 1
+        results = [dispatcher.submit(Delivery(url="http://hook.test/d", kind="webhook", payload="{}")) for _ in range(5)]
+        gate.set()
+        self.assertFalse(all(results))
+        self.assertTrue(dispatcher.wait_idle(5))
+        self.assertEqual(len(outcomes), 5)
+
+    def test_article_notices_are_coalesced(self):
+        http = FakeHttp()
+        dispatcher, outcomes = self._dispatcher(http, coalesce_window=0.05)
+        for name in ("first", "second"):
+            dispatcher.submit(Delivery(url="http://hook.test/e", kind="notice", title="t", text=name,
+                                       task_id="task", mps_id=name, article_count=1, coalesce=True))
+        self.assertTrue(dispatcher.wait_idle(5))
+        self.assertEqual(len(http.calls), 1)
+        body = json.loads(http.calls[0]["data"])
+        self.assertEqual(body["content"], "first\n\nsecond")
+        delivery = outcomes[0][0]
+        self.assertEqual((delivery.parts, delivery.article_count, delivery.mps_id), (2, 2, "first,second"))
+
+    def test_webhook_payloads_merge_into_json_array(self):
+        merged = merge_deliveries([
+            Delivery(url="u", kind="webhook", payload='{"a": 1}'),
+            Delivery(url="u", kind="webhook", payload='{"a": 2}'),
+        ])
+        self.assertEqual(len(merged), 1)
+        self.assertEqual(json.loads(merged[0].payload), [{"a": 1}, {"a": 2}])
+        self.assertEqual(len(merge_deliveries([
+            Delivery(url="u", kind="webhook", payload="not json"),
+            Delivery(url="u", kind="webhook", payload="{}"),
+        ])), 2)
+
+    def test_outcome_is_written_to_task_log(self):
+        DB.create_tables()
+        task_id = f"dispatch-{uuid.uuid4().hex[:8]}"
+        delivery = Delivery(url="https://hook.test/f?access_token=secret", kind="webhook",
+                            task_id=task_id, owner_id="alice", mps_id="mp1", article_count=3, attempts=2)
+        record_delivery(delivery, False, "HTTP 500")
+        session = DB.get_session()
+        try:
+            row = session.query(MessageTaskLog).filter(MessageTaskLog.task_id == task_id).one()
+            self.assertEqual((row.status, row.update_count, row.owner_id), (2, 3, "alice"))
+            self.assertIn("尝试次数: 2", row.log)
+            self.assertNotIn("secret", row.log)
+            session.query(MessageTaskLog).filter(MessageTaskLog.task_id == task_id).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,244 @@
+import threading
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from core.db import DB
+from core.ai_service import (
+    PUBLISH_STATUS_PENDING,
+    PUBLISH_STATUS_PROCESSING,
+    PUBLISH_STATUS_SUCCESS,
+    _mark_task_processing,
+    add_publish_task_listener,
+    enqueue_publish_task,
+    read_publish_generation,
+    remove_publish_task_listener,
+)
+from core.models.ai_publish_task import AIPublishTask
+from jobs.ai_publish import PublishScheduler
+
+T0 = datetime(2000, 1, 1, 12, 0, 0)
+
+
+class FakeClock:
+    def __init__(self, now=T0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class PublishSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        DB.create_tables()
+        self.owner = f"u_{uuid.uuid4().hex[:10]}"
+        self.other = f"u_{uuid.uuid4().hex[:10]}"
+        self.clock = FakeClock()
+        self.processed = []
+
+    def tearDown(self):
+        session = DB.get_session()
+        try:
+            session.query(AIPublishTask).filter(
+                AIPublishTask.owner_id.in_([self.owner, self.other])
+            ).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def _task(self, owner, due, status=PUBLISH_STATUS_PENDING, created_at=T0, updated_at=T0):
+        session = DB.get_session()
+        try:
+            task = AIPublishTask(id=str(uuid.uuid4()), owner_id=owner, article_id="a", title="t", content="c",
+                                 status=status, retries=0, max_retries=3, next_retry_at=due,
+                                 created_at=created_at, updated_at=updated_at)
+            session.add(task)
+            session.commit()
+            return task.id
+        finally:
+            session.close()
+
+    def _status(self, task_id):
+        session = DB.get_session()
+        try:
+            return session.query(AIPublishTask.status).filter(AIPublishTask.id == task_id).scalar()
+        finally:
+            session.close()
+
+    def _succeed(self, session, task):
+        self.processed.append(task.id)
+        task.status = PUBLISH_STATUS_SUCCESS
+        task.next_retry_at = None
+        session.commit()
+        return True, "ok"
+
+    def _scheduler(self, process=None, **kwargs):
+        kwargs.setdefault("concurrency", 3)
+        kwargs.setdefault("per_owner", 2)
+        return PublishScheduler(process=process or self._succeed, clock=self.clock, **kwargs)
+
+    def test_dispatch_follows_due_time_with_owner_cap(self):
+        scheduler = self._scheduler()
+        # created_at 越早的任务到期越晚，调度只看 next_retry_at
+        late = self._task(self.owner, T0 - timedelta(minutes=1), created_at=T0 - timedelta(days=1))
+        first = self._task(self.owner, T0 - timedelta(minutes=3))
+        second = self._task(self.owner, T0 - timedelta(minutes=2))
+        other = self._task(self.other, T0 - timedelta(minutes=1))
+        future = self._task(self.other, T0 + timedelta(minutes=5))
+        for task_id, owner, due in [(late, self.owner, T0 - timedelta(minutes=1)),
+                                    (first, self.owner, T0 - timedelta(minutes=3)),
+                                    (second, self.owner, T0 - timedelta(minutes=2)),
+                                    (other, self.other, T0 - timedelta(minutes=1)),
+                                    (future, self.other, T0 + timedelta(minutes=5))]:
+            scheduler.schedule(task_id, owner, due)
+
+        self.assertEqual(scheduler.dispatch_due(), 3)
+        self.assertEqual(self.processed, [first, second, other])
+        self.assertEqual(scheduler.dispatch_due(), 1)
+        self.assertEqual(self.processed[-1], late)
+        self.assertEqual(scheduler.dispatch_due(), 0)
+        self.assertEqual(scheduler._wait_seconds(), 300.0)
+
+        self.clock.now = T0 + timedelta(minutes=5)
+        self.assertEqual(scheduler.dispatch_due(), 1)
+        self.assertEqual(self.processed[-1], future)
+        self.assertEqual(scheduler.pending_count(), 0)
+
+    def test_failed_delivery_is_rescheduled_at_next_retry(self):
+        retry_at = T0 + timedelta(minutes=2)
+
+        def fail_once(session, task):
+            self.processed.append(task.id)
+            if len(self.processed) == 1:
+                task.retries = 1
+                task.next_retry_at = retry_at
+                session.commit()
+                return False, "boom"
+            return self._succeed(session, task)
+
+        scheduler = self._scheduler(process=fail_once)
+        task_id = self._task(self.owner, T0)
+        scheduler.schedule(task_id, self.owner, T0)
+        self.assertEqual(scheduler.dispatch_due(), 1)
+        self.assertEqual(scheduler.pending_count(), 1)
+        self.assertEqual(scheduler._wait_seconds(), 120.0)
+
+        self.clock.now = retry_at - timedelta(seconds=1)
+        self.assertEqual(scheduler.dispatch_due(), 0)
+        self.clock.now = retry_at
+        self.assertEqual(scheduler.dispatch_due(), 1)
+        self.assertEqual(self._status(task_id), PUBLISH_STATUS_SUCCESS)
+
+    def test_rehydrate_recovers_stale_processing(self):
+        scheduler = self._scheduler(lease_seconds=600)
+        pending = self._task(self.owner, T0 + timedelta(minutes=1))
+        stale = self._task(self.owner, None, status=PUBLISH_STATUS_PROCESSING,
+                           updated_at=T0 - timedelta(hours=1))
+        fresh = self._task(self.owner, None, status=PUBLISH_STATUS_PROCESSING,
+                           updated_at=T0 - timedelta(seconds=30))
+
+        scheduler.rehydrate()
+        self.assertIn(pending, scheduler._entries)
+        self.assertIn(stale, scheduler._entries)
+        self.assertNotIn(fresh, scheduler._entries)
+        self.assertEqual(self._status(stale), PUBLISH_STATUS_PENDING)
+        self.assertEqual(self._status(fresh), PUBLISH_STATUS_PROCESSING)
+
+    def test_poll_reads_marker_before_querying_tasks(self):
+        marker = {"generation": 1}
+        scheduler = self._scheduler(poll_seconds=5, poll_max_seconds=40,
+                                    read_generation=lambda: marker["generation"])
+        scheduler.rehydrate = lambda: 0
+        scheduler._poll_since = T0
+        scheduler._seen_generation = 1
+        old = self._task(self.owner, T0, updated_at=T0 - timedelta(hours=1))
+        # 其他进程入队：本进程没有收到回调，标记尚未递增时不查询任务表
+        new = self._task(self.owner, T0 + timedelta(seconds=1), created_at=T0 + timedelta(seconds=1),
+                         updated_at=T0 + timedelta(seconds=1))
+        self.clock.now = T0 + timedelta(seconds=5)
+        self.assertEqual(scheduler.poll(), 0)
+        self.assertNotIn(new, scheduler._entries)
+
+        marker["generation"] = 2
+        self.assertGreaterEqual(scheduler.poll(), 1)
+        self.assertIn(new, scheduler._entries)
+        self.assertNotIn(old, scheduler._entries)
+        self.assertEqual(scheduler._poll_since, T0 + timedelta(seconds=5))
+        self.assertEqual(scheduler._seen_generation, 2)
+
+        self.assertEqual(scheduler.dispatch_due(), 1)
+        self.assertEqual(self.processed, [new])
+
+    def test_idle_poll_interval_backs_off(self):
+        scheduler = self._scheduler(poll_seconds=5, poll_max_seconds=40)
+        self.assertEqual([scheduler._next_poll_interval(0) for _ in range(4)], [10, 20, 40, 40])
+        self.assertEqual(scheduler._next_poll_interval(1), 5)
+        scheduler.schedule("t1", self.owner, T0 + timedelta(minutes=1))
+        self.assertEqual(scheduler._next_poll_interval(0), 5)
+
+    def test_enqueue_bumps_marker(self):
+        before = read_publish_generation()
+        session = DB.get_session()
+        try:
+            enqueue_publish_task(session, owner_id=self.owner, article_id="a", title="t", content="c")
+        finally:
+            session.close()
+        self.assertEqual(read_publish_generation(), before + 1)
+
+    def test_claim_is_exclusive_and_respects_due_time(self):
+        now = datetime.now()
+        due = self._task(self.owner, now - timedelta(seconds=1))
+        not_due = self._task(self.owner, now + timedelta(minutes=5))
+        first, second = DB.get_session(), DB.get_session()
+        try:
+            task_a = first.get(AIPublishTask, due)
+            task_b = second.get(AIPublishTask, due)
+            self.assertTrue(_mark_task_processing(first, task_a, now))
+            self.assertFalse(_mark_task_processing(second, task_b, now))
+            self.assertFalse(_mark_task_processing(first, first.get(AIPublishTask, not_due), now))
+        finally:
+            first.close()
+            second.close()
+
+    def test_enqueue_wakes_running_scheduler(self):
+        done = threading.Event()
+
+        def process(session, task):
+            result = self._succeed(session, task)
+            done.set()
+            return result
+
+        scheduler = PublishScheduler(process=process, concurrency=2, rehydrate_seconds=3600)
+        # 只验证入队唤醒：不从数据库加载其他用例遗留的任务
+        scheduler.rehydrate = lambda: 0
+        scheduler.start()
+        try:
+            session = DB.get_session()
+            try:
+                task = enqueue_publish_task(session, owner_id=self.owner, article_id="a", title="t", content="c")
+                task_id = task.id
+            finally:
+                session.close()
+            self.assertTrue(done.wait(5))
+            self.assertEqual(self.processed, [task_id])
+        finally:
+            scheduler.stop()
+
+    def test_listener_registration(self):
+        calls = []
+        listener = lambda *args: calls.append(args)
+        add_publish_task_listener(listener)
+        try:
+            session = DB.get_session()
+            try:
+                task = enqueue_publish_task(session, owner_id=self.owner, article_id="a", title="t", content="c")
+            finally:
+                session.close()
+        finally:
+            remove_publish_task_listener(listener)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][:2], (task.id, self.owner))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import httpx
+from fastapi import FastAPI
+
+import apis.res as res
+from core.res.proxy_cache import ResourceCache
+
+IMAGE_URL = "http://mmbiz.qpic.cn/logo/1.png"
+
+
+class ResourceProxyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = ResourceCache(root=self.tmp_dir, max_bytes=1000, ttl=3600, memory_bytes=100,
+                                   memory_max_object_bytes=50, max_object_bytes=400)
+        self.upstream_calls = 0
+        self.body = b"x" * 40
+        app = FastAPI()
+        app.include_router(res.router)
+        self.app = app
+        patches = [
+            mock.patch.object(res, "_cache", self.cache),
+            mock.patch.object(res, "_client", httpx.AsyncClient(transport=httpx.MockTransport(self._upstream))),
+            mock.patch.object(res, "_inflight", {}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    async def _upstream(self, request):
+        self.upstream_calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, content=self.body, headers={"Content-Type": "image/png"})
+
+    async def _get(self, *urls, headers=None):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://test") as client:
+            return await asyncio.gather(*[client.get(f"/res/logo/{url}", headers=headers) for url in urls])
+
+    def test_concurrent_misses_fetch_upstream_once(self):
+        responses = asyncio.run(self._get(*[IMAGE_URL] * 5))
+        self.assertEqual(self.upstream_calls, 1)
+        self.assertTrue(all(r.status_code == 200 and r.content == self.body for r in responses))
+        self.assertTrue(all(r.headers["cache-control"].startswith("public, max-age=") for r in responses))
+
+    def test_cached_object_is_sharded_and_revalidated_with_etag(self):
+        first = asyncio.run(self._get(IMAGE_URL))[0]
+        key = self.cache.key_for(IMAGE_URL)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, key[:2], key[2:4], key)))
+        self.assertFalse(any(name.endswith(".headers") for _, _, files in os.walk(self.tmp_dir) for name in files))
+        etag = first.headers["etag"]
+        second = asyncio.run(self._get(IMAGE_URL, headers={"If-None-Match": etag}))[0]
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(self.upstream_calls, 1)
+
+    def test_disk_cache_evicts_least_recently_used(self):
+        for i in range(30):
+            writer = self.cache.open_writer(self.cache.key_for(f"u{i}"))
+            writer.write(b"y" * 100)
+            writer.commit("image/png", "e", time.time())
+        self.assertLessEqual(self.cache.total_size(), 1000)
+        self.assertIsNone(self.cache.get(self.cache.key_for("u0")))
+        self.assertIsNotNone(self.cache.get(self.cache.key_for("u29")))
+
+    def test_large_objects_stream_without_caching(self):
+        self.body = b"z" * 500
+        response = asyncio.run(self._get(IMAGE_URL))[0]
+        self.assertEqual(response.content, self.body)
+        self.assertIsNone(self.cache.get(self.cache.key_for(IMAGE_URL)))
+
+    def test_other_hosts_are_redirected(self):
+        response = asyncio.run(self._get("http://example.com/a.png"))[0]
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(self.upstream_calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+
+from core.resource import ResourceSampler
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class ResourceSamplerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.refreshed = []
+        self.sampler = ResourceSampler(
+            interval=5,
+            history=3,
+            article_interval=600,
+            queue_info=lambda: {"pending_tasks": 4, "running_tasks": 1},
+            article_refresh=self.refreshed.append,
+            clock=self.clock,
+        )
+
+    def test_sample_never_blocks_on_cpu_percent(self):
+        with mock.patch("core.resource.psutil.cpu_percent", return_value=12.5) as cpu_percent:
+            snapshot = self.sampler.sample()
+        cpu_percent.assert_called_once_with(interval=None)
+        self.assertEqual(snapshot["cpu"]["percent"], 12.5)
+        self.assertEqual(snapshot["queue"]["pending_tasks"], 4)
+        self.assertIs(self.sampler.latest(), snapshot)
+
+    def test_ring_buffer_keeps_recent_points(self):
+        for i in range(5):
+            self.clock.now = 1000.0 + i * 5
+            self.sampler.sample()
+        points = self.sampler.series()
+        self.assertEqual([p["t"] for p in points], [1010.0, 1015.0, 1020.0])
+        self.assertEqual(points[-1]["queue_pending"], 4)
+        self.assertEqual([p["t"] for p in self.sampler.series(since=1010.0)], [1015.0, 1020.0])
+        self.assertEqual([p["t"] for p in self.sampler.series(limit=1)], [1020.0])
+
+    def test_article_stats_refresh_at_their_own_cadence(self):
+        self.sampler.refresh_articles()
+        self.clock.now += 300
+        self.sampler.refresh_articles()
+        self.clock.now += 300
+        self.sampler.refresh_articles()
+        self.assertEqual(self.refreshed, [600, 600])
+
+    def test_queue_failure_does_not_drop_sample(self):
+        def broken():
+            raise RuntimeError("queue unavailable")
+        sampler = ResourceSampler(interval=5, history=3, queue_info=broken, article_refresh=None, clock=self.clock)
+        snapshot = sampler.sample()
+        self.assertEqual(snapshot["queue"], {})
+        self.assertEqual(sampler.series()[-1]["queue_pending"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
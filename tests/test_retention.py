@@ -0,0 +1,99 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+
+from core.models.ai_publish_task import AIPublishTask
+from core.models.analytics_event import AnalyticsEvent
+from core.retention_service import (
+    RetentionPolicy,
+    RetentionService,
+    expired_partitions,
+    month_partition_name,
+)
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+
+
+class RetentionServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'db.sqlite')}")
+        AnalyticsEvent.__table__.create(self.engine)
+        AIPublishTask.__table__.create(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def _service(self, policies, **kwargs):
+        return RetentionService(self.engine, policies=policies, batch_size=3,
+                                archive_dir=os.path.join(self.tmp.name, "archive"),
+                                pause_seconds=0, now=lambda: NOW, **kwargs)
+
+    def _count(self, table):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(table)).scalar()
+
+    def _add_events(self, days_ago, count, prefix):
+        rows = [{"id": f"{prefix}-{i}", "event_type": "page_view", "created_at": NOW - timedelta(days=days_ago)}
+                for i in range(count)]
+        with self.engine.begin() as conn:
+            conn.execute(AnalyticsEvent.__table__.insert(), rows)
+
+    def test_archives_then_deletes_expired_rows_in_batches(self):
+        self._add_events(120, 7, "old")
+        self._add_events(10, 2, "new")
+        result = self._service([RetentionPolicy("analytics_events", days=90, archive=True)]).run()[0]
+
+        self.assertEqual(result.deleted, 7)
+        self.assertEqual(result.archived, 7)
+        self.assertEqual(self._count(AnalyticsEvent.__table__), 2)
+        self.assertEqual(len(result.archive_files), 1)
+        self.assertTrue(result.archive_files[0].endswith(os.path.join("analytics_events", "2024-02.ndjson.gz")))
+        with gzip.open(result.archive_files[0], "rt", encoding="utf-8") as f:
+            archived = [json.loads(line) for line in f if line.strip()]
+        self.assertEqual(sorted(row["id"] for row in archived), sorted(f"old-{i}" for i in range(7)))
+        self.assertEqual(archived[0]["event_type"], "page_view")
+
+    def test_status_filter_keeps_unfinished_tasks(self):
+        old = NOW - timedelta(days=200)
+        rows = [
+            {"id": "done", "status": "success"},
+            {"id": "failed", "status": "failed"},
+            {"id": "waiting", "status": "pending"},
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(AIPublishTask.__table__.insert(), [
+                dict(row, owner_id="u", article_id="a", title="t", content="c", updated_at=old) for row in rows
+            ])
+        policy = RetentionPolicy("ai_publish_tasks", time_column="updated_at", days=90,
+                                 statuses=("success", "failed"))
+        result = self._service([policy]).run()[0]
+        self.assertEqual(result.deleted, 2)
+        with self.engine.connect() as conn:
+            left = [row[0] for row in conn.execute(select(AIPublishTask.__table__.c.id))]
+        self.assertEqual(left, ["waiting"])
+
+    def test_missing_table_and_disabled_policy_are_skipped(self):
+        results = self._service([
+            RetentionPolicy("message_tasks_logs", days=30),
+            RetentionPolicy("analytics_events", days=30, enabled=False),
+        ]).run()
+        self.assertEqual([(r.table, r.deleted) for r in results], [("message_tasks_logs", 0)])
+
+    def test_partition_helpers(self):
+        self.assertEqual(month_partition_name("analytics_events", datetime(2024, 3, 1), "postgresql"),
+                         "analytics_events_p202403")
+        self.assertEqual(month_partition_name("analytics_events", datetime(2024, 3, 1), "mysql"), "p202403")
+        names = ["p202401", "p202402", "p202403", "pmax"]
+        # 2024-02 整月都早于截止时间，2024-03 跨越截止时间需保留
+        self.assertEqual(expired_partitions(names, datetime(2024, 3, 10)), ["p202401", "p202402"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import json
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+from core.db import DB
+from core.models.message_task import MessageTask
+from core.task.task import TaskScheduler
+import jobs.mps as mps
+
+
+class SchedulerReconcileTestCase(unittest.TestCase):
+    def setUp(self):
+        DB.create_tables()
+        self.owner = f"o_{uuid.uuid4().hex[:10]}"
+        self.other = f"o_{uuid.uuid4().hex[:10]}"
+        self.scheduler = TaskScheduler(distributed=False)
+        patcher = mock.patch.object(mps, "scheduler", self.scheduler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.scheduler.clear_all_jobs()
+        session = DB.get_session()
+        try:
+            session.query(MessageTask).filter(
+                MessageTask.owner_id.in_([self.owner, self.other])
+            ).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def _task(self, owner, cron_exp="*/5 * * * *", status=1, mps_id="[]"):
+        now = datetime.now()
+        task = MessageTask(
+            id=str(uuid.uuid4()),
+            owner_id=owner,
+            message_type=0,
+            name="reconcile",
+            message_template="",
+            web_hook_url="",
+            mps_id=mps_id,
+            cron_exp=cron_exp,
+            status=status,
+            created_at=now,
+            updated_at=now,
+        )
+        session = DB.get_session()
+        try:
+            session.add(task)
+            session.commit()
+            return str(task.id)
+        finally:
+            session.close()
+
+    def _update(self, task_id, **values):
+        session = DB.get_session()
+        try:
+            session.query(MessageTask).filter(MessageTask.id == task_id).update(values, synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def test_reconcile_only_touches_changed_tasks(self):
+        a = self._task(self.owner)
+        b = self._task(self.owner)
+        c = self._task(self.owner)
+        self.assertEqual(mps.reconcile_jobs(owner_id=self.owner)["added"], 3)
+
+        with mock.patch.object(self.scheduler, "add_cron_job", wraps=self.scheduler.add_cron_job) as add:
+            counts = mps.reconcile_jobs(owner_id=self.owner)
+        self.assertEqual(counts["unchanged"], 3)
+        add.assert_not_called()
+
+        self._update(a, cron_exp="0 * * * *", updated_at=datetime.now() + timedelta(seconds=1))
+        self._update(b, status=0)
+        with mock.patch.object(self.scheduler, "add_cron_job", wraps=self.scheduler.add_cron_job) as add:
+            counts = mps.reconcile_jobs(owner_id=self.owner)
+        self.assertEqual((counts["replaced"], counts["removed"], counts["unchanged"]), (1, 1, 1))
+        self.assertEqual([call.kwargs["job_id"] for call in add.call_args_list], [a])
+        self.assertEqual(sorted(self.scheduler.get_job_ids()), sorted([a, c]))
+        self.assertEqual(self.scheduler.get_job_versions()[a][1], "0 * * * *")
+
+    def test_owner_scope_leaves_other_owners_jobs(self):
+        mine = self._task(self.owner)
+        theirs = self._task(self.other)
+        mps.reconcile_jobs(owner_id=self.owner)
+        mps.reconcile_jobs(owner_id=self.other)
+        self._update(mine, status=0)
+
+        counts = mps.reconcile_jobs(owner_id=self.owner)
+        self.assertEqual(counts["removed"], 1)
+        self.assertEqual(self.scheduler.get_job_ids(), [theirs])
+
+    def test_invalid_cron_does_not_block_other_tasks(self):
+        good = self._task(self.owner)
+        self._task(self.owner, cron_exp="not a cron")
+        counts = mps.reconcile_jobs(owner_id=self.owner)
+        self.assertEqual((counts["added"], counts["failed"]), (1, 1))
+        self.assertEqual(self.scheduler.get_job_ids(), [good])
+
+    def test_reload_all_keeps_queue(self):
+        self._task(self.owner)
+        with mock.patch.object(mps.TaskQueue, "clear_queue") as clear_queue, \
+                mock.patch.object(self.scheduler, "clear_all_jobs") as clear_all, \
+                mock.patch.object(self.scheduler, "start"):
+            mps.reload_job()
+        clear_queue.assert_not_called()
+        clear_all.assert_not_called()
+
+    def test_feeds_are_resolved_when_job_fires(self):
+        task_id = self._task(self.owner)
+        mps.reconcile_jobs(owner_id=self.owner)
+        self._update(task_id, mps_id=json.dumps([{"id": "feed-late"}]))
+
+        with mock.patch.object(mps, "get_feeds", return_value=["feed"]) as get_feeds, \
+                mock.patch.object(mps, "add_job") as add_job:
+            mps.fire_task(task_id)
+        get_feeds.assert_called_once()
+        task = add_job.call_args.args[1]
+        self.assertIn("feed-late", task.mps_id)
+
+        self._update(task_id, status=0)
+        with mock.patch.object(mps, "add_job") as add_job:
+            mps.fire_task(task_id)
+        add_job.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
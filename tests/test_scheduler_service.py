@@ -0,0 +1,152 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+from core.db import DB
+from core.models.scheduler_job import SchedulerJob
+from core.models.scheduler_lease import SchedulerLease
+from core.task.leader import LeaderElector
+from core.task.service import SchedulerService
+from core.task.store import JOB_STATUS_FAILED, JOB_STATUS_SUCCESS, SchedulerJobStore
+from core.task.task import TaskScheduler
+
+
+class SchedulerServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        DB.create_tables()
+        self.lease_name = f"test_{uuid.uuid4().hex[:8]}"
+        self.job_prefix = f"job_{uuid.uuid4().hex[:8]}"
+        self.store = SchedulerJobStore()
+
+    def tearDown(self):
+        session = DB.get_session()
+        try:
+            session.query(SchedulerLease).filter(SchedulerLease.name == self.lease_name).delete(synchronize_session=False)
+            session.query(SchedulerJob).filter(SchedulerJob.job_id.like(f"{self.job_prefix}%")).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def _elector(self, holder):
+        return LeaderElector(name=self.lease_name, ttl_seconds=30, holder=holder)
+
+    def _service(self, elector):
+        service = SchedulerService(store=self.store, elector=elector)
+        service.leader_election = True
+        return service
+
+    def _task_scheduler(self, service):
+        with mock.patch("core.task.task.get_scheduler_service", return_value=service):
+            return TaskScheduler()
+
+    def test_only_one_holder_gets_the_lease(self):
+        a, b = self._elector("a"), self._elector("b")
+        self.assertTrue(a.try_acquire())
+        self.assertFalse(b.try_acquire())
+        self.assertTrue(a.try_acquire())
+        self.assertTrue(a.is_leader())
+        self.assertFalse(b.is_leader())
+        self.assertEqual(b.current_holder(), "a")
+
+    def test_lease_can_be_taken_over_after_release_or_expiry(self):
+        a, b = self._elector("a"), self._elector("b")
+        self.assertTrue(a.try_acquire())
+        a.release()
+        self.assertFalse(a.is_leader())
+        self.assertTrue(b.try_acquire())
+
+        session = DB.get_session()
+        session.query(SchedulerLease).filter(SchedulerLease.name == self.lease_name).update(
+            {SchedulerLease.expires_at: datetime.now() - timedelta(seconds=1)}
+        )
+        session.commit()
+        self.assertTrue(a.try_acquire())
+        self.assertFalse(b.try_acquire())
+
+    def test_store_records_runs(self):
+        job_id = f"{self.job_prefix}_store"
+        self.store.save_definition(job_id, tag="t", cron_exp="*/5 * * * *", jitter=10)
+        self.store.record_run(job_id, holder="a", started_at=datetime.now(), duration_ms=42, ok=True)
+        self.store.record_run(job_id, holder="a", started_at=datetime.now(), duration_ms=7, ok=False, error="boom")
+        self.store.save_definition(job_id, tag="t2", cron_exp="*/10 * * * *", jitter=0)
+        row = self.store.get(job_id)
+        self.assertEqual(row["cron_exp"], "*/10 * * * *")
+        self.assertEqual(row["run_count"], 2)
+        self.assertEqual(row["last_duration_ms"], 7)
+        self.assertEqual(row["last_status"], JOB_STATUS_FAILED)
+        self.assertEqual(row["last_error"], "boom")
+
+    def test_jobs_fire_only_on_leader(self):
+        leader = self._service(self._elector("leader"))
+        follower = self._service(self._elector("follower"))
+        leader.elector.try_acquire()
+        follower.elector.try_acquire()
+        calls = []
+        job_id = f"{self.job_prefix}_fire"
+        for name, service in (("leader", leader), ("follower", follower)):
+            scheduler = self._task_scheduler(service)
+            scheduler.add_cron_job(lambda n=name: calls.append(n), "*/5 * * * *", job_id=job_id, jitter=30)
+            job = service.scheduler.get_job(job_id)
+            self.assertEqual(job.trigger.jitter, 30)
+            job.func(*job.args, **job.kwargs)
+        self.assertEqual(calls, ["leader"])
+        row = self.store.get(job_id)
+        self.assertEqual(row["run_count"], 1)
+        self.assertEqual(row["last_holder"], "leader")
+        self.assertEqual(row["last_status"], JOB_STATUS_SUCCESS)
+        self.assertEqual(row["jitter"], 30)
+        self.assertEqual(scheduler.get_job_details(job_id)["run_count"], 1)
+
+    def test_clear_all_jobs_keeps_other_instances_jobs(self):
+        service = self._service(self._elector("a"))
+        first = self._task_scheduler(service)
+        second = self._task_scheduler(service)
+        first.add_cron_job(lambda: None, "0 * * * *", job_id=f"{self.job_prefix}_1")
+        second.add_cron_job(lambda: None, "0 * * * *", job_id=f"{self.job_prefix}_2")
+        self.assertEqual(first.clear_all_jobs(), 1)
+        self.assertEqual([job.id for job in service.scheduler.get_jobs()], [f"{self.job_prefix}_2"])
+        self.assertIsNone(self.store.get(f"{self.job_prefix}_1"))
+        self.assertIsNotNone(self.store.get(f"{self.job_prefix}_2"))
+
+    def test_anonymous_jobs_are_not_persisted(self):
+        service = self._service(self._elector("a"))
+        scheduler = self._task_scheduler(service)
+        job_id = scheduler.add_cron_job(lambda: None, "0 * * * *")
+        self.addCleanup(scheduler.clear_all_jobs)
+        self.assertIsNotNone(service.scheduler.get_job(job_id))
+        self.assertIsNone(self.store.get(job_id))
+
+    def test_leader_reconciles_after_follower_change(self):
+        leader = self._service(self._elector("leader"))
+        follower = self._service(self._elector("follower"))
+        reconciled = []
+        leader.add_reconciler(lambda: reconciled.append(True))
+        leader._tick(initial=True)
+        follower._tick(initial=True)
+        leader._tick()
+        self.assertEqual(reconciled, [])
+
+        follower_scheduler = self._task_scheduler(follower)
+        follower_scheduler.add_cron_job(lambda: None, "0 * * * *", job_id=f"{self.job_prefix}_new")
+        leader._tick()
+        self.assertEqual(reconciled, [True])
+        leader._tick()
+        self.assertEqual(reconciled, [True])
+
+    def test_failover_triggers_reconcile(self):
+        first = self._service(self._elector("first"))
+        second = self._service(self._elector("second"))
+        reconciled = []
+        second.add_reconciler(lambda: reconciled.append(True))
+        first._tick(initial=True)
+        second._tick(initial=True)
+        self.assertFalse(second.should_fire())
+        first.elector.release()
+        second._tick()
+        self.assertTrue(second.should_fire())
+        self.assertEqual(reconciled, [True])
+
+
+if __name__ == "__main__":
+    unittest.main()
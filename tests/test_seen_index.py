@@ -0,0 +1,86 @@
+import unittest
+from unittest import mock
+
+from core.seen_index import SeenArticleIndex, article_pk
+
+
+class SeenArticleIndexTestCase(unittest.TestCase):
+    def _index(self, rows, max_per_feed=10):
+        self.loads = []
+        self.lookups = []
+
+        def loader(mp_id, limit):
+            self.loads.append(mp_id)
+            return rows[-limit:]
+
+        def exists(article_id):
+            self.lookups.append(article_id)
+            return article_id in rows
+
+        return SeenArticleIndex(max_per_feed=max_per_feed, max_feeds=2, loader=loader, exists=exists)
+
+    def test_warmed_feed_answers_from_memory(self):
+        index = self._index([article_pk("MP_WXS_1", "a"), article_pk("MP_WXS_1", "b")])
+        self.assertTrue(index.contains("MP_WXS_1", "a"))
+        self.assertFalse(index.contains("MP_WXS_1", "new"))
+        index.add("MP_WXS_1", "new")
+        self.assertTrue(index.contains("MP_WXS_1", "new"))
+        self.assertEqual(self.loads, ["MP_WXS_1"])
+        self.assertEqual(self.lookups, [])
+
+    def test_truncated_feed_falls_back_to_primary_key(self):
+        rows = [article_pk("MP_WXS_1", str(i)) for i in range(5)]
+        index = self._index(rows, max_per_feed=3)
+        self.assertTrue(index.contains("MP_WXS_1", "4"))
+        self.assertEqual(self.lookups, [])
+        self.assertTrue(index.contains("MP_WXS_1", "0"))
+        self.assertFalse(index.contains("MP_WXS_1", "99"))
+        self.assertEqual(len(self.lookups), 2)
+
+    def test_memory_is_bounded(self):
+        index = self._index([], max_per_feed=3)
+        for i in range(10):
+            index.add("MP_WXS_1", str(i))
+        index.add("MP_WXS_2", "x")
+        index.add("MP_WXS_3", "y")
+        self.assertEqual(len(index._feeds), 2)
+        self.assertNotIn("MP_WXS_1", index._feeds)
+        self.assertEqual(len(index._feeds["MP_WXS_3"].keys), 1)
+
+    def test_all_known(self):
+        index = self._index([article_pk("MP_WXS_1", "a"), article_pk("MP_WXS_1", "b")])
+        self.assertTrue(index.all_known("MP_WXS_1", ["a", "b"]))
+        self.assertFalse(index.all_known("MP_WXS_1", ["a", "c"]))
+        self.assertFalse(index.all_known("MP_WXS_1", []))
+
+
+class CrawlerStopsOnKnownPageTestCase(unittest.TestCase):
+    def test_api_crawler_stops_after_known_page(self):
+        from core.wx.base import WxGather
+        from core.wx.model.api import MpsApi
+
+        index = SeenArticleIndex(max_per_feed=100, loader=lambda mp_id, limit: [article_pk(mp_id, "old")],
+                                 exists=lambda article_id: False)
+        pages = [
+            [{"aid": "new", "title": "n", "link": "l", "cover": "", "update_time": 1}],
+            [{"aid": "old", "title": "o", "link": "l", "cover": "", "update_time": 0}],
+            [{"aid": "older", "title": "x", "link": "l", "cover": "", "update_time": 0}],
+        ]
+        responses = [mock.Mock(cookies=[], json=mock.Mock(return_value={"base_resp": {"ret": 0}, "app_msg_list": p}))
+                     for p in pages]
+        saved = []
+        with mock.patch("core.wx.base.get_seen_index", return_value=index), \
+                mock.patch.object(WxGather, "Start"), mock.patch.object(WxGather, "Item_Over"), \
+                mock.patch.object(WxGather, "Over"), mock.patch("core.wx.model.api.time.sleep"):
+            wx = MpsApi()
+            wx.Gather_Content = False
+            wx.session = mock.Mock(get=mock.Mock(side_effect=responses))
+            wx.get_Articles("fake", Mps_id="MP_WXS_1", CallBack=lambda art: saved.append(art["id"]) or True,
+                            MaxPage=3, interval=0, Gather_Content=False)
+        self.assertEqual(wx.session.get.call_count, 2)
+        self.assertEqual(saved, ["new"])
+        self.assertTrue(index.contains("MP_WXS_1", "new"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import json
+import unittest
+import uuid
+from datetime import datetime
+
+from core.db import DB
+from core.models.feed import Feed
+from core.models.tag_feed import TagFeed
+from core.models.tags import Tags
+from core.tag_feed_service import (
+    parse_mps_ids,
+    rebuild_tag_feeds,
+    remove_tag_feeds,
+    sync_tag_feeds,
+    tag_counts,
+    tag_feed_ids,
+    tags_for_feed,
+)
+
+
+def _mps(*ids):
+    return json.dumps([{"id": i, "mp_name": f"name-{i}"} for i in ids])
+
+
+class TagFeedsTestCase(unittest.TestCase):
+    def setUp(self):
+        DB.create_tables()
+        self.owner = f"u_{uuid.uuid4().hex[:10]}"
+        self.prefix = uuid.uuid4().hex[:8]
+
+    def tearDown(self):
+        session = DB.get_session()
+        try:
+            session.query(TagFeed).filter(TagFeed.owner_id == self.owner).delete(synchronize_session=False)
+            session.query(Tags).filter(Tags.owner_id == self.owner).delete(synchronize_session=False)
+            session.query(Feed).filter(Feed.owner_id == self.owner).delete(synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def _feed(self, n):
+        return f"{self.prefix}-mp{n}"
+
+    def _tag(self, session, mps_id, sync=True):
+        tag = Tags(id=str(uuid.uuid4()), owner_id=self.owner, name="t", status=1, mps_id=mps_id,
+                   created_at=datetime.now(), updated_at=datetime.now())
+        session.add(tag)
+        session.flush()
+        if sync:
+            sync_tag_feeds(session, tag)
+        session.commit()
+        return tag.id
+
+    def _feed_row(self, session, feed_id, article_count):
+        session.add(Feed(id=feed_id, owner_id=self.owner, mp_name=feed_id, status=1,
+                         article_count=article_count, faker_id=feed_id))
+        session.commit()
+
+    def _feed_ids(self, session, tag_id):
+        return sorted(row[0] for row in session.execute(tag_feed_ids(tag_id)))
+
+    def test_parse_mps_ids(self):
+        self.assertEqual(parse_mps_ids(_mps("a", "b", "a")), ["a", "b"])
+        self.assertEqual(parse_mps_ids("not json"), [])
+        self.assertEqual(parse_mps_ids('{"id": "a"}'), [])
+        self.assertEqual(parse_mps_ids(None), [])
+        self.assertEqual(parse_mps_ids('[{"name": "x"}, "y", {"id": 3}]'), ["3"])
+
+    def test_sync_replaces_on_update_and_remove(self):
+        session = DB.get_session()
+        try:
+            tag_id = self._tag(session, _mps(self._feed(1), self._feed(2)))
+            self.assertEqual(self._feed_ids(session, tag_id), [self._feed(1), self._feed(2)])
+
+            tag = session.get(Tags, tag_id)
+            tag.mps_id = _mps(self._feed(2), self._feed(3))
+            sync_tag_feeds(session, tag)
+            session.commit()
+            self.assertEqual(self._feed_ids(session, tag_id), [self._feed(2), self._feed(3)])
+            self.assertEqual(tags_for_feed(session, self._feed(3), self.owner), [tag_id])
+            self.assertEqual(tags_for_feed(session, self._feed(1), self.owner), [])
+
+            remove_tag_feeds(session, [tag_id])
+            session.commit()
+            self.assertEqual(self._feed_ids(session, tag_id), [])
+        finally:
+            session.close()
+
+    def test_tag_counts_group_by_tag(self):
+        session = DB.get_session()
+        try:
+            self._feed_row(session, self._feed(1), 3)
+            self._feed_row(session, self._feed(2), 1)
+            both = self._tag(session, _mps(self._feed(1), self._feed(2), self._feed(9)))
+            one = self._tag(session, _mps(self._feed(2)))
+            empty = self._tag(session, "[]")
+
+            counts = tag_counts(session, [both, one, empty])
+            self.assertEqual(counts[both], {"mp_count": 3, "article_count": 4})
+            self.assertEqual(counts[one], {"mp_count": 1, "article_count": 1})
+            self.assertEqual(counts[empty], {"mp_count": 0, "article_count": 0})
+        finally:
+            session.close()
+
+    def test_rebuild_migrates_existing_json(self):
+        session = DB.get_session()
+        try:
+            valid = self._tag(session, _mps(self._feed(1), self._feed(2)), sync=False)
+            broken = self._tag(session, "{broken", sync=False)
+            self.assertEqual(self._feed_ids(session, valid), [])
+
+            self.assertGreaterEqual(rebuild_tag_feeds(session, chunk_size=1), 2)
+            self.assertEqual(self._feed_ids(session, valid), [self._feed(1), self._feed(2)])
+            self.assertEqual(self._feed_ids(session, broken), [])
+            rows = session.query(TagFeed).filter(TagFeed.tag_id == valid).all()
+            self.assertTrue(all(row.owner_id == self.owner for row in rows))
+        finally:
+            session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
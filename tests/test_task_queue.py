@@ -0,0 +1,110 @@
+import threading
+import unittest
+
+from core.queue import (
+    LANE_BACKFILL,
+    LANE_INTERACTIVE,
+    LANE_SCHEDULED,
+    TaskQueueManager,
+    current_task_owner,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TaskQueueSchedulingTestCase(unittest.TestCase):
+    """直接驱动出队逻辑，不启动执行线程"""
+
+    def _drain(self, queue):
+        order = []
+        while True:
+            with queue._cond:
+                item = queue._next_locked()
+            if item is None:
+                return order
+            order.append((item.owner_id, item.args[0]))
+
+    def test_round_robin_between_owners(self):
+        queue = TaskQueueManager(per_owner_limit=0)
+        for i in range(4):
+            queue.submit(print, (f"big{i}",), owner_id="big")
+        queue.submit(print, ("small0",), owner_id="small")
+        order = self._drain(queue)
+        # 积压多的用户不会挡住后来的用户
+        self.assertEqual(order[:2], [("big", "big0"), ("small", "small0")])
+        self.assertEqual([o for o, _ in order[2:]], ["big"] * 3)
+
+    def test_weights_and_lane_priority(self):
+        queue = TaskQueueManager(per_owner_limit=0, weights={"vip": 2})
+        for i in range(4):
+            queue.submit(print, (f"vip{i}",), owner_id="vip")
+            queue.submit(print, (f"std{i}",), owner_id="std")
+        queue.submit(print, ("later",), owner_id="std", lane=LANE_BACKFILL)
+        queue.submit(print, ("now",), owner_id="std", lane=LANE_INTERACTIVE)
+        order = [name for _, name in self._drain(queue)]
+        self.assertEqual(order[0], "now")
+        self.assertEqual(order[1:7], ["vip0", "vip1", "std0", "vip2", "vip3", "std1"])
+        self.assertEqual(order[-1], "later")
+
+    def test_owner_at_concurrency_limit_is_skipped(self):
+        queue = TaskQueueManager(per_owner_limit=1)
+        queue.submit(print, ("a0",), owner_id="a")
+        queue.submit(print, ("a1",), owner_id="a")
+        queue.submit(print, ("b0",), owner_id="b")
+        queue._running["a"] = 1
+        self.assertEqual(self._drain(queue), [("b", "b0")])
+        queue._running.clear()
+        self.assertEqual(len(self._drain(queue)), 2)
+
+    def test_clear_queue_only_touches_owner(self):
+        queue = TaskQueueManager()
+        queue.submit(print, ("a",), owner_id="a")
+        queue.submit(print, ("b",), owner_id="b", lane=LANE_INTERACTIVE)
+        self.assertEqual(queue.clear_queue(owner_id="a"), 1)
+        self.assertEqual(queue.get_queue_info()["pending_tasks"], 1)
+        self.assertEqual(queue.clear_queue(), 1)
+
+    def test_queue_info_reports_depth_and_waits(self):
+        clock = FakeClock()
+        queue = TaskQueueManager(clock=clock)
+        queue.submit(print, ("x",), owner_id="a")
+        queue.submit(print, ("y",), owner_id="a")
+        clock.now += 5
+        info = queue.get_queue_info()
+        self.assertEqual(info["pending_tasks"], 2)
+        self.assertEqual(info["lanes"][LANE_SCHEDULED]["oldest_wait_seconds"], 5.0)
+        self.assertEqual(info["owners"], [{"owner_id": "a", "pending": 2, "running": 0}])
+
+
+class TaskQueueExecutionTestCase(unittest.TestCase):
+    def test_workers_run_tasks_with_owner_context(self):
+        queue = TaskQueueManager(tag="test", workers=2, per_owner_limit=1)
+        seen = []
+        lock = threading.Lock()
+
+        def task(name):
+            with lock:
+                seen.append((name, current_task_owner()))
+
+        for owner in ("a", "b", "a"):
+            queue.submit(task, (owner,), owner_id=owner)
+        queue.add_task(task, "shared")
+        queue.run_task_background()
+        try:
+            self.assertTrue(queue.wait_idle(timeout=5))
+        finally:
+            queue.stop()
+        self.assertEqual(sorted(seen), [("a", "a"), ("a", "a"), ("b", "b"), ("shared", "")])
+        info = queue.get_queue_info()
+        self.assertEqual(info["lanes"][LANE_SCHEDULED]["dispatched"], 4)
+        self.assertIsNone(current_task_owner())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import time
+import unittest
+from unittest import mock
+
+from core.lax import template_parser
+from core.lax.template_parser import TemplateParser
+
+NESTED_TEMPLATE = (
+    "{% for group in groups %}<h2>{{group.name}}</h2>"
+    "{% if group.show %}"
+    "{% for item in group['items'] %}"
+    "{% if item > 2 %}<b>{{=item * 2}}</b>{% endif %}"
+    "{% if loop.last %}end{% endif %}"
+    "{% endfor %}"
+    "{% else %}hidden{% endif %}"
+    "{% endfor %}"
+)
+
+
+def _context(groups=30, items=20):
+    return {
+        "groups": [
+            {"name": f"g{i}", "show": i % 3 != 0, "items": list(range(items))}
+            for i in range(groups)
+        ]
+    }
+
+
+def run_benchmark(rounds=50):
+    """渲染嵌套 for/if 模板 rounds 次，返回平均耗时（毫秒）。"""
+    parser = TemplateParser(NESTED_TEMPLATE)
+    parser.render(_context())
+    started = time.perf_counter()
+    for _ in range(rounds):
+        parser.render(_context())
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+class TestTemplateParserPerf(unittest.TestCase):
+    """表达式编译缓存与嵌套渲染的回归测试。"""
+
+    def test_expressions_are_compiled_once(self):
+        parser = TemplateParser("{% for x in items %}{% if x > 1 %}{{=x + 1}}{% endif %}{% endfor %}")
+        parser.render({"items": [1, 2, 3]})
+        template_parser._compile_expression.cache_clear()
+        parser.render({"items": list(range(50))})
+        info = template_parser._compile_expression.cache_info()
+        self.assertEqual(info.misses, 2)
+        self.assertGreater(info.hits, 90)
+
+    def test_branches_do_not_spawn_parsers(self):
+        parser = TemplateParser("{% if a %}{% for x in items %}{% if x %}{{x}}{% endif %}{% endfor %}{% else %}none{% endif %}")
+        with mock.patch.object(TemplateParser, "__init__", side_effect=AssertionError("new parser")):
+            self.assertEqual(parser.render({"a": True, "items": [0, 1, 2]}), "\n1\n2")
+            self.assertEqual(parser.render({"a": False, "items": []}), "none")
+
+    def test_custom_functions_refresh_eval_globals(self):
+        parser = TemplateParser("{{=twice(2)}}")
+        parser.register_function("twice", lambda v: v * 2)
+        self.assertEqual(parser.render({}), "4")
+        parser.register_function("twice", lambda v: v * 3)
+        self.assertEqual(parser.render({}), "6")
+
+    def test_safe_globals_are_shared(self):
+        parser = TemplateParser("{{=upper(name)}}")
+        self.assertEqual(parser.render({"name": "abc"}), "ABC")
+        self.assertIs(parser._get_eval_globals()["upper"], template_parser._SAFE_GLOBALS["upper"])
+        self.assertNotIn("__builtins__", template_parser._SAFE_GLOBALS)
+
+    def test_unsafe_expressions_are_still_rejected(self):
+        parser = TemplateParser("{{=__import__('os').getcwd()}}{% if open('x') %}bad{% endif %}")
+        result = parser.render({})
+        self.assertIn("[Error: Potentially dangerous expression", result)
+        self.assertNotIn("bad", result)
+
+    def test_nested_benchmark(self):
+        parser = TemplateParser(NESTED_TEMPLATE)
+        output = parser.render(_context(groups=3, items=4))
+        self.assertIn("<b>6</b>", output)
+        self.assertIn("hidden", output)
+        # 宽松上限，只拦截数量级的退化；精确耗时用 __main__ 手动测
+        self.assertLess(run_benchmark(rounds=5), 1000)
+
+
+if __name__ == "__main__":
+    print(f"nested for/if render: {run_benchmark():.2f} ms")
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.lax.template_parser import TemplateParser
+from core.lax.template_registry import TemplateRegistry
+
+
+class TestTemplateRegistry(unittest.TestCase):
+    """Test cases for TemplateRegistry class."""
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self._write("includes/header.html", "<h1>{{title}}</h1>")
+        self._write(
+            "page.html",
+            "{% include 'includes/header.html' %}{% for item in items %}<i>{{item}}</i>{% endfor %}",
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.template_dir, ignore_errors=True)
+
+    def _write(self, name, content, mtime=None):
+        path = os.path.join(self.template_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_load_all_compiles_every_template(self):
+        registry = TemplateRegistry(self.template_dir)
+        self.assertEqual(registry.load_all(), 2)
+        template = registry.get("page.html")
+        self.assertIn(os.path.join(self.template_dir, "includes", "header.html"), template.dependencies)
+        # include 已在编译阶段展开
+        self.assertFalse(any("include" in part for part in template.parts if part))
+
+    def test_render_matches_template_parser(self):
+        registry = TemplateRegistry(self.template_dir)
+        registry.load_all()
+        context = {"title": "Hi", "items": [1, 2]}
+        path = os.path.join(self.template_dir, "page.html")
+        with open(path, "r", encoding="utf-8") as f:
+            expected = TemplateParser(f.read(), template_dir=self.template_dir).render(context)
+        self.assertEqual(registry.render("page.html", context), expected)
+        self.assertEqual(registry.render(path, context), expected)
+
+    def test_get_returns_cached_template(self):
+        registry = TemplateRegistry(self.template_dir)
+        registry.load_all()
+        self.assertIs(registry.get("page.html"), registry.get("page.html"))
+
+    def test_auto_reload_recompiles_changed_include(self):
+        registry = TemplateRegistry(self.template_dir, auto_reload=True)
+        registry.load_all()
+        first = registry.get("page.html")
+        self._write("includes/header.html", "<h2>{{title}}</h2>", mtime=os.path.getmtime(first.path) + 10)
+        self.assertEqual(registry.render("page.html", {"title": "Hi", "items": []}), "<h2>Hi</h2>")
+        self.assertIsNot(registry.get("page.html"), first)
+
+    def test_without_auto_reload_keeps_compiled_version(self):
+        registry = TemplateRegistry(self.template_dir)
+        registry.load_all()
+        path = registry.get("page.html").path
+        self._write("page.html", "changed", mtime=os.path.getmtime(path) + 10)
+        self.assertEqual(registry.render("page.html", {"title": "Hi", "items": []}), "<h1>Hi</h1>")
+
+    def test_include_cycle_is_bounded(self):
+        self._write("loop.html", "x{% include 'loop.html' %}")
+        registry = TemplateRegistry(self.template_dir)
+        result = registry.render("loop.html", {})
+        self.assertIn("Include depth exceeded", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import asyncio
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import update
+
+import core.auth as auth
+from core.db import DB
+from core.models.analytics_event import AnalyticsEvent
+from core.models.article import Article
+from core.models.tags import Tags
+from core.models.tenant_purge_job import TenantPurgeJob
+from core.models.user import User
+from core.tenant_purge_service import TenantPurger, get_purge_job, request_purge
+
+
+class TenantPurgeTestCase(unittest.TestCase):
+    def setUp(self):
+        DB.create_tables()
+        self.session = DB.get_session()
+        self.username = f"u_{uuid.uuid4().hex[:10]}"
+        now = datetime.now()
+        self.session.add(User(
+            id=str(uuid.uuid4()),
+            username=self.username,
+            phone=f"16{uuid.uuid4().int % 1000000000:09d}",
+            password_hash=auth.pwd_context.hash("demo123456"),
+            role="user",
+            permissions="[]",
+            created_at=now,
+            updated_at=now,
+            is_active=True,
+        ))
+        for i in range(5):
+            self.session.add(Article(id=f"{self.username}-a{i}", mp_id="mp", owner_id=self.username, title=f"t{i}"))
+        self.session.add(Tags(id=f"{self.username}-tag", name="tag", mps_id="[]", owner_id=self.username))
+        self.session.add(AnalyticsEvent(id=f"{self.username}-ev", username=self.username, created_at=now))
+        self.session.commit()
+        auth.clear_user_cache(self.username)
+
+    def tearDown(self):
+        for model, column in ((Article, Article.owner_id), (Tags, Tags.owner_id),
+                              (AnalyticsEvent, AnalyticsEvent.username), (User, User.username),
+                              (TenantPurgeJob, TenantPurgeJob.username)):
+            self.session.query(model).filter(column == self.username).delete(synchronize_session=False)
+        self.session.commit()
+        self.session.close()
+
+    def test_request_disables_user_and_purge_deletes_in_chunks(self):
+        job = request_purge(self.session, self.username, requested_by="admin")
+        self.assertEqual(job["status"], "pending")
+        self.assertFalse(auth.get_user(self.username).is_active)
+        token = auth.create_access_token({"sub": self.username}, timedelta(minutes=5))
+        with self.assertRaises(HTTPException):
+            asyncio.run(auth.get_current_user(token))
+
+        # 重复请求返回同一个任务
+        self.assertEqual(request_purge(self.session, self.username)["id"], job["id"])
+
+        pauses = []
+        purger = TenantPurger(chunk_size=2, pause_seconds=0.01, sleep=pauses.append)
+        self.assertTrue(purger.run(job["id"]))
+        self.assertFalse(purger.run(job["id"]))
+
+        status = get_purge_job(self.username)
+        self.assertEqual(status["status"], "done")
+        self.assertEqual(status["deleted"]["articles"], 5)
+        self.assertEqual(status["deleted"]["tags"], 1)
+        self.assertEqual(status["deleted"]["analytics_events_by_username"], 1)
+        self.assertEqual(status["deleted"]["users"], 1)
+        self.assertEqual(status["progress"]["finished_steps"], status["progress"]["total_steps"])
+        # 5 篇文章按每批 2 条删除，满批之后停顿
+        self.assertEqual(len(pauses), 2)
+        self.session.expire_all()
+        self.assertEqual(self.session.query(Article).filter(Article.owner_id == self.username).count(), 0)
+        self.assertIsNone(self.session.query(User).filter(User.username == self.username).first())
+        self.assertIsNone(auth.get_user(self.username))
+
+    def test_stale_running_job_is_resumed(self):
+        job = request_purge(self.session, self.username)
+        table = TenantPurgeJob.__table__
+        with DB.get_engine().begin() as conn:
+            conn.execute(update(table).where(table.c.id == job["id"]).values(
+                status="running", step="articles", deleted_json='{"articles": 3}', updated_at=datetime.now()))
+        purger = TenantPurger(chunk_size=100, pause_seconds=0, stale_seconds=60)
+        # 心跳未超时，视为其他进程仍在执行
+        self.assertNotIn(job["id"], purger.runnable_job_ids())
+        self.assertFalse(purger.run(job["id"]))
+
+        with DB.get_engine().begin() as conn:
+            conn.execute(update(table).where(table.c.id == job["id"]).values(
+                updated_at=datetime.now() - timedelta(minutes=5)))
+        self.assertIn(job["id"], purger.runnable_job_ids())
+        self.assertTrue(purger.run(job["id"]))
+        status = get_purge_job(self.username)
+        self.assertEqual(status["status"], "done")
+        self.assertEqual(status["deleted"]["articles"], 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
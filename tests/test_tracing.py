@@ -0,0 +1,150 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from core.queue import TaskQueueManager
+from core.tracing import (
+    FileSpanExporter,
+    SpanContext,
+    Tracer,
+    current_span_context,
+    format_traceparent,
+    parse_traceparent,
+    set_tracer,
+    start_span,
+    traced,
+)
+
+
+class MemoryExporter:
+    def __init__(self):
+        self.batches = []
+
+    def export(self, spans):
+        self.batches.append(list(spans))
+
+    @property
+    def spans(self):
+        return {span.name: span for batch in self.batches for span in batch}
+
+
+class TracingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.exporter = MemoryExporter()
+        self.tracer = Tracer(enabled=True, sample_rate=1.0, exporter=self.exporter, rng=random.Random(7))
+        self.previous = set_tracer(self.tracer)
+
+    def tearDown(self):
+        set_tracer(self.previous)
+
+    def test_nested_spans_export_once_per_local_root(self):
+        @traced("stage.inner")
+        def inner():
+            return "ok"
+
+        with start_span("job.run", attributes={"task_id": "t1"}) as root:
+            with start_span("stage.fetch") as fetch:
+                self.assertEqual(current_span_context(), fetch.context)
+                self.assertEqual(inner(), "ok")
+            self.assertEqual(self.exporter.batches, [])
+        self.assertIsNone(current_span_context())
+
+        self.assertEqual(len(self.exporter.batches), 1)
+        spans = self.exporter.spans
+        self.assertEqual({s.context.trace_id for s in spans.values()}, {root.context.trace_id})
+        self.assertEqual(spans["stage.fetch"].parent_span_id, root.context.span_id)
+        self.assertEqual(spans["stage.inner"].parent_span_id, fetch.context.span_id)
+
+        data = root.to_otlp()
+        self.assertEqual(len(data["traceId"]), 32)
+        self.assertEqual(len(data["spanId"]), 16)
+        self.assertNotIn("parentSpanId", data)
+        self.assertIn({"key": "task_id", "value": {"stringValue": "t1"}}, data["attributes"])
+        self.assertLessEqual(int(data["startTimeUnixNano"]), int(data["endTimeUnixNano"]))
+
+    def test_exception_marks_span_error(self):
+        with self.assertRaises(ValueError):
+            with start_span("stage.fail"):
+                raise ValueError("boom")
+        data = self.exporter.spans["stage.fail"].to_otlp()
+        self.assertEqual(data["status"], {"code": 2, "message": "ValueError: boom"})
+        self.assertEqual(data["events"][0]["name"], "exception")
+
+    def test_sampling_follows_root_and_remote_parent(self):
+        self.tracer.sample_rate = 0.0
+        with start_span("job.run") as root:
+            with start_span("stage.fetch") as child:
+                self.assertFalse(child.recording)
+                self.assertEqual(child.context.trace_id, root.context.trace_id)
+        self.assertEqual(self.exporter.batches, [])
+
+        parent = parse_traceparent("00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01")
+        with start_span("GET /api", parent=parent, kind="server") as span:
+            pass
+        self.assertTrue(span.recording)
+        self.assertEqual(span.parent_span_id, "b7ad6b7169203331")
+        self.assertEqual(span.to_otlp()["kind"], 2)
+
+    def test_traceparent_round_trip(self):
+        context = SpanContext("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331", False)
+        self.assertEqual(parse_traceparent(format_traceparent(context)), context)
+        self.assertIsNone(parse_traceparent("garbage"))
+        self.assertIsNone(parse_traceparent("00-00000000000000000000000000000000-b7ad6b7169203331-01"))
+        self.assertEqual(format_traceparent(None), "")
+
+    def test_disabled_tracer_is_noop(self):
+        set_tracer(Tracer(enabled=False, exporter=self.exporter))
+        with start_span("job.run") as span:
+            span.set_attribute("k", "v")
+            self.assertIsNone(current_span_context())
+        self.assertEqual(self.exporter.batches, [])
+
+    def test_queue_task_continues_submitting_trace(self):
+        queue = TaskQueueManager(tag="trace-test", per_owner_limit=0)
+
+        def work():
+            with start_span("stage.work"):
+                pass
+
+        with start_span("http.request") as request_span:
+            queue.submit(work, owner_id="u1")
+        queue.run_task_background()
+        try:
+            self.assertTrue(queue.wait_idle(5))
+        finally:
+            queue.stop()
+
+        spans = self.exporter.spans
+        task_span = spans["queue.task"]
+        self.assertEqual(task_span.context.trace_id, request_span.context.trace_id)
+        self.assertEqual(task_span.parent_span_id, request_span.context.span_id)
+        self.assertEqual(spans["stage.work"].parent_span_id, task_span.context.span_id)
+        self.assertEqual(task_span.attributes["queue.lane"], "scheduled")
+
+    def test_file_exporter_writes_rotating_otlp_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "traces", "spans.jsonl")
+            exporter = FileSpanExporter(path, max_bytes=2048, backup_count=2, service_name="svc")
+            self.tracer.exporter = exporter
+            try:
+                for i in range(20):
+                    with start_span("job.run", attributes={"i": i, "payload": "x" * 100}):
+                        with start_span("stage.fetch"):
+                            pass
+            finally:
+                exporter.close()
+            self.assertTrue(os.path.exists(path + ".1"))
+            self.assertFalse(os.path.exists(path + ".3"))
+            with open(path, encoding="utf-8") as f:
+                line = json.loads(f.readline())
+        resource = line["resourceSpans"][0]
+        self.assertIn({"key": "service.name", "value": {"stringValue": "svc"}}, resource["resource"]["attributes"])
+        spans = resource["scopeSpans"][0]["spans"]
+        self.assertEqual([s["name"] for s in spans], ["stage.fetch", "job.run"])
+        self.assertEqual(spans[0]["parentSpanId"], spans[1]["spanId"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from core.seen_index import SeenArticleIndex
+from core.wx.base import WxGather
+from core.wx.upstream import UpstreamCrawlCache, crawl_feed
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeGather:
+    def __init__(self, pages, complete=True):
+        self.pages = pages
+        self.complete = complete
+        self.crawl_complete = False
+        self.item_hook = None
+        self.requests = 0
+        self.fanned_out = []
+
+    def get_Articles(self, faker_id, CallBack=None, Mps_id=None, **kwargs):
+        self.requests += 1
+        for item in self.pages:
+            if self.item_hook is not None:
+                self.item_hook(item)
+        self.crawl_complete = self.complete
+
+    def FanOut(self, items, Mps_id, **kwargs):
+        self.fanned_out.append((Mps_id, [item["aid"] for item in items]))
+        return len(items)
+
+
+def _feed(owner, faker_id="biz"):
+    return SimpleNamespace(id=f"MP_WXS_{owner}_{faker_id}", faker_id=faker_id, mp_name="mp")
+
+
+class UpstreamCrawlTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = UpstreamCrawlCache(window_seconds=60, max_entries=10, clock=self.clock)
+        patcher = mock.patch("core.wx.upstream.get_upstream_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_second_subscriber_reuses_upstream_result(self):
+        wx = FakeGather([{"aid": "1"}, {"aid": "2"}])
+        self.assertFalse(crawl_feed(wx, _feed("alice")))
+        self.assertTrue(crawl_feed(wx, _feed("bob")))
+        self.assertTrue(crawl_feed(wx, _feed("carol")))
+        self.assertEqual(wx.requests, 1)
+        self.assertEqual([owner for owner, _ in wx.fanned_out], ["MP_WXS_bob_biz", "MP_WXS_carol_biz"])
+        self.assertEqual(wx.fanned_out[0][1], ["1", "2"])
+
+    def test_window_expiry_and_other_accounts_crawl_again(self):
+        wx = FakeGather([{"aid": "1"}])
+        crawl_feed(wx, _feed("alice"))
+        crawl_feed(wx, _feed("alice", faker_id="other"))
+        self.assertEqual(wx.requests, 2)
+        self.clock.now = 61
+        self.assertFalse(crawl_feed(wx, _feed("bob")))
+        self.assertEqual(wx.requests, 3)
+
+    def test_empty_crawl_is_not_shared(self):
+        wx = FakeGather([])
+        crawl_feed(wx, _feed("alice"))
+        self.assertFalse(crawl_feed(wx, _feed("bob")))
+        self.assertEqual(wx.requests, 2)
+
+    def test_truncated_crawl_is_not_shared(self):
+        # alice 的订阅已采集过前几篇，翻页提前停止；bob 需要自己抓完整列表
+        wx = FakeGather([{"aid": "1"}], complete=False)
+        crawl_feed(wx, _feed("alice"), MaxPage=3)
+        self.assertFalse(crawl_feed(wx, _feed("bob"), MaxPage=3))
+        self.assertEqual(wx.requests, 2)
+        self.assertEqual(wx.fanned_out, [])
+
+    def test_fan_out_writes_only_unknown_articles(self):
+        index = SeenArticleIndex(max_per_feed=10, loader=lambda mp_id, limit: ["bob_biz-1"], exists=lambda _: False)
+        saved = []
+        with mock.patch("core.wx.base.get_seen_index", return_value=index), \
+                mock.patch.object(WxGather, "update_mps"), mock.patch.object(WxGather, "Over"), \
+                mock.patch("core.wx.base.setStatus"):
+            wx = WxGather()
+            items = [
+                {"aid": "1", "title": "a", "link": "l1", "cover": "", "update_time": 1, "content": "<p>a</p>"},
+                {"aid": "2", "title": "b", "link": "l2", "cover": "", "update_time": 2},
+            ]
+            count = wx.FanOut(items, Mps_id="MP_WXS_bob_biz", CallBack=lambda art: saved.append(art) or True)
+        self.assertEqual(count, 1)
+        self.assertEqual([(a["id"], a["mp_id"], a["content"]) for a in saved], [("2", "MP_WXS_bob_biz", "")])
+        self.assertNotIn("mp_id", items[1])
+
+    def test_items_known_to_first_subscriber_get_content_on_fan_out(self):
+        page = [
+            {"aid": "1", "title": "a", "link": "l1", "cover": "", "update_time": 1},
+            {"aid": "2", "title": "b", "link": "l2", "cover": "", "update_time": 2},
+        ]
+
+        class PageGather(WxGather):
+            def get_Articles(self, faker_id, CallBack=None, Mps_id=None, Mps_title="", **kwargs):
+                for item in page:
+                    self.GatherItem(dict(item), Mps_id, Mps_title, CallBack=CallBack, Gather_Content=True)
+                self.crawl_complete = True
+
+        # alice 已采集过第 1 篇，列表中这一篇不会抓正文
+        index = SeenArticleIndex(max_per_feed=10, loader=lambda mp_id, limit: ["alice_biz-1"] if "alice" in mp_id else [],
+                                 exists=lambda _: False)
+        saved = []
+        with mock.patch("core.wx.base.get_seen_index", return_value=index), \
+                mock.patch.object(WxGather, "update_mps"), mock.patch.object(WxGather, "Over"), \
+                mock.patch.object(WxGather, "Throttle"), mock.patch("core.wx.base.setStatus"), \
+                mock.patch.object(WxGather, "content_extract", side_effect=lambda url: f"<p>{url}</p>") as extract:
+            wx = PageGather()
+            wx.Gather_Content = True
+            callback = lambda art: saved.append(art) or True
+            self.assertFalse(crawl_feed(wx, _feed("alice"), CallBack=callback))
+            self.assertTrue(crawl_feed(wx, _feed("bob"), CallBack=callback))
+            self.assertTrue(crawl_feed(wx, _feed("carol"), CallBack=callback))
+        self.assertEqual([(a["mp_id"], a["id"], a["content"]) for a in saved], [
+            ("MP_WXS_alice_biz", "2", "<p>l2</p>"),
+            ("MP_WXS_bob_biz", "1", "<p>l1</p>"),
+            ("MP_WXS_bob_biz", "2", "<p>l2</p>"),
+            ("MP_WXS_carol_biz", "1", "<p>l1</p>"),
+            ("MP_WXS_carol_biz", "2", "<p>l2</p>"),
+        ])
+        # 补抓的正文写回共享列表，第三个订阅不再重复抓取
+        self.assertEqual(extract.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import threading
+import time
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from core.db import DB
+from core.models.wechat_token import WechatAccessToken
+from core.wechat_token_service import WechatTokenService, is_invalid_token_error
+
+T0 = datetime(2000, 1, 1, 12, 0, 0)
+
+
+class FakeClock:
+    def __init__(self, now=T0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeFetcher:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, app_id, secret):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        time.sleep(self.delay)
+        return f"{app_id}-token-{n}", 7200, ""
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.status_code = 200
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class FakeHttp:
+    """第一次返回 40001，之后返回成功；记录每次请求带的 access_token"""
+
+    def __init__(self):
+        self.tokens = []
+
+    def request(self, method, url, params=None, **kwargs):
+        self.tokens.append(params["access_token"])
+        if len(self.tokens) == 1:
+            return FakeResponse({"errcode": 40001, "errmsg": "invalid credential"})
+        return FakeResponse({"media_id": "m1"})
+
+
+class WechatTokenServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        DB.create_tables()
+        self.app_id = f"wx{uuid.uuid4().hex[:12]}"
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        session = DB.get_session()
+        try:
+            session.query(WechatAccessToken).filter(WechatAccessToken.app_id == self.app_id).delete()
+            session.commit()
+        finally:
+            session.close()
+
+    def _service(self, fetcher, **kwargs):
+        kwargs.setdefault("refresh_ahead_seconds", 300)
+        kwargs.setdefault("wait_seconds", 0)
+        return WechatTokenService(fetcher=fetcher, clock=self.clock, **kwargs)
+
+    def test_concurrent_callers_share_one_fetch(self):
+        fetcher = FakeFetcher(delay=0.05)
+        service = self._service(fetcher)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(service.get_token(self.app_id, "secret")))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(fetcher.calls, 1)
+        self.assertEqual(set(results), {(f"{self.app_id}-token-1", "")})
+
+    def test_other_process_reuses_shared_row(self):
+        first = FakeFetcher()
+        self.assertEqual(self._service(first).get_token(self.app_id, "secret")[0], f"{self.app_id}-token-1")
+        second = FakeFetcher()
+        self.assertEqual(self._service(second).get_token(self.app_id, "secret")[0], f"{self.app_id}-token-1")
+        self.assertEqual(second.calls, 0)
+        # secret 变更后不沿用旧 secret 换来的 token
+        self.assertEqual(self._service(second).get_token(self.app_id, "rotated")[0], f"{self.app_id}-token-1")
+        self.assertEqual(second.calls, 1)
+        self.assertEqual(self._service(FakeFetcher()).get_token(self.app_id, "")[1], "缺少 appid/appsecret")
+
+    def test_refreshes_ahead_of_expiry(self):
+        fetcher = FakeFetcher()
+        service = self._service(fetcher)
+        token, _ = service.get_token(self.app_id, "secret")
+        self.clock.now = T0 + timedelta(seconds=7200 - 301)
+        self.assertEqual(service.get_token(self.app_id, "secret")[0], token)
+
+        # 进入提前刷新窗口，但其他进程持有刷新租约：继续使用仍有效的旧 token
+        self.clock.now = T0 + timedelta(seconds=7200 - 200)
+        other = self._service(FakeFetcher(), holder="other")
+        self.assertTrue(other._claim(self.app_id, self.clock.now))
+        self.assertEqual(service.get_token(self.app_id, "secret")[0], token)
+        self.assertEqual(fetcher.calls, 1)
+
+        other._release(self.app_id)
+        self.assertEqual(service.get_token(self.app_id, "secret")[0], f"{self.app_id}-token-2")
+        self.assertEqual(fetcher.calls, 2)
+
+    def test_invalid_token_error_refreshes_and_retries(self):
+        fetcher = FakeFetcher()
+        http = FakeHttp()
+        service = self._service(fetcher, http=http)
+        stale, _ = service.get_token(self.app_id, "secret")
+
+        resp = service.post("https://api.weixin.qq.com/cgi-bin/draft/add", stale, data=b"{}")
+        self.assertEqual(resp.json(), {"media_id": "m1"})
+        fresh = f"{self.app_id}-token-2"
+        self.assertEqual(http.tokens, [stale, fresh])
+        # 仍持有旧 token 的调用方直接换成新 token，不再触发失效重试
+        service.post("https://api.weixin.qq.com/cgi-bin/draft/add", stale, data=b"{}")
+        self.assertEqual(http.tokens[-1], fresh)
+        self.assertEqual(fetcher.calls, 2)
+
+        # 其他进程作废旧 token 不影响已刷新的新 token
+        self._service(FakeFetcher()).invalidate(self.app_id, stale)
+        self.assertEqual(self._service(FakeFetcher()).get_token(self.app_id, "secret")[0], fresh)
+
+    def test_is_invalid_token_error(self):
+        self.assertTrue(is_invalid_token_error({"errcode": 40001}))
+        self.assertTrue(is_invalid_token_error({"errcode": "42001"}))
+        self.assertFalse(is_invalid_token_error({"errcode": 0, "media_id": "m"}))
+        self.assertFalse(is_invalid_token_error(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from core.wx.governor import RequestGovernor, credential_key, get_governor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RequestGovernorTestCase(unittest.TestCase):
+    def _governor(self, rate_per_minute=60):
+        self.clock = FakeClock()
+        governor = RequestGovernor(key="k", rate_per_minute=rate_per_minute, sleep=self.clock.sleep, clock=self.clock)
+        governor.jitter = 0
+        governor.burst = 2
+        governor._tokens = 2
+        governor.min_rate = 6 / 60
+        governor.max_rate = 120 / 60
+        governor.rate = rate_per_minute / 60
+        governor.success_streak = 2
+        governor.increase = 30 / 60
+        governor.cooldown_base = 60
+        governor.cooldown_max = 200
+        return governor
+
+    def test_bucket_allows_burst_then_paces(self):
+        governor = self._governor(rate_per_minute=60)
+        self.assertEqual(governor.acquire(), 0)
+        self.assertEqual(governor.acquire(), 0)
+        self.assertAlmostEqual(governor.acquire(), 1.0)
+        self.assertAlmostEqual(governor.acquire(), 1.0)
+
+    def test_success_increases_rate_up_to_max(self):
+        governor = self._governor(rate_per_minute=60)
+        for _ in range(20):
+            governor.observe(0)
+        self.assertAlmostEqual(governor.rate, 2.0)
+
+    def test_freq_control_halves_rate_and_cools_down_exponentially(self):
+        governor = self._governor(rate_per_minute=60)
+        self.assertEqual(governor.on_rate_limited(), 60)
+        self.assertAlmostEqual(governor.rate, 0.5)
+        self.assertGreaterEqual(governor.acquire(), 60)
+        governor.observe(200013)
+        self.assertEqual(governor.status()["strikes"], 2)
+        self.assertGreaterEqual(governor.reserve(), 120)
+        self.assertEqual(governor.on_rate_limited(), 200)
+        self.assertAlmostEqual(governor.rate, 0.125)
+        governor.observe(0)
+        self.assertEqual(governor.status()["strikes"], 0)
+
+    def test_ignores_unknown_codes(self):
+        governor = self._governor()
+        governor.observe("bad")
+        governor.observe(200003)
+        self.assertEqual(governor.status()["strikes"], 0)
+
+    def test_same_credential_shares_one_governor(self):
+        self.assertIs(get_governor("t", "c"), get_governor("t", "c"))
+        self.assertIsNot(get_governor("t", "c"), get_governor("t", "other"))
+        self.assertNotIn("t", credential_key("t", "c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 from core.models.article import Article
 from sqlalchemy import func
 import core.db as db
+from core.feed_stats_service import record_articles_removed
 DB=db.Db(tag="文章清理")
 def clean_duplicate_articles():
     """
@@ -37,7 +38,8 @@ def clean_duplicate_articles():
             else:
                 seen_articles.add(article_key)
         
-        # 删除重复文章
+        # 删除重复文章（删除前扣减公众号文章数与统计）
+        record_articles_removed(session, duplicates)
         for duplicate in duplicates:
             print(f"删除重复文章: {duplicate.title}")
             session.delete(duplicate)
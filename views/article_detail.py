@@ -5,13 +5,13 @@ import os
 from datetime import datetime
 import re
 import json
-from views.base import process_content_images, _render_template_with_error
+from views.base import process_content_images, _render_template_with_error, render_template
 from core.db import DB
 from core.models.article import Article
 from core.models.feed import Feed
 from core.models.tags import Tags
+from core.feed_stats_service import record_read_change
 from apis.base import format_search_kw
-from core.lax.template_parser import TemplateParser
 from views.config import base
 from driver.wxarticle import Web
 from core.config import cfg
@@ -68,6 +68,7 @@ async def article_detail_view(
         
         # 标记为已读（可选）
         if not article.is_read:
+            record_read_change(session, article, True)
             article.is_read = 1
             session.commit()
 
@@ -149,13 +150,7 @@ async def article_detail_view(
             {"name": article_data["title"][:50] + "..." if len(article_data["title"]) > 50 else article_data["title"], "url": None}
         ]
         
-        # 读取模板文件
-        template_path=base.article_detail_template
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        parser = TemplateParser(template_content, template_dir=base.public_dir)
-        html_content = parser.render({
+        return render_template(base.article_detail_template, {
             "site": base.site,
             "article": article_data,
             "related_articles": related_list,
@@ -164,8 +159,6 @@ async def article_detail_view(
             "breadcrumb": breadcrumb,
         })
         
-        return HTMLResponse(content=html_content)
-        
     except HTTPException:
         raise
     except Exception as e:
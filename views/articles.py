@@ -4,17 +4,16 @@ from typing import Optional
 import os
 from datetime import datetime
 import re
-import json
-from views.base import _render_template_with_error
+from views.base import _render_template_with_error, render_template
 from core.db import DB
 from core.models.article import Article
 from core.models.feed import Feed
 from core.models.tags import Tags
 from apis.base import format_search_kw
-from core.lax.template_parser import TemplateParser
 from views.config import base
 from driver.wxarticle import Web
 from core.cache import cache_view, clear_cache_pattern, data_cache
+from core.tag_feed_service import tag_feed_ids
 
 
 
@@ -47,23 +46,17 @@ async def articles_view(
         if order not in valid_orders:
             order = "desc"
         
-        # 预处理标签筛选的mp_ids
-        mps_ids = []
+        # 标签筛选：经 tag_feeds 关联表子查询，不再解析 mps_id JSON
+        tag_active = False
         if tag_id:
-            tag = session.query(Tags.mps_id).filter(Tags.id == tag_id, Tags.status == 1).scalar()
-            if tag:
-                try:
-                    mps_data = json.loads(tag)
-                    mps_ids = [str(mp['id']) for mp in mps_data] if isinstance(mps_data, list) else []
-                except (json.JSONDecodeError, TypeError):
-                    mps_ids = []
+            tag_active = session.query(Tags.id).filter(Tags.id == tag_id, Tags.status == 1).scalar() is not None
         
         # 构建基础查询条件
         base_conditions = [Article.status == 1]
         if mp_id:
             base_conditions.append(Article.mp_id == mp_id)
-        if mps_ids:
-            base_conditions.append(Article.mp_id.in_(mps_ids))
+        if tag_active:
+            base_conditions.append(Article.mp_id.in_(tag_feed_ids(tag_id)))
         if keyword and keyword.strip():
             search_filter = format_search_kw(keyword.strip())
             if search_filter is not None:
@@ -139,20 +132,14 @@ async def articles_view(
         cache_key_popular = "popular_mps_top10"
         mp_options = data_cache.get(cache_key_popular)
         if mp_options is None:
-            from sqlalchemy import func
-            
+            # 直接按反范式维护的 Feed.article_count 排序，无需对文章表 GROUP BY
             popular_mps = session.query(
-                Feed.id, Feed.mp_name,
-                func.count(Article.id).label('article_count')
-            ).join(
-                Article, Feed.id == Article.mp_id
-            ).filter(
-                Article.status == 1,
-                Feed.status == 1
-            ).group_by(
                 Feed.id, Feed.mp_name
+            ).filter(
+                Feed.status == 1,
+                Feed.article_count > 0
             ).order_by(
-                func.count(Article.id).desc()
+                Feed.article_count.desc()
             ).limit(10).all()
             
             mp_options = [{"id": str(row[0]), "name": row[1]} for row in popular_mps]
@@ -166,11 +153,6 @@ async def articles_view(
         # 构建面包屑
         breadcrumb = [{"name": "文章列表", "url": "/views/articles"}]
         
-        # 读取模板文件
-        template_path = base.articles_template
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
         feed_info = feed_dict.get(mp_id) if mp_id else None
         info = {
             "mp_name": feed_info.mp_name if feed_info else "",
@@ -179,8 +161,7 @@ async def articles_view(
             "mp_id": mp_id,
         } if feed_info else {}
         
-        parser = TemplateParser(template_content, template_dir=base.public_dir)
-        html_content = parser.render({
+        return render_template(base.articles_template, {
             "site": base.site,
             "articles": article_list,
             "current_page": page,
@@ -203,8 +184,6 @@ async def articles_view(
             "breadcrumb": breadcrumb
         })
         
-        return HTMLResponse(content=html_content)
-        
     except Exception as e:
         print(f"获取文章列表错误: {str(e)}")
         return _render_template_with_error(
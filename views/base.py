@@ -1,6 +1,5 @@
 from math import e
 from fastapi import APIRouter, Request, Depends, Query, HTTPException
-from core.lax.template_parser import TemplateParser
 from fastapi.responses import HTMLResponse
 from core.db import DB
 from core.models.feed import Feed
@@ -8,7 +7,10 @@ from core.models.article import Article
 from driver.wxarticle import Web
 from datetime import datetime
 from core.models.tags import Tags
-import json
+from core.tag_feed_service import tag_counts
+from core.config import DEBUG
+from views.config import base, templates
+import time
 #获取公众号视图数据
 def get_mps_view(
     page: int ,
@@ -26,18 +28,10 @@ def get_mps_view(
         # 查询公众号列表
         feeds = session.query(Feed).filter(Feed.status == 1).order_by(Feed.created_at.desc()).offset(offset).limit(limit).all()
         
-        # 处理公众号数据
+        # 处理公众号数据（文章数取自增量维护的 Feed.article_count，无需逐个 COUNT）
         feed_list = []
         for feed in feeds:
-            # 对于 Feed 表，id 就是公众号的 ID
-            mp_id = feed.id
-            
-            # 统计该公众号的文章数量
-            article_count = session.query(Article).filter(
-                Article.mp_id == mp_id,
-                Article.status == 1
-            ).count()
-            
+            article_count = int(feed.article_count or 0)
             feed_data = {
                 "id": feed.id,
                 "name": feed.mp_name,
@@ -98,36 +92,19 @@ def get_tags_view(
         # 查询标签列表
         tags = session.query(Tags).filter(Tags.status == 1).order_by(Tags.created_at.desc()).offset(offset).limit(limit).all()
         
+        # 经 tag_feeds 关联表一次分组查询取回本页标签的公众号数与文章数
+        counts = tag_counts(session, [tag.id for tag in tags])
+
         # 处理标签数据
         tag_list = []
         for tag in tags:
-            # 解析mps_id JSON
-            mps_ids = []
-            if tag.mps_id:
-                try:
-                    mps_data = json.loads(tag.mps_id)
-                    mps_ids = [str(mp['id']) for mp in mps_data] if isinstance(mps_data, list) else []
-                except (json.JSONDecodeError, TypeError):
-                    mps_ids = []
-            
-            # 统计文章数量
-            article_count = 0
-            if mps_ids:
-                article_count = session.query(Article).filter(
-                    Article.mp_id.in_(mps_ids),
-                    Article.status == 1
-                ).count()
-            
-            # 获取关联的公众号数量
-            mp_count = len(mps_ids) if mps_ids else 0
-            
             tag_data = {
                 "id": tag.id,
                 "name": tag.name,
                 "cover": Web.get_image_url(tag.cover) if tag.cover else "",
                 "intro": tag.intro,
-                "mp_count": mp_count,
-                "article_count": article_count,
+                "mp_count": counts[tag.id]["mp_count"],
+                "article_count": counts[tag.id]["article_count"],
                 "sync_time": datetime.fromtimestamp(tag.sync_time).strftime('%Y-%m-%d %H:%M') if tag.sync_time else "未同步",
                 "created_at": tag.created_at.strftime('%Y-%m-%d') if tag.created_at else ""
             }
@@ -160,19 +137,23 @@ def get_tags_view(
         session.close()
     return data
 
+def render_template(template_path: str, context: dict) -> HTMLResponse:
+    """使用预编译模板渲染页面，调试模式下通过响应头返回渲染耗时"""
+    started = time.perf_counter()
+    html_content = templates.render(template_path, context)
+    response = HTMLResponse(content=html_content)
+    if DEBUG:
+        response.headers["X-Template-Render-Ms"] = f"{(time.perf_counter() - started) * 1000:.2f}"
+    return response
+
 def _render_template_with_error(template_path: str, error_msg: str, breadcrumb: list) -> HTMLResponse:
     """渲染错误页面的辅助函数"""
     try:
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        parser = TemplateParser(template_content, template_dir=base.public_dir)
-        html_content = parser.render({
+        return render_template(template_path, {
             "site": base.site,
             "error": error_msg,
             "breadcrumb": breadcrumb
         })
-        return HTMLResponse(content=html_content)
     except Exception:
         return HTMLResponse(content=f"<h1>系统错误</h1><p>{error_msg}</p>")
 
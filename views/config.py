@@ -1,5 +1,6 @@
 import os
-from core.config import cfg
+from core.config import cfg, DEBUG
+from core.lax.template_registry import TemplateRegistry
 class Config:
     base_path= "./public"
     #模板路径 
@@ -21,3 +22,6 @@ class Config:
         "copyright": cfg.get("site.copyright", "© 2026 Content Studio Team"),
     }
 base = Config()
+# 启动时一次性编译 public/templates 下的全部模板；调试模式下按 mtime 热更新
+templates = TemplateRegistry(base.public_dir, auto_reload=bool(DEBUG))
+templates.load_all()
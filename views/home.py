@@ -2,10 +2,9 @@ from fastapi import APIRouter, Request, Depends, Query, HTTPException
 from fastapi.responses import HTMLResponse
 from typing import Optional
 from apis.tags import get_tags
-from core.lax.template_parser import TemplateParser
 from views.config import base
 from core.cache import cache_view, clear_cache_pattern
-from views.base import get_tags_view,get_mps_view
+from views.base import get_tags_view,get_mps_view,render_template
 # 创建路由器
 router = APIRouter(tags=["首页"])
 
@@ -21,29 +20,13 @@ async def home_view(
     """
     try:
         data={"site": base.site,"tags":get_tags_view(page, limit),"mps":get_mps_view(page, limit)}
-        # 读取模板文件
-        template_path = base.home_template
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        # 使用模板引擎渲染
-        parser = TemplateParser(template_content, template_dir=base.public_dir)
-        html_content = parser.render(data)
-        
-        return HTMLResponse(content=html_content)
+        # 使用预编译模板渲染
+        return render_template(base.home_template, data)
         
     except Exception as e:
         print(f"获取首页数据错误: {str(e)}")
-        # 读取模板文件
-        template_path = base.home_template
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        parser = TemplateParser(template_content, template_dir=base.public_dir)
-        html_content = parser.render({
+        return render_template(base.home_template, {
             "error": f"加载数据时出现错误: {str(e)}",
             "breadcrumb": [{"name": "首页", "url": "/views/home"}]
         })
-        
-        return HTMLResponse(content=html_content)
 
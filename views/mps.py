@@ -3,10 +3,9 @@ from fastapi.responses import HTMLResponse
 from typing import Optional
 import os
 from core.db import DB
-from core.lax.template_parser import TemplateParser
 from views.config import base
 from core.cache import cache_view, clear_cache_pattern
-from views.base import get_mps_view
+from views.base import get_mps_view, render_template
 # 创建路由器
 router = APIRouter(tags=["公众号"])
 
@@ -22,31 +21,15 @@ async def mps_view(
     """
     try:
         data=get_mps_view(page, limit)
-        # 读取模板文件
-        template_path = base.mps_template
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-
         data['site'] = base.site
-        # 使用模板引擎渲染
-        parser = TemplateParser(template_content, template_dir=base.public_dir)
-        html_content = parser.render(data)
-        
-        return HTMLResponse(content=html_content)
+        # 使用预编译模板渲染
+        return render_template(base.mps_template, data)
         
     except Exception as e:
         print(f"获取首页数据错误: {str(e)}")
-        # 读取模板文件
-        template_path = base.mps_template
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        parser = TemplateParser(template_content, template_dir=base.public_dir)
-        html_content = parser.render({
+        return render_template(base.mps_template, {
             "site": base.site,
             "error": f"加载数据时出现错误: {str(e)}",
             "breadcrumb": [{"name": "公众号", "url": "/views/mps"}]
         })
-        
-        return HTMLResponse(content=html_content)
    
\ No newline at end of file
@@ -2,17 +2,17 @@ from fastapi import APIRouter, Request, Depends, Query, HTTPException
 from fastapi.responses import HTMLResponse
 from typing import Optional
 import os
-import json
 from datetime import datetime
 
 from core.db import DB
 from core.models.tags import Tags
 from core.models.feed import Feed
 from core.models.article import Article
-from core.lax.template_parser import TemplateParser
 from views.config import base
+from views.base import render_template
 from driver.wxarticle import Web
 from core.cache import cache_view, clear_cache_pattern
+from core.tag_feed_service import tag_counts, tag_feed_ids
 # 创建路由器
 router = APIRouter(tags=["标签"])
 
@@ -37,36 +37,19 @@ async def tags_view(
         # 查询标签列表
         tags = session.query(Tags).filter(Tags.status == 1).order_by(Tags.created_at.desc()).offset(offset).limit(limit).all()
         
+        # 一次分组查询统计本页标签的公众号数与文章数
+        counts = tag_counts(session, [tag.id for tag in tags])
+        
         # 处理标签数据
         tag_list = []
         for tag in tags:
-            # 解析mps_id JSON
-            mps_ids = []
-            if tag.mps_id:
-                try:
-                    mps_data = json.loads(tag.mps_id)
-                    mps_ids = [str(mp['id']) for mp in mps_data] if isinstance(mps_data, list) else []
-                except (json.JSONDecodeError, TypeError):
-                    mps_ids = []
-            
-            # 统计文章数量
-            article_count = 0
-            if mps_ids:
-                article_count = session.query(Article).filter(
-                    Article.mp_id.in_(mps_ids),
-                    Article.status == 1
-                ).count()
-            
-            # 获取关联的公众号数量
-            mp_count = len(mps_ids) if mps_ids else 0
-            
             tag_data = {
                 "id": tag.id,
                 "name": tag.name,
                 "cover": Web.get_image_url(tag.cover) if tag.cover else "",
                 "intro": tag.intro,
-                "mp_count": mp_count,
-                "article_count": article_count,
+                "mp_count": counts[tag.id]["mp_count"],
+                "article_count": counts[tag.id]["article_count"],
                 "sync_time": datetime.fromtimestamp(tag.sync_time).strftime('%Y-%m-%d %H:%M') if tag.sync_time else "未同步",
                 "created_at": tag.created_at.strftime('%Y-%m-%d') if tag.created_at else ""
             }
@@ -82,14 +65,7 @@ async def tags_view(
             {"name": "标签", "url": "/views/tags"}
         ]
         
-        # 读取模板文件
-        template_path = base.tags_template
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        # 使用模板引擎渲染
-        parser = TemplateParser(template_content, template_dir=base.public_dir)
-        html_content = parser.render({
+        return render_template(base.tags_template, {
             "site": base.site,
             "tags": tag_list,
             "current_page": page,
@@ -101,23 +77,13 @@ async def tags_view(
             "breadcrumb": breadcrumb
         })
         
-        return HTMLResponse(content=html_content)
-        
     except Exception as e:
         print(f"获取首页数据错误: {str(e)}")
-        # 读取模板文件
-        template_path = base.home_template
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        parser = TemplateParser(template_content, template_dir=base.public_dir)
-        html_content = parser.render({
+        return render_template(base.home_template, {
             "site": base.site,
             "error": f"加载数据时出现错误: {str(e)}",
             "breadcrumb": [{"name": "标签", "url": "/views/tags"}]
         })
-        
-        return HTMLResponse(content=html_content)
     finally:
         session.close()
 
@@ -140,25 +106,14 @@ async def tag_detail_view(
         if not tag:
             raise HTTPException(status_code=404, detail="标签不存在")
         
-        # 解析mps_id JSON
-        mps_ids = []
-        if tag.mps_id:
-            try:
-                mps_data = json.loads(tag.mps_id)
-                mps_ids = [str(mp['id']) for mp in mps_data] if isinstance(mps_data, list) else []
-            except (json.JSONDecodeError, TypeError):
-                mps_ids = []
-        
-        # 获取关联的公众号信息
-        mps_info = []
-        if mps_ids:
-            mps_info = session.query(Feed).filter(Feed.id.in_(mps_ids)).all()
+        # 获取关联的公众号信息（经 tag_feeds 关联表）
+        mps_info = session.query(Feed).filter(Feed.id.in_(tag_feed_ids(tag_id))).all()
         
         # 查询文章总数
         total = 0
-        if mps_ids:
+        if mps_info:
             total = session.query(Article).filter(
-                Article.mp_id.in_(mps_ids),
+                Article.mp_id.in_(tag_feed_ids(tag_id)),
                 Article.status == 1
             ).count()
         
@@ -167,11 +122,11 @@ async def tag_detail_view(
         
         # 查询文章列表
         articles = []
-        if mps_ids:
+        if mps_info:
             articles_query = session.query(Article, Feed).join(
                 Feed, Article.mp_id == Feed.id
             ).filter(
-                Article.mp_id.in_(mps_ids),
+                Article.mp_id.in_(tag_feed_ids(tag_id)),
                 Article.status == 1
             ).order_by(Article.publish_time.desc()).offset(offset).limit(limit).all()
             
@@ -195,7 +150,7 @@ async def tag_detail_view(
             "name": tag.name,
             "cover":tag.cover,
             "intro": tag.intro,
-            "mp_count": len(mps_ids),
+            "mp_count": len(mps_info),
             "article_count": total,
             "sync_time": datetime.fromtimestamp(tag.sync_time).strftime('%Y-%m-%d %H:%M') if tag.sync_time else "未同步",
             "mps": [{"id": mp.id, "name": mp.mp_name, "cover": Web.get_image_url(mp.mp_cover)} for mp in mps_info]
@@ -211,13 +166,7 @@ async def tag_detail_view(
             {"name": tag.name, "url": None}
         ]
         
-        # 读取模板文件
-        template_path = base.articles_template
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        parser = TemplateParser(template_content, template_dir=base.public_dir)
-        html_content = parser.render({
+        return render_template(base.articles_template, {
             "site": base.site,
             "tag": tag_data,
             "articles": articles,
@@ -230,24 +179,14 @@ async def tag_detail_view(
             "breadcrumb": breadcrumb
         })
         
-        return HTMLResponse(content=html_content)
-        
     except HTTPException:
         raise
     except Exception as e:
         print(f"获取标签详情错误: {str(e)}")
-        # 读取模板文件
-        template_path = base.tag_template
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        parser = TemplateParser(template_content, template_dir=base.public_dir)
-        html_content = parser.render({
+        return render_template(base.tag_detail_template, {
             "site": base.site,
             "error": f"加载数据时出现错误: {str(e)}",
             "breadcrumb": [{"name": "首页", "url": "/views/home"}]
         })
-        
-        return HTMLResponse(content=html_content)
     finally:
         session.close()
\ No newline at end of file
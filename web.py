@@ -9,6 +9,7 @@ from fastapi.openapi.utils import get_openapi
 import json
 from typing import Any
 from core.log import get_logger, set_trace_id
+from core.tracing import format_traceparent, parse_traceparent, start_span
 from core.events import log_event, E
 from apis.auth import router as auth_router
 from apis.user import router as user_router
@@ -97,8 +98,19 @@ async def trace_id_middleware(request: Request, call_next):
     if not tid:
         tid = uuid.uuid4().hex[:8]
     set_trace_id(tid)
-    response = await call_next(request)
+    # 沿用调用方的 W3C traceparent，使 HTTP 请求与下游阶段 span 同属一个 trace
+    parent = parse_traceparent(request.headers.get("traceparent", ""))
+    with start_span(f"{request.method} {request.url.path}", parent=parent, kind="server", attributes={
+        "http.request.method": request.method,
+        "url.path": request.url.path,
+    }) as span:
+        response = await call_next(request)
+        span.set_attribute("http.response.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.set_status(False, f"HTTP {response.status_code}")
     response.headers["X-Trace-ID"] = tid
+    if span.context is not None:
+        response.headers["traceparent"] = format_traceparent(span.context)
     return response
 
 
@@ -199,10 +211,19 @@ async def ensure_tables():
         DB.create_tables()
         log_event(_web_logger, E.SYSTEM_DB_INIT, tables="all")
         start_compose_queue_workers()
+        # 启动资源采样线程，/sys/resources 等接口只读取采样快照
+        from core.resource import get_resource_sampler
+        get_resource_sampler()
         log_event(_web_logger, E.SYSTEM_STARTUP, version=VERSION, api_base=API_BASE)
     except Exception:
         pass
 
+@app.on_event("shutdown")
+async def close_resource_proxy():
+    # 释放资源反向代理的回源连接池
+    from apis.res import close_client
+    await close_client()
+
 # 静态文件服务配置
 app.mount("/assets", StaticFiles(directory="static/assets"), name="assets")
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -178,6 +178,7 @@ export interface WorkbenchOverview {
   plan_catalog: PlanCatalogItem[]
   stats: {
     mp_count: number
+    // 用户现有公众号（含已停用）下状态正常的文章数，已删除公众号遗留的文章不计入
     article_count: number
     unread_count: number
     local_draft_count: number